@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Langlebiger Analyse-Worker mit Unix-Socket-IPC
+
+Statt pro Analyse `python analyze_and_comment.py` zu starten (Interpreter +
+Vision/LLM-Imports jedes Mal), läuft ein Worker-Prozess dauerhaft und nimmt
+Anfragen über einen Unix-Socket an.
+
+Protokoll: pro Verbindung eine Anfrage, ein Frame je Richtung; Frame =
+4 Byte Länge (big endian) + UTF-8-JSON.
+  {"op": "ping"}                         → {"ok": true, "pid", "uptime", "served", "busy_sec"}
+  {"op": "analyze", "image", "salt"}     → {"ok": true, "text", ...} | {"ok": false, "error"}
+  {"op": "shutdown"}                     → {"ok": true}; laufende Analyse wird fertig, dann Ende
+
+Analysen laufen seriell (ein Modell, eine GPU); Pings werden parallel
+beantwortet, damit ein Client hängende Worker erkennt (busy_sec).
+WorkerClient startet den Worker bei Bedarf, erkennt Hänger per Timeout und
+startet dann neu (shutdown → SIGTERM → SIGKILL).
+"""
+
+from __future__ import annotations
+import os
+import json
+import time
+import signal
+import socket
+import struct
+import logging
+import tempfile
+import threading
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger("analysis_worker")
+
+SOCKET_PATH = os.getenv("ANALYSIS_WORKER_SOCKET",
+                        os.path.join(tempfile.gettempdir(), "zephyr-analyze.sock"))
+try:
+    REQUEST_TIMEOUT_SEC = float(os.getenv("ANALYSIS_WORKER_TIMEOUT_SEC", "150"))
+except Exception:
+    REQUEST_TIMEOUT_SEC = 150.0
+try:
+    START_TIMEOUT_SEC = float(os.getenv("ANALYSIS_WORKER_START_TIMEOUT_SEC", "30"))
+except Exception:
+    START_TIMEOUT_SEC = 30.0
+try:
+    # Worker nach N Analysen geordnet recyceln (Speicherlecks in Modell-Libs); 0 = nie
+    MAX_REQUESTS = int(os.getenv("ANALYSIS_WORKER_MAX_REQUESTS", "0"))
+except Exception:
+    MAX_REQUESTS = 0
+
+_HDR = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024
+
+Handler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+# -----------------------------------------------------------------------------
+# Framing
+# -----------------------------------------------------------------------------
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Verbindung vorzeitig geschlossen")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_frame(sock: socket.socket, obj: Dict[str, Any]):
+    data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HDR.pack(len(data)) + data)
+
+
+def recv_frame(sock: socket.socket) -> Dict[str, Any]:
+    (n,) = _HDR.unpack(_recv_exact(sock, _HDR.size))
+    if n > MAX_FRAME:
+        raise ConnectionError(f"Frame zu groß: {n}")
+    return json.loads(_recv_exact(sock, n).decode("utf-8"))
+
+
+# -----------------------------------------------------------------------------
+# Server
+# -----------------------------------------------------------------------------
+
+class WorkerServer:
+    def __init__(self, handler: Handler, path: str = SOCKET_PATH, max_requests: int = MAX_REQUESTS):
+        self.handler = handler
+        self.path = path
+        self.max_requests = max(0, int(max_requests))
+        self.started = time.monotonic()
+        self.served = 0
+        self.errors = 0
+        self._busy_since: Optional[float] = None
+        self._work_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sock: Optional[socket.socket] = None
+        self._conns: List[threading.Thread] = []
+
+    def _bind(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.bind(self.path)
+        os.chmod(self.path, 0o600)
+        s.listen(8)
+        s.settimeout(0.5)
+        self._sock = s
+
+    def _status(self) -> Dict[str, Any]:
+        busy = self._busy_since
+        return {"ok": True, "pid": os.getpid(), "uptime": round(time.monotonic() - self.started, 1),
+                "served": self.served, "errors": self.errors,
+                "busy_sec": round(time.monotonic() - busy, 1) if busy else 0.0}
+
+    def _analyze(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        with self._work_lock:
+            self._busy_since = time.monotonic()
+            try:
+                out = dict(self.handler(req) or {})
+                out.setdefault("ok", True)
+            except Exception as e:
+                self.errors += 1
+                log.exception("[worker] analyze failed")
+                out = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            finally:
+                self._busy_since = None
+                self.served += 1
+        if self.max_requests and self.served >= self.max_requests:
+            log.info("[worker] %d Anfragen bedient – geordneter Neustart", self.served)
+            self._stop.set()
+        return out
+
+    def _serve_conn(self, conn: socket.socket):
+        with conn:
+            try:
+                conn.settimeout(10.0)
+                req = recv_frame(conn)
+                conn.settimeout(None)
+                op = req.get("op")
+                if op == "ping":
+                    resp = self._status()
+                elif op == "analyze":
+                    resp = self._analyze(req)
+                elif op == "shutdown":
+                    self._stop.set()
+                    resp = {"ok": True}
+                else:
+                    resp = {"ok": False, "error": f"unbekannte op: {op!r}"}
+                send_frame(conn, resp)
+            except Exception as e:
+                log.debug("[worker] connection error: %s", e)
+
+    def serve_forever(self):
+        self._bind()
+        log.info("[worker] bereit auf %s (pid %d)", self.path, os.getpid())
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    continue
+                except OSError:
+                    if self._stop.is_set():
+                        break
+                    raise
+                t = threading.Thread(target=self._serve_conn, args=(conn,), name="worker-conn", daemon=True)
+                t.start()
+                self._conns = [c for c in self._conns if c.is_alive()] + [t]
+        finally:
+            # keine neuen Verbindungen; laufende Analyse beenden lassen
+            try:
+                self._sock.close()
+            except Exception:
+                pass
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            for t in self._conns:
+                t.join(REQUEST_TIMEOUT_SEC)
+            log.info("[worker] beendet (%d Anfragen)", self.served)
+
+    def stop(self):
+        self._stop.set()
+
+    def install_signal_handlers(self):
+        def _term(signum, frame):
+            self._stop.set()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                signal.signal(sig, _term)
+            except (ValueError, AttributeError):
+                pass
+
+
+# -----------------------------------------------------------------------------
+# Client
+# -----------------------------------------------------------------------------
+
+class WorkerClient:
+    """Spricht mit dem Worker; startet/ersetzt ihn bei Bedarf."""
+
+    def __init__(self, command: Optional[List[str]] = None, path: str = SOCKET_PATH,
+                 timeout_sec: float = REQUEST_TIMEOUT_SEC, start_timeout_sec: float = START_TIMEOUT_SEC):
+        self.command = command
+        self.path = path
+        self.timeout_sec = timeout_sec
+        self.start_timeout_sec = start_timeout_sec
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self.restarts = 0
+
+    def request(self, req: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout if timeout is not None else self.timeout_sec)
+            s.connect(self.path)
+            send_frame(s, req)
+            return recv_frame(s)
+
+    def ping(self, timeout: float = 2.0) -> Optional[Dict[str, Any]]:
+        try:
+            return self.request({"op": "ping"}, timeout=timeout)
+        except (OSError, ValueError, ConnectionError):
+            return None
+
+    def _spawn(self):
+        if not self.command:
+            raise WorkerError("Worker läuft nicht und kein Startkommando gesetzt")
+        self._proc = subprocess.Popen(self.command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                      start_new_session=True, close_fds=True)
+        deadline = time.monotonic() + self.start_timeout_sec
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise WorkerError(f"Worker beim Start beendet (RC {self._proc.returncode})")
+            if self.ping(timeout=1.0):
+                return
+            time.sleep(0.05)
+        raise WorkerError("Worker antwortet nicht auf ping")
+
+    def ensure(self) -> Dict[str, Any]:
+        """Laufenden Worker liefern, sonst starten. Gibt den ping-Status zurück."""
+        with self._lock:
+            st = self.ping()
+            if st is None:
+                self._spawn()
+                st = self.ping() or {}
+            return st
+
+    def stop(self, grace_sec: float = 10.0):
+        """Geordnet beenden: shutdown, dann SIGTERM, zuletzt SIGKILL."""
+        st = self.ping()
+        pid = (st or {}).get("pid") or (self._proc.pid if self._proc and self._proc.poll() is None else None)
+        try:
+            self.request({"op": "shutdown"}, timeout=2.0)
+        except (OSError, ValueError, ConnectionError):
+            pass
+        if not pid:
+            return
+        for sig, wait in ((None, grace_sec), (signal.SIGTERM, 3.0), (signal.SIGKILL, 1.0)):
+            if sig is not None:
+                try:
+                    os.kill(pid, sig)
+                except ProcessLookupError:
+                    break
+            if _wait_pid_gone(pid, wait, self._proc):
+                break
+
+    def restart(self):
+        self.restarts += 1
+        self.stop()
+        return self.ensure()
+
+    def analyze(self, image: str, salt: str = "", **extra) -> Dict[str, Any]:
+        """Eine Analyse; Timeout/abgerissene Verbindung → Worker neu starten, WorkerError."""
+        self.ensure()
+        req = {"op": "analyze", "image": image, "salt": salt}
+        req.update(extra)
+        try:
+            return self.request(req)
+        except socket.timeout:
+            log.warning("[worker] Analyse > %.0fs – Worker wird neu gestartet", self.timeout_sec)
+            self._restart_quietly()
+            raise WorkerError("Timeout")
+        except (OSError, ValueError, ConnectionError) as e:
+            self._restart_quietly()
+            raise WorkerError(str(e))
+
+    def _restart_quietly(self):
+        try:
+            self.restart()
+        except Exception as e:
+            log.warning("[worker] restart failed: %s", e)
+
+
+def _wait_pid_gone(pid: int, timeout: float, proc: Optional[subprocess.Popen]) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.pid == pid:
+            if proc.poll() is not None:
+                return True
+        else:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return True
+        time.sleep(0.05)
+    return False
+
+
+def serve(handler: Handler, path: str = SOCKET_PATH):
+    srv = WorkerServer(handler, path)
+    srv.install_signal_handlers()
+    srv.serve_forever()
@@ -3,12 +3,30 @@
 
 """
 CLI/Hook: Bild rein, Vision-Summary + LLM-Kommentar raus – als eine Nachricht.
-Übergibt die vollständige Vision-Analyse (raw_full) an die LLM-Kette.
+
+Die eigentliche Analyse läuft in einem langlebigen Worker (analysis_worker,
+Unix-Socket); die CLI ist nur noch ein dünner Client und startet den Worker
+bei Bedarf selbst. Vision- und LLM-Module werden nur im Worker importiert.
+
+  analyze_and_comment.py <bild> [salt]   # Analyse über den Worker
+  analyze_and_comment.py --serve         # Worker im Vordergrund
+  analyze_and_comment.py --ping|--stop|--restart
+  analyze_and_comment.py --batch <verzeichnis|ring> [--out F] [--checkpoint F]
+                         [--concurrency N] [--max-concurrency M] [--comment] [--limit K]
+  ANALYSIS_WORKER_ENABLED=false          # wie früher: alles im eigenen Prozess
+
+Der Batch-Modus (batch_backfill) läuft im eigenen Prozess mit mehreren
+parallelen VLM-Anfragen; der Worker analysiert seriell und bleibt für
+Einzelbilder zuständig.
 """
 
 from __future__ import annotations
+import os
 import sys
 import re
+import json
+import time
+from typing import Any, Dict
 
 # .env laden (robust)
 try:
@@ -17,23 +35,13 @@ try:
 except Exception:
     pass
 
-from vision_summarizer import summarize
-from llm_router import ask_language_models
-from commentary_engine import render_message
-
-PROMPT_TEMPLATE = """\
-Hier ist eine vollständige, unbearbeitete Vision-Analyse (vom Bildmodell):
-
-<<<VISION_BEGIN
-{vision_full}
-VISION_END>>>
+import analysis_worker
 
-Aufgabe:
-- Formuliere GENAU EINEN deutschen Satz (keine Liste, kein Bullet, kein Markdown), der die Szene präzise beschreibt und eine klare Handlungsempfehlung ableitet.
-- Maximal 500 Zeichen.
-- Nutze ausschließlich Informationen aus der Vision-Analyse; benenne Unsicherheit knapp (z. B. „wirkt“, „vermutlich“), wenn confidence niedrig ist.
-- Kein Emoji, keine Hashtags, keine Platzhalter.
-"""
+WORKER_ENABLED = os.getenv("ANALYSIS_WORKER_ENABLED", "true").lower() != "false"
+LATEST_COMMENT_FILE = os.getenv(
+    "LATEST_COMMENT_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "latest_comment.txt"),
+)
 
 def _to_one_sentence(s: str) -> str:
     s = " ".join((s or "").split())
@@ -55,26 +63,102 @@ def _clamp(s: str, n: int) -> str:
     s = " ".join((s or "").split())
     return s if len(s) <= n else (s[:n].rsplit(" ", 1)[0].rstrip(" .,:;-") + "…")
 
-def build_prompt_from_vision(vision: dict) -> str:
-    full = (vision.get("raw_full") or "").strip()
-    if not full:
-        # Fallback: kleiner Brief, falls raw_full leer ist
-        brief = vision.get("raw_excerpt") or "Keine verwertbaren Details vorhanden."
-        return PROMPT_TEMPLATE.format(vision_full=brief).strip()
-    return PROMPT_TEMPLATE.format(vision_full=full).strip()
+def _write_latest(text: str, image: str):
+    """latest_comment.txt (JSON, short_chat) für Datei-basierte Abnehmer – atomar."""
+    try:
+        tmp = LATEST_COMMENT_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"short_chat": text, "image": image, "ts": time.time()}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, LATEST_COMMENT_FILE)
+    except OSError:
+        pass
+
+
+def analyze(image: str, salt: str = "") -> Dict[str, Any]:
+    """Vision + Kommentar für ein Bild (läuft im Worker; Importe einmalig)."""
+    from vision_summarizer import summarize_image
+    from commentary_engine import make_comment
+    vision = summarize_image(image)
+    if not vision:
+        return {"ok": False, "error": "keine Vision-Antwort"}
+    msg = make_comment(vision, salt=salt) or ""
+    final = _clamp(_to_one_sentence(msg), 500)
+    if final:
+        _write_latest(final, image)
+    return {"ok": bool(final), "text": final, "short_chat": final, "vision": vision}
+
+
+def _handle(req: Dict[str, Any]) -> Dict[str, Any]:
+    return analyze(str(req.get("image") or ""), str(req.get("salt") or ""))
+
+
+def client() -> analysis_worker.WorkerClient:
+    return analysis_worker.WorkerClient([sys.executable, os.path.abspath(__file__), "--serve"])
+
+
+def batch_main(args) -> int:
+    import argparse
+    import batch_backfill
+    ap = argparse.ArgumentParser(prog="analyze_and_comment.py --batch",
+                                 description="Vision-Backfill über ein Verzeichnis oder den Ringpuffer")
+    ap.add_argument("source", help="Verzeichnis mit Bildern oder 'ring'")
+    ap.add_argument("--out", default="backfill.jsonl", help="JSONL-Ausgabe (wird fortgeschrieben)")
+    ap.add_argument("--checkpoint", default=None, help="Checkpoint-Datei (Standard: <out>.ckpt)")
+    ap.add_argument("--concurrency", type=int, default=2, help="parallele VLM-Anfragen zu Beginn")
+    ap.add_argument("--max-concurrency", type=int, default=4, help="Obergrenze für das adaptive Limit")
+    ap.add_argument("--comment", action="store_true", help="zusätzlich Chat-Kommentar pro Frame (LLM)")
+    ap.add_argument("--limit", type=int, default=None, help="höchstens K Bilder")
+    a = ap.parse_args(args)
+    try:
+        paths = batch_backfill.list_sources(a.source)
+    except FileNotFoundError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    summary = batch_backfill.run_batch(
+        paths, a.out, checkpoint=a.checkpoint or a.out + ".ckpt",
+        concurrency=a.concurrency, max_concurrency=a.max_concurrency,
+        comment=a.comment, limit=a.limit,
+    )
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0 if not summary["failed"] else 1
+
 
 def main(argv):
     if len(argv) < 2:
-        print("Usage: analyze_and_comment.py <image_path_or_url> [salt]")
+        print("Usage: analyze_and_comment.py <image_path_or_url> [salt] | --serve | --ping | --stop | --restart"
+              " | --batch <dir|ring> [...]")
         sys.exit(1)
-    image = argv[1]
+    cmd = argv[1]
+    if cmd == "--batch":
+        sys.exit(batch_main(argv[2:]))
+    if cmd == "--serve":
+        analysis_worker.serve(_handle)
+        return
+    if cmd in ("--ping", "--stop", "--restart"):
+        c = client()
+        if cmd == "--stop":
+            c.stop()
+        elif cmd == "--restart":
+            c.restart()
+        st = c.ping()
+        print(json.dumps(st) if st else "worker: down")
+        sys.exit(0 if st or cmd == "--stop" else 1)
+    # Der Worker läuft mit dem cwd des Clients, der ihn gestartet hat – relative Pfade hier auflösen
+    image = cmd if "://" in cmd else os.path.abspath(cmd)
     salt = argv[2] if len(argv) >= 3 else ""
-    vision = summarize(image)
-    prompt = build_prompt_from_vision(vision)
-    llm_text = ask_language_models(prompt)  # nutzt BACKEND_ORDER und *_API_BASE/KEY/MODEL
-    msg = render_message(vision, llm_text, salt=salt)
-    final = _clamp(_to_one_sentence(msg), 500)
-    print(final)
+    if WORKER_ENABLED:
+        try:
+            res = client().analyze(image, salt)
+        except analysis_worker.WorkerError as e:
+            print(f"worker: {e}", file=sys.stderr)
+            sys.exit(2)
+    else:
+        res = analyze(image, salt)
+    if not res.get("ok"):
+        print(res.get("error") or "keine Analyse", file=sys.stderr)
+        sys.exit(1)
+    print(res.get("text", ""))
+
 
 if __name__ == "__main__":
     main(sys.argv)
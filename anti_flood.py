@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import time
 import hashlib
 from typing import Optional
 
+import clock
+
 
 class AntiFlood:
     def __init__(self):
@@ -19,10 +20,18 @@ class AntiFlood:
         return hashlib.sha256(data.encode("utf-8")).hexdigest()[:12]
 
     def allow(self, text: str, *, min_interval: int = 30, salt: str = "") -> bool:
-        now = time.time()
+        now = clock.time()
         h = self._hash(text, salt=salt)
         if self._last_hash == h and (now - self._last_time) < min_interval:
             return False
         self._last_hash = h
         self._last_time = now
         return True
+
+    # Warm-Restart (state_snapshot)
+    def export_state(self) -> dict:
+        return {"last_hash": self._last_hash, "last_time": self._last_time}
+
+    def restore_state(self, data: dict):
+        self._last_hash = data.get("last_hash")
+        self._last_time = float(data.get("last_time") or 0.0)
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Batch-Backfill: Verzeichnis oder Screenshot-Ringpuffer durch die Vision schicken
+
+    analyze_and_comment.py --batch <verzeichnis|ring> [--out F] [--checkpoint F]
+                           [--concurrency N] [--max-concurrency M] [--comment] [--limit K]
+
+- Quellen: Bilder eines Verzeichnisses (.png/.jpg/.jpeg, nach Name) oder der
+  komplette Ringpuffer (screenshots.screenshot_manager, älteste zuerst)
+- Fortsetzbar: pro fertigem Frame eine Zeile "md5<TAB>pfad" im Checkpoint
+  (nach der Ergebniszeile geschrieben – ein Abbruch verliert nichts, schlimmstenfalls
+  steht ein Ergebnis doppelt im JSONL). Bereits gecachte Hashes (vision_cache)
+  gehen ohne VLM-Aufruf durch, doppelte Bytes im Lauf nur einmal.
+- Ergebnis: eine JSON-Zeile pro Frame (path, md5, vision, optional comment, ms, cached)
+- Nebenläufigkeit: AIMD wie bei TCP. Das Limit wächst, solange die Latenz
+  nahe am besten gesehenen Wert bleibt, und halbiert sich bei Fehlern oder
+  wenn die Latenz auf das BATCH_LATENCY_FACTOR-fache steigt (die Bridge
+  arbeitet seriell – mehr parallele Anfragen stauen sich dort nur). Offener
+  VLM-Breaker → warten statt weiter anfragen.
+- Fortschritt + Durchsatz (Frames/min) auf stderr
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import frame_loader
+import lazy_import
+
+log = logging.getLogger("batch_backfill")
+
+try:
+    LATENCY_FACTOR = max(1.1, float(os.getenv("BATCH_LATENCY_FACTOR", "1.8")))
+except Exception:
+    LATENCY_FACTOR = 1.8
+try:
+    PROGRESS_SEC = float(os.getenv("BATCH_PROGRESS_SEC", "10"))
+except Exception:
+    PROGRESS_SEC = 10.0
+
+_EXTS = (".png", ".jpg", ".jpeg")
+
+Analyzer = Callable[[frame_loader.Frame], Optional[Dict[str, Any]]]
+
+
+# -----------------------------------------------------------------------------
+# Quellen / Checkpoint
+# -----------------------------------------------------------------------------
+
+def list_sources(target: str) -> List[str]:
+    """Bildpfade eines Verzeichnisses oder ("ring") des Screenshot-Ringpuffers."""
+    if target == "ring":
+        sm = lazy_import.optional("screenshots.screenshot_manager")
+        if sm is None:
+            raise FileNotFoundError("Screenshot-Ringpuffer nicht verfügbar")
+        n = sm.count() if hasattr(sm, "count") else 10 ** 6
+        recs = sm.list_recent(max(1, int(n))) or []
+        return [r["path"] for r in reversed(recs) if r.get("path")]
+    if not os.path.isdir(target):
+        raise FileNotFoundError(f"kein Verzeichnis: {target}")
+    return sorted(os.path.join(target, n) for n in os.listdir(target)
+                  if n.lower().endswith(_EXTS) and os.path.isfile(os.path.join(target, n)))
+
+
+def load_checkpoint(path: Optional[str]) -> Set[str]:
+    done: Set[str] = set()
+    if not path:
+        return done
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                md5 = line.split("\t", 1)[0].strip()
+                if md5:
+                    done.add(md5)
+    except FileNotFoundError:
+        pass
+    return done
+
+
+# -----------------------------------------------------------------------------
+# Nebenläufigkeit
+# -----------------------------------------------------------------------------
+
+class AdaptiveLimit:
+    """AIMD-Limit für gleichzeitige VLM-Anfragen (Latenz-basiert wie TCP Vegas)."""
+
+    def __init__(self, start: int = 2, lo: int = 1, hi: int = 4, factor: float = LATENCY_FACTOR):
+        self.lo = max(1, lo)
+        self.hi = max(self.lo, hi)
+        self.value = float(min(self.hi, max(self.lo, start)))
+        self.factor = factor
+        self.base_ms: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return int(self.value)
+
+    def on_result(self, ms: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.base_ms = ms if self.base_ms is None else min(self.base_ms, ms)
+            if not ok or ms > self.base_ms * self.factor:
+                self.value = max(float(self.lo), self.value / 2.0)
+            else:
+                self.value = min(float(self.hi), self.value + 1.0 / self.value)
+
+
+# -----------------------------------------------------------------------------
+# Lauf
+# -----------------------------------------------------------------------------
+
+class BatchStats:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.analyzed = 0
+        self.cached = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.vlm_ms = 0.0
+
+    def fpm(self) -> float:
+        dt = time.monotonic() - self.started
+        return self.analyzed / dt * 60.0 if dt > 0 else 0.0
+
+    def line(self, limit: int) -> str:
+        return (f"[batch] {self.done + self.skipped}/{self.total} · analysiert {self.analyzed} · "
+                f"cache {self.cached} · übersprungen {self.skipped} · Fehler {self.failed} · "
+                f"{self.fpm():.1f} Frames/min · parallel {limit}")
+
+    def summary(self) -> Dict[str, Any]:
+        dt = time.monotonic() - self.started
+        return {"total": self.total, "analyzed": self.analyzed, "cached": self.cached,
+                "skipped": self.skipped, "failed": self.failed, "sec": round(dt, 1),
+                "frames_per_min": round(self.fpm(), 2),
+                "avg_vlm_ms": round(self.vlm_ms / self.analyzed) if self.analyzed else None}
+
+
+def _default_analyzer() -> Tuple[Analyzer, Callable[[str], Optional[Dict[str, Any]]]]:
+    import vision_summarizer
+    return vision_summarizer.summarize_frame, vision_summarizer.cached_summary
+
+
+def _vlm_wait() -> float:
+    qc = lazy_import.optional("qwen_client")
+    return qc.BREAKER.retry_in() if qc is not None else 0.0
+
+
+def run_batch(paths: Iterable[str], out_path: str, checkpoint: Optional[str] = None,
+              concurrency: int = 2, max_concurrency: int = 4, comment: bool = False,
+              limit: Optional[int] = None, analyzer: Optional[Analyzer] = None,
+              cached: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+              progress: Optional[Callable[[str], None]] = None,
+              vlm_wait: Callable[[], float] = _vlm_wait) -> Dict[str, Any]:
+    """Frames analysieren und als JSONL anhängen; Rückgabe: Zusammenfassung."""
+    if analyzer is None or cached is None:
+        a, c = _default_analyzer()
+        analyzer, cached = analyzer or a, cached or c
+    make_comment = lazy_import.optional("commentary_engine", "make_comment") if comment else None
+    paths = list(paths)
+    if limit:
+        paths = paths[:limit]
+    done = load_checkpoint(checkpoint)
+    seen: Set[str] = set()
+    stats = BatchStats(len(paths))
+    lim = AdaptiveLimit(concurrency, 1, max(concurrency, max_concurrency))
+    out_lock = threading.Lock()
+    say = progress or (lambda s: print(s, file=sys.stderr, flush=True))
+    last_report = time.monotonic()
+
+    out_f = open(out_path, "a", encoding="utf-8")
+    ck_f = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+
+    def emit(rec: Dict[str, Any]):
+        with out_lock:
+            out_f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            out_f.flush()
+            if ck_f is not None:
+                ck_f.write(f"{rec['md5']}\t{rec['path']}\n")
+                ck_f.flush()
+
+    def record(frame: frame_loader.Frame, vision: Dict[str, Any], ms: Optional[int], hit: bool):
+        rec: Dict[str, Any] = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "path": frame.path,
+                               "md5": frame.md5, "cached": hit, "ms": ms, "vision": vision}
+        if make_comment is not None:
+            try:
+                rec["comment"] = make_comment(vision) or ""
+            except Exception as e:
+                rec["comment_error"] = str(e)
+        emit(rec)
+
+    def job(frame: frame_loader.Frame) -> Tuple[frame_loader.Frame, Optional[Dict[str, Any]], float]:
+        t0 = time.perf_counter()
+        try:
+            vis = analyzer(frame)
+        except Exception as e:
+            log.warning("[batch] %s: %s", frame.path, e)
+            vis = None
+        return frame, vis, (time.perf_counter() - t0) * 1000.0
+
+    pending: Set[Future] = set()
+    it = iter(paths)
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=lim.hi, thread_name_prefix="batch") as pool:
+        try:
+            while pending or not exhausted:
+                # nachfüllen bis zum aktuellen Limit; cache-/checkpoint-Treffer laufen direkt durch
+                while not exhausted and len(pending) < lim.limit:
+                    p = next(it, None)
+                    if p is None:
+                        exhausted = True
+                        break
+                    frame = frame_loader.try_load(p, siblings=False)
+                    if frame is None:
+                        stats.failed += 1
+                        continue
+                    if frame.md5 in done or frame.md5 in seen:
+                        stats.skipped += 1
+                        continue
+                    seen.add(frame.md5)
+                    hit = cached(frame.md5)
+                    if hit is not None:
+                        record(frame, hit, None, True)
+                        stats.cached += 1
+                        stats.done += 1
+                        continue
+                    wait_s = vlm_wait()
+                    if wait_s > 0:
+                        say(f"[batch] VLM-Breaker offen – warte {wait_s:.0f}s")
+                        time.sleep(wait_s)
+                    pending.add(pool.submit(job, frame))
+                if not pending:
+                    continue
+                finished, pending = wait(pending, timeout=PROGRESS_SEC, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    frame, vis, ms = fut.result()
+                    lim.on_result(ms, vis is not None)
+                    if vis is None:
+                        stats.failed += 1
+                        continue
+                    record(frame, vis, int(ms), False)
+                    stats.analyzed += 1
+                    stats.done += 1
+                    stats.vlm_ms += ms
+                if time.monotonic() - last_report >= PROGRESS_SEC:
+                    last_report = time.monotonic()
+                    say(stats.line(lim.limit))
+        finally:
+            for fut in pending:
+                fut.cancel()
+            out_f.close()
+            if ck_f is not None:
+                ck_f.close()
+    say(stats.line(lim.limit))
+    return stats.summary()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Bild-Ingest pro Vision-Aufruf – alter Pfad vs. frame_loader,
+optional Payload/Latenz mit und ohne vision_preprocess
+
+Alter Pfad (nachgestellt, wie vor frame_loader):
+  summarizer:   os.stat → _md5sum (read) → `/usr/bin/stat`-Fork (Debug-Zeile)
+                → qwen_client.analyze_image: open/read/base64
+  orchestrator: _file_md5 (read) → _call_vision: open/read, md5, base64
+Neuer Pfad: frame_loader.load() einmal, md5 + base64 aus dem Puffer.
+
+Gemessen pro Aufruf: Wall-Zeit, CPU (eigener Prozess + Kindprozesse) und
+gelesene Bytes (/proc/self/io rchar, nur Linux).
+
+--payload: Payload-Größe/Vision-Tokens Original vs. vision_preprocess
+(braucht ein echtes Bild und Pillow). --vlm N: zusätzlich N End-to-End-
+Vision-Aufrufe (orchestrator._call_vision) gegen die laufende Bridge, je
+einmal mit Original und vorverarbeitetem Bild.
+
+--gate: Dauer von frame_gate.signature() (dHash + Kacheln) auf dem Bild.
+
+    python bench_ingest.py [BILD] [--n 200] [--size-kb 600] [--payload] [--vlm 5] [--gate]
+"""
+
+from __future__ import annotations
+import os
+import sys
+import time
+import base64
+import hashlib
+import argparse
+import tempfile
+import resource
+import subprocess
+from typing import Callable, Dict, Optional
+
+import frame_loader
+
+
+def _rchar() -> Optional[int]:
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _child_cpu() -> float:
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+# --- alter Pfad --------------------------------------------------------------
+
+def _legacy_md5(path: str) -> str:
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def legacy_summarizer(path: str):
+    os.stat(path)
+    _legacy_md5(path)
+    try:
+        subprocess.check_output(["/usr/bin/stat", "-c", "%s %y", path], text=True)
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    with open(path, "rb") as f:
+        base64.b64encode(f.read()).decode("ascii")
+
+
+def legacy_orchestrator(path: str):
+    _legacy_md5(path)
+    with open(path, "rb") as f:
+        img = f.read()
+    hashlib.md5(img).hexdigest()
+    base64.b64encode(img).decode("ascii")
+
+
+# --- neuer Pfad --------------------------------------------------------------
+
+def loader_path(path: str):
+    frame = frame_loader.load(path, siblings=False)
+    frame.md5
+    frame.data_uri()
+
+
+def measure(fn: Callable[[str], None], path: str, n: int) -> Dict[str, float]:
+    fn(path)    # Warmup (Page-Cache, Imports)
+    r0, c0, k0, t0 = _rchar(), time.process_time(), _child_cpu(), time.perf_counter()
+    for _ in range(n):
+        fn(path)
+    wall = time.perf_counter() - t0
+    cpu = (time.process_time() - c0) + (_child_cpu() - k0)
+    r1 = _rchar()
+    return {
+        "wall_ms": wall / n * 1000.0,
+        "cpu_ms": cpu / n * 1000.0,
+        "read_kb": ((r1 - r0) / n / 1024.0) if r0 is not None and r1 is not None else float("nan"),
+    }
+
+
+def bench_payload(path: str, vlm_calls: int = 0):
+    import vision_preprocess
+    frame = frame_loader.load(path, siblings=False)
+    raw_kb = len(frame.data_uri()) / 1024.0
+    enc = vision_preprocess.Preprocessor(cache_entries=0).encode(frame)
+    print(f"\nPayload: original {raw_kb:.0f} KiB → {len(enc.data_uri) / 1024.0:.0f} KiB "
+          f"({enc.width}x{enc.height}, {enc.tokens} Vision-Tokens, JPEG q{vision_preprocess.JPEG_QUALITY}, "
+          f"{enc.ms:.1f} ms)")
+    if vlm_calls <= 0:
+        return
+    import orchestrator
+    import vision_cache
+    vision_cache.CACHE_ENABLED = False
+    for label, enabled in (("original", False), ("preprocessed", True)):
+        vision_preprocess.PREPROCESS_ENABLED = enabled
+        vision_preprocess._PREP = None
+        times = []
+        for _ in range(vlm_calls):
+            trace: Dict[str, object] = {}
+            t0 = time.perf_counter()
+            ok = orchestrator._call_vision(path, None, frame=frame, trace=trace) is not None
+            times.append((time.perf_counter() - t0) * 1000.0)
+            if not ok:
+                print(f"  {label}: Vision-Aufruf fehlgeschlagen (Bridge erreichbar?)")
+                break
+        times.sort()
+        print(f"  {label:<13} median {times[len(times) // 2]:.0f} ms, max {times[-1]:.0f} ms, "
+              f"payload {trace.get('payload')}")
+
+
+def bench_gate(path: str, n: int):
+    import frame_gate
+    data = frame_loader.load(path, siblings=False).data
+    frame_gate.signature(data)
+    times = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        frame_gate.signature(data)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    times.sort()
+    print(f"\nGate-Signatur: median {times[len(times) // 2]:.2f} ms, p95 {times[int(len(times) * 0.95)]:.2f} ms")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Ingest-Benchmark alter Pfad vs. frame_loader")
+    ap.add_argument("image", nargs="?", help="Bilddatei (ohne: Zufallsdaten der Größe --size-kb)")
+    ap.add_argument("--n", type=int, default=200)
+    ap.add_argument("--size-kb", type=int, default=600)
+    ap.add_argument("--payload", action="store_true", help="Payload vorher/nachher (Pillow, echtes Bild)")
+    ap.add_argument("--vlm", type=int, default=0, metavar="N", help="N End-to-End-Vision-Aufrufe je Variante")
+    ap.add_argument("--gate", action="store_true", help="frame_gate.signature() messen (Pillow, echtes Bild)")
+    args = ap.parse_args(argv)
+
+    tmp = None
+    path = args.image
+    if not path:
+        fd, tmp = tempfile.mkstemp(suffix=".jpg")
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(args.size_kb * 1024))
+        path = tmp
+    try:
+        size_kb = os.path.getsize(path) / 1024.0
+        print(f"Bild: {path} ({size_kb:.0f} KiB), n={args.n}")
+        print(f"{'Pfad':<24}{'wall ms':>10}{'cpu ms':>10}{'read KiB':>11}")
+        for name, fn in (("legacy summarizer", legacy_summarizer),
+                         ("legacy orchestrator", legacy_orchestrator),
+                         ("frame_loader", loader_path)):
+            m = measure(fn, path, args.n)
+            print(f"{name:<24}{m['wall_ms']:>10.2f}{m['cpu_ms']:>10.2f}{m['read_kb']:>11.0f}")
+        if (args.payload or args.vlm) and not tmp:
+            bench_payload(path, args.vlm)
+        if args.gate and not tmp:
+            bench_gate(path, args.n)
+    finally:
+        if tmp:
+            os.remove(tmp)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: JSON-Extraktion aus Modellausgaben – alter Scanner vs. json_extract
+
+Alt (bis hierher kopiert in orchestrator/vision_summarizer): json.loads auf
+den ganzen String, Fences per replace entfernen, Zeichen-für-Zeichen-Scan,
+json.loads pro balanciertem Kandidaten.
+
+Eingaben: der Korpus (tests/data/json_corpus.jsonl) sowie künstlich
+geschwätzige Ausgaben mit N Klammerpaaren vor dem eigentlichen Objekt (Code
+im Bild, Mengenklammern in der Prosa).
+
+    python bench_json_extract.py [--repeat 200] [--sizes 100,1000,10000]
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Any, Callable, Dict, List, Optional
+
+import json_extract
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "data", "json_corpus.jsonl")
+
+
+def legacy_extract(s: str) -> Optional[Dict[str, Any]]:
+    if not s:
+        return None
+    try:
+        return json.loads(s)
+    except Exception:
+        pass
+    s2 = s.replace("```json", "```").replace("```", "")
+    depth = 0
+    start = -1
+    in_str = False
+    esc = False
+    for i, ch in enumerate(s2):
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+            continue
+        if ch == '{':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == '}':
+            if depth > 0:
+                depth -= 1
+                if depth == 0 and start != -1:
+                    cand = s2[start:i + 1]
+                    try:
+                        return json.loads(cand)
+                    except Exception:
+                        start = -1
+    return None
+
+
+def _chatty(n: int) -> str:
+    obj = {"scene_summary": "Editor mit Python-Code", "entities": ["VS Code"], "notable_text": [], "confidence": 0.8}
+    prose = "Im Code steht z. B. d = {k: v for k in x} und {x} sowie {'a': 1, 'b': [1, 2]}. " * max(1, n // 4)
+    return prose + "\n```json\n" + json.dumps(obj, ensure_ascii=False) + "\n```"
+
+
+def _timeit(fn: Callable[[str], Any], inputs: List[str], repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for s in inputs:
+            fn(s)
+    return (time.perf_counter() - t0) / (repeat * len(inputs)) * 1e6
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="JSON-Extraktion: alt vs. json_extract")
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--sizes", default="100,1000,10000", help="Klammerpaare in der Prosa")
+    args = ap.parse_args(argv)
+
+    with open(CORPUS_FILE, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    raws = [c["raw"] for c in corpus]
+    ok_old = sum(1 for c in corpus if legacy_extract(c["raw"]) == c["expect"])
+    ok_new = sum(1 for c in corpus if json_extract.extract_object(c["raw"]) == c["expect"])
+    print(f"Korpus: {len(corpus)} Ausgaben, korrekt alt {ok_old}, neu {ok_new}")
+    print(f"  alt {_timeit(legacy_extract, raws, args.repeat):8.1f} µs/Aufruf   "
+          f"neu {_timeit(json_extract.extract_object, raws, args.repeat):8.1f} µs/Aufruf")
+
+    print(f"\n{'Klammern':>9}{'KiB':>8}{'alt ms':>10}{'neu ms':>10}")
+    for n in (int(x) for x in args.sizes.split(",") if x.strip()):
+        s = _chatty(n)
+        rep = max(1, args.repeat // max(1, n // 100))
+        old = _timeit(legacy_extract, [s], rep) / 1000.0
+        new = _timeit(json_extract.extract_object, [s], rep) / 1000.0
+        print(f"{n:>9}{len(s) / 1024.0:>8.0f}{old:>10.2f}{new:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Typisierte Laufzeit-Konfiguration mit Live-Reload
+
+Alle zur Laufzeit verstellbaren Werte (Takt, Cooldowns, Kommentar-Gates,
+Chat-Befehle) stehen in einem unveränderlichen BotConfig-Objekt. get() ist
+ein einfacher Attributzugriff – Hot-Paths lesen keine Umgebungsvariablen
+mehr. reload() liest Umgebung + .env neu, validiert und tauscht das Objekt
+atomar aus; ausgelöst per SIGHUP oder wenn sich die .env-Datei ändert.
+Ungültige Werte werden geloggt und behalten ihren bisherigen Wert.
+
+Vorrang wie beim Start: Variablen aus der Prozess-Umgebung (systemd,
+Shell) schlagen Werte aus der .env-Datei. Aus der .env gelöschte Schlüssel
+werden beim Reload wieder entfernt (→ Default), sofern der Wert noch aus
+der Datei stammt.
+
+Listener (on_change) werden nach jedem Tausch mit (alt, neu) aufgerufen,
+z. B. um Twitch-Budgets ohne IRC-Reconnect neu zu setzen.
+"""
+
+from __future__ import annotations
+import os
+import signal
+import logging
+import threading
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+log = logging.getLogger("bot_config")
+
+ENV_FILE = os.getenv(
+    "ZEPHYR_ENV_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"),
+)
+try:
+    WATCH_INTERVAL_SEC = float(os.getenv("CONFIG_WATCH_INTERVAL_SEC", "5"))
+except Exception:
+    WATCH_INTERVAL_SEC = 5.0
+
+
+def _f(default: Any, env: str, lo: Optional[float] = None, hi: Optional[float] = None):
+    return field(default=default, metadata={"env": env, "lo": lo, "hi": hi})
+
+
+@dataclass(frozen=True)
+class BotConfig:
+    # --- Vision-Loop / Kadenz ---
+    interval_sec: int = _f(10, "SCREENSHOT_ANALYSIS_INTERVAL", lo=1)
+    interval_jitter_sec: float = _f(1.0, "TICK_JITTER_SEC", lo=0)
+    short_chat_min_interval: int = _f(8, "SHORT_CHAT_MIN_INTERVAL", lo=0)
+    chat_global_cooldown_sec: int = _f(120, "CHAT_GLOBAL_COOLDOWN_SEC", lo=0)
+    post_salt: str = _f(".", "POST_SALT")
+    # --- Adaptive Kadenz (cadence.py) ---
+    cadence_enabled: bool = _f(True, "CADENCE_ENABLED")
+    cadence_min_sec: float = _f(3.0, "CADENCE_MIN_SEC", lo=0.5)
+    cadence_max_sec: float = _f(60.0, "CADENCE_MAX_SEC", lo=1)
+    cadence_headroom: float = _f(1.2, "CADENCE_HEADROOM", lo=1)
+    cadence_idle_stretch: float = _f(3.0, "CADENCE_IDLE_STRETCH", lo=1)
+    cadence_ewma_alpha: float = _f(0.3, "CADENCE_EWMA_ALPHA", lo=0.01, hi=1)
+    skip_blocked_ticks: bool = _f(True, "VISION_SKIP_BLOCKED_TICKS")
+    # --- make_comment ---
+    vision_host_filter: str = _f("", "VISION_HOST_FILTER")
+    cross_host_deprioritize_sec: int = _f(120, "CROSS_HOST_DEPRIORIZE_SEC", lo=0)
+    norelevant_min_interval_sec: int = _f(90, "NORELEVANT_MIN_INTERVAL_SEC", lo=0)
+    vision_comment_use_llm: bool = _f(True, "VISION_COMMENT_USE_LLM")
+    # --- Chat-Befehle ---
+    links_url: str = _f("https://linktr.ee/derleiti", "LINKS_URL")
+    budget_cmd: str = _f("budget", "BUDGET_CMD")
+    budget_require_mod: bool = _f(True, "BUDGET_REQUIRE_MOD")
+    health_include_irc: bool = _f(True, "HEALTH_INCLUDE_IRC")
+    vision_host_label: str = _f("", "VISION_HOST_LABEL")
+    vision_source_label: str = _f("screen@unknown", "VISION_SOURCE_LABEL")
+    help_enabled: bool = _f(True, "TWITCH_HELP_ENABLED")
+    help_interval_sec: int = _f(300, "TWITCH_HELP_INTERVAL_SEC", lo=60)
+    help_message: str = _f("", "TWITCH_HELP_MESSAGE")
+    # --- Zufallsantworten ---
+    rand_reply_enabled: bool = _f(False, "TWITCH_RANDOM_REPLY")
+    rand_reply_rate: float = _f(0.10, "TWITCH_RANDOM_REPLY_RATE", lo=0, hi=1)
+    rand_reply_min_gap_sec: int = _f(90, "TWITCH_RANDOM_REPLY_MIN_GAP_SEC", lo=0)
+    rand_reply_classifier: bool = _f(True, "TWITCH_RANDOM_REPLY_CLASSIFIER")
+    rand_reply_threshold: float = _f(0.6, "TWITCH_RANDOM_REPLY_THRESHOLD", lo=0, hi=1)
+    rand_reply_llm_budget: int = _f(40, "TWITCH_RANDOM_REPLY_LLM_BUDGET", lo=0)
+    rand_reply_ignore: Tuple[str, ...] = _f(("nightbot", "streamelements", "moobot", "anotherttvviewer"),
+                                           "TWITCH_RANDOM_REPLY_IGNORE_USERS")
+    bot_username: str = _f("", "TWITCH_USERNAME")
+
+    def diff(self, other: "BotConfig") -> Dict[str, Tuple[Any, Any]]:
+        return {f.name: (getattr(self, f.name), getattr(other, f.name))
+                for f in fields(self) if getattr(self, f.name) != getattr(other, f.name)}
+
+
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off"}
+
+
+def _parse(kind: str, raw: str) -> Any:
+    raw = raw.strip()
+    if kind == "bool":
+        v = raw.lower()
+        if v in _TRUE:
+            return True
+        if v in _FALSE:
+            return False
+        raise ValueError(f"kein bool: {raw!r}")
+    if kind == "int":
+        return int(raw)
+    if kind == "float":
+        return float(raw)
+    if kind.startswith("Tuple"):
+        return tuple(s.strip().lower() for s in raw.split(",") if s.strip())
+    return raw
+
+
+def from_env(env: Mapping[str, str], base: Optional[BotConfig] = None) -> Tuple[BotConfig, List[str]]:
+    """BotConfig aus einer Umgebung bauen; ungültige Werte → Wert aus `base` (bzw. Default)."""
+    base = base or BotConfig()
+    values: Dict[str, Any] = {}
+    errors: List[str] = []
+    for f in fields(BotConfig):
+        name = f.metadata["env"]
+        raw = env.get(name)
+        if name == "TWITCH_USERNAME" and not raw:
+            raw = env.get("BOT_USERNAME")
+        if raw is None:
+            values[f.name] = f.default
+            continue
+        try:
+            v = _parse(str(f.type), raw)
+            lo, hi = f.metadata.get("lo"), f.metadata.get("hi")
+            if (lo is not None and v < lo) or (hi is not None and v > hi):
+                raise ValueError(f"{v} außerhalb [{lo}, {hi}]")
+        except ValueError as e:
+            errors.append(f"{name}: {e}")
+            v = getattr(base, f.name)
+        values[f.name] = v
+    return replace(base, **values), errors
+
+
+def read_env_file(path: str) -> Dict[str, str]:
+    """Minimaler .env-Parser (KEY=VALUE, Kommentare, optionale Quotes, 'export ')."""
+    out: Dict[str, str] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                s = line.strip()
+                if not s or s.startswith("#") or "=" not in s:
+                    continue
+                if s.startswith("export "):
+                    s = s[7:]
+                k, v = s.split("=", 1)
+                k, v = k.strip(), v.strip()
+                if len(v) >= 2 and v[0] == v[-1] and v[0] in "\"'":
+                    v = v[1:-1]
+                elif " #" in v:
+                    v = v.split(" #", 1)[0].rstrip()
+                out[k] = v
+    except OSError:
+        pass
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Globale Instanz
+# -----------------------------------------------------------------------------
+
+_CFG: Optional[BotConfig] = None
+_lock = threading.Lock()
+_listeners: List[Callable[[BotConfig, BotConfig], None]] = []
+# Schlüssel, die aus der .env stammen (dürfen beim Reload überschrieben werden)
+_file_keys: Dict[str, str] = {}
+_env_mtime: Optional[float] = None
+_watch_stop = threading.Event()
+_watch_thread: Optional[threading.Thread] = None
+
+
+def get() -> BotConfig:
+    cfg = _CFG
+    if cfg is None:
+        cfg = load()
+    return cfg
+
+
+def on_change(fn: Callable[[BotConfig, BotConfig], None]):
+    _listeners.append(fn)
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def load(env: Optional[Mapping[str, str]] = None) -> BotConfig:
+    """Initial laden (ohne Listener); aus zephyr_bot.main() bzw. beim ersten get()."""
+    global _CFG, _env_mtime
+    cfg, errors = from_env(os.environ if env is None else env)
+    for e in errors:
+        log.warning("[config] ungültig, Default genutzt: %s", e)
+    with _lock:
+        _CFG = cfg
+        _env_mtime = _mtime(ENV_FILE)
+        file_vals = read_env_file(ENV_FILE)
+        _file_keys.clear()
+        _file_keys.update({k: v for k, v in file_vals.items() if os.environ.get(k) == v})
+    return cfg
+
+
+def reload(reason: str = "manual") -> BotConfig:
+    """.env neu einlesen, validieren, atomar tauschen, Listener benachrichtigen."""
+    global _CFG, _env_mtime
+    with _lock:
+        _env_mtime = _mtime(ENV_FILE)
+        file_vals = read_env_file(ENV_FILE)
+        for k, v in file_vals.items():
+            # Prozess-Umgebung behält Vorrang vor der Datei
+            if k not in os.environ or k in _file_keys:
+                os.environ[k] = v
+                _file_keys[k] = v
+        for k in [k for k in _file_keys if k not in file_vals]:
+            # aus der .env gelöscht: eigenen Wert zurücknehmen, fremde Änderungen stehen lassen
+            if os.environ.get(k) == _file_keys.pop(k):
+                del os.environ[k]
+        old = _CFG or BotConfig()
+        new, errors = from_env(os.environ, base=old)
+        _CFG = new
+    for e in errors:
+        log.warning("[config] ungültig, alter Wert bleibt: %s", e)
+    changes = old.diff(new)
+    if changes:
+        log.info("[config] reload (%s): %s", reason,
+                 ", ".join(f"{k}={b!r}" for k, (_, b) in changes.items()))
+    else:
+        log.info("[config] reload (%s): keine Änderungen", reason)
+    for fn in list(_listeners):
+        try:
+            fn(old, new)
+        except Exception as e:
+            log.warning("[config] listener failed: %s", e)
+    return new
+
+
+def install_sighup_handler():
+    """SIGHUP → reload() in einem Hilfsthread (Signal-Handler bleibt kurz)."""
+    def _on_hup(signum, frame):
+        threading.Thread(target=reload, args=("SIGHUP",), name="config-reload", daemon=True).start()
+    try:
+        signal.signal(signal.SIGHUP, _on_hup)
+    except (ValueError, AttributeError):
+        log.debug("[config] SIGHUP handler nicht verfügbar")
+
+
+def _watch(interval: float):
+    while not _watch_stop.wait(interval):
+        m = _mtime(ENV_FILE)
+        if m is not None and m != _env_mtime:
+            reload("env file changed")
+
+
+def start_watch(interval_sec: float = WATCH_INTERVAL_SEC):
+    global _watch_thread
+    if interval_sec <= 0 or (_watch_thread and _watch_thread.is_alive()):
+        return
+    _watch_stop.clear()
+    _watch_thread = threading.Thread(target=_watch, args=(interval_sec,), name="config-watch", daemon=True)
+    _watch_thread.start()
+
+
+def stop_watch():
+    _watch_stop.set()
@@ -1,4 +1,4 @@
-import os, time, base64, requests
+import os, time, base64
 from typing import Tuple, Optional
 
 TIMEOUT_MS = int(os.getenv("HEALTH_TIMEOUT_MS", "1500"))
@@ -36,6 +36,7 @@ def check_qwen(base: str, model: str, timeout_ms: int = TIMEOUT_MS) -> Tuple[boo
             "max_tokens": 4,
             "temperature": 0.0,
         }
+        import requests  # erst bei der ersten Prüfung laden
         r = requests.post(f"{base}/v1/chat/completions", json=payload, timeout=timeout_ms/1000)
         r.raise_for_status()
         _ = r.json().get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -46,6 +47,7 @@ def check_qwen(base: str, model: str, timeout_ms: int = TIMEOUT_MS) -> Tuple[boo
 
 def check_auth(base: str, timeout_ms: int = TIMEOUT_MS) -> Tuple[bool, Optional[int], Optional[str]]:
     try:
+        import requests
         t0 = _ms()
         r = requests.get(f"{base}/", timeout=timeout_ms/1000)
         r.raise_for_status()
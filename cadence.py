@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive Tick-Kadenz für den Vision-Loop
+
+Statt fest SCREENSHOT_ANALYSIS_INTERVAL (+ Jitter) zu schlafen, bestimmt der
+CadenceController die Pause bis zum nächsten Tick aus:
+
+- gemessener Pipeline-Latenz (EWMA von Vision + Writer): die Tick-Periode
+  ist mindestens Latenz × CADENCE_HEADROOM – langsames Qwen auf CPU staut
+  keine Ticks mehr auf,
+- Bildwechselrate (EWMA über "Screenshot-Hash hat sich geändert"): ein
+  ruhiger Bildschirm streckt die Periode bis zu CADENCE_IDLE_STRETCH-fach,
+- Budget-Druck des Vision-Buckets (used/limit): volles Budget → langsamer.
+
+Ergebnis wird auf [CADENCE_MIN_SEC, CADENCE_MAX_SEC] begrenzt. decisions()
+liefert den aktuellen Stand für !health verbose. Parameter kommen aus
+bot_config und sind damit live verstellbar.
+"""
+
+from __future__ import annotations
+import random
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import bot_config
+
+Budget = Tuple[Optional[int], Optional[int], Optional[int]]
+
+
+class CadenceController:
+    def __init__(self, rng: Optional[random.Random] = None, history: int = 20):
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.latency_sec: Optional[float] = None     # EWMA Vision + Writer
+        self.vision_sec: Optional[float] = None
+        self.writer_sec: Optional[float] = None
+        self.change_rate: float = 1.0                # EWMA, Start: "alles neu"
+        self._last_md5: Optional[str] = None
+        self.last: Dict[str, Any] = {}
+        self.history: Deque[float] = deque(maxlen=history)
+
+    @staticmethod
+    def _ewma(old: Optional[float], new: float, alpha: float) -> float:
+        return new if old is None else (alpha * new + (1.0 - alpha) * old)
+
+    def observe(self, trace: Optional[Dict[str, Any]]):
+        """Ergebnis eines Ticks einspeisen (trace aus orchestrator.run_tick)."""
+        if not trace:
+            return
+        alpha = bot_config.get().cadence_ewma_alpha
+        timings = trace.get("timings") or {}
+        with self._lock:
+            v = timings.get("vision_ms")
+            w = timings.get("writer_ms")
+            if v is not None:
+                self.vision_sec = self._ewma(self.vision_sec, v / 1000.0, alpha)
+            if w is not None:
+                self.writer_sec = self._ewma(self.writer_sec, w / 1000.0, alpha)
+            if v is not None or w is not None:
+                self.latency_sec = (self.vision_sec or 0.0) + (self.writer_sec or 0.0)
+            md5 = trace.get("image_md5")
+            if "frame_changed" in trace:
+                # Urteil des Frame-Gates: Cursor/Uhr zählen nicht als Bildwechsel
+                changed = 1.0 if trace["frame_changed"] else 0.0
+                self.change_rate = self._ewma(self.change_rate, changed, alpha)
+                self._last_md5 = md5
+            elif md5:
+                changed = 1.0 if md5 != self._last_md5 else 0.0
+                self.change_rate = self._ewma(self.change_rate, changed, alpha)
+                self._last_md5 = md5
+
+    def expected_latency(self) -> float:
+        """Erwartete Dauer eines Ticks (Vision + Writer), 0 solange nichts gemessen."""
+        with self._lock:
+            return self.latency_sec or 0.0
+
+    def next_delay(self, tick_sec: float = 0.0, budget: Optional[Budget] = None) -> float:
+        """Pause bis zum nächsten Tick; `tick_sec` = Dauer des gerade beendeten Ticks."""
+        cfg = bot_config.get()
+        base = float(cfg.interval_sec)
+        lo = cfg.cadence_min_sec
+        hi = max(lo, cfg.cadence_max_sec)
+        if not cfg.cadence_enabled:
+            delay = max(1.0, base + self._rng.uniform(-cfg.interval_jitter_sec, cfg.interval_jitter_sec))
+            self._record(delay, base, "static", 1.0, 1.0, budget)
+            return delay
+
+        with self._lock:
+            lat = self.latency_sec
+            chg = self.change_rate
+        period = base
+        reason = "interval"
+        if lat is not None and lat * cfg.cadence_headroom > period:
+            period = lat * cfg.cadence_headroom
+            reason = "latency"
+        idle_f = 1.0 + (1.0 - max(0.0, min(1.0, chg))) * (cfg.cadence_idle_stretch - 1.0)
+        budget_f = 1.0
+        used, limit, _ = budget or (None, None, None)
+        if used is not None and limit:
+            budget_f = 1.0 + min(1.0, used / float(limit))
+        period *= idle_f * budget_f
+        if idle_f >= 1.5 and idle_f >= budget_f:
+            reason = "idle"
+        elif budget_f >= 1.5:
+            reason = "budget"
+        jitter = cfg.interval_jitter_sec
+        period += self._rng.uniform(-jitter, jitter) if jitter > 0 else 0.0
+        # bereits verbrauchte Tick-Zeit abziehen, dann begrenzen
+        delay = max(lo, min(hi, period - max(0.0, tick_sec)))
+        if period - tick_sec > hi:
+            reason = "max"
+        self._record(delay, period, reason, idle_f, budget_f, budget)
+        return delay
+
+    def _record(self, delay: float, period: float, reason: str, idle_f: float, budget_f: float,
+                budget: Optional[Budget]):
+        with self._lock:
+            self.history.append(delay)
+            self.last = {
+                "delay": round(delay, 2),
+                "period": round(period, 2),
+                "reason": reason,
+                "latency": round(self.latency_sec, 2) if self.latency_sec is not None else None,
+                "change_rate": round(self.change_rate, 2),
+                "idle_factor": round(idle_f, 2),
+                "budget_factor": round(budget_f, 2),
+                "budget": list(budget) if budget else None,
+            }
+
+    def decisions(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self.last)
+            hist = list(self.history)
+        out["avg_delay"] = round(sum(hist) / len(hist), 2) if hist else None
+        return out
+
+    def compact(self) -> str:
+        d = self.decisions()
+        if not d.get("reason"):
+            return "n/a"
+        lat = f"{d['latency']:.1f}s" if d.get("latency") is not None else "–"
+        return f"{d['delay']:.0f}s {d['reason']} (lat {lat}, chg {d['change_rate']:.2f})"
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Kleiner Circuit Breaker (closed → open → half-open)
+
+- closed:    Aufrufe erlaubt; nach `failure_threshold` Fehlern in Folge → open
+- open:      Aufrufe sofort abgelehnt, bis `reset_sec` verstrichen sind
+- half-open: genau ein Probeaufruf; Erfolg → closed, Fehler → wieder open.
+             Meldet sich der Probeaufruf nicht binnen `trial_timeout_sec`
+             zurück (Aufrufer-Bug, hängender Thread), wird ein neuer erlaubt.
+
+Blockiert nie: allow() antwortet sofort, retry_in() sagt dem Aufrufer, wann
+sich ein neuer Versuch lohnt. Die Uhr ist injizierbar (Tests/Simulation).
+"""
+
+from __future__ import annotations
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, reset_sec: float = 30.0,
+                 clock: Optional[Callable[[], float]] = None, trial_timeout_sec: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_sec = max(0.0, float(reset_sec))
+        self.trial_timeout_sec = max(1.0, float(trial_timeout_sec if trial_timeout_sec is not None
+                                               else max(60.0, self.reset_sec)))
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._fails = 0
+        self._opened_at = 0.0
+        self._trial_inflight = False
+        self._trial_started = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and (self._clock() - self._opened_at) >= self.reset_sec:
+            self._state = HALF_OPEN
+            self._trial_inflight = False
+        elif (self._state == HALF_OPEN and self._trial_inflight
+              and self._clock() - self._trial_started >= self.trial_timeout_sec):
+            # Probeaufruf hat nie record_success/record_failure gemeldet
+            self._trial_inflight = False
+
+    def allow(self) -> bool:
+        """Darf jetzt ein Aufruf starten? (half-open: nur ein Probeaufruf)"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_inflight:
+                self._trial_inflight = True
+                self._trial_started = self._clock()
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._fails = 0
+            self._trial_inflight = False
+            self.last_error = None
+
+    def record_failure(self, error: Optional[str] = None):
+        with self._lock:
+            self._fails += 1
+            self.last_error = error
+            if self._state == HALF_OPEN or self._fails >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opens += 1
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._trial_inflight = False
+
+    def retry_in(self) -> float:
+        """Sekunden bis zum nächsten erlaubten Versuch (0 = jetzt)."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_sec - (self._clock() - self._opened_at))
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "fails": self._fails,
+            "opens": self.opens,
+            "rejected": self.rejected,
+            "retry_in": round(self.retry_in(), 1),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Injizierbare Uhr für Bot-Logik (Kadenz, Cooldowns, Budgets, Dedupe)
+
+Module rufen clock.time() / clock.monotonic() / clock.sleep() /
+clock.call_later() statt der time-/threading-Funktionen auf. Im Betrieb ist
+das die Systemuhr; simulate.py setzt eine VirtualClock, bei der sleep() die
+Zeit sofort vorspult und fällige call_later-Callbacks ausführt – drei
+Stunden Stream laufen so in Sekunden durch.
+
+Netzwerk-Messungen (IRC-Ping-RTT, Probe-Latenzen) bleiben bewusst auf der
+echten Uhr.
+"""
+
+from __future__ import annotations
+import time as _time
+import heapq
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class SystemClock:
+    def time(self) -> float:
+        return _time.time()
+
+    def monotonic(self) -> float:
+        return _time.monotonic()
+
+    def sleep(self, sec: float) -> None:
+        if sec > 0:
+            _time.sleep(sec)
+
+    def call_later(self, delay: float, fn: Callable[[], Any]) -> Any:
+        t = threading.Timer(max(0.0, delay), fn)
+        t.daemon = True
+        t.start()
+        return t
+
+
+class SimulationDone(Exception):
+    """Virtuelle Zeit hat das Ende (until) erreicht."""
+
+
+class VirtualClock:
+    """Virtuelle Zeit: sleep() spult vor, Callbacks laufen synchron im aufrufenden Thread."""
+
+    def __init__(self, start_wall: float = 1_700_000_000.0, until: Optional[float] = None):
+        self._wall0 = float(start_wall)
+        self._now = 0.0                      # Sekunden seit Start
+        self.until = until                   # Sekunden seit Start; None = offen
+        self._timers: List[Tuple[float, int, Callable[[], Any]]] = []
+        self._seq = 0
+        self._lock = threading.RLock()
+        self.slept = 0.0
+
+    def time(self) -> float:
+        return self._wall0 + self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def elapsed(self) -> float:
+        return self._now
+
+    def call_later(self, delay: float, fn: Callable[[], Any]) -> None:
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._timers, (self._now + max(0.0, delay), self._seq, fn))
+
+    def advance(self, sec: float) -> None:
+        """Zeit um `sec` vorspulen; fällige Timer in Zeitreihenfolge ausführen."""
+        target = self._now + max(0.0, sec)
+        while True:
+            with self._lock:
+                if not self._timers or self._timers[0][0] > target:
+                    break
+                due, _, fn = heapq.heappop(self._timers)
+                self._now = max(self._now, due)
+            fn()
+        # verschachtelte sleep()-Aufrufe in Callbacks können schon weiter sein
+        self._now = max(self._now, target)
+        if self.until is not None and self._now >= self.until:
+            raise SimulationDone()
+
+    def sleep(self, sec: float) -> None:
+        self.slept += max(0.0, sec)
+        self.advance(sec)
+
+
+_CLOCK: Any = SystemClock()
+
+
+def get():
+    return _CLOCK
+
+
+def set_clock(c) -> None:
+    global _CLOCK
+    _CLOCK = c if c is not None else SystemClock()
+
+
+def time() -> float:
+    return _CLOCK.time()
+
+
+def monotonic() -> float:
+    return _CLOCK.monotonic()
+
+
+def sleep(sec: float) -> None:
+    _CLOCK.sleep(sec)
+
+
+def call_later(delay: float, fn: Callable[[], Any]) -> Any:
+    return _CLOCK.call_later(delay, fn)
@@ -4,17 +4,15 @@
 import os
 import socket
 import re
-import time
 import json
 import hashlib
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format="%(asctime)s [%(name)-12s] [%(levelname)-5s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+import clock
+import lazy_import
+import bot_config
+
 log = logging.getLogger("commentary_engine")
 
 POST_PREFIX = os.getenv("POST_PREFIX", "🎯 Vision")
@@ -385,10 +383,7 @@ def generate_one_sentence(vision: Dict[str, Any]) -> str:
     # Attempt writer chain via llm_router
     text: str | None = None
     try:
-        try:
-            from llm_router import run_llm_chain as _llm
-        except Exception:
-            _llm = None
+        _llm = lazy_import.optional("llm_router", "run_llm_chain")
         if _llm:
             # Build concise DE instruction to avoid echoing
             labels = []
@@ -426,6 +421,19 @@ def generate_one_sentence(vision: Dict[str, Any]) -> str:
     return text
 
 
+def export_state() -> Dict[str, Any]:
+    """Dedupe-/Cooldown-Zustand für state_snapshot (Wall-Clock)."""
+    now = clock.time()
+    sigs = {k: v for k, v in _last_signature_ts.items() if now - v < DEDUPE_WINDOW_SEC}
+    return {"signatures": sigs, "last_emit": _last_emit_ts}
+
+
+def restore_state(data: Dict[str, Any]):
+    global _last_emit_ts
+    _last_signature_ts.update({str(k): float(v) for k, v in (data.get("signatures") or {}).items()})
+    _last_emit_ts = max(_last_emit_ts, float(data.get("last_emit") or 0.0))
+
+
 def make_comment(vision: Dict[str, Any], *, salt: str = "") -> Optional[str]:
     """
     Baut eine Twitch-taugliche Nachricht:
@@ -454,7 +462,7 @@ def make_comment(vision: Dict[str, Any], *, salt: str = "") -> Optional[str]:
         event_title = ev.get("event") or "Status aktualisiert"
         # Signature + Dedupe
         sig = make_signature(event_title, ev.get("route"), ev.get("port"))
-        now = time.time()
+        now = clock.time()
         last = _last_signature_ts.get(sig, 0.0)
         if now - last < DEDUPE_WINDOW_SEC:
             log.debug("Dedupe: gleiche Signatur %s in %.1fs – unterdrückt", sig, now - last)
@@ -480,10 +488,11 @@ def make_comment(vision: Dict[str, Any], *, salt: str = "") -> Optional[str]:
                         detail_text = clean_details
 
         # De-Priorisierung: Nur selten posten, wenn (a) kein Host-Match und (b) generischer Status
-        host_filter = os.getenv("VISION_HOST_FILTER", "").strip()
-        cross_host_cooldown = int(os.getenv("CROSS_HOST_DEPRIORIZE_SEC", "120"))
-        no_relevant_cooldown = int(os.getenv("NORELEVANT_MIN_INTERVAL_SEC", "90"))
-        now = time.time()
+        cfg = bot_config.get()
+        host_filter = cfg.vision_host_filter.strip()
+        cross_host_cooldown = cfg.cross_host_deprioritize_sec
+        no_relevant_cooldown = cfg.norelevant_min_interval_sec
+        now = clock.time()
         global _last_emit_ts
 
         if event_title == "Status aktualisiert":
@@ -500,12 +509,9 @@ def make_comment(vision: Dict[str, Any], *, salt: str = "") -> Optional[str]:
                     return None
 
         # Optional: LLM-gestützte Kurzbeschreibung (deutlich, nicht "zu klein")
-        use_llm = (os.getenv("VISION_COMMENT_USE_LLM", "true").lower() == "true")
+        use_llm = cfg.vision_comment_use_llm
         if use_llm:
-            try:
-                from llm_router import run_llm_chain as _llm
-            except Exception:
-                _llm = None
+            _llm = lazy_import.optional("llm_router", "run_llm_chain")
             if _llm:
                 try:
                     labels_str = ", ".join(filtered_labels) if filtered_labels else "(keine)"
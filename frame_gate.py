@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Wahrnehmungs-Hash als Gate vor Qwen-VL
+
+Die meisten Frames unterscheiden sich nur durch einen blinkenden Cursor oder
+die Uhr in der Taskleiste – die MD5 ändert sich trotzdem, und jeder Tick
+schickt das volle Bild ans VLM. FrameGate berechnet vor der Inferenz eine
+kleine Signatur:
+
+- dHash (64 Bit) auf 9×8 Graustufen: grobe Bildstruktur
+- Kachel-Mittelwerte (16×9 Kacheln à 8×8 px einer 128×72-Verkleinerung):
+  fängt lokale Änderungen (neue Chatzeile, geöffnetes Fenster), die der
+  dHash übersieht
+
+Liegt ein Frame innerhalb FRAME_GATE_MAX_HAMMING Bits und
+FRAME_GATE_MAX_TILE_DIFF Grauwerten (max. Kachel-Differenz) vom zuletzt
+analysierten Frame, wird dessen Vision-Ergebnis wiederverwendet. Nach
+FRAME_GATE_MAX_REUSE_SEC wird trotzdem neu analysiert.
+
+JPEGs werden per Pillow-draft() auf die kleinste DCT-Stufe ≥ 128×72
+dekodiert (1080p → 1/8), Kacheln und dHash kommen per BOX-Verkleinerung
+aus demselben Bild – ein typischer Screenshot kostet so wenige
+Millisekunden (python bench_ingest.py BILD --gate). Die Dekodierzeit
+wächst mit der Entropie: ein JPEG aus Rauschen braucht ein Vielfaches. Ohne Pillow/NumPy ist das Gate aus (jeder Frame wird
+analysiert).
+"""
+
+from __future__ import annotations
+import io
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple, Union
+
+import clock
+
+log = logging.getLogger("frame_gate")
+
+GATE_ENABLED = os.getenv("FRAME_GATE_ENABLED", "true").lower() != "false"
+try:
+    MAX_HAMMING = int(os.getenv("FRAME_GATE_MAX_HAMMING", "4"))
+except Exception:
+    MAX_HAMMING = 4
+try:
+    MAX_TILE_DIFF = float(os.getenv("FRAME_GATE_MAX_TILE_DIFF", "6"))
+except Exception:
+    MAX_TILE_DIFF = 6.0
+try:
+    MAX_REUSE_SEC = float(os.getenv("FRAME_GATE_MAX_REUSE_SEC", "180"))
+except Exception:
+    MAX_REUSE_SEC = 180.0
+
+TILES_X, TILES_Y, _TILE_PX = 16, 9, 8
+
+
+class Signature(NamedTuple):
+    dhash: int
+    tiles: Sequence[float]          # TILES_Y × TILES_X Mittelwerte, flach
+
+
+class GateDecision(NamedTuple):
+    reuse: bool
+    vision: Optional[Dict[str, Any]]
+    hamming: Optional[int]
+    tile_diff: Optional[float]
+    hash_ms: float
+    # Indizes der Kacheln (zeilenweise, TILES_X × TILES_Y) über max_tile_diff; None = kein Referenzframe
+    changed: Optional[Tuple[int, ...]] = None
+    # Frame wäre wiederverwendbar, nur FRAME_GATE_MAX_REUSE_SEC ist abgelaufen (Pflicht-Neuanalyse)
+    forced: bool = False
+
+
+def signature(src: Union[str, bytes]) -> Signature:
+    """dHash + Kachel-Mittelwerte eines Bildes (Pillow + NumPy).
+
+    `src` ist ein Pfad oder der bereits gelesene Dateiinhalt (frame_loader).
+    """
+    import numpy as np
+    from PIL import Image
+    with Image.open(io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else src) as im:
+        # JPEG: kleinste DCT-Stufe, die noch ≥ 128×72 ist
+        im.draft("L", (TILES_X * _TILE_PX, TILES_Y * _TILE_PX))
+        g = im.convert("L")
+    # BOX = Flächenmittel: eine Kachel ist der Mittelwert ihres Bildausschnitts
+    tiles = np.asarray(g.resize((TILES_X, TILES_Y), Image.BOX), dtype=np.float32)
+    d = np.asarray(g.resize((9, 8), Image.BOX), dtype=np.int16)
+    bits = (d[:, 1:] > d[:, :-1]).flatten()
+    dh = 0
+    for b in bits:
+        dh = (dh << 1) | int(b)
+    return Signature(dh, tiles.flatten().tolist())
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def tile_diff(a: Sequence[float], b: Sequence[float]) -> float:
+    if len(a) != len(b):
+        return float("inf")
+    return max((abs(x - y) for x, y in zip(a, b)), default=0.0)
+
+
+def changed_tiles(a: Sequence[float], b: Sequence[float], threshold: float) -> Optional[Tuple[int, ...]]:
+    if len(a) != len(b):
+        return None
+    return tuple(i for i, (x, y) in enumerate(zip(a, b)) if abs(x - y) > threshold)
+
+
+class FrameGate:
+    def __init__(self, max_hamming: int = MAX_HAMMING, max_tile_diff: float = MAX_TILE_DIFF,
+                 max_reuse_sec: float = MAX_REUSE_SEC,
+                 signer: Optional[Callable[[Union[str, bytes]], Signature]] = None):
+        self.max_hamming = max_hamming
+        self.max_tile_diff = max_tile_diff
+        self.max_reuse_sec = max_reuse_sec
+        self._signer = signer or signature
+        self._lock = threading.Lock()
+        self._last: Optional[Signature] = None
+        self._last_vision: Optional[Dict[str, Any]] = None
+        self._last_ts = 0.0
+        self._pending: Optional[Signature] = None
+        self.frames = 0
+        self.skips = 0
+        self.errors = 0
+        self.hash_ms_avg: Optional[float] = None
+        self.hash_ms_max = 0.0
+        self._disabled_reason: Optional[str] = None
+
+    def check(self, path: Union[str, bytes]) -> Optional[GateDecision]:
+        """Frame vergleichen. None = Gate nicht nutzbar (Fehler/fehlende Libs) → analysieren."""
+        if self._disabled_reason:
+            return None
+        t0 = time.perf_counter()
+        try:
+            sig = self._signer(path)
+        except ImportError as e:
+            self._disabled_reason = str(e)
+            log.info("[fgate] deaktiviert (%s)", e)
+            return None
+        except Exception as e:
+            self.errors += 1
+            log.debug("[fgate] signature failed: %s", e)
+            return None
+        ms = (time.perf_counter() - t0) * 1000.0
+        now = clock.monotonic()
+        with self._lock:
+            self.frames += 1
+            self.hash_ms_avg = ms if self.hash_ms_avg is None else 0.9 * self.hash_ms_avg + 0.1 * ms
+            self.hash_ms_max = max(self.hash_ms_max, ms)
+            self._pending = sig
+            last = self._last
+            if last is None:
+                return GateDecision(False, None, None, None, ms)
+            hd = hamming(sig.dhash, last.dhash)
+            td = tile_diff(sig.tiles, last.tiles)
+            fresh = self.max_reuse_sec <= 0 or (now - self._last_ts) < self.max_reuse_sec
+            similar = hd <= self.max_hamming and td <= self.max_tile_diff
+            if similar and fresh:
+                self.skips += 1
+                return GateDecision(True, self._last_vision, hd, td, ms, ())
+            return GateDecision(False, None, hd, td, ms, changed_tiles(sig.tiles, last.tiles, self.max_tile_diff),
+                                forced=similar)
+
+    def last_vision(self) -> Optional[Dict[str, Any]]:
+        """Vision-Ergebnis des Referenzframes (Kontext für Ausschnitt-Analysen)."""
+        with self._lock:
+            return self._last_vision
+
+    def remember(self, vision: Optional[Dict[str, Any]] = None):
+        """Zuletzt geprüften Frame als Referenz übernehmen (nach erfolgreicher Analyse)."""
+        with self._lock:
+            if self._pending is None:
+                return
+            self._last = self._pending
+            self._last_vision = vision
+            self._last_ts = clock.monotonic()
+            self._pending = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "skips": self.skips,
+                "skip_rate": round(self.skips / self.frames, 3) if self.frames else 0.0,
+                "hash_ms_avg": round(self.hash_ms_avg, 2) if self.hash_ms_avg is not None else None,
+                "hash_ms_max": round(self.hash_ms_max, 2),
+                "errors": self.errors,
+                "disabled": self._disabled_reason,
+            }
+
+    def stats_compact(self) -> str:
+        s = self.stats()
+        if s["disabled"]:
+            return "off"
+        if not s["frames"]:
+            return "n/a"
+        return f"skip {s['skip_rate'] * 100:.0f}% ({s['skips']}/{s['frames']}), hash {s['hash_ms_avg']:.1f}ms"
+
+
+_GATE: Optional[FrameGate] = None
+
+
+def get_gate() -> Optional[FrameGate]:
+    global _GATE
+    if not GATE_ENABLED:
+        return None
+    if _GATE is None:
+        _GATE = FrameGate()
+    return _GATE
+
+
+def stats_compact() -> str:
+    return _GATE.stats_compact() if _GATE is not None else "n/a"
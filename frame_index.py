@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+"""
+Ähnlichkeitsindex über gespeicherte Screenshots
+
+Beim Ingest in den Ringpuffer bekommt jeder Frame einen kompakten
+Merkmalsvektor (DIM=128, float16):
+
+- 48  HSV-Farbhistogramm (12 Farbton × 2 Sättigung × 2 Helligkeit)
+- 16  Kantenstärke auf einem 4×4-Raster (Gradientenbetrag)
+- 64  8×8-Graustufen-Layout (mittelwertbefreit)
+
+Jeder Block wird einzeln L2-normiert und gewichtet, der Gesamtvektor
+ebenfalls – Skalarprodukt = Kosinus-Ähnlichkeit. Pillow dekodiert JPEGs per
+draft() verkleinert, NumPy rechnet den Rest (wenige ms pro Frame).
+
+Speicher: memory-mapped float16-Matrix (FRAME_INDEX_DIR/vectors.f16, feste
+Kapazität FRAME_INDEX_CAPACITY Zeilen, danach Ringbetrieb wie der Puffer)
+plus meta.jsonl (Zeile → sid, md5, ts, path), nur angehängt. Suche per
+Brute Force in float32-Blöcken: 100k × 128 sind ~13 Mio. Multiplikationen,
+also wenige Millisekunden – eine IVF-Struktur lohnt sich erst weit darüber.
+
+Genau ein Prozess schreibt (writer=True: legt den Index an, baut ihn bei
+Formatwechsel neu auf, hängt an). Im Multi-Process-Modus ist das die
+Ingest-Stufe; der Hauptprozess (!similar) öffnet ihn nur lesend
+(set_writer(False)) und übernimmt vor jeder Abfrage neue Zeilen aus
+meta.jsonl – die Vektoren sieht er über die geteilte Abbildung direkt.
+
+Nutzung: ingest() statt screenshot_manager.ingest() (Vektor + optional
+Beinahe-Duplikate verwerfen, FRAME_INDEX_PRUNE_DUPS), !similar <sid|latest> [n],
+cluster() für Szenengruppen.
+
+    python frame_index.py similar <sid> [--k 5]
+    python frame_index.py cluster [--k 8]
+    python frame_index.py bench [--n 100000]
+
+Ohne NumPy/Pillow ist der Index aus.
+"""
+
+from __future__ import annotations
+import io
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+log = logging.getLogger("frame_index")
+
+INDEX_ENABLED = os.getenv("FRAME_INDEX_ENABLED", "true").lower() != "false"
+INDEX_DIR = os.getenv(
+    "FRAME_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "frame_index"),
+)
+try:
+    CAPACITY = max(16, int(os.getenv("FRAME_INDEX_CAPACITY", "100000")))
+except Exception:
+    CAPACITY = 100000
+PRUNE_DUPS = os.getenv("FRAME_INDEX_PRUNE_DUPS", "false").lower() == "true"
+try:
+    DUP_SIM = float(os.getenv("FRAME_INDEX_DUP_SIM", "0.995"))
+except Exception:
+    DUP_SIM = 0.995
+try:
+    DUP_WINDOW = max(1, int(os.getenv("FRAME_INDEX_DUP_WINDOW", "32")))
+except Exception:
+    DUP_WINDOW = 32
+_READER_RETRY_SEC = 30.0                    # Leser: Index noch nicht angelegt → später erneut
+
+DIM = 128
+_W, _H = 64, 36
+_BLOCK_WEIGHTS = (1.0, 0.6, 0.8)            # Farbe, Kanten, Layout
+_CHUNK = 16384
+
+Source = Union[str, bytes]
+
+
+# -----------------------------------------------------------------------------
+# Merkmale
+# -----------------------------------------------------------------------------
+
+def features(src: Source):
+    """128-dim. float32-Vektor (L2-normiert) eines Bildes – Pfad oder Dateiinhalt."""
+    import numpy as np
+    from PIL import Image
+    with Image.open(io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else src) as im:
+        im.draft("RGB", (_W * 2, _H * 2))
+        small = im.convert("RGB").resize((_W, _H), Image.BILINEAR)
+    hsv = np.asarray(small.convert("HSV"), dtype=np.float32)
+    h = np.minimum((hsv[..., 0] * 12.0 / 256.0).astype(np.int32), 11)
+    s = (hsv[..., 1] >= 96).astype(np.int32)
+    v = (hsv[..., 2] >= 128).astype(np.int32)
+    color = np.bincount((h * 4 + s * 2 + v).ravel(), minlength=48).astype(np.float32)
+    color = np.sqrt(color)                  # Hellinger: große Flächen dominieren weniger
+
+    g = np.asarray(small.convert("L"), dtype=np.float32)
+    gx = np.abs(np.diff(g, axis=1))[:-1, :]
+    gy = np.abs(np.diff(g, axis=0))[:, :-1]
+    mag = gx + gy                           # (35, 63)
+    mag = mag[:32, :60].reshape(4, 8, 4, 15).mean(axis=(1, 3)).ravel()
+
+    layout = g[:32, :64].reshape(8, 4, 8, 8).mean(axis=(1, 3)).ravel()
+    layout = layout - layout.mean()
+
+    parts = []
+    for block, w in zip((color, mag, layout), _BLOCK_WEIGHTS):
+        n = float(np.linalg.norm(block))
+        parts.append(block * (w / n) if n > 0 else block)
+    vec = np.concatenate(parts).astype(np.float32)
+    n = float(np.linalg.norm(vec))
+    return vec / n if n > 0 else vec
+
+
+# -----------------------------------------------------------------------------
+# Index
+# -----------------------------------------------------------------------------
+
+class FrameIndex:
+    def __init__(self, directory: str = INDEX_DIR, capacity: int = CAPACITY, dim: int = DIM,
+                 extractor: Optional[Callable[[Source], Any]] = None, writer: bool = True):
+        import numpy as np
+        self._np = np
+        self.dir = directory
+        self.capacity = int(capacity)
+        self.dim = int(dim)
+        self.writer = writer
+        self._extract = extractor or features
+        self._lock = threading.Lock()
+        self._vec_path = os.path.join(self.dir, "vectors.f16")
+        self._meta_path = os.path.join(self.dir, "meta.jsonl")
+        self._hdr_path = os.path.join(self.dir, "index.json")
+        if writer:
+            os.makedirs(self.dir, exist_ok=True)
+            self._check_header()
+        elif self._read_header() != self._header():
+            # Schreiber hat (noch) nicht angelegt bzw. anderes Format
+            raise FileNotFoundError(f"frame index {self._hdr_path} fehlt oder passt nicht")
+        self._open_mat()
+        self._reset_meta()
+        self._load_meta()
+        self.stats = {"adds": 0, "searches": 0, "search_ms_max": 0.0, "feature_ms_avg": None}
+
+    def _header(self) -> Dict[str, Any]:
+        return {"dim": self.dim, "capacity": self.capacity, "dtype": "float16", "version": 1}
+
+    def _read_header(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._hdr_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _check_header(self):
+        hdr = self._header()
+        old = self._read_header()
+        if old != hdr:
+            if old is not None:
+                log.info("[findex] Format geändert (%s → %s) – Index wird neu aufgebaut", old, hdr)
+            for p in (self._vec_path, self._meta_path):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            with open(self._hdr_path, "w", encoding="utf-8") as f:
+                json.dump(hdr, f)
+
+    def _open_mat(self):
+        if self.writer:
+            mode = "r+" if os.path.exists(self._vec_path) else "w+"
+        else:
+            mode = "r"                      # fehlt die Datei → FileNotFoundError
+        self._mat = self._np.memmap(self._vec_path, dtype=self._np.float16, mode=mode,
+                                    shape=(self.capacity, self.dim))
+        self._vec_ino = os.stat(self._vec_path).st_ino
+
+    def _reset_meta(self):
+        self.meta: List[Optional[Dict[str, Any]]] = [None] * self.capacity
+        self._by_sid: Dict[int, int] = {}
+        self.count = 0                      # insgesamt hinzugefügt (Zeile = count % capacity)
+        self._meta_off = 0                  # gelesene Bytes von meta.jsonl
+
+    def _read_meta(self) -> int:
+        """Neue vollständige Zeilen aus meta.jsonl ab dem letzten Offset übernehmen."""
+        try:
+            with open(self._meta_path, "rb") as f:
+                f.seek(self._meta_off)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        end = data.rfind(b"\n") + 1           # unvollständige letzte Zeile: beim nächsten Mal
+        lines = 0
+        for raw in data[:end].splitlines():
+            try:
+                m = json.loads(raw)
+            except ValueError:
+                continue                    # halbe Zeile nach Absturz
+            self._place(int(m["row"]), m)
+            self.count = max(self.count, int(m["n"]) + 1)
+            lines += 1
+        self._meta_off += end
+        return lines
+
+    def _load_meta(self):
+        lines = self._read_meta()
+        if self.writer and lines > 2 * self.capacity:
+            # Ringbetrieb: überschriebene Zeilen aus meta.jsonl entfernen
+            tmp = self._meta_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for m in sorted((m for m in self.meta if m is not None), key=lambda m: m["n"]):
+                    f.write(json.dumps(m, ensure_ascii=False) + "\n")
+            os.replace(tmp, self._meta_path)
+            self._meta_off = os.path.getsize(self._meta_path)
+
+    def refresh(self):
+        """Leser: Einträge übernehmen, die der Schreiber seitdem angehängt hat."""
+        if self.writer:
+            return
+        try:
+            ino = os.stat(self._vec_path).st_ino
+            size = os.path.getsize(self._meta_path)
+        except OSError:
+            return
+        with self._lock:
+            if ino != self._vec_ino:
+                # Schreiber hat den Index neu aufgebaut → neu abbilden
+                self._open_mat()
+                self._reset_meta()
+            elif size < self._meta_off:
+                self._reset_meta()          # meta.jsonl wurde kompaktiert
+            elif size == self._meta_off:
+                return
+            self._read_meta()
+
+    def _place(self, row: int, m: Dict[str, Any]):
+        old = self.meta[row]
+        if old is not None and old.get("sid") is not None:
+            self._by_sid.pop(int(old["sid"]), None)
+        self.meta[row] = m
+        if m.get("sid") is not None:
+            self._by_sid[int(m["sid"])] = row
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    # --- Schreiben ---
+    def vector(self, src: Source):
+        t0 = time.perf_counter()
+        v = self._extract(src)
+        ms = (time.perf_counter() - t0) * 1000.0
+        a = self.stats["feature_ms_avg"]
+        self.stats["feature_ms_avg"] = ms if a is None else 0.9 * a + 0.1 * ms
+        return v
+
+    def add(self, vec, sid: Optional[int] = None, md5: Optional[str] = None,
+            path: Optional[str] = None, ts: Optional[float] = None) -> int:
+        if not self.writer:
+            raise OSError("frame index: nur lesend geöffnet")
+        with self._lock:
+            n = self.count
+            row = n % self.capacity
+            self._mat[row] = vec
+            self._mat.flush()               # Vektor vor der Meta-Zeile sichtbar (Leser, Absturz)
+            m = {"n": n, "row": row, "sid": sid, "md5": md5, "path": path, "ts": ts or time.time()}
+            line = (json.dumps(m, ensure_ascii=False) + "\n").encode("utf-8")
+            with open(self._meta_path, "ab") as f:
+                f.write(line)
+            self._meta_off += len(line)
+            self._place(row, m)
+            self.count = n + 1
+            self.stats["adds"] += 1
+            return row
+
+    def flush(self):
+        self._mat.flush()
+
+    # --- Suchen ---
+    def row_for_sid(self, sid: int) -> Optional[int]:
+        self.refresh()
+        return self._by_sid.get(int(sid))
+
+    def search(self, q, k: int = 5, exclude_row: Optional[int] = None,
+               rows: Optional[Tuple[int, int]] = None) -> List[Tuple[int, float]]:
+        """Top-k (Zeile, Kosinus) über alle belegten Zeilen (Brute Force, float32-Blöcke)."""
+        np = self._np
+        t0 = time.perf_counter()
+        self.refresh()
+        q = np.asarray(q, dtype=np.float32)
+        n = len(self)
+        lo, hi = rows or (0, n)
+        best_rows: List[Any] = []
+        best_sims: List[Any] = []
+        for a in range(lo, hi, _CHUNK):
+            b = min(hi, a + _CHUNK)
+            sims = np.asarray(self._mat[a:b], dtype=np.float32) @ q
+            if exclude_row is not None and a <= exclude_row < b:
+                sims[exclude_row - a] = -np.inf
+            kk = min(k, b - a)
+            idx = np.argpartition(-sims, kk - 1)[:kk]
+            best_rows.append(idx + a)
+            best_sims.append(sims[idx])
+        if not best_rows:
+            return []
+        r = np.concatenate(best_rows)
+        s = np.concatenate(best_sims)
+        order = np.argsort(-s)[:k]
+        out = [(int(r[i]), float(s[i])) for i in order if np.isfinite(s[i])]
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.stats["searches"] += 1
+        self.stats["search_ms_max"] = max(self.stats["search_ms_max"], ms)
+        return out
+
+    def similar_to_sid(self, sid: int, k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        row = self.row_for_sid(sid)
+        if row is None:
+            return []
+        hits = self.search(self._mat[row], k, exclude_row=row)
+        return [(self.meta[r], s) for r, s in hits if self.meta[r] is not None]
+
+    def near_duplicate(self, vec, threshold: float = DUP_SIM, window: int = DUP_WINDOW) -> Optional[Dict[str, Any]]:
+        """Meta des zuletzt hinzugefügten, fast identischen Frames (nur die letzten `window`) oder None."""
+        np = self._np
+        self.refresh()
+        n = len(self)
+        if not n:
+            return None
+        last = (self.count - 1) % self.capacity
+        rows = [(last - i) % self.capacity for i in range(min(window, n))]
+        sims = np.asarray(self._mat[rows], dtype=np.float32) @ np.asarray(vec, dtype=np.float32)
+        i = int(np.argmax(sims))
+        return self.meta[rows[i]] if sims[i] >= threshold else None
+
+    def cluster(self, k: int = 8, iters: int = 12, seed: int = 0) -> Tuple[Any, Any]:
+        """Sphärisches k-Means über alle Vektoren: (Labels je Zeile, Zentren)."""
+        np = self._np
+        self.refresh()
+        n = len(self)
+        X = np.asarray(self._mat[:n], dtype=np.float32)
+        k = max(1, min(k, n))
+        rng = np.random.default_rng(seed)
+        C = X[rng.choice(n, size=k, replace=False)].copy()
+        labels = np.zeros(n, dtype=np.int32)
+        for _ in range(iters):
+            labels = np.argmax(X @ C.T, axis=1)
+            for j in range(k):
+                sel = X[labels == j]
+                if len(sel):
+                    c = sel.sum(axis=0)
+                    C[j] = c / (np.linalg.norm(c) or 1.0)
+        return labels, C
+
+    def stats_compact(self) -> str:
+        s = self.stats
+        fm = s["feature_ms_avg"]
+        return (f"{len(self)} frames, feat {fm:.1f}ms" if fm is not None else f"{len(self)} frames") + \
+            (f", search max {s['search_ms_max']:.1f}ms" if s["searches"] else "")
+
+
+_INDEX: Optional[FrameIndex] = None
+_INDEX_ERR: Optional[str] = None
+_INDEX_LOCK = threading.Lock()
+_WRITER = True
+_retry_at = 0.0
+
+
+def set_writer(writer: bool):
+    """Rolle dieses Prozesses festlegen (vor dem ersten get_index())."""
+    global _WRITER
+    _WRITER = bool(writer)
+
+
+def get_index() -> Optional[FrameIndex]:
+    """Globaler Index (lazy) oder None (deaktiviert / NumPy fehlt / Leser: noch nicht angelegt)."""
+    global _INDEX, _INDEX_ERR, _retry_at
+    if not INDEX_ENABLED or _INDEX_ERR:
+        return None
+    if _INDEX is None and time.monotonic() >= _retry_at:
+        with _INDEX_LOCK:
+            if _INDEX is None and not _INDEX_ERR:
+                try:
+                    _INDEX = FrameIndex(writer=_WRITER)
+                except FileNotFoundError as e:
+                    if _WRITER:
+                        _INDEX_ERR = str(e)
+                        log.warning("[findex] Index nicht nutzbar: %s", e)
+                    else:
+                        _retry_at = time.monotonic() + _READER_RETRY_SEC
+                        log.debug("[findex] noch kein Index zum Lesen: %s", e)
+                except ImportError as e:
+                    _INDEX_ERR = str(e)
+                    log.info("[findex] deaktiviert (%s)", e)
+                except OSError as e:
+                    _INDEX_ERR = str(e)
+                    log.warning("[findex] Index nicht nutzbar: %s", e)
+    return _INDEX
+
+
+def ingest(sm: Any, path: str, data: Optional[bytes] = None) -> Any:
+    """screenshot_manager.ingest() mit Index: Vektor einmal berechnen, ggf. als
+    Beinahe-Duplikat verwerfen (FRAME_INDEX_PRUNE_DUPS → None), sonst ablegen."""
+    idx = get_index()
+    vec = None
+    if idx is not None:
+        try:
+            vec = idx.vector(data if data is not None else path)
+        except ImportError as e:
+            _disable(str(e))
+        except Exception as e:
+            log.debug("[findex] features failed: %s", e)
+        if vec is not None and PRUNE_DUPS and idx.near_duplicate(vec) is not None:
+            idx.stats["pruned"] = idx.stats.get("pruned", 0) + 1
+            return None
+    rec = sm.ingest(path)
+    if vec is not None and isinstance(rec, dict) and rec.get("sid") is not None:
+        if idx.row_for_sid(rec["sid"]) is None:     # Archiv-Dedupe liefert den alten Eintrag
+            try:
+                idx.add(vec, sid=rec["sid"], md5=rec.get("md5"), path=rec.get("path"), ts=rec.get("ts"))
+            except OSError as e:
+                log.debug("[findex] add failed: %s", e)
+    return rec
+
+
+def _disable(reason: str):
+    global _INDEX_ERR
+    _INDEX_ERR = reason
+    log.info("[findex] deaktiviert (%s)", reason)
+
+
+def stats_compact() -> str:
+    return _INDEX.stats_compact() if _INDEX is not None else ("off" if _INDEX_ERR else "n/a")
+
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+
+def _bench(n: int, k: int = 5) -> Dict[str, float]:
+    import tempfile
+    import numpy as np
+    with tempfile.TemporaryDirectory() as d:
+        idx = FrameIndex(d, capacity=n)
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal((n, DIM)).astype(np.float32)
+        X /= np.linalg.norm(X, axis=1, keepdims=True)
+        idx._mat[:n] = X
+        idx.count = n
+        q = X[n // 2]
+        idx.search(q, k)                    # Warmup (Seiten laden)
+        t = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            idx.search(q, k)
+            t.append((time.perf_counter() - t0) * 1000.0)
+        t.sort()
+        return {"n": n, "p50_ms": round(t[len(t) // 2], 2), "max_ms": round(t[-1], 2)}
+
+
+def main(argv=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="Frame-Ähnlichkeitsindex")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("similar")
+    p.add_argument("sid", type=int)
+    p.add_argument("--k", type=int, default=5)
+    p = sub.add_parser("cluster")
+    p.add_argument("--k", type=int, default=8)
+    p = sub.add_parser("bench")
+    p.add_argument("--n", type=int, default=100000)
+    a = ap.parse_args(argv)
+    if a.cmd == "bench":
+        print(json.dumps(_bench(a.n)))
+        return 0
+    set_writer(False)                       # der laufende Bot schreibt
+    idx = get_index()
+    if idx is None:
+        print("frame index nicht verfügbar", file=sys.stderr)
+        return 2
+    if a.cmd == "similar":
+        for m, s in idx.similar_to_sid(a.sid, a.k):
+            print(f"{s:.3f}  sid:{m.get('sid')}  {m.get('path')}")
+        return 0
+    labels, _ = idx.cluster(a.k)
+    for j in range(int(labels.max()) + 1 if len(labels) else 0):
+        rows = [i for i in range(len(labels)) if labels[i] == j]
+        sids = [idx.meta[r].get("sid") for r in rows[:5] if idx.meta[r]]
+        print(f"cluster {j}: {len(rows)} frames, z. B. sid {sids}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
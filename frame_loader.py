@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Einmal lesen, mehrfach nutzen: gemeinsamer Bild-Loader für Vision-Aufrufe
+
+Vorher las ein Vision-Aufruf dieselbe Datei mehrfach (os.stat, _md5sum,
+Debug-`/usr/bin/stat`-Fork, base64 in qwen_client, nochmal im Orchestrator).
+load() öffnet die Datei genau einmal, fstat()et den offenen Deskriptor und
+liest sie in einen Puffer. Hash, Validierung (Mindestgröße) und base64-
+Kodierung arbeiten auf diesem Puffer – kein zweites open(), kein Subprozess.
+Nebeneffekt: Hash und gesendete Bytes gehören garantiert zum selben Frame,
+auch wenn der Capture-Prozess die Datei währenddessen ersetzt.
+
+Fehlt die Datei oder ist sie zu klein, werden Geschwister-Endungen
+(.jpg/.jpeg/.png) probiert – wie bisher in vision_summarizer/orchestrator.
+"""
+
+from __future__ import annotations
+import os
+import base64
+import hashlib
+import mimetypes
+from typing import Dict, List, Optional
+
+_EXT_ORDER = (".jpg", ".jpeg", ".png")
+
+STATS: Dict[str, int] = {"loads": 0, "bytes": 0, "errors": 0}
+
+
+class FrameError(OSError):
+    """Bild fehlt, ist unlesbar oder kleiner als min_bytes."""
+
+
+def _mime_for(path: str) -> str:
+    mime, _ = mimetypes.guess_type(path)
+    if mime:
+        return mime
+    return "image/png" if os.path.splitext(path)[1].lower() == ".png" else "image/jpeg"
+
+
+class Frame:
+    __slots__ = ("path", "data", "size", "mtime", "mime", "_md5", "_uri")
+
+    def __init__(self, path: str, data: bytes, mtime: float):
+        self.path = path
+        self.data = data
+        self.size = len(data)
+        self.mtime = mtime
+        self.mime = _mime_for(path)
+        self._md5: Optional[str] = None
+        self._uri: Optional[str] = None
+
+    @property
+    def md5(self) -> str:
+        if self._md5 is None:
+            self._md5 = hashlib.md5(self.data).hexdigest()
+        return self._md5
+
+    def data_uri(self) -> str:
+        if self._uri is None:
+            self._uri = f"data:{self.mime};base64,{base64.b64encode(self.data).decode('ascii')}"
+        return self._uri
+
+
+def sibling_candidates(path: str) -> List[str]:
+    """path selbst, dann Geschwister mit anderer Bild-Endung (aktuelle zuerst)."""
+    base, ext = os.path.splitext(path)
+    ext_l = ext.lower()
+    order = [ext_l] + [e for e in _EXT_ORDER if e != ext_l] if ext_l in _EXT_ORDER else list(_EXT_ORDER)
+    out = [path]
+    for e in order:
+        cand = base + e
+        if cand != path:
+            out.append(cand)
+    return out
+
+
+def _read_once(path: str) -> Frame:
+    # ungepuffert: readall() dimensioniert den Puffer per fstat und liest ohne Zwischenkopie
+    with open(path, "rb", buffering=0) as f:
+        st = os.fstat(f.fileno())
+        data = f.read()
+    return Frame(path, data, st.st_mtime)
+
+
+def load(path: str, min_bytes: int = 0, siblings: bool = True) -> Frame:
+    """Bild einmal lesen; FrameError, wenn kein gültiger Kandidat existiert."""
+    err: Optional[str] = None
+    for cand in (sibling_candidates(path) if siblings else [path]):
+        try:
+            frame = _read_once(cand)
+        except FileNotFoundError:
+            err = err or f"Bild nicht gefunden: {path}"
+            continue
+        except OSError as e:
+            err = f"Lesen fehlgeschlagen: {cand}: {e}"
+            continue
+        if frame.size < min_bytes:
+            err = f"Screenshot zu klein ({frame.size} Bytes < {min_bytes})."
+            continue
+        STATS["loads"] += 1
+        STATS["bytes"] += frame.size
+        return frame
+    STATS["errors"] += 1
+    raise FrameError(err or f"Bild nicht gefunden: {path}")
+
+
+def try_load(path: str, min_bytes: int = 0, siblings: bool = True) -> Optional[Frame]:
+    try:
+        return load(path, min_bytes, siblings)
+    except FrameError:
+        return None
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Laufender Spiel-/Szenenzustand und Deltas für den Writer
+
+game_state.json (game, mood, player_status) bleibt die von Hand gepflegte
+Vorgabe. Darauf setzt der Tracker auf und faltet jedes Vision-Ergebnis ein:
+
+- scene:     letzte scene_summary
+- entities:  Label → erster/letzter Tick; "anwesend" ist, was in den letzten
+             GAME_STATE_ENTITY_TTL Ticks gesehen wurde (ein verpasster Tick
+             lässt nichts verschwinden und wieder auftauchen)
+- text:      notable_text der letzten Ticks
+
+Ein Tick ist ein neu analysierter Frame: vom Frame-Gate wiederverwendete
+Ergebnisse werden nicht eingefaltet (orchestrator.run_tick).
+
+delta() vergleicht mit dem Stand beim letzten Post (mark_posted()): neue und
+verschwundene Entities, neuer Text, die Szene nur, wenn sie sich inhaltlich
+geändert hat (Wort-Jaccard < GAME_STATE_SCENE_SIM – das VLM formuliert
+dieselbe Szene jedes Mal etwas anders). Der Writer-Prompt enthält nur noch
+das Delta plus den kurzen festen Kontext, statt bei jedem Tick das ganze
+Vision-JSON – die Promptlänge bleibt über eine lange Session flach.
+
+Persistenz: GAME_STATE_FILE (Standard cache/game_state.json), atomar
+(tmp + replace), höchstens alle GAME_STATE_SAVE_SEC. Beim Start gewinnen
+die Vorgabefelder aus game_state.json gegenüber dem gespeicherten Stand.
+
+Nur im Single-Process-Pfad (orchestrator.run_tick): mark_posted() muss im
+Prozess laufen, der tatsächlich postet – im Multi-Process-Pipeline-Modus
+(multiproc_pipeline) bekommt der Writer weiterhin das ganze Vision-JSON.
+"""
+
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger("game_state_tracker")
+
+_BASE = os.path.dirname(os.path.abspath(__file__))
+TRACKER_ENABLED = os.getenv("GAME_STATE_TRACKER_ENABLED", "true").lower() != "false"
+SEED_FILE = os.getenv("GAME_STATE_SEED_FILE", os.path.join(_BASE, "game_state.json"))
+STATE_FILE = os.getenv("GAME_STATE_FILE", os.path.join(_BASE, "cache", "game_state.json"))
+try:
+    ENTITY_TTL = max(1, int(os.getenv("GAME_STATE_ENTITY_TTL", "3")))
+except Exception:
+    ENTITY_TTL = 3
+try:
+    SCENE_SIM = min(1.0, max(0.0, float(os.getenv("GAME_STATE_SCENE_SIM", "0.5"))))
+except Exception:
+    SCENE_SIM = 0.5
+try:
+    SAVE_SEC = max(0.0, float(os.getenv("GAME_STATE_SAVE_SEC", "15")))
+except Exception:
+    SAVE_SEC = 15.0
+
+STATIC_FIELDS = ("game", "mood", "player_status")
+_FORGET_TICKS = 50                     # so lange ungesehen → aus dem Zustand entfernen
+_WORD_RE = re.compile(r"\w{3,}", re.UNICODE)
+
+
+def _words(s: str) -> set:
+    return {w.lower() for w in _WORD_RE.findall(s or "")}
+
+
+def scene_similarity(a: str, b: str) -> float:
+    wa, wb = _words(a), _words(b)
+    if not wa and not wb:
+        return 1.0
+    return len(wa & wb) / float(len(wa | wb))
+
+
+class GameStateTracker:
+    def __init__(self, path: Optional[str] = STATE_FILE, seed_path: Optional[str] = SEED_FILE,
+                 entity_ttl: int = ENTITY_TTL, scene_sim: float = SCENE_SIM, save_sec: float = SAVE_SEC):
+        self.path = path
+        self.entity_ttl = entity_ttl
+        self.scene_sim = scene_sim
+        self.save_sec = save_sec
+        self._lock = threading.Lock()
+        self.static: Dict[str, str] = {k: "" for k in STATIC_FIELDS}
+        self.scene = ""
+        self.entities: Dict[str, Dict[str, Any]] = {}      # key → {label, first, last}
+        self.text: Dict[str, int] = {}                     # notable_text → zuletzt gesehen (Tick)
+        self.tick = 0
+        self.posted: Dict[str, Any] = {"scene": "", "entities": [], "text": [], "static": {}}
+        self._dirty = False
+        self._saved_at = 0.0
+        self.stats = {"posts": 0, "prompt_chars": 0, "prompts": 0}
+        self._load(path)
+        self._load_seed(seed_path)
+
+    # --- Persistenz ---
+    def _load(self, path: Optional[str]):
+        if not path:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            log.warning("[gstate] %s unlesbar (%s) – frischer Zustand", path, e)
+            return
+        self.static.update({k: str(data.get(k) or "") for k in STATIC_FIELDS})
+        self.scene = str(data.get("scene") or "")
+        self.entities = {k: dict(v) for k, v in (data.get("entities") or {}).items() if isinstance(v, dict)}
+        self.text = {str(k): int(v) for k, v in (data.get("text") or {}).items()}
+        self.tick = int(data.get("tick") or 0)
+        posted = data.get("posted") or {}
+        self.posted = {"scene": str(posted.get("scene") or ""), "entities": list(posted.get("entities") or []),
+                       "text": list(posted.get("text") or []), "static": dict(posted.get("static") or {})}
+
+    def _load_seed(self, seed_path: Optional[str]):
+        if not seed_path:
+            return
+        try:
+            with open(seed_path, "r", encoding="utf-8") as f:
+                seed = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            log.warning("[gstate] Vorgabe %s unlesbar: %s", seed_path, e)
+            return
+        for k in STATIC_FIELDS:
+            if k in seed:
+                self.static[k] = str(seed.get(k) or "")
+
+    def to_dict(self) -> Dict[str, Any]:
+        d: Dict[str, Any] = dict(self.static)
+        d.update({"scene": self.scene, "entities": self.entities, "text": self.text,
+                  "tick": self.tick, "posted": self.posted, "updated": time.time()})
+        return d
+
+    def save(self, force: bool = False) -> bool:
+        """Atomar schreiben (tmp + replace), wenn geändert und das Intervall um ist."""
+        if not self.path:
+            return False
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._saved_at < self.save_sec):
+                return False
+            data = self.to_dict()
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        tmp = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.path)
+            return True
+        except Exception as e:
+            log.warning("[gstate] save failed: %s", e)
+            with self._lock:
+                self._dirty = True          # nächster Versuch schreibt erneut
+            return False
+
+    # --- Einfalten ---
+    def present(self) -> List[str]:
+        """Aktuell anwesende Entities (Labels), in Reihenfolge des ersten Auftretens."""
+        live = [e for e in self.entities.values() if self.tick - int(e["last"]) < self.entity_ttl]
+        return [e["label"] for e in sorted(live, key=lambda e: e["first"])]
+
+    def recent_text(self) -> List[str]:
+        return [t for t, last in self.text.items() if self.tick - last < self.entity_ttl]
+
+    def fold(self, vision: Dict[str, Any]) -> Dict[str, Any]:
+        """Vision-Ergebnis (Orchestrator- oder Summarizer-Schema) einfalten; Rückgabe: delta()."""
+        with self._lock:
+            self.tick += 1
+            scene = str(vision.get("scene_summary") or vision.get("details") or "").strip()
+            if scene:
+                self.scene = scene
+            labels = list(vision.get("entities") or [])
+            labels += [o.get("label") for o in (vision.get("objects") or []) if isinstance(o, dict)]
+            for label in labels:
+                label = str(label or "").strip()
+                if not label:
+                    continue
+                e = self.entities.setdefault(label.lower(), {"label": label, "first": self.tick, "last": self.tick})
+                e["last"] = self.tick
+            for t in vision.get("notable_text") or []:
+                t = str(t or "").strip()
+                if t:
+                    self.text[t] = self.tick
+            # Zustand begrenzt halten
+            old = self.tick - _FORGET_TICKS
+            self.entities = {k: e for k, e in self.entities.items() if e["last"] > old}
+            self.text = {t: n for t, n in self.text.items() if n > self.tick - 4 * self.entity_ttl}
+            self._dirty = True
+        self.save()
+        return self.delta()
+
+    def delta(self) -> Dict[str, Any]:
+        """Was sich seit dem letzten Post geändert hat (leeres dict = nichts)."""
+        with self._lock:
+            present = self.present()
+            posted_ents = {e.lower() for e in self.posted["entities"]}
+            now_ents = {e.lower() for e in present}
+            d: Dict[str, Any] = {}
+            if self.scene and scene_similarity(self.scene, self.posted["scene"]) < self.scene_sim:
+                d["scene_summary"] = self.scene
+            new = [e for e in present if e.lower() not in posted_ents]
+            gone = [e for e in self.posted["entities"] if e.lower() not in now_ents]
+            text = [t for t in self.recent_text() if t not in self.posted["text"]]
+            if new:
+                d["new_entities"] = new[:6]
+            if gone:
+                d["gone_entities"] = gone[:6]
+            if text:
+                d["new_text"] = text[:6]
+            changed = {k: v for k, v in self.static.items() if v and self.posted["static"].get(k) != v}
+            if changed:
+                d["context_changed"] = changed
+            return d
+
+    def context(self) -> Dict[str, str]:
+        """Fester Kurzkontext (Vorgabefelder, nur belegte)."""
+        return {k: v for k, v in self.static.items() if v}
+
+    def mark_posted(self):
+        """Aktuellen Stand als "gepostet" merken – Basis für das nächste delta()."""
+        with self._lock:
+            self.posted = {"scene": self.scene, "entities": self.present(), "text": self.recent_text(),
+                           "static": dict(self.static)}
+            self.stats["posts"] += 1
+            self._dirty = True
+        self.save()
+
+    def note_prompt(self, chars: int):
+        with self._lock:
+            self.stats["prompts"] += 1
+            self.stats["prompt_chars"] += int(chars)
+
+    def stats_compact(self) -> str:
+        s = self.stats
+        avg = f", {s['prompt_chars'] / s['prompts']:.0f} chars/prompt" if s["prompts"] else ""
+        return f"tick {self.tick}, {len(self.present())} ent{avg}"
+
+
+_TRACKER: Optional[GameStateTracker] = None
+_TRACKER_LOCK = threading.Lock()
+
+
+def get_tracker() -> Optional[GameStateTracker]:
+    """Globaler Tracker (lazy) oder None (GAME_STATE_TRACKER_ENABLED=false)."""
+    global _TRACKER
+    if not TRACKER_ENABLED:
+        return None
+    if _TRACKER is None:
+        with _TRACKER_LOCK:
+            if _TRACKER is None:
+                _TRACKER = GameStateTracker()
+    return _TRACKER
+
+
+def mark_posted():
+    if _TRACKER is not None:
+        _TRACKER.mark_posted()
+
+
+def save():
+    if _TRACKER is not None:
+        _TRACKER.save(force=True)
+
+
+def stats_compact() -> str:
+    return _TRACKER.stats_compact() if _TRACKER is not None else "n/a"
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Hintergrund-Health-Monitor für !health
+
+Jede Abhängigkeit (IRC-Ping, Qwen, Auth, Screenshot-Archiv) wird in ihrem
+eigenen Takt geprüft – parallel in einem kleinen Thread-Pool und mit Deadline.
+Ergebnisse landen in einem Snapshot mit Zeitstempel und rollierenden
+Latenz-Statistiken (p50/p95). Der Chat-Handler rendert nur noch aus dem
+Speicher; Probe-Kosten bleiben außerhalb des Chat-Pfads.
+
+Probe-Funktionen liefern (ok, ms, err) wie bot_health.check_*, optional
+ergänzt um einen Info-Wert (ok, ms, err, info), z. B. die Anzahl Screenshots.
+"""
+
+from __future__ import annotations
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+log = logging.getLogger("health_monitor")
+
+ProbeResult = Tuple[Any, ...]
+
+MONITOR_ENABLED = os.getenv("HEALTH_MONITOR_ENABLED", "true").lower() != "false"
+try:
+    STATS_WINDOW = max(3, int(os.getenv("HEALTH_STATS_WINDOW", "20")))
+except Exception:
+    STATS_WINDOW = 20
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class Probe:
+    def __init__(self, name: str, fn: Callable[[], ProbeResult], interval_sec: float, timeout_sec: float):
+        self.name = name
+        self.fn = fn
+        self.interval_sec = max(1.0, float(interval_sec))
+        self.timeout_sec = max(0.1, float(timeout_sec))
+        self.next_due = 0.0           # monotonic
+        self.future: Optional[Future] = None
+        self.started = 0.0            # monotonic
+        self.timed_out = False
+        self.last: Optional[Dict[str, Any]] = None
+        self.latencies: Deque[int] = deque(maxlen=STATS_WINDOW)
+        self.runs = 0
+        self.failures = 0
+
+
+def _percentile(sorted_vals: List[int], q: float) -> Optional[int]:
+    if not sorted_vals:
+        return None
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+class HealthMonitor:
+    """Plant Probes, sammelt Ergebnisse mit Deadline und hält den Snapshot."""
+
+    def __init__(self, max_workers: int = 4, tick_sec: float = 0.25):
+        self._probes: Dict[str, Probe] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="health-probe")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.tick_sec = tick_sec
+
+    def add(self, name: str, fn: Callable[[], ProbeResult], interval_sec: float, timeout_sec: float):
+        self._probes[name] = Probe(name, fn, interval_sec, timeout_sec)
+
+    # --- Scheduling ---
+    def _record(self, p: Probe, ok: bool, ms: Optional[int], err: Optional[str], info: Any = None):
+        with self._lock:
+            p.runs += 1
+            if ok and ms is not None:
+                p.latencies.append(int(ms))
+            if not ok:
+                p.failures += 1
+            p.last = {"ok": bool(ok), "ms": ms, "err": err, "info": info, "ts": time.time()}
+
+    def _step(self, now: float):
+        for p in self._probes.values():
+            fut = p.future
+            if fut is not None:
+                if fut.done():
+                    if not p.timed_out:
+                        try:
+                            res = tuple(fut.result())
+                            ok, ms, err = res[:3]
+                            info = res[3] if len(res) > 3 else None
+                        except Exception as e:
+                            ok, ms, err, info = False, None, type(e).__name__.lower(), None
+                        self._record(p, ok, ms, err, info)
+                    p.future = None
+                elif not p.timed_out and (now - p.started) > p.timeout_sec:
+                    # Deadline gerissen: als Fehler melden, Thread läuft aus, kein Neustart solange
+                    p.timed_out = True
+                    self._record(p, False, None, "deadline")
+                continue
+            if now >= p.next_due:
+                p.started = now
+                p.timed_out = False
+                p.next_due = now + p.interval_sec
+                try:
+                    p.future = self._pool.submit(p.fn)
+                except RuntimeError:
+                    return  # Pool heruntergefahren
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._step(time.monotonic())
+            except Exception as e:
+                log.debug("[health] step error: %s", e)
+            self._stop.wait(self.tick_sec)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False)
+
+    def run_once(self, wait_sec: float = 5.0):
+        """Alle Probes sofort einmal ausführen und einsammeln (Tests/CLI)."""
+        for p in self._probes.values():
+            p.next_due = 0.0
+        deadline = time.monotonic() + wait_sec
+        self._step(time.monotonic())
+        while time.monotonic() < deadline:
+            self._step(time.monotonic())
+            if all(p.future is None or p.timed_out for p in self._probes.values()):
+                break
+            time.sleep(0.01)
+
+    # --- Lesen (Chat-Pfad) ---
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        now = time.time()
+        with self._lock:
+            for name, p in self._probes.items():
+                lat = sorted(p.latencies)
+                entry: Dict[str, Any] = dict(p.last) if p.last else {"ok": None, "ms": None, "err": "pending", "info": None, "ts": None}
+                entry["age"] = int(now - entry["ts"]) if entry.get("ts") else None
+                entry["p50"] = _percentile(lat, 0.50)
+                entry["p95"] = _percentile(lat, 0.95)
+                entry["avg"] = int(sum(lat) / len(lat)) if lat else None
+                entry["runs"] = p.runs
+                entry["failures"] = p.failures
+                out[name] = entry
+        return out
+
+
+def fmt_entry(name: str, entry: Optional[Dict[str, Any]], verbose: bool = False) -> str:
+    """Eine !health-Komponente aus dem Snapshot (gleiches Format wie bot_health.fmt_check)."""
+    if not entry or entry.get("ok") is None:
+        return f"{name}: n/a"
+    if entry["ok"]:
+        base = f"{name}: OK {entry['ms']}ms" if entry.get("ms") is not None else f"{name}: OK"
+    else:
+        base = f"{name}: ERR({entry['err']})" if (verbose and entry.get("err")) else f"{name}: ERR"
+    if verbose:
+        extra = []
+        if entry.get("p50") is not None:
+            extra.append(f"p50 {entry['p50']}/p95 {entry['p95']}")
+        if entry.get("failures"):
+            extra.append(f"fail {entry['failures']}/{entry['runs']}")
+        if entry.get("age") is not None:
+            extra.append(f"{entry['age']}s")
+        if extra:
+            base += f" ({', '.join(extra)})"
+    return base
+
+
+# -----------------------------------------------------------------------------
+# Standard-Probes des Bots
+# -----------------------------------------------------------------------------
+
+_MONITOR: Optional[HealthMonitor] = None
+
+
+def get_monitor() -> Optional[HealthMonitor]:
+    return _MONITOR
+
+
+def start_default(twitch=None) -> Optional[HealthMonitor]:
+    """Monitor mit IRC/Qwen/Auth/Shots-Probes gemäß HEALTH_* env starten."""
+    global _MONITOR
+    if not MONITOR_ENABLED:
+        log.info("[health] monitor disabled via HEALTH_MONITOR_ENABLED=false")
+        return None
+    import lazy_import
+
+    timeout_ms = int(_env_float("HEALTH_TIMEOUT_MS", 1500))
+    mon = HealthMonitor()
+
+    if twitch is not None and os.getenv("HEALTH_INCLUDE_IRC", "true").lower() != "false":
+        irc_timeout_ms = int(_env_float("HEALTH_IRC_TIMEOUT_MS", 800))
+
+        def _irc() -> ProbeResult:
+            rtt = twitch.ping(irc_timeout_ms)
+            return (rtt is not None), rtt, (None if rtt is not None else "timeout")
+        mon.add("irc", _irc, _env_float("HEALTH_IRC_INTERVAL_SEC", 15), irc_timeout_ms / 1000 + 0.5)
+
+    bot_health = lazy_import.optional("bot_health")
+    if bot_health is not None and bot_health.INC_QWEN:
+        def _qwen() -> ProbeResult:
+            return bot_health.check_qwen(os.getenv("QWEN_BASE", "http://127.0.0.1:8010"),
+                                         os.getenv("QWEN_MODEL", "qwen-vl"), timeout_ms)
+        mon.add("qwen", _qwen, _env_float("HEALTH_QWEN_INTERVAL_SEC", 60), timeout_ms / 1000 + 1.0)
+    if bot_health is not None and bot_health.INC_AUTH:
+        def _auth() -> ProbeResult:
+            return bot_health.check_auth(os.getenv("AUTH_BASE_URL", "http://127.0.0.1:8088"), timeout_ms)
+        mon.add("auth", _auth, _env_float("HEALTH_AUTH_INTERVAL_SEC", 30), timeout_ms / 1000 + 1.0)
+
+    def _shots() -> ProbeResult:
+        sm = lazy_import.optional("screenshots.screenshot_manager")
+        if sm is None:
+            return False, None, "missing"
+        t0 = time.perf_counter()
+        n = sm.count()
+        return True, int((time.perf_counter() - t0) * 1000), None, n
+    mon.add("shots", _shots, _env_float("HEALTH_SHOTS_INTERVAL_SEC", 30), 2.0)
+
+    mon.start()
+    _MONITOR = mon
+    return mon
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Vorproduzierter Witz-/Füllzeilen-Pool für Chat-Befehle
+
+Ein Hintergrund-Thread hält pro Art ("witz", "filler") einen kleinen Vorrat
+an LLM-Zeilen bereit. Generiert wird nur, wenn die LLM-Kette im Leerlauf ist
+(llm_router.is_idle), mit wechselnden Themen und Dedupe über normalisierte
+Texte. Befehle holen mit take() sofort eine Zeile; leerer Pool → None, der
+Aufrufer nimmt dann seine statische Liste.
+"""
+
+from __future__ import annotations
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import lazy_import
+
+log = logging.getLogger("joke_pool")
+
+POOL_ENABLED = os.getenv("JOKE_POOL_ENABLED", "true").lower() != "false"
+try:
+    POOL_SIZE = max(1, int(os.getenv("JOKE_POOL_SIZE", "8")))
+except Exception:
+    POOL_SIZE = 8
+try:
+    REFILL_SEC = max(1.0, float(os.getenv("JOKE_POOL_REFILL_SEC", "20")))
+except Exception:
+    REFILL_SEC = 20.0
+try:
+    IDLE_SEC = max(0.0, float(os.getenv("JOKE_POOL_IDLE_SEC", "5")))
+except Exception:
+    IDLE_SEC = 5.0
+MAX_CHARS = 160
+SEEN_MAX = 500
+
+_TOPICS: Dict[str, List[str]] = {
+    "witz": ["Programmierer", "Linux", "Gaming", "KI", "Kaffee", "Bugs", "Streaming",
+             "Tastaturen", "Server", "Katzen", "Montage", "Passwörter"],
+    "filler": ["Stream-Stimmung", "Chat begrüßen", "kurze Pause", "Fokus beim Coden",
+               "Hydration", "Lieblingsspiel", "Feierabend", "gute Laune"],
+}
+_PROMPTS: Dict[str, str] = {
+    "witz": ("Erzähle einen sehr kurzen, harmlosen Witz auf Deutsch zum Thema {topic}. "
+             "Eine Zeile, max. 120 Zeichen, ohne Markdown."),
+    "filler": ("Schreibe eine kurze, freundliche Chat-Zeile für einen Twitch-Stream zum Thema {topic}. "
+               "Deutsch, eine Zeile, max. 100 Zeichen, ohne Markdown und ohne Hashtags."),
+}
+
+
+def _dedupe_key(text: str) -> str:
+    return re.sub(r"\W+", "", (text or "").casefold())
+
+
+def _clean(text: Optional[str]) -> str:
+    lines = (text or "").strip().splitlines()
+    s = lines[0] if lines else ""
+    s = s.strip().strip('"„“”\'').strip()
+    s = " ".join(s.split())
+    if len(s) > MAX_CHARS:
+        return ""
+    return s
+
+
+class TextPool:
+    """Thread-sicherer Vorrat pro Art mit Hintergrund-Nachschub."""
+
+    def __init__(self,
+                 generate: Optional[Callable[[str], Optional[str]]] = None,
+                 idle_check: Optional[Callable[[float], bool]] = None,
+                 size: int = POOL_SIZE,
+                 refill_sec: float = REFILL_SEC,
+                 idle_sec: float = IDLE_SEC):
+        self._generate = generate
+        self._idle_check = idle_check
+        self.size = size
+        self.refill_sec = refill_sec
+        self.idle_sec = idle_sec
+        self._items: Dict[str, Deque[str]] = {k: deque() for k in _PROMPTS}
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._topic_idx: Dict[str, int] = {k: 0 for k in _PROMPTS}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"generated": 0, "duplicates": 0, "rejected": 0, "served": 0, "empty": 0}
+
+    # --- Zugriff (Chat-Pfad) ---
+    def take(self, kind: str) -> Optional[str]:
+        with self._lock:
+            dq = self._items.get(kind)
+            if not dq:
+                self.stats["empty"] += 1
+                return None
+            self.stats["served"] += 1
+            return dq.popleft()
+
+    def count(self, kind: str) -> int:
+        with self._lock:
+            return len(self._items.get(kind) or ())
+
+    def add(self, kind: str, text: Optional[str], prompt: str = "") -> bool:
+        s = _clean(text)
+        # llm_router liefert als Notanker den gekürzten Prompt zurück – nie in den Pool
+        if not s or (prompt and _dedupe_key(prompt).startswith(_dedupe_key(s)[:40])):
+            self.stats["rejected"] += 1
+            return False
+        _looks = lazy_import.optional("commentary_engine", "looks_like_prompt")
+        if _looks and _looks(s):
+            self.stats["rejected"] += 1
+            return False
+        key = _dedupe_key(s)
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                self.stats["duplicates"] += 1
+                return False
+            self._seen[key] = None
+            while len(self._seen) > SEEN_MAX:
+                self._seen.popitem(last=False)
+            self._items.setdefault(kind, deque()).append(s)
+            self.stats["generated"] += 1
+        return True
+
+    # --- Nachschub ---
+    def _needy_kind(self) -> Optional[str]:
+        with self._lock:
+            fill = {k: len(v) for k, v in self._items.items() if len(v) < self.size}
+        if not fill:
+            return None
+        return min(fill, key=fill.get)
+
+    def _next_prompt(self, kind: str) -> str:
+        topics = _TOPICS.get(kind) or ["Alltag"]
+        i = self._topic_idx.get(kind, 0)
+        self._topic_idx[kind] = i + 1
+        return _PROMPTS[kind].format(topic=topics[i % len(topics)])
+
+    def refill_once(self) -> bool:
+        """Eine Zeile nachproduzieren, falls nötig und die LLM-Kette frei ist."""
+        kind = self._needy_kind()
+        if kind is None:
+            return False
+        gen = self._generate or lazy_import.optional("llm_router", "run_llm_chain")
+        if gen is None:
+            return False
+        idle = self._idle_check or lazy_import.optional("llm_router", "is_idle")
+        if idle is not None and not idle(self.idle_sec):
+            return False
+        prompt = self._next_prompt(kind)
+        try:
+            text = gen(prompt)
+        except Exception as e:
+            log.debug("[joke_pool] generate failed: %s", e)
+            return False
+        return self.add(kind, text, prompt=prompt)
+
+    def _run(self):
+        while not self._stop.is_set():
+            produced = False
+            try:
+                produced = self.refill_once()
+            except Exception as e:
+                log.debug("[joke_pool] refill error: %s", e)
+            # kurz durchatmen zwischen zwei Generierungen, sonst normales Intervall
+            self._stop.wait(0.5 if produced else self.refill_sec)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="joke-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # --- Warm-Restart (state_snapshot) ---
+    def export_state(self) -> Dict[str, List[str]]:
+        with self._lock:
+            return {k: list(v) for k, v in self._items.items()}
+
+    def restore_state(self, data: Dict[str, List[str]]):
+        for kind, items in (data or {}).items():
+            if kind not in self._items:
+                continue
+            for s in (items or [])[: self.size]:
+                self.add(kind, s)
+
+
+_POOL: Optional[TextPool] = None
+
+
+def get_pool() -> TextPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = TextPool()
+    return _POOL
+
+
+def start_background() -> Optional[TextPool]:
+    if not POOL_ENABLED:
+        log.info("[joke_pool] disabled via JOKE_POOL_ENABLED=false")
+        return None
+    pool = get_pool()
+    pool.start()
+    return pool
+
+
+def take(kind: str) -> Optional[str]:
+    """Sofortige Zeile aus dem Pool (None, wenn leer oder nie gestartet)."""
+    if _POOL is None:
+        return None
+    return _POOL.take(kind)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Erstes JSON-Objekt aus gesprächiger Modellausgabe ziehen – in einem Durchlauf
+
+Ersetzt die kopierten _extract_first_json_object-Varianten aus orchestrator
+und vision_summarizer. Die alten liefen Zeichen für Zeichen in Python über
+die Ausgabe und riefen json.loads auf jeden balancierten Kandidaten – bei
+Ausgaben mit vielen Klammern (Code im Bild, Mengen in der Prosa) teuer, und
+abgeschnittene Ausgaben oder Trailing Commas endeten im Fallback-Text.
+
+extract_object():
+- springt per Regex nur über strukturelle Zeichen ({ } [ ] " \\), Text
+  dazwischen wird nicht Zeichen für Zeichen in Python angefasst
+- Strings werden nur innerhalb eines Objekts verfolgt – ein einzelnes
+  Anführungszeichen in der Prosa davor bringt den Scanner nicht aus dem Tritt
+- Kandidaten, die nicht wie ein Objekt beginnen ({x}, {k: v}), werden gar
+  nicht dekodiert; die übrigen genau einmal mit JSONDecoder.raw_decode().
+  Kandidaten überlappen nicht → linear in der Eingabelänge
+- toleriert Code-Fences (```json), Trailing Commas, Python-Literale
+  (True/False/None) und abgeschnittene Ausgabe (max_tokens): offene Strings
+  und Klammern werden geschlossen, ein halbes letztes Feld fällt weg
+
+Liefert nur dicts: aus einer Liste auf oberster Ebene kommt das erste
+enthaltene Objekt, reine Zahlen/Strings → None.
+"""
+
+from __future__ import annotations
+import re
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_DECODER = json.JSONDecoder()
+_FENCE = re.compile(r"```[A-Za-z0-9_-]*")
+_STRUCT = re.compile(r'[{}\[\]"\\]')
+# ein JSON-Objekt beginnt mit '{' + Schlüssel oder '}' – alles andere ({x}, {k: v}) gar nicht erst dekodieren
+_OBJ_START = re.compile(r'\{\s*["}]')
+# String-Literal | Trailing Comma | Python-Literal (außerhalb von Strings)
+_REPAIR = re.compile(r'"(?:[^"\\]|\\.)*"|,(\s*[}\]])|\b(True|False|None)\b', re.S)
+_PY_LIT = {"True": "true", "False": "false", "None": "null"}
+_CLOSE = {"{": "}", "[": "]"}
+_MAX_CUTS = 4
+_MAX_PROBES = 64
+_MAX_OPEN = 16
+
+STATS: Dict[str, int] = {"calls": 0, "direct": 0, "repaired": 0, "truncated": 0, "failed": 0}
+
+
+def _decode(text: str) -> Optional[Any]:
+    try:
+        obj, _ = _DECODER.raw_decode(text)
+        return obj
+    except ValueError:
+        return None
+
+
+def _fix_tokens(text: str) -> str:
+    def sub(m: "re.Match[str]") -> str:
+        if m.group(1) is not None:
+            return m.group(1)
+        if m.group(2) is not None:
+            return _PY_LIT[m.group(2)]
+        return m.group(0)
+    return _REPAIR.sub(sub, text)
+
+
+def _close_truncated(text: str) -> Optional[str]:
+    """Abgeschnittenes Objekt schließen: String, Klammern, halbes letztes Feld."""
+    for _ in range(_MAX_CUTS):
+        stack: List[str] = []
+        in_str = False
+        esc = False
+        for m in _STRUCT.finditer(text):
+            ch = m.group(0)
+            if in_str:
+                if esc:
+                    esc = False
+                elif ch == "\\":
+                    esc = True
+                elif ch == '"':
+                    in_str = False
+                continue
+            if ch == '"':
+                in_str = True
+            elif ch in "{[":
+                stack.append(ch)
+            elif ch in "}]" and stack:
+                stack.pop()
+        tail = text + ('"' if in_str else "")
+        tail = re.sub(r"[\s,]+$", "", tail)
+        if tail.endswith(":"):
+            tail += " null"
+        candidate = tail + "".join(_CLOSE[c] for c in reversed(stack))
+        obj = _decode(_fix_tokens(candidate))
+        if isinstance(obj, dict):
+            return candidate
+        # halbes letztes Feld abschneiden und erneut versuchen
+        cut = _last_comma(text)
+        if cut <= 0:
+            return None
+        text = text[:cut]
+    return None
+
+
+def _last_comma(text: str) -> int:
+    """Position des letzten Kommas außerhalb von Strings (oder -1)."""
+    last = -1
+    in_str = False
+    esc = False
+    for m in re.finditer(r'[",\\]', text):
+        ch = m.group(0)
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch == ",":
+            last = m.start()
+    return last
+
+
+def _scan(s: str) -> Tuple[List[Tuple[int, int]], List[int]]:
+    """Top-Level-Objektkandidaten (start, end) und Positionen der am Ende offenen '{'."""
+    spans: List[Tuple[int, int]] = []
+    stack: List[str] = []
+    opens: List[int] = []
+    start = -1
+    in_str = False
+    esc = False
+    for m in _STRUCT.finditer(s):
+        ch = m.group(0)
+        if not stack:
+            if ch == "{":
+                stack.append(ch)
+                opens.append(m.start())
+                start = m.start()
+            continue
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append(ch)
+            opens.append(m.start())
+        elif ch in "}]":
+            opens.pop()
+            if _CLOSE[stack.pop()] != ch:
+                # "{ [ }": kein JSON – Kandidat verwerfen, ab hier neu suchen
+                stack.clear()
+                opens.clear()
+            elif not stack:
+                spans.append((start, m.end()))
+    return spans, [p for p, c in zip(opens, stack) if c == "{"]
+
+
+def _candidates(text: str, repair: bool) -> Iterator[Tuple[str, Any]]:
+    """(Art, dekodierter Wert) in Prioritätsreihenfolge; Dekodierfehler fallen weg."""
+    if text.startswith("{"):
+        yield "direct", _decode(text)
+    if "```" in text:
+        text = _FENCE.sub("", text)
+    spans, opens = _scan(text)
+    for a, b in spans:
+        if not _OBJ_START.match(text, a):
+            continue
+        cand = text[a:b]
+        obj = _decode(cand)
+        yield "direct", obj
+        if repair and not isinstance(obj, dict):
+            yield "repaired", _decode(_fix_tokens(cand))
+    if spans or opens:
+        # Scanner kann von einem Anführungszeichen in Prosa-Klammern ({a" b}) verschluckt
+        # worden sein: begrenzt direkt an weiteren '{' probieren (scheitert meist nach 1–2 Zeichen)
+        tried = {a for a, _ in spans}
+        pos = text.find("{")
+        probes = 0
+        while pos != -1 and probes < _MAX_PROBES:
+            if pos not in tried and _OBJ_START.match(text, pos):
+                probes += 1
+                obj = _decode(text[pos:])
+                yield "direct", obj
+                if repair and obj is None:
+                    yield "repaired", _decode(_fix_tokens(text[pos:]))
+            pos = text.find("{", pos + 1)
+    if repair:
+        # abgeschnitten: vom äußersten offenen Objekt nach innen
+        for start in [p for p in opens if _OBJ_START.match(text, p)][:_MAX_OPEN]:
+            closed = _close_truncated(text[start:])
+            if closed is not None:
+                yield "truncated", _decode(_fix_tokens(closed))
+
+
+def extract_object(s: Optional[str], repair: bool = True) -> Optional[Dict[str, Any]]:
+    """Erstes dekodierbares, nicht leeres JSON-Objekt in `s` (sonst `{}`, falls gesehen) oder None."""
+    STATS["calls"] += 1
+    empty: Optional[Dict[str, Any]] = None
+    if s:
+        for kind, obj in _candidates(s.strip(), repair):
+            if isinstance(obj, dict):
+                if obj:
+                    STATS[kind] += 1
+                    return obj
+                empty = obj         # "{}" aus Prosa nur nehmen, wenn sonst nichts kommt
+    STATS["failed" if empty is None else "direct"] += 1
+    return empty
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Verzögerte Imports für Bot-Module
+
+Schwere oder optionale Abhängigkeiten (Vision, LLM-Router, Screenshot-Archiv,
+requests) werden erst beim ersten Gebrauch geladen. Ergebnisse – auch
+Fehlschläge – werden gecacht, damit Handler nicht bei jedem Aufruf erneut
+importieren (ein fehlgeschlagener Import durchsucht sonst jedes Mal sys.path).
+"""
+
+from __future__ import annotations
+import sys
+import importlib
+import logging
+import threading
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional
+
+import startup_profile
+
+log = logging.getLogger("lazy_import")
+
+_lock = threading.Lock()
+_modules: Dict[str, Optional[ModuleType]] = {}
+_errors: Dict[str, str] = {}
+_on_load: Dict[str, List[Callable[[ModuleType], None]]] = {}
+
+
+def module(name: str) -> ModuleType:
+    """Importiert `name` beim ersten Aufruf; wirft ImportError wie `import`."""
+    mod = _modules.get(name)
+    if mod is not None:
+        return mod
+    with _lock:
+        if name in _modules:
+            if _modules[name] is None:
+                raise ImportError(_errors.get(name) or name)
+            return _modules[name]  # type: ignore[return-value]
+        try:
+            with startup_profile.phase(f"import {name} (deferred)"):
+                mod = importlib.import_module(name)
+        except Exception as e:
+            _modules[name] = None
+            _errors[name] = f"{name}: {e}"
+            log.debug("deferred import failed: %s", _errors[name])
+            raise ImportError(_errors[name]) from e
+        _modules[name] = mod
+        hooks = _on_load.pop(name, [])
+    _run_hooks(name, mod, hooks)
+    return mod
+
+
+def _run_hooks(name: str, mod: ModuleType, hooks: List[Callable[[ModuleType], None]]):
+    for fn in hooks:
+        try:
+            fn(mod)
+        except Exception as e:
+            log.debug("on_load hook for %s failed: %s", name, e)
+
+
+def on_load(name: str, fn: Callable[[ModuleType], None]) -> None:
+    """fn(mod) ausführen, sobald `name` geladen ist – sofort, falls schon importiert."""
+    with _lock:
+        mod = _modules.get(name) or sys.modules.get(name)
+        if mod is None:
+            _on_load.setdefault(name, []).append(fn)
+            return
+    _run_hooks(name, mod, [fn])
+
+
+def optional(name: str, attr: Optional[str] = None) -> Any:
+    """Wie module(), liefert aber None statt einer Exception (optional: Attribut)."""
+    try:
+        mod = module(name)
+    except ImportError:
+        return None
+    if attr is None:
+        return mod
+    return getattr(mod, attr, None)
+
+
+def forget(name: Optional[str] = None) -> None:
+    """Cache leeren (Tests/Reload)."""
+    with _lock:
+        if name is None:
+            _modules.clear()
+            _errors.clear()
+        else:
+            _modules.pop(name, None)
+            _errors.pop(name, None)
@@ -3,7 +3,9 @@
 
 import os
 import json
+import time
 import logging
+import threading
 import requests
 from typing import Callable, List
 
@@ -22,6 +24,17 @@ MISTRAL_KEY = os.getenv("MISTRAL_API_KEY")
 OLLAMA_BASE = os.getenv("OLLAMA_URL") or os.getenv("OLLAMA_BASE") or "http://127.0.0.1:11434"
 OLLAMA_MODEL = os.getenv("OLLAMA_TEXT_MODEL") or os.getenv("OLLAMA_MODEL") or "gpt-oss:latest"
 
+# Auslastung der Kette (für Hintergrund-Jobs, die nur im Leerlauf generieren)
+_busy_lock = threading.Lock()
+_inflight = 0
+_last_done_ts = 0.0  # monotonic
+
+
+def is_idle(quiet_sec: float = 0.0) -> bool:
+    """True, wenn gerade kein Aufruf läuft und der letzte ≥ quiet_sec her ist."""
+    return _inflight == 0 and (time.monotonic() - _last_done_ts) >= quiet_sec
+
+
 def _shorten(s: str, limit: int | None = None) -> str:
     """Collapse whitespace and clamp length, but keep full sentence(s) instead of a single line."""
     if limit is None:
@@ -93,6 +106,18 @@ def run_llm_chain(prompt: str) -> str:
       - "hybrid": versuche alle in Reihenfolge und wähle die inhaltlich reichste (längste) Antwort
     Fallback: gekürzter Prompt.
     """
+    global _inflight, _last_done_ts
+    with _busy_lock:
+        _inflight += 1
+    try:
+        return _run_chain(prompt)
+    finally:
+        with _busy_lock:
+            _inflight -= 1
+            _last_done_ts = time.monotonic()
+
+
+def _run_chain(prompt: str) -> str:
     order = os.getenv("AI_ORDER") or os.getenv("BACKEND_ORDER") or "gemini,mistral,gpt-oss"
     mode = (os.getenv("AI_MODE") or "first").strip().lower()
     seq: List[str] = [x.strip().lower() for x in order.split(",") if x.strip()]
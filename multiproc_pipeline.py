@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Optionales Multi-Prozess-Layout für den Vision-Pfad
+
+    ingest (1) ──frames──▶ vision (N) ──vision json──▶ writer (M) ──posts──▶ Hauptprozess
+
+- ingest:  prüft SCREENSHOT_FILE im Takt, überspringt unveränderte (md5) und
+           nahezu gleiche Frames (frame_gate), nimmt neue ins Screenshot-Archiv
+           auf und legt eine stabile Kopie im Spool-Verzeichnis ab (der
+           Capture-Prozess überschreibt das Original laufend).
+- vision:  Bild laden/base64/VLM-Aufruf/JSON-Parsing (orchestrator._call_vision)
+- writer:  LLM-Kette + Satz-Sanitizing (orchestrator._call_writer/_format_and_keywords)
+- Hauptprozess: nur Chat-I/O (IRC-Thread, Befehle) und Veröffentlichung über
+  die Sinks – keine CPU-lastige Stufe teilt sich mehr die GIL mit dem Chat.
+
+Die Stufen sind über lokale multiprocessing-Queues (Pipes) verbunden; es
+wandern nur kleine Deskriptoren/JSON, nie Bilddaten. Würde ein Post ohnehin
+verworfen (Cooldown/Vision-Budget, VISION_SKIP_BLOCKED_TICKS), setzt der
+Hauptprozess per hold_until() einen "nicht vor"-Zeitpunkt, bis zu dem die
+Ingest-Stufe keine Frames weitergibt; vision_ms/writer_ms der Stufen kommen
+mit dem Ergebnis zurück und speisen die Latenzschätzung dafür. Ein Supervisor-Thread
+startet tote oder hängende Worker (Heartbeat) mit Backoff neu.
+
+Aktivierung: ZEPHYR_MULTIPROC=true
+"""
+
+from __future__ import annotations
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing as mp
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger("multiproc_pipeline")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+MULTIPROC_ENABLED = os.getenv("ZEPHYR_MULTIPROC", "false").lower() == "true"
+VISION_WORKERS = max(1, _env_int("ZEPHYR_VISION_WORKERS", 1))
+WRITER_WORKERS = max(1, _env_int("ZEPHYR_WRITER_WORKERS", 1))
+QUEUE_MAX = max(1, _env_int("ZEPHYR_STAGE_QUEUE_MAX", 4))
+HANG_SEC = _env_float("ZEPHYR_STAGE_HANG_SEC", 600.0)
+SPOOL_DIR = os.getenv("ZEPHYR_SPOOL_DIR", "/tmp/zephyr_frames")
+
+
+def _worker_logging(name: str):
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format=f"%(asctime)s [%(levelname)s] [{name}] %(message)s",
+    )
+
+
+def _drop_spool(path: Optional[str]):
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# -----------------------------------------------------------------------------
+# Stufen (Top-Level-Funktionen, damit sie mit "spawn" startbar sind)
+# -----------------------------------------------------------------------------
+
+def ingest_worker(screenshot_path: str, interval_sec: float, out_q, not_before, hb, stop_evt):
+    _worker_logging("ingest")
+    import lazy_import
+    import frame_loader
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    last_md5: Optional[str] = None
+    while not stop_evt.is_set():
+        hb.value = time.time()
+        hold = not_before.value - time.time()
+        if hold > 0:
+            # nächster Post-Slot noch nicht erreichbar: keine Inferenz anstoßen
+            stop_evt.wait(min(hold, interval_sec))
+            continue
+        try:
+            post_gate = lazy_import.optional("commentary_engine", "should_post_now")
+            if post_gate is None or post_gate():
+                # einmal lesen: md5, Gate und Spool-Kopie aus demselben Puffer
+                img = frame_loader.try_load(screenshot_path, siblings=False)
+                md5 = img.md5 if img is not None else None
+                near_dup = False
+                frame_gate = None
+                if md5 and md5 != last_md5:
+                    # nur Cursor/Uhr geändert → Frame gar nicht erst an die Vision-Stufe geben
+                    fg = lazy_import.optional("frame_gate")
+                    frame_gate = fg.get_gate() if fg is not None else None
+                    d = frame_gate.check(img.data) if frame_gate is not None else None
+                    near_dup = bool(d and d.reuse)
+                    if near_dup:
+                        last_md5 = md5
+                if md5 and md5 != last_md5 and not near_dup:
+                    sm = lazy_import.optional("screenshots.screenshot_manager")
+                    if sm is not None:
+                        try:
+                            fi = lazy_import.optional("frame_index")
+                            if fi is not None:
+                                fi.ingest(sm, screenshot_path, img.data)
+                            else:
+                                sm.ingest(screenshot_path)
+                        except Exception:
+                            pass
+                    ext = os.path.splitext(screenshot_path)[1] or ".png"
+                    spool = os.path.join(SPOOL_DIR, f"{md5}{ext}")
+                    with open(spool, "wb") as f:
+                        f.write(img.data)
+                    frame = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "path": spool, "md5": md5}
+                    try:
+                        out_q.put_nowait(frame)
+                        last_md5 = md5
+                        if frame_gate is not None:
+                            frame_gate.remember()
+                    except queue.Full:
+                        # Vision hängt hinterher: Frame verwerfen, der nächste ist ohnehin aktueller
+                        _drop_spool(spool)
+                        log.debug("vision queue full – frame %s dropped", md5[:8])
+        except Exception as e:
+            log.warning("ingest error: %s", e)
+        stop_evt.wait(interval_sec)
+
+
+def vision_worker(in_q, out_q, hb, stop_evt):
+    _worker_logging("vision")
+    import lazy_import
+    orch = lazy_import.module("orchestrator")
+    while not stop_evt.is_set():
+        hb.value = time.time()
+        try:
+            frame = in_q.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        t0 = time.perf_counter()
+        try:
+            vis = orch._call_vision(frame["path"], frame.get("ocr_text"))
+        except Exception as e:
+            log.warning("vision error: %s", e)
+            vis = None
+        finally:
+            _drop_spool(frame.get("path"))
+        if vis:
+            out_q.put({"ts": frame["ts"], "md5": frame.get("md5"), "vision": vis,
+                       "vision_ms": int((time.perf_counter() - t0) * 1000)})
+
+
+def writer_worker(in_q, out_q, hb, stop_evt):
+    _worker_logging("writer")
+    import lazy_import
+    orch = lazy_import.module("orchestrator")
+    while not stop_evt.is_set():
+        hb.value = time.time()
+        try:
+            item = in_q.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        vis = item["vision"]
+        t0 = time.perf_counter()
+        try:
+            # ohne game_state_tracker: ob gepostet wird, entscheidet erst der Hauptprozess
+            writer = orch._call_writer(vis, item["ts"])
+            if not writer:
+                continue
+            out = orch._format_and_keywords(
+                writer.get("long_sentence", ""), writer.get("short_sentence", ""),
+                vis.get("entities", []), vis.get("notable_text", []),
+            )
+        except Exception as e:
+            log.warning("writer error: %s", e)
+            continue
+        out["ts"] = item["ts"]
+        out["md5"] = item.get("md5")
+        out["timings"] = {"vision_ms": item.get("vision_ms"), "writer_ms": int((time.perf_counter() - t0) * 1000)}
+        out_q.put(out)
+
+
+# -----------------------------------------------------------------------------
+# Supervisor
+# -----------------------------------------------------------------------------
+
+class _Slot:
+    """Ein Worker-Platz: Prozess + Heartbeat + Restart-Buchhaltung."""
+
+    def __init__(self, stage: str, idx: int, target: Callable, args: tuple):
+        self.stage = stage
+        self.idx = idx
+        self.target = target
+        self.args = args
+        self.proc = None
+        self.hb = None
+        self.restarts = 0
+        self.next_start = 0.0   # monotonic
+
+    @property
+    def name(self) -> str:
+        return f"{self.stage}-{self.idx}"
+
+
+class StagePipeline:
+    """Startet und überwacht die Stufen-Prozesse; results() liefert fertige Posts."""
+
+    def __init__(self, screenshot_path: str, interval_sec: float,
+                 vision_workers: int = VISION_WORKERS, writer_workers: int = WRITER_WORKERS,
+                 queue_max: int = QUEUE_MAX, hang_sec: float = HANG_SEC,
+                 ctx: Optional[Any] = None):
+        self._ctx = ctx or mp.get_context("spawn")
+        self.frames_q = self._ctx.Queue(maxsize=queue_max)
+        self.vision_q = self._ctx.Queue(maxsize=queue_max)
+        self.out_q = self._ctx.Queue(maxsize=queue_max)
+        self._stop_evt = self._ctx.Event()
+        self._not_before = self._ctx.Value("d", 0.0)        # Wall-Clock, 0 = frei
+        self.hang_sec = hang_sec
+        self._slots: List[_Slot] = [_Slot("ingest", 0, ingest_worker,
+                                          (screenshot_path, interval_sec, self.frames_q, self._not_before))]
+        self._slots += [_Slot("vision", i, vision_worker, (self.frames_q, self.vision_q)) for i in range(max(1, vision_workers))]
+        self._slots += [_Slot("writer", i, writer_worker, (self.vision_q, self.out_q)) for i in range(max(1, writer_workers))]
+        self._sup_stop = threading.Event()
+        self._sup: Optional[threading.Thread] = None
+
+    def _spawn(self, slot: _Slot):
+        slot.hb = self._ctx.Value("d", time.time())
+        slot.proc = self._ctx.Process(
+            target=slot.target, args=slot.args + (slot.hb, self._stop_evt),
+            name=f"zephyr-{slot.name}", daemon=True,
+        )
+        slot.proc.start()
+        log.info("[pipeline] %s started (pid %s)", slot.name, slot.proc.pid)
+
+    def _check(self, slot: _Slot):
+        now = time.monotonic()
+        proc = slot.proc
+        if proc is not None and proc.is_alive():
+            if self.hang_sec and (time.time() - slot.hb.value) > self.hang_sec:
+                log.warning("[pipeline] %s hängt seit %.0fs – terminate", slot.name, time.time() - slot.hb.value)
+                proc.terminate()
+                proc.join(2.0)
+            else:
+                return
+        if proc is not None:
+            log.warning("[pipeline] %s beendet (exit %s) – Neustart", slot.name, proc.exitcode)
+            slot.proc = None
+            slot.restarts += 1
+            slot.next_start = now + min(30.0, 2.0 ** min(slot.restarts, 5))
+        if now >= slot.next_start and not self._stop_evt.is_set():
+            self._spawn(slot)
+
+    def _supervise(self):
+        while not self._sup_stop.wait(1.0):
+            for slot in self._slots:
+                try:
+                    self._check(slot)
+                except Exception as e:
+                    log.debug("[pipeline] supervise %s: %s", slot.name, e)
+
+    def start(self):
+        for slot in self._slots:
+            self._spawn(slot)
+        self._sup = threading.Thread(target=self._supervise, name="pipeline-supervisor", daemon=True)
+        self._sup.start()
+
+    def hold_until(self, ts: float):
+        """Ingest gibt bis `ts` (time.time()) keine Frames weiter; 0 = sofort wieder frei."""
+        self._not_before.value = float(ts)
+
+    def results(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        try:
+            return self.out_q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop(self, join_sec: float = 3.0):
+        self._sup_stop.set()
+        self._stop_evt.set()
+        for slot in self._slots:
+            if slot.proc is not None:
+                slot.proc.join(join_sec)
+                if slot.proc.is_alive():
+                    slot.proc.terminate()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for slot in self._slots:
+            alive = bool(slot.proc and slot.proc.is_alive())
+            out[slot.name] = {
+                "alive": alive,
+                "pid": slot.proc.pid if slot.proc else None,
+                "restarts": slot.restarts,
+                "hb_age": round(time.time() - slot.hb.value, 1) if slot.hb is not None else None,
+            }
+        return out
+
+    def stats_compact(self) -> str:
+        stages: Dict[str, List[int]] = {}
+        for name, st in self.stats().items():
+            stage = name.rsplit("-", 1)[0]
+            agg = stages.setdefault(stage, [0, 0, 0])
+            agg[0] += 1 if st["alive"] else 0
+            agg[1] += 1
+            agg[2] += st["restarts"]
+        return ", ".join(f"{s} {a}/{n}" + (f" r{r}" if r else "") for s, (a, n, r) in stages.items())
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Lokaler OCR-Vorlauf (tesseract) für run_tick
+
+Terminals, Editoren und Chatfenster leben vom Text – genau den liest ein VLM
+bei reduziertem Pixelbudget am schlechtesten. Vor der Vision läuft deshalb
+optional tesseract (lokales Binary, OCR_TESSERACT_BIN) über den Frame:
+
+- Der Frame wird in OCR_GRID Regionen geteilt (Standard 2x3, Spalten×Zeilen).
+  Jede Region wird als Graustufen-PNG an einen eigenen tesseract-Prozess
+  gegeben; bis zu OCR_WORKERS laufen parallel (die Arbeit passiert in den
+  Kindprozessen, der Pool verteilt nur).
+- Ergebnis-Cache pro Region über den Hash ihrer Pixel (OCR_CACHE Einträge):
+  unveränderte Regionen kosten nichts, bei Tippen im Editor wird nur die
+  eine Region neu gelesen.
+- Der zusammengefügte Text (≤ OCR_MAX_CHARS) geht als OCR-Hinweis in den
+  Vision-Prompt.
+- Text-Fast-Path: Ist der Frame überwiegend Text (≥ OCR_TEXT_FRAC der
+  Regionen mit ≥ OCR_MIN_CHARS Zeichen) und haben sich seit der letzten
+  Analyse nur Textregionen geändert, übernimmt run_tick die letzte
+  Szenenbeschreibung mit dem neuen Text als notable_text – ohne VLM.
+  Spätestens nach OCR_FAST_MAX Fast-Path-Ticks folgt wieder eine Vision.
+
+Standardmäßig aus (OCR_ENABLED=true zum Einschalten); ohne tesseract oder
+Pillow bleibt es aus.
+"""
+
+from __future__ import annotations
+import io
+import os
+import re
+import time
+import shutil
+import hashlib
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+import frame_loader
+
+log = logging.getLogger("ocr_prepass")
+
+OCR_ENABLED = os.getenv("OCR_ENABLED", "false").lower() == "true"
+TESSERACT_BIN = os.getenv("OCR_TESSERACT_BIN", "tesseract")
+OCR_LANGS = os.getenv("OCR_LANGS", "deu+eng")
+try:
+    _c, _r = (int(x) for x in os.getenv("OCR_GRID", "2x3").lower().split("x", 1))
+    GRID = (max(1, _c), max(1, _r))
+except Exception:
+    GRID = (2, 3)
+try:
+    WORKERS = max(1, int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1)))))
+except Exception:
+    WORKERS = 2
+try:
+    TIMEOUT_SEC = float(os.getenv("OCR_TIMEOUT_SEC", "8"))
+except Exception:
+    TIMEOUT_SEC = 8.0
+try:
+    CACHE_ENTRIES = max(0, int(os.getenv("OCR_CACHE", "256")))
+except Exception:
+    CACHE_ENTRIES = 256
+try:
+    MAX_CHARS = max(80, int(os.getenv("OCR_MAX_CHARS", "600")))
+except Exception:
+    MAX_CHARS = 600
+try:
+    MIN_CHARS = max(1, int(os.getenv("OCR_MIN_CHARS", "24")))
+except Exception:
+    MIN_CHARS = 24
+try:
+    TEXT_FRAC = min(1.0, max(0.0, float(os.getenv("OCR_TEXT_FRAC", "0.5"))))
+except Exception:
+    TEXT_FRAC = 0.5
+try:
+    FAST_MAX = max(0, int(os.getenv("OCR_FAST_MAX", "4")))
+except Exception:
+    FAST_MAX = 4
+
+_NOISE_RE = re.compile(r"[^\w]", re.UNICODE)
+
+Runner = Callable[[bytes], str]
+
+
+class OcrResult(NamedTuple):
+    text: str                       # bereinigt, zusammengefügt, ≤ MAX_CHARS
+    regions: Tuple[str, ...]        # Text je Region (zeilenweise von links oben)
+    hashes: Tuple[str, ...]         # Pixel-Hash je Region
+    changed: Tuple[int, ...]        # Regionen mit anderem Hash als beim letzten Lauf (leer beim ersten)
+    text_regions: Tuple[int, ...]   # Regionen mit ≥ MIN_CHARS Zeichen
+    mostly_text: bool
+    cached: int
+    ms: float
+
+
+def _clean(raw: str) -> str:
+    lines = []
+    for line in (raw or "").splitlines():
+        line = " ".join(line.split())
+        # Zeilen aus Rahmen/Icons (kaum Buchstaben/Ziffern) verwerfen
+        if line and len(_NOISE_RE.sub("", line)) >= max(2, len(line) // 3):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _chars(s: str) -> int:
+    return len(_NOISE_RE.sub("", s))
+
+
+def tesseract(png: bytes, binary: str = TESSERACT_BIN, langs: str = OCR_LANGS,
+              timeout: float = TIMEOUT_SEC) -> str:
+    """Ein tesseract-Prozess pro Region: PNG über stdin, Text über stdout."""
+    p = subprocess.run([binary, "stdin", "stdout", "-l", langs, "--psm", "6"],
+                       input=png, capture_output=True, timeout=timeout, check=False)
+    if p.returncode != 0:
+        raise RuntimeError((p.stderr or b"").decode("utf-8", "replace").strip()[:200] or f"rc={p.returncode}")
+    return p.stdout.decode("utf-8", "replace")
+
+
+def text_only_change(prev: Optional[OcrResult], cur: OcrResult) -> bool:
+    """Beide Frames überwiegend Text, etwas geändert und alle geänderten Regionen sind Textregionen."""
+    if prev is None or not prev.mostly_text or not cur.mostly_text:
+        return False
+    if len(prev.hashes) != len(cur.hashes) or not cur.changed:
+        return False                        # nichts geändert: kein Anlass, das alte Ergebnis umzuschreiben
+    text = set(cur.text_regions) | set(prev.text_regions)
+    return all(i in text for i in cur.changed)
+
+
+def changed_lines(prev: Optional[OcrResult], cur: OcrResult, limit: int = 6, width: int = 80) -> List[str]:
+    """Neue Zeilen aus den geänderten Regionen (für notable_text)."""
+    out: List[str] = []
+    for i in cur.changed:
+        old = set(prev.regions[i].splitlines()) if prev is not None and i < len(prev.regions) else set()
+        for line in cur.regions[i].splitlines():
+            if line not in old and _chars(line) >= 3 and line not in out:
+                out.append(line[:width])
+    return out[-limit:]
+
+
+class OcrPrepass:
+    def __init__(self, grid: Tuple[int, int] = GRID, workers: int = WORKERS,
+                 runner: Optional[Runner] = None, cache_entries: int = CACHE_ENTRIES,
+                 min_chars: int = MIN_CHARS, text_frac: float = TEXT_FRAC, max_chars: int = MAX_CHARS,
+                 fast_max: int = FAST_MAX):
+        self.grid = grid
+        self.fast_max = fast_max
+        self._fast_streak = 0
+        self.min_chars = min_chars
+        self.text_frac = text_frac
+        self.max_chars = max_chars
+        self.cache_entries = cache_entries
+        self._run = runner or tesseract
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+        self._lru: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last: Optional[OcrResult] = None
+        self.previous: Optional[OcrResult] = None   # Ergebnis des vorletzten run() (für den Fast-Path)
+        self._disabled_reason: Optional[str] = None
+        self.stats = {"runs": 0, "regions": 0, "cache_hits": 0, "errors": 0, "fast": 0, "ms_total": 0.0}
+
+    def _regions(self, frame: frame_loader.Frame) -> List[Tuple[str, Any]]:
+        """(Pixel-Hash, Graustufen-Region) je Rasterfeld; PNG erst für Cache-Fehlschläge."""
+        from PIL import Image
+        cols, rows = self.grid
+        out = []
+        with Image.open(io.BytesIO(frame.data)) as im:
+            g = im.convert("L")
+        W, H = g.size
+        for r in range(rows):
+            for c in range(cols):
+                box = (c * W // cols, r * H // rows, (c + 1) * W // cols, (r + 1) * H // rows)
+                reg = g.crop(box)
+                out.append((hashlib.md5(reg.tobytes()).hexdigest(), reg))
+        return out
+
+    def _ocr(self, region) -> Optional[str]:
+        try:
+            buf = io.BytesIO()
+            region.save(buf, format="PNG", compress_level=1)
+            return _clean(self._run(buf.getvalue()))
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            log.debug("[ocr] region failed: %s", e)
+            return None
+
+    def run(self, frame: frame_loader.Frame) -> Optional[OcrResult]:
+        """Frame lesen (nur geänderte Regionen, parallel); None bei aus/Fehler."""
+        if self._disabled_reason:
+            return None
+        t0 = time.perf_counter()
+        try:
+            regions = self._regions(frame)
+        except ImportError as e:
+            self.disable(str(e))
+            return None
+        except Exception as e:
+            self.stats["errors"] += 1
+            log.debug("[ocr] split failed: %s", e)
+            return None
+        texts: List[Optional[str]] = []
+        todo = []
+        with self._lock:
+            for i, (h, _) in enumerate(regions):
+                hit = self._lru.get(h)
+                if hit is not None:
+                    self._lru.move_to_end(h)
+                texts.append(hit)
+                if hit is None:
+                    todo.append(i)
+        errors_before = self.stats["errors"]
+        futs = {i: self._pool.submit(self._ocr, regions[i][1]) for i in todo}
+        for i, fut in futs.items():
+            texts[i] = fut.result()
+        if todo and not self.stats["runs"] and self.stats["errors"] - errors_before == len(todo):
+            # erster Lauf komplett gescheitert (z. B. Sprachdaten fehlen) → nicht jeden Tick erneut
+            self.disable("tesseract scheitert an allen Regionen")
+            return None
+        with self._lock:
+            for i in todo:
+                if texts[i] is not None:            # Fehler nicht cachen (Timeout o. ä.)
+                    self._lru[regions[i][0]] = texts[i]
+            while len(self._lru) > self.cache_entries:
+                self._lru.popitem(last=False)
+        regs = tuple(t or "" for t in texts)
+        hashes = tuple(h for h, _ in regions)
+        prev = self._last
+        changed = tuple(i for i, h in enumerate(hashes)
+                        if prev is not None and i < len(prev.hashes) and prev.hashes[i] != h)
+        text_regions = tuple(i for i, t in enumerate(regs) if _chars(t) >= self.min_chars)
+        joined = "\n".join(t for t in regs if t)
+        if len(joined) > self.max_chars:
+            joined = joined[:self.max_chars].rsplit("\n", 1)[0] or joined[:self.max_chars]
+        ms = (time.perf_counter() - t0) * 1000.0
+        res = OcrResult(joined, regs, hashes, changed, text_regions,
+                        len(text_regions) >= self.text_frac * len(regs), len(regs) - len(todo), ms)
+        with self._lock:
+            self.previous, self._last = self._last, res
+            self.stats["runs"] += 1
+            self.stats["regions"] += len(todo)
+            self.stats["cache_hits"] += len(regs) - len(todo)
+            self.stats["ms_total"] += ms
+        return res
+
+    def fast_path(self, res: OcrResult) -> bool:
+        """Text-Fast-Path für diesen Frame? Zählt die Serie bis OCR_FAST_MAX mit."""
+        with self._lock:
+            ok = self._fast_streak < self.fast_max and text_only_change(self.previous, res)
+            self._fast_streak = self._fast_streak + 1 if ok else 0
+            if ok:
+                self.stats["fast"] += 1
+        return ok
+
+    def disable(self, reason: str):
+        self._disabled_reason = reason
+        log.info("[ocr] deaktiviert (%s)", reason)
+
+    def stats_compact(self) -> str:
+        s = self.stats
+        if self._disabled_reason:
+            return "off"
+        if not s["runs"]:
+            return "n/a"
+        total = s["regions"] + s["cache_hits"]
+        return (f"{s['ms_total'] / s['runs']:.0f}ms/frame, {s['cache_hits'] / total * 100:.0f}% cached, "
+                f"{s['fast']} fast")
+
+
+_OCR: Optional[OcrPrepass] = None
+_OCR_ERR: Optional[str] = None
+_OCR_LOCK = threading.Lock()
+
+
+def get_prepass() -> Optional[OcrPrepass]:
+    """Globaler OCR-Vorlauf oder None (aus / tesseract fehlt)."""
+    global _OCR, _OCR_ERR
+    if not OCR_ENABLED or _OCR_ERR:
+        return None
+    if _OCR is None:
+        with _OCR_LOCK:
+            if _OCR is None and not _OCR_ERR:
+                if shutil.which(TESSERACT_BIN) is None:
+                    _OCR_ERR = f"{TESSERACT_BIN} nicht gefunden"
+                    log.info("[ocr] deaktiviert (%s)", _OCR_ERR)
+                    return None
+                _OCR = OcrPrepass()
+    return _OCR
+
+
+def stats_compact() -> str:
+    return _OCR.stats_compact() if _OCR is not None else ("off" if _OCR_ERR else "n/a")
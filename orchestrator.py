@@ -22,149 +22,171 @@ import time
 import logging
 from typing import Any, Dict, List, Optional, Tuple
 
+import lazy_import
 import qwen_client
+import vision_cache
+import frame_gate
+import frame_loader
+import vision_preprocess
+import region_crop
+import vision_ladder
+import game_state_tracker
+import ocr_prepass
+import json_extract
 
 log = logging.getLogger("orchestrator")
 
 
-def _extract_first_json_object(s: str) -> Optional[Dict[str, Any]]:
-    if not s:
-        return None
-    try:
-        return json.loads(s)
-    except Exception:
-        pass
-    # strip codefences
-    s2 = s.replace("```json", "```").replace("```", "")
-    depth = 0
-    start = -1
-    in_str = False
-    esc = False
-    for i, ch in enumerate(s2):
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == '"':
-                in_str = False
-            continue
-        if ch == '"':
-            in_str = True
-            continue
-        if ch == '{':
-            if depth == 0:
-                start = i
-            depth += 1
-        elif ch == '}':
-            if depth > 0:
-                depth -= 1
-                if depth == 0 and start != -1:
-                    cand = s2[start:i + 1]
-                    try:
-                        return json.loads(cand)
-                    except Exception:
-                        start = -1
-    return None
+def _call_vision(image_path: str, ocr_text: Optional[str],
+                 frame: Optional[frame_loader.Frame] = None,
+                 trace: Optional[Dict[str, Any]] = None,
+                 crop: Optional[region_crop.Crop] = None,
+                 context: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Call Qwen-VL with the structured vision prompt, parse JSON.
 
+    `frame` is the already-read image (frame_loader.load); without it the
+    image is loaded here, including the sibling-extension fallback
+    (.jpg/.jpeg/.png) shared with the summarizer. Payload size and vision
+    tokens of the sent image end up in `trace["payload"]`.
 
-def _call_vision(image_path: str, ocr_text: Optional[str]) -> Optional[Dict[str, Any]]:
-    """Call Qwen-VL with the structured vision prompt, parse JSON.
+    With `crop` (region_crop) only the changed region(s) are sent, together
+    with `context` (previous scene_summary); the model updates that scene.
+    Such results depend on the context and are not put into vision_cache.
 
-    Includes resilient image-path handling: if the exact path does not exist,
-    try common sibling extensions (.jpg/.jpeg/.png) similar to the summarizer.
+    The image goes through vision_ladder: low pixel budget first, higher
+    budgets only while confidence is low or no entities were found
+    (`trace["ladder"]`). Only the final result is cached.
     """
     # Build a custom message content via qwen_client by temporarily overriding the user_text
     # We reuse qwen_client.analyze_image by monkeypatching its prompt through env (avoid invasive change)
     # but simplest is to call the same endpoint ourselves using qwen_client settings.
-    try:
-        import base64, mimetypes, urllib.request as _ur
-
-        # Resolve actual image path with sibling extension fallback
-        img_path = image_path
-        if not os.path.exists(img_path):
-            base, ext = os.path.splitext(img_path)
-            ext_order = [".jpg", ".jpeg", ".png"]
-            # Keep current ext first if present, then others
-            if ext.lower() in ext_order:
-                order = [ext.lower()] + [e for e in ext_order if e != ext.lower()]
-            else:
-                order = ext_order
-            for e in order:
-                cand = base + e
-                if os.path.exists(cand):
-                    img_path = cand
-                    try:
-                        log.debug("[vision] using sibling image: %s", img_path)
-                    except Exception:
-                        pass
-                    break
+    import urllib.request as _ur
 
-        if not os.path.exists(img_path):
+    if frame is None:
+        frame = frame_loader.try_load(image_path)
+        if frame is None:
             return None
+    if frame.path != image_path:
+        log.debug("[vision] using sibling image: %s", frame.path)
 
-        with open(img_path, 'rb') as f:
-            b64 = base64.b64encode(f.read()).decode('ascii')
-        mime, _ = mimetypes.guess_type(img_path)
-        if not mime:
-            mime = 'image/jpeg'
-        data_uri = f"data:{mime};base64,{b64}"
+    vis_lang = (os.getenv("VISION_LANG") or "de").strip().lower()
+    md5 = frame.md5
+    cached = vision_cache.get(md5, "scene", vis_lang, ocr_text or "")
+    if cached is not None:
+        return cached
 
-        vis_lang = (os.getenv("VISION_LANG") or "de").strip().lower()
+    if vis_lang.startswith("en"):
+        system = (
+            "Role: Qwen-Vision, you analyze a desktop screenshot. "
+            "Return exactly JSON with scene_summary, entities, notable_text, confidence."
+        )
+        user = (
+            "Analyze the image concisely and factually. Do not identify real people. "
+            "Use OCR hints if provided; do not invent details."
+        )
+    else:
+        system = (
+            "Rolle: Qwen-Vision, du analysierst einen Desktop-Screenshot. "
+            "Gib exakt JSON zurück mit scene_summary, entities, notable_text, confidence."
+        )
+        user = (
+            "Analysiere das Bild prägnant und faktenbasiert. Keine Identifikation realer Personen. "
+            "Nutze ggf. OCR-Hinweise, erfinde nichts."
+        )
+    if crop is not None:
+        where = "; ".join(f"x {x0}-{x1}, y {y0}-{y1}" for x0, y0, x1, y1 in crop.boxes)
         if vis_lang.startswith("en"):
-            system = (
-                "Role: Qwen-Vision, you analyze a desktop screenshot. "
-                "Return exactly JSON with scene_summary, entities, notable_text, confidence."
-            )
-            user = (
-                "Analyze the image concisely and factually. Do not identify real people. "
-                "Use OCR hints if provided; do not invent details."
+            user += (
+                f"\nPrevious scene: {context or '-'}\n"
+                f"The image shows ONLY the screen region(s) that changed since then ({where}"
+                f"{'; stacked as a mosaic' if crop.mosaic else ''}). "
+                "Describe the whole current scene: keep what is still valid, update what changed."
             )
         else:
-            system = (
-                "Rolle: Qwen-Vision, du analysierst einen Desktop-Screenshot. "
-                "Gib exakt JSON zurück mit scene_summary, entities, notable_text, confidence."
+            user += (
+                f"\nBisherige Szene: {context or '-'}\n"
+                f"Das Bild zeigt NUR die seitdem geänderten Bildschirmbereiche ({where}"
+                f"{'; als Mosaik untereinander' if crop.mosaic else ''}). "
+                "Beschreibe die gesamte aktuelle Szene: Gültiges beibehalten, Geändertes aktualisieren."
             )
-            user = (
-                "Analysiere das Bild prägnant und faktenbasiert. Keine Identifikation realer Personen. "
-                "Nutze ggf. OCR-Hinweise, erfinde nichts."
-            )
-        if ocr_text:
-            user += f"\nOCR: {ocr_text}"
+    if ocr_text:
+        user += f"\nOCR: {ocr_text}"
 
-        messages = [
-            {"role": "system", "content": [{"type": "text", "text": system}]},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": user},
-                    {"type": "image_url", "image_url": {"url": data_uri}},
-                ],
-            },
-        ]
-        payload = {
-            "model": getattr(qwen_client, "QWEN_MODEL_VL", os.getenv("QWEN_VISION_MODEL", "qwen2.5-vl")),
-            "messages": messages,
-            "temperature": float(os.getenv("QWEN_TEMPERATURE", "0.1")),
-            "max_tokens": int(os.getenv("QWEN_MAX_TOKENS", "448")),
-            # Try structured JSON if bridge supports it
-            # "response_format": {"type": "json_object"},
+    def _encode(max_pixels: int) -> vision_preprocess.Encoded:
+        if crop is None:
+            return vision_preprocess.encode(frame, max_pixels)
+        if max_pixels == vision_preprocess.MAX_PIXELS or not crop.tiles:
+            return crop.encoded
+        try:
+            return region_crop.render(frame, crop.tiles, max_pixels=max_pixels).encoded
+        except Exception as e:
+            log.debug("[vision] crop re-render failed: %s", e)
+            return crop.encoded
+
+    def _ask(max_pixels: int) -> Optional[Dict[str, Any]]:
+        """Eine Stufe: kodieren, anfragen, parsen. None = Transportfehler, {} = kein JSON."""
+        try:
+            enc = _encode(max_pixels)
+            if trace is not None:
+                trace["payload"] = {"src_kb": round(enc.src_bytes / 1024.0, 1),
+                                    "sent_kb": round(len(enc.data_uri) / 1024.0, 1),
+                                    "size": f"{enc.width}x{enc.height}" if enc.width else None,
+                                    "tokens": enc.tokens or None, "prep_ms": round(enc.ms, 1)}
+            messages = [
+                {"role": "system", "content": [{"type": "text", "text": system}]},
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": user},
+                        {"type": "image_url", "image_url": {"url": enc.data_uri}},
+                    ],
+                },
+            ]
+            payload = {
+                "model": getattr(qwen_client, "QWEN_MODEL_VL", os.getenv("QWEN_VISION_MODEL", "qwen2.5-vl")),
+                "messages": messages,
+                "temperature": float(os.getenv("QWEN_TEMPERATURE", "0.1")),
+                "max_tokens": int(os.getenv("QWEN_MAX_TOKENS", "448")),
+                # Try structured JSON if bridge supports it
+                # "response_format": {"type": "json_object"},
+            }
+            req = _ur.Request(
+                f"{getattr(qwen_client, 'QWEN_BASE', os.getenv('QWEN_BASE','http://127.0.0.1:8010/v1'))}/chat/completions",
+                data=json.dumps(payload).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+            )
+            if not qwen_client.BREAKER.allow():
+                log.debug("Vision skipped: VLM breaker open (retry in %.0fs)", qwen_client.BREAKER.retry_in())
+                return None
+            try:
+                with _ur.urlopen(req, timeout=getattr(qwen_client, "QWEN_TIMEOUT", 30.0)) as r:
+                    body = r.read().decode("utf-8")
+                    data = json.loads(body)
+                    content = data["choices"][0]["message"]["content"]
+            except Exception as e:
+                qwen_client.BREAKER.record_failure(type(e).__name__)
+                raise
+            qwen_client.BREAKER.record_success()
+        except Exception as e:
+            log.warning("Vision call failed: %s", e)
+            return None
+        js = json_extract.extract_object(content)
+        if not js:
+            return {}
+        # Normalize structure
+        return {
+            "scene_summary": str(js.get("scene_summary") or "").strip(),
+            "entities": [str(x).strip() for x in (js.get("entities") or []) if str(x).strip()][:6],
+            "notable_text": [str(x).strip() for x in (js.get("notable_text") or []) if str(x).strip()][:6],
+            "confidence": float(js.get("confidence") or 0.0),
         }
-        req = _ur.Request(
-            f"{getattr(qwen_client, 'QWEN_BASE', os.getenv('QWEN_BASE','http://127.0.0.1:8010/v1'))}/chat/completions",
-            data=json.dumps(payload).encode("utf-8"),
-            headers={"Content-Type": "application/json"},
-        )
-        with _ur.urlopen(req, timeout=getattr(qwen_client, "QWEN_TIMEOUT", 30.0)) as r:
-            body = r.read().decode("utf-8")
-            data = json.loads(body)
-            content = data["choices"][0]["message"]["content"]
-    except Exception as e:
-        log.warning("Vision call failed: %s", e)
-        return None
 
-    js = _extract_first_json_object(content)
-    if not js:
+    out, trail = vision_ladder.run(_ask)
+    if trace is not None and trail:
+        trace["ladder"] = trail
+    if out is None:
+        return None
+    if not out:
         # Fallback: use robust summarizer and map to expected schema
         try:
             from vision_summarizer import summarize_image as _sum
@@ -201,36 +223,61 @@ def _call_vision(image_path: str, ocr_text: Optional[str]) -> Optional[Dict[str,
                 }
         return None
 
-    # Normalize structure
-    out: Dict[str, Any] = {
-        "scene_summary": str(js.get("scene_summary") or "").strip(),
-        "entities": [str(x).strip() for x in (js.get("entities") or []) if str(x).strip()][:6],
-        "notable_text": [str(x).strip() for x in (js.get("notable_text") or []) if str(x).strip()][:6],
-        "confidence": float(js.get("confidence") or 0.0),
-    }
+    if crop is None:
+        vision_cache.put(md5, "scene", out, vis_lang, ocr_text or "")
     return out
 
 
-def _call_writer(vision: Dict[str, Any], timestamp: str) -> Optional[Dict[str, str]]:
-    try:
-        from llm_router import run_llm_chain
-    except Exception:
-        run_llm_chain = None
+def _call_writer(vision: Dict[str, Any], timestamp: str,
+                 tracker: Optional[game_state_tracker.GameStateTracker] = None,
+                 trace: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, str]]:
+    """Writer-LLM: zwei Sätze aus dem Vision-Ergebnis.
+
+    Mit `tracker` (game_state_tracker, Vision bereits eingefaltet) bekommt das
+    LLM nur den festen Kurzkontext und was sich seit dem letzten Post geändert
+    hat statt des ganzen Vision-JSON.
+    """
+    run_llm_chain = lazy_import.optional("llm_router", "run_llm_chain")
 
-    payload = {
-        "scene_summary": vision.get("scene_summary", ""),
-        "entities": vision.get("entities", []),
-        "notable_text": vision.get("notable_text", []),
-        "confidence": float(vision.get("confidence") or 0.0),
-        "timestamp": timestamp,
-    }
     comm_lang = (os.getenv("COMMENTARY_LANG") or "de").strip().lower()
-    if comm_lang.startswith("en"):
+    en = comm_lang.startswith("en")
+    if tracker is not None:
+        changes = tracker.delta()
+        if not changes:
+            changes = {"unchanged": True, "scene_hint": _clamp(tracker.scene, 120)}
+        payload = {
+            "context": tracker.context(),
+            "changes": changes,
+            "confidence": float(vision.get("confidence") or 0.0),
+            "timestamp": timestamp,
+        }
+        if trace is not None:
+            trace["state_delta"] = changes
+        source = (
+            "Input: context (fixed, for orientation only – do not describe it again) and changes since your "
+            "last post (scene_summary only if the scene changed, new_entities, gone_entities, new_text). "
+            "Comment on the changes; if unchanged, write a brief continuation without repeating yourself; "
+            if en else
+            "Input: context (fest, nur zur Orientierung – nicht erneut beschreiben) und changes seit deinem "
+            "letzten Post (scene_summary nur bei Szenenwechsel, new_entities, gone_entities, new_text). "
+            "Kommentiere die Änderungen; bei unchanged kurz weiterführen, ohne dich zu wiederholen; "
+        )
+    else:
+        payload = {
+            "scene_summary": vision.get("scene_summary", ""),
+            "entities": vision.get("entities", []),
+            "notable_text": vision.get("notable_text", []),
+            "confidence": float(vision.get("confidence") or 0.0),
+            "timestamp": timestamp,
+        }
+        source = ("Only use content from scene_summary/notable_text/entities; " if en else
+                  "Nur Inhalte aus scene_summary/notable_text/entities; ")
+    if en:
         instr = (
             "Role: You write complete sentences in English based on the Qwen analysis. "
             "Return exactly JSON with long_sentence (180–400, exactly ONE sentence) and short_sentence (80–160, exactly ONE sentence). "
             "Full sentences, no bullet style, no lists, no placeholders or hashtags. "
-            "Only use content from scene_summary/notable_text/entities; be cautious if confidence is low (appears to, likely)."
+            + source + "be cautious if confidence is low (appears to, likely)."
         )
         idle_fallback = "Brief idle moment…"
     else:
@@ -238,10 +285,14 @@ def _call_writer(vision: Dict[str, Any], timestamp: str) -> Optional[Dict[str, s
             "Rolle: Du schreibst komplette Sätze in Deutsch auf Basis der Qwen-Analyse. "
             "Gib exakt JSON mit long_sentence (180–400, exakt EIN Satz) und short_sentence (80–160, exakt EIN Satz) zurück. "
             "Ganze Sätze, kein Telegrammstil, keine Listen, keine Platzhalter oder Hashtags. "
-            "Nur Inhalte aus scene_summary/notable_text/entities; bei geringer Sicherheit vorsichtig (scheint, vermutlich)."
+            + source + "bei geringer Sicherheit vorsichtig (scheint, vermutlich)."
         )
         idle_fallback = "Kurzer Idle-Moment…"
     prompt = instr + "\nInput:\n" + json.dumps(payload, ensure_ascii=False)
+    if trace is not None:
+        trace["writer_prompt_chars"] = len(prompt)
+    if tracker is not None:
+        tracker.note_prompt(len(prompt))
 
     if not run_llm_chain:
         # Bare fallback: use scene_summary
@@ -260,7 +311,7 @@ def _call_writer(vision: Dict[str, Any], timestamp: str) -> Optional[Dict[str, s
         def _looks(x: str) -> bool:
             x = (x or "").lower()
             return any(m in x for m in ["aufgabe:", "2–4 sätze", "2-4 sätze", "json", "vision_begin", "long_sentence", "short_sentence", "rolle:", "role:"])
-    js = _extract_first_json_object(out)
+    js = json_extract.extract_object(out)
     if not js:
         # fallback to raw text unless it looks like a prompt; then scene_summary
         text = (out or "").strip()
@@ -338,13 +389,84 @@ def _format_and_keywords(long_s: str, short_s: str, ents: List[str], notes: List
     return {"twitch_sentence": tw, "youtube_sentence": yt, "keywords": kws[:6]}
 
 
-def run_tick(timestamp: str, screenshot_path: str, optional_ocr_text: Optional[str] = None) -> Optional[Dict[str, Any]]:
-    vis = _call_vision(screenshot_path, optional_ocr_text)
+def run_tick(timestamp: str, screenshot_path: str, optional_ocr_text: Optional[str] = None,
+             trace: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Vision → Writer → Format. `trace` (optional) wird mit Zwischenergebnissen
+    und Timings für das Tick-Journal befüllt. Ohne `optional_ocr_text` liefert
+    ocr_prepass (falls eingeschaltet) den OCR-Hinweis."""
+    t0 = time.perf_counter()
+    # Screenshot genau einmal lesen: Hash, Gate und Vision teilen sich den Puffer
+    frame = frame_loader.try_load(screenshot_path)
+    if trace is not None:
+        trace["image_md5"] = frame.md5 if frame is not None else None
+    # Perceptual-Gate: kaum veränderter Frame → letztes Vision-Ergebnis wiederverwenden
+    gate = frame_gate.get_gate()
+    decision = gate.check(frame.data) if gate is not None and frame is not None else None
+    if decision is not None and decision.reuse and decision.vision:
+        vis = decision.vision
+    else:
+        vis = None
+        # OCR-Vorlauf: Text als Hinweis für die Vision; reine Textänderung → ohne VLM
+        ocr = ocr_prepass.get_prepass() if frame is not None and optional_ocr_text is None else None
+        ocr_res = ocr.run(frame) if ocr is not None else None
+        if ocr_res is not None:
+            optional_ocr_text = ocr_res.text or None
+            last = gate.last_vision() if gate is not None else None
+            # abgelaufenes Wiederverwendungsfenster erzwingt eine echte Analyse
+            forced = decision is not None and decision.forced
+            fast = bool(last) and not forced and ocr.fast_path(ocr_res)
+            if fast:
+                vis = dict(last)
+                lines = ocr_prepass.changed_lines(ocr.previous, ocr_res)
+                if lines:
+                    vis["notable_text"] = lines
+                gate.remember(vis)
+            if trace is not None:
+                trace["ocr"] = {"ms": round(ocr_res.ms, 1), "chars": len(ocr_res.text), "cached": ocr_res.cached,
+                                "changed": list(ocr_res.changed), "mostly_text": ocr_res.mostly_text, "fast": fast}
+    if vis is None:
+        # nur geänderte Bereiche schicken, wenn es einen analysierten Referenzframe gibt
+        crop, crop_why, context = None, "", None
+        cropper = region_crop.get_cropper() if decision is not None else None
+        if cropper is not None:
+            prev = gate.last_vision() or {}
+            context = prev.get("scene_summary") or None
+            crop, crop_why = cropper.crop(frame, decision.changed, bool(context))
+        vis = _call_vision(screenshot_path, optional_ocr_text, frame=frame, trace=trace,
+                           crop=crop, context=context)
+        if vis and gate is not None:
+            gate.remember(vis)
+        if vis and cropper is not None:
+            cropper.committed(crop)
+        if trace is not None and cropper is not None:
+            trace["region"] = ({"boxes": [list(b) for b in crop.boxes], "area": round(crop.area, 3),
+                                "mosaic": crop.mosaic} if crop is not None else {"full": crop_why})
+    t1 = time.perf_counter()
+    if trace is not None:
+        trace["vision"] = vis
+        trace["timings"] = {"vision_ms": int((t1 - t0) * 1000)}
+        if decision is not None:
+            trace["frame_changed"] = not decision.reuse
+            trace["frame_gate"] = {"reuse": decision.reuse, "hamming": decision.hamming,
+                                   "tile_diff": None if decision.tile_diff is None else round(decision.tile_diff, 1),
+                                   "hash_ms": round(decision.hash_ms, 2)}
     if not vis:
         return None
+    # Spielzustand fortschreiben; der Writer bekommt nur das Delta seit dem letzten Post.
+    # Wiederverwendete Frames (Gate) sind keine neue Beobachtung: kein fold, sonst
+    # hinge das Altern der Entities (GAME_STATE_ENTITY_TTL) an der Tick-Rate.
+    tracker = game_state_tracker.get_tracker()
+    if tracker is not None and not (decision is not None and decision.reuse):
+        tracker.fold(vis)
     # Neutralize if very low confidence – the writer prompt already covers it, but we surface confidence anyway
-    writer = _call_writer(vis, timestamp)
+    writer = _call_writer(vis, timestamp, tracker=tracker, trace=trace)
+    t2 = time.perf_counter()
+    if trace is not None:
+        trace["writer"] = writer
+        trace["timings"]["writer_ms"] = int((t2 - t1) * 1000)
     if not writer:
         return None
     out = _format_and_keywords(writer.get("long_sentence",""), writer.get("short_sentence",""), vis.get("entities", []), vis.get("notable_text", []))
+    if trace is not None:
+        trace["timings"]["total_ms"] = int((time.perf_counter() - t0) * 1000)
     return out
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Ausgabe-Sinks mit eigener Queue, Retry-Policy und Circuit Breaker
+
+Der Vision-Loop ruft nur noch SinkHub.publish({...}) auf – das legt die
+Nachricht in die Queue jedes Sinks und kehrt sofort zurück. Jeder Sink
+(Twitch, YouTube, Overlay-Datei, Webhook) liefert in seinem eigenen Thread
+aus; ein langsamer oder kaputter Sink verzögert weder die Ticks noch die
+anderen Sinks. Pro Sink werden Zustellungen, Fehler, Drops und die
+Latenz (publish → zugestellt) mitgeführt.
+"""
+
+from __future__ import annotations
+import json
+import os
+import queue
+import threading
+import time
+import logging
+import urllib.request
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from circuit_breaker import CircuitBreaker
+
+log = logging.getLogger("output_sinks")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+QUEUE_MAX = _env_int("SINK_QUEUE_MAX", 20)
+MAX_RETRIES = _env_int("SINK_MAX_RETRIES", 1)
+RETRY_BACKOFF_SEC = _env_float("SINK_RETRY_BACKOFF_SEC", 5.0)
+MSG_TTL_SEC = _env_float("SINK_MSG_TTL_SEC", 60.0)
+BREAKER_FAILS = _env_int("SINK_BREAKER_FAILS", 3)
+BREAKER_RESET_SEC = _env_float("SINK_BREAKER_RESET_SEC", 60.0)
+
+
+# -----------------------------------------------------------------------------
+# Sinks
+# -----------------------------------------------------------------------------
+
+class Sink:
+    """Basisklasse: select() wählt den Payload aus der Nachricht, deliver() stellt zu."""
+    name = "sink"
+    field = "twitch"
+
+    def select(self, msg: Dict[str, Any]) -> Any:
+        return msg.get(self.field)
+
+    def deliver(self, payload: Any) -> None:
+        raise NotImplementedError
+
+
+class TwitchSink(Sink):
+    name = "twitch"
+    field = "twitch"
+
+    def __init__(self, client, bucket: str = "vision"):
+        self.client = client
+        self.bucket = bucket
+
+    def deliver(self, payload: str) -> None:
+        self.client.enqueue(payload, bucket=self.bucket)
+
+
+class YouTubeSink(Sink):
+    name = "youtube"
+    field = "youtube"
+
+    def __init__(self, client):
+        self.client = client
+
+    def deliver(self, payload: str) -> None:
+        self.client.post(payload)
+
+
+class FileSink(Sink):
+    """Overlay-Datei (z. B. OBS-Textquelle), atomar ersetzt."""
+    name = "overlay"
+
+    def __init__(self, path: str, field: str = "twitch"):
+        self.path = path
+        self.field = field
+
+    def deliver(self, payload: str) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write((payload or "").strip() + "\n")
+        os.replace(tmp, self.path)
+
+
+class WebhookSink(Sink):
+    """POST der kompletten Nachricht als JSON."""
+    name = "webhook"
+
+    def __init__(self, url: str, timeout_sec: float = 5.0):
+        self.url = url
+        self.timeout_sec = timeout_sec
+
+    def select(self, msg: Dict[str, Any]) -> Any:
+        return msg
+
+    def deliver(self, payload: Dict[str, Any]) -> None:
+        req = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout_sec) as r:
+            r.read()
+
+
+# -----------------------------------------------------------------------------
+# Worker + Hub
+# -----------------------------------------------------------------------------
+
+class SinkWorker:
+    """Eine Queue + ein Thread pro Sink. inline=True stellt synchron zu (Simulation/Tests)."""
+
+    def __init__(self, sink: Sink, maxsize: int = QUEUE_MAX, max_retries: int = MAX_RETRIES,
+                 backoff_sec: float = RETRY_BACKOFF_SEC, ttl_sec: float = MSG_TTL_SEC,
+                 breaker: Optional[CircuitBreaker] = None, inline: bool = False):
+        self.sink = sink
+        self.max_retries = max(0, max_retries)
+        self.backoff_sec = max(0.0, backoff_sec)
+        self.ttl_sec = ttl_sec
+        self.breaker = breaker or CircuitBreaker(f"sink:{sink.name}", BREAKER_FAILS, BREAKER_RESET_SEC)
+        self.inline = inline
+        self._q: "queue.Queue[tuple]" = queue.Queue(maxsize=max(1, maxsize))
+        self._stop = threading.Event()
+        self._lat_ms: Deque[int] = deque(maxlen=50)
+        self._lock = threading.Lock()
+        self.counts = {"delivered": 0, "failed": 0, "dropped_full": 0, "dropped_open": 0, "dropped_stale": 0}
+        self._thread: Optional[threading.Thread] = None
+        if not inline:
+            self._thread = threading.Thread(target=self._run, name=f"sink-{sink.name}", daemon=True)
+            self._thread.start()
+
+    def submit(self, payload: Any) -> bool:
+        item = (time.monotonic(), payload)
+        if self.inline:
+            self._handle(item)
+            return True
+        try:
+            self._q.put_nowait(item)
+            return True
+        except queue.Full:
+            # älteste Nachricht verwerfen – Chat-Posts veralten schnell
+            try:
+                self._q.get_nowait()
+            except queue.Empty:
+                pass
+            self._count("dropped_full")
+            try:
+                self._q.put_nowait(item)
+                return True
+            except queue.Full:
+                return False
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _handle(self, item: tuple):
+        enq_ts, payload = item
+        for attempt in range(self.max_retries + 1):
+            if self.ttl_sec and (time.monotonic() - enq_ts) > self.ttl_sec:
+                self._count("dropped_stale")
+                return
+            if not self.breaker.allow():
+                self._count("dropped_open")
+                log.debug("[sink:%s] breaker open – drop (retry in %.0fs)", self.sink.name, self.breaker.retry_in())
+                return
+            try:
+                self.sink.deliver(payload)
+            except Exception as e:
+                self.breaker.record_failure(type(e).__name__.lower())
+                log.warning("[sink:%s] delivery failed (attempt %d): %s", self.sink.name, attempt + 1, e)
+                if attempt < self.max_retries and self._stop.wait(self.backoff_sec * (2 ** attempt)):
+                    return
+                continue
+            self.breaker.record_success()
+            with self._lock:
+                self.counts["delivered"] += 1
+                self._lat_ms.append(int((time.monotonic() - enq_ts) * 1000))
+            return
+        self._count("failed")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                item = self._q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._handle(item)
+            except Exception as e:
+                log.debug("[sink:%s] worker error: %s", self.sink.name, e)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self._lat_ms)
+            out: Dict[str, Any] = dict(self.counts)
+        out["queued"] = self._q.qsize()
+        out["p50_ms"] = lat[len(lat) // 2] if lat else None
+        out["p95_ms"] = lat[min(len(lat) - 1, int(len(lat) * 0.95))] if lat else None
+        out["breaker"] = self.breaker.state
+        return out
+
+
+class SinkHub:
+    def __init__(self, inline: bool = False):
+        self.inline = inline
+        self.workers: List[SinkWorker] = []
+
+    def add(self, sink: Sink, **kw) -> SinkWorker:
+        kw.setdefault("inline", self.inline)
+        w = SinkWorker(sink, **kw)
+        self.workers.append(w)
+        return w
+
+    def publish(self, msg: Dict[str, Any]) -> int:
+        """Nachricht an alle Sinks verteilen (nicht blockierend); Anzahl angenommener Sinks."""
+        n = 0
+        for w in self.workers:
+            payload = w.sink.select(msg)
+            if payload and w.submit(payload):
+                n += 1
+        return n
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {w.sink.name: w.stats() for w in self.workers}
+
+    def stats_compact(self) -> str:
+        parts = []
+        for name, st in self.stats().items():
+            if st["breaker"] != "closed":
+                parts.append(f"{name} {st['breaker'].upper()}")
+            elif st["p50_ms"] is not None:
+                parts.append(f"{name} {st['p50_ms']}ms")
+            else:
+                parts.append(f"{name} –")
+        return ", ".join(parts)
+
+    def stop(self):
+        for w in self.workers:
+            w.stop()
+
+
+def build_default_hub(twitch=None, youtube=None, inline: bool = False) -> SinkHub:
+    """Hub aus den aktiven Clients plus optionalem OVERLAY_FILE / OUTPUT_WEBHOOK_URL."""
+    hub = SinkHub(inline=inline)
+    if twitch is not None:
+        hub.add(TwitchSink(twitch))
+    if youtube is not None:
+        hub.add(YouTubeSink(youtube))
+    overlay = os.getenv("OVERLAY_FILE", "").strip()
+    if overlay:
+        hub.add(FileSink(overlay))
+    hook = os.getenv("OUTPUT_WEBHOOK_URL", "").strip()
+    if hook:
+        hub.add(WebhookSink(hook, timeout_sec=_env_float("OUTPUT_WEBHOOK_TIMEOUT_SEC", 5.0)))
+    return hub
@@ -6,17 +6,22 @@ Design goals:
 - Use data URI for images to avoid file path issues
 - Keep payload minimal (some bridges 500 on 'response_format' or aggressive system prompts)
 - Return raw assistant 'content' as str; caller handles JSON parsing and schema
+- Frames are downscaled to the vision pixel budget before encoding (vision_preprocess)
+- BREAKER (closed/open/half-open) shared by all VLM callers: while the bridge
+  is down, calls return None immediately instead of waiting on timeouts
 """
 
 from __future__ import annotations
 import os
 import json
-import base64
-import mimetypes
 import urllib.request
-import urllib.error
 from typing import Optional
 
+import clock
+import frame_loader
+import vision_preprocess
+from circuit_breaker import CircuitBreaker
+
 # Base URL and model from env
 QWEN_BASE = os.getenv("QWEN_BASE", "http://127.0.0.1:8010/v1")
 QWEN_MODEL_VL = os.getenv("QWEN_VISION_MODEL", "qwen2.5-vl")
@@ -39,37 +44,38 @@ else:
 # If your bridge safely supports response_format json_object, set this to "1"
 QWEN_STRICT_JSON = os.getenv("QWEN_STRICT_JSON", "0") in ("1", "true", "TRUE")
 
-
-def _guess_mime(path: str) -> str:
-    mime, _ = mimetypes.guess_type(path)
-    if not mime:
-        # default to jpeg; many screenshots are jpg/png
-        ext = os.path.splitext(path)[1].lower()
-        if ext in (".png",):
-            return "image/png"
-        return "image/jpeg"
-    return mime
-
-
-def analyze_image(image_path: str) -> Optional[str]:
+# Circuit breaker: after N failures in a row, skip VLM calls for RESET seconds
+# (replaces the old in-thread backoff sleep; ZEPHYR_VISION_BACKOFF_SEC kept as default)
+try:
+    BREAKER_FAILS = int(os.getenv("QWEN_BREAKER_FAILS", "3"))
+except Exception:
+    BREAKER_FAILS = 3
+try:
+    BREAKER_RESET_SEC = float(os.getenv("QWEN_BREAKER_RESET_SEC", os.getenv("ZEPHYR_VISION_BACKOFF_SEC", "20")))
+except Exception:
+    BREAKER_RESET_SEC = 20.0
+BREAKER = CircuitBreaker("vlm", BREAKER_FAILS, BREAKER_RESET_SEC, clock=clock.monotonic)
+
+
+def analyze_image(image_path: str, frame: Optional["frame_loader.Frame"] = None,
+                  max_pixels: Optional[int] = None) -> Optional[str]:
     """
     Read an image, build a minimal OpenAI-compatible payload, and call the bridge.
+    Pass `frame` (frame_loader.load) to reuse an already-read buffer;
+    `max_pixels` overrides the pixel budget (vision_ladder steps).
 
     Returns:
         assistant 'content' string on success
         None on error
     """
-    if not os.path.exists(image_path):
+    if BREAKER.retry_in() > 0:
         return None
-
-    try:
-        with open(image_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode("ascii")
-    except Exception:
-        return None
-
-    mime = _guess_mime(image_path)
-    data_uri = f"data:{mime};base64,{b64}"
+    if frame is None:
+        frame = frame_loader.try_load(image_path, siblings=False)
+        if frame is None:
+            return None
+    # auf Pixelbudget/Patch-Raster skalieren und als JPEG senden (pro MD5 gecacht)
+    data_uri = vision_preprocess.encode(frame, max_pixels).data_uri
 
     # Minimal prompt – let downstream enforce JSON strictly; language via VISION_LANG
     if VISION_LANG == "en":
@@ -112,11 +118,17 @@ def analyze_image(image_path: str) -> Optional[str]:
         headers={"Content-Type": "application/json"},
     )
 
+    if not BREAKER.allow():
+        return None
     try:
         with urllib.request.urlopen(req, timeout=QWEN_TIMEOUT) as r:
             body = r.read().decode("utf-8")
             data = json.loads(body)
             # Return raw content; caller will parse/normalize
-            return data["choices"][0]["message"]["content"]
-    except (urllib.error.HTTPError, urllib.error.URLError, TimeoutError, KeyError, json.JSONDecodeError):
+            content = data["choices"][0]["message"]["content"]
+    except Exception as e:
+        # jeder Fehler muss gemeldet werden – sonst bleibt ein half-open-Probeaufruf "in flight"
+        BREAKER.record_failure(type(e).__name__)
         return None
+    BREAKER.record_success()
+    return content
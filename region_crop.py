@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Nur geänderte Bildbereiche ans VLM schicken
+
+Bei Desktop-/Coding-Streams ändert sich zwischen zwei Ticks meist nur ein
+Fenster. frame_gate liefert pro Tick die Kacheln (16×9), deren Mittelwert
+sich gegenüber dem zuletzt analysierten Frame um mehr als
+FRAME_GATE_MAX_TILE_DIFF verändert hat. Daraus entsteht hier:
+
+- plan():   zusammenhängende geänderte Kacheln (4er-Nachbarschaft) → Boxen,
+            um REGION_CROP_PAD_TILES erweitert. Zu viel geändert
+            (> REGION_CROP_MAX_AREA) oder zu viele Inseln → voller Frame.
+- render(): eine Box → enger Ausschnitt; mehrere → Mosaik (untereinander,
+            mit Trennstreifen). Das Pixelbudget skaliert mit der Fläche
+            (VISION_MAX_PIXELS × Anteil), also wachsen Vision-Tokens und
+            Inferenzzeit mit der Änderung statt mit der Bildschirmauflösung.
+- RegionCropper: entscheidet pro Tick; spätestens nach
+  REGION_CROP_REFRESH_TICKS Ausschnitten kommt wieder ein voller Frame,
+  damit sich keine Fehler in der Szenenbeschreibung aufsummieren.
+
+Der Orchestrator schickt zum Ausschnitt die vorherige Szenenbeschreibung
+als Kontext mit. Ohne Pillow oder ohne Referenzframe: immer voller Frame.
+"""
+
+from __future__ import annotations
+import io
+import os
+import logging
+import threading
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import frame_loader
+import vision_preprocess
+from frame_gate import TILES_X, TILES_Y
+
+log = logging.getLogger("region_crop")
+
+CROP_ENABLED = os.getenv("REGION_CROP_ENABLED", "true").lower() != "false"
+try:
+    MAX_AREA = min(1.0, max(0.05, float(os.getenv("REGION_CROP_MAX_AREA", "0.45"))))
+except Exception:
+    MAX_AREA = 0.45
+try:
+    MAX_REGIONS = max(1, int(os.getenv("REGION_CROP_MAX_REGIONS", "3")))
+except Exception:
+    MAX_REGIONS = 3
+try:
+    PAD_TILES = max(0, int(os.getenv("REGION_CROP_PAD_TILES", "1")))
+except Exception:
+    PAD_TILES = 1
+try:
+    REFRESH_TICKS = max(1, int(os.getenv("REGION_CROP_REFRESH_TICKS", "6")))
+except Exception:
+    REFRESH_TICKS = 6
+
+_GAP_PX = 8
+
+# Kachel-Box: (c0, r0, c1, r1), inklusive
+TileBox = Tuple[int, int, int, int]
+
+
+class Crop(NamedTuple):
+    boxes: Tuple[Tuple[int, int, int, int], ...]   # Pixel-Boxen im Original (x0, y0, x1, y1)
+    area: float                                     # Anteil an der Gesamtfläche
+    encoded: vision_preprocess.Encoded
+    mosaic: bool
+    tiles: Tuple[TileBox, ...] = ()                 # Kachel-Boxen (für render() mit anderem Budget)
+
+
+def _components(changed: Sequence[int], cols: int, rows: int) -> List[TileBox]:
+    todo = set(changed)
+    out: List[TileBox] = []
+    while todo:
+        stack = [todo.pop()]
+        c0 = r0 = 10 ** 6
+        c1 = r1 = -1
+        while stack:
+            i = stack.pop()
+            r, c = divmod(i, cols)
+            c0, c1, r0, r1 = min(c0, c), max(c1, c), min(r0, r), max(r1, r)
+            for dr, dc in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+                rr, cc = r + dr, c + dc
+                j = rr * cols + cc
+                if 0 <= rr < rows and 0 <= cc < cols and j in todo:
+                    todo.remove(j)
+                    stack.append(j)
+        out.append((c0, r0, c1, r1))
+    return out
+
+
+def _pad(box: TileBox, pad: int, cols: int, rows: int) -> TileBox:
+    c0, r0, c1, r1 = box
+    return max(0, c0 - pad), max(0, r0 - pad), min(cols - 1, c1 + pad), min(rows - 1, r1 + pad)
+
+
+def _overlaps(a: TileBox, b: TileBox) -> bool:
+    return not (a[2] < b[0] or b[2] < a[0] or a[3] < b[1] or b[3] < a[1])
+
+
+def _merge_overlapping(boxes: List[TileBox]) -> List[TileBox]:
+    boxes = list(boxes)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                if _overlaps(boxes[i], boxes[j]):
+                    a, b = boxes[i], boxes[j]
+                    boxes[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+def _tile_area(b: TileBox) -> int:
+    return (b[2] - b[0] + 1) * (b[3] - b[1] + 1)
+
+
+def plan(changed: Optional[Sequence[int]], cols: int = TILES_X, rows: int = TILES_Y,
+         max_area: float = MAX_AREA, max_regions: int = MAX_REGIONS,
+         pad: int = PAD_TILES) -> Optional[List[TileBox]]:
+    """Kachel-Boxen für den Ausschnitt oder None (voller Frame nötig)."""
+    if not changed:
+        return None
+    boxes = _merge_overlapping([_pad(b, pad, cols, rows) for b in _components(changed, cols, rows)])
+    if len(boxes) > max_regions:
+        # zu verstreut: eine umschließende Box versuchen
+        boxes = [(min(b[0] for b in boxes), min(b[1] for b in boxes),
+                  max(b[2] for b in boxes), max(b[3] for b in boxes))]
+    if sum(_tile_area(b) for b in boxes) > max_area * cols * rows:
+        return None
+    boxes.sort(key=lambda b: (b[1], b[0]))
+    return boxes
+
+
+def _to_pixels(box: TileBox, width: int, height: int, cols: int, rows: int) -> Tuple[int, int, int, int]:
+    c0, r0, c1, r1 = box
+    return (c0 * width // cols, r0 * height // rows, (c1 + 1) * width // cols, (r1 + 1) * height // rows)
+
+
+def render(frame: frame_loader.Frame, boxes: Sequence[TileBox], cols: int = TILES_X, rows: int = TILES_Y,
+           max_pixels: int = vision_preprocess.MAX_PIXELS) -> Crop:
+    """Ausschnitt/Mosaik aus dem Frame schneiden und fürs VLM kodieren (Pillow)."""
+    from PIL import Image
+    with Image.open(io.BytesIO(frame.data)) as im:
+        im.load()
+        W, H = im.size
+        px = [_to_pixels(b, W, H, cols, rows) for b in boxes]
+        crops = [im.crop(p).convert("RGB") for p in px]
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in px) / float(W * H)
+    if len(crops) == 1:
+        img = crops[0]
+    else:
+        mw = max(c.width for c in crops)
+        mh = sum(c.height for c in crops) + _GAP_PX * (len(crops) - 1)
+        img = Image.new("RGB", (mw, mh), (0, 0, 0))
+        y = 0
+        for c in crops:
+            img.paste(c, (0, y))
+            y += c.height + _GAP_PX
+    # gleicher Maßstab wie der volle Frame: Budget × Flächenanteil
+    budget = max(vision_preprocess.MIN_PIXELS, int(max_pixels * img.width * img.height / float(W * H)))
+    enc = vision_preprocess.encode_image(img, budget, src_bytes=frame.size)
+    return Crop(tuple(px), area, enc, len(crops) > 1, tuple(boxes))
+
+
+class RegionCropper:
+    def __init__(self, refresh_ticks: int = REFRESH_TICKS, max_area: float = MAX_AREA,
+                 max_regions: int = MAX_REGIONS, pad: int = PAD_TILES):
+        self.refresh_ticks = refresh_ticks
+        self.max_area = max_area
+        self.max_regions = max_regions
+        self.pad = pad
+        self._lock = threading.Lock()
+        self._since_full = 0
+        self._disabled_reason: Optional[str] = None
+        self.stats = {"full": 0, "crops": 0, "area_sum": 0.0, "tokens_sum": 0, "errors": 0}
+
+    def crop(self, frame: frame_loader.Frame, changed: Optional[Sequence[int]],
+             has_context: bool) -> Tuple[Optional[Crop], str]:
+        """(Crop, Grund) – Crop None heißt: vollen Frame analysieren, Grund fürs Journal."""
+        reason = ""
+        boxes = None
+        if self._disabled_reason:
+            reason = "off"
+        elif not has_context:
+            reason = "no_context"
+        elif changed is None:
+            reason = "no_reference"
+        elif self._since_full >= self.refresh_ticks:
+            reason = "refresh"
+        else:
+            boxes = plan(changed, max_area=self.max_area, max_regions=self.max_regions, pad=self.pad)
+            if boxes is None:
+                reason = "large_change" if changed else "global_change"
+        crop: Optional[Crop] = None
+        if boxes is not None:
+            try:
+                crop = render(frame, boxes)
+            except ImportError as e:
+                self._disabled_reason = str(e)
+                log.info("[crop] deaktiviert (%s)", e)
+                reason = "off"
+            except Exception as e:
+                self.stats["errors"] += 1
+                log.debug("[crop] render failed: %s", e)
+                reason = "error"
+        with self._lock:
+            if crop is None:
+                self.stats["full"] += 1
+            else:
+                self.stats["crops"] += 1
+                self.stats["area_sum"] += crop.area
+                self.stats["tokens_sum"] += crop.encoded.tokens
+        return crop, reason
+
+    def committed(self, crop: Optional[Crop]):
+        """Nach erfolgreicher Analyse: Zähler bis zum nächsten vollen Frame fortschreiben."""
+        with self._lock:
+            self._since_full = self._since_full + 1 if crop is not None else 0
+
+    def stats_compact(self) -> str:
+        s = self.stats
+        if self._disabled_reason:
+            return "off"
+        n = s["full"] + s["crops"]
+        if not n:
+            return "n/a"
+        if not s["crops"]:
+            return f"0/{n}"
+        return (f"{s['crops']}/{n} ({s['area_sum'] / s['crops'] * 100:.0f}% area, "
+                f"{s['tokens_sum'] / s['crops']:.0f} tok)")
+
+
+_CROPPER: Optional[RegionCropper] = None
+
+
+def get_cropper() -> Optional[RegionCropper]:
+    global _CROPPER
+    if not CROP_ENABLED:
+        return None
+    if _CROPPER is None:
+        _CROPPER = RegionCropper()
+    return _CROPPER
+
+
+def stats_compact() -> str:
+    return _CROPPER.stats_compact() if _CROPPER is not None else "n/a"
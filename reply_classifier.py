@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+Lokaler Klassifikator: welche Chatzeile verdient eine LLM-Antwort?
+
+Statt Würfel (TWITCH_RANDOM_REPLY_RATE) bewertet ein kleines logistisches
+Modell jede Zeile: gehashte n-Gramm-Features (Wörter, Wort-Bigramme,
+Zeichen-Trigramme, crc32 → fester Vektorraum) mal Gewichte, Sigmoid.
+Eine Zeile kostet wenige Mikrosekunden, ohne Abhängigkeiten; NumPy wird nur
+fürs Training genutzt, wenn vorhanden (sonst reines Python-SGD).
+
+Trainingsdaten kommen aus dem Interaktions-Log (JSONL): jede Chatzeile und
+jede Bot-Antwort. log_event() puffert nur im Speicher; flush_log() hängt
+den Puffer an (periodisch mit dem State-Snapshot und beim Beenden).
+Label einer beantworteten Zeile: 1, wenn der Nutzer innerhalb von
+REPLY_ENGAGE_WINDOW_SEC wieder schreibt (Gespräch), sonst 0.
+Zeilen mit explizitem "label" (manuell kuratiert) gehen direkt ein.
+
+  python reply_classifier.py train            # Log → Modell
+  python reply_classifier.py score "text"     # Score einer Zeile
+"""
+
+from __future__ import annotations
+import os
+import re
+import sys
+import json
+import math
+import zlib
+import random
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import clock
+
+log = logging.getLogger("reply_classifier")
+
+_BASE = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILE = os.getenv("REPLY_MODEL_FILE", os.path.join(_BASE, "cache", "reply_model.json"))
+LOG_FILE = os.getenv("REPLY_LOG_FILE", os.path.join(_BASE, "cache", "journal", "chat_interactions.jsonl"))
+LOG_ENABLED = os.getenv("REPLY_LOG_ENABLED", "true").lower() != "false"
+try:
+    LOG_MAX_BYTES = int(float(os.getenv("REPLY_LOG_MAX_MB", "20")) * 1024 * 1024)
+except Exception:
+    LOG_MAX_BYTES = 20 * 1024 * 1024
+try:
+    ENGAGE_WINDOW_SEC = float(os.getenv("REPLY_ENGAGE_WINDOW_SEC", "120"))
+except Exception:
+    ENGAGE_WINDOW_SEC = 120.0
+
+DEFAULT_BITS = 14
+_TOKEN_RE = re.compile(r"\w+|[?!]", re.UNICODE)
+
+
+# -----------------------------------------------------------------------------
+# Features
+# -----------------------------------------------------------------------------
+
+def _len_bucket(n: int) -> str:
+    return "0" if n <= 1 else "1" if n <= 3 else "2" if n <= 8 else "3"
+
+
+def features(text: str, bits: int = DEFAULT_BITS, bot_name: str = "") -> List[int]:
+    """Sortierte, eindeutige Feature-Indizes einer Zeile (binär, gehasht)."""
+    mask = (1 << bits) - 1
+    t = (text or "").lower().strip()
+    toks = _TOKEN_RE.findall(t)
+    names = ["bias", "len:" + _len_bucket(len(toks))]
+    if "?" in t:
+        names.append("q")
+    if bot_name and bot_name.lower() in t:
+        names.append("mention")
+    names.extend("w:" + w for w in toks)
+    names.extend("b:" + a + " " + b for a, b in zip(toks, toks[1:]))
+    padded = f" {t} "
+    names.extend("c:" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return sorted({zlib.crc32(n.encode("utf-8")) & mask for n in names})
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+# -----------------------------------------------------------------------------
+# Modell
+# -----------------------------------------------------------------------------
+
+class ReplyModel:
+    """Logistische Regression über gehashte Features; Gewichte dünn gespeichert."""
+
+    def __init__(self, weights: Optional[Dict[int, float]] = None, bits: int = DEFAULT_BITS,
+                 meta: Optional[Dict[str, Any]] = None):
+        self.bits = bits
+        self.w: Dict[int, float] = dict(weights or {})
+        self.meta: Dict[str, Any] = dict(meta or {})
+
+    def score(self, text: str, bot_name: str = "") -> float:
+        idx = features(text, self.bits, bot_name)
+        if not idx:
+            return 0.0
+        w = self.w
+        z = sum(w.get(i, 0.0) for i in idx) / math.sqrt(len(idx))
+        return _sigmoid(z)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": 1, "bits": self.bits, "meta": self.meta,
+                "weights": {str(i): round(v, 6) for i, v in self.w.items() if abs(v) > 1e-6}}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ReplyModel":
+        return cls({int(k): float(v) for k, v in (d.get("weights") or {}).items()},
+                   bits=int(d.get("bits") or DEFAULT_BITS), meta=d.get("meta"))
+
+    def save(self, path: str = MODEL_FILE):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_FILE) -> Optional["ReplyModel"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning("[reply] model %s unreadable: %s", path, e)
+            return None
+
+
+def _train_numpy(rows: List[List[int]], y: Sequence[float], bits: int, epochs: int,
+                 lr: float, l2: float) -> Dict[int, float]:
+    import numpy as np
+    dim = 1 << bits
+    n = len(rows)
+    row = np.repeat(np.arange(n), [len(r) for r in rows])
+    col = np.fromiter((i for r in rows for i in r), dtype=np.int64, count=len(row))
+    val = np.repeat(np.array([1.0 / math.sqrt(len(r)) for r in rows]), [len(r) for r in rows])
+    yv = np.asarray(y, dtype=np.float64)
+    w = np.zeros(dim)
+    for _ in range(epochs):
+        z = np.bincount(row, weights=w[col] * val, minlength=n)
+        p = 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+        g = p - yv
+        grad = np.bincount(col, weights=g[row] * val, minlength=dim) / n + l2 * w
+        w -= lr * grad
+    nz = np.nonzero(w)[0]
+    return {int(i): float(w[i]) for i in nz}
+
+
+def _train_python(rows: List[List[int]], y: Sequence[float], epochs: int, lr: float,
+                  l2: float, seed: int) -> Dict[int, float]:
+    w: Dict[int, float] = {}
+    order = list(range(len(rows)))
+    rng = random.Random(seed)
+    step = lr * 0.1                    # pro Beispiel, nicht Full-Batch
+    for _ in range(epochs):
+        rng.shuffle(order)
+        for k in order:
+            idx = rows[k]
+            s = 1.0 / math.sqrt(len(idx))
+            p = _sigmoid(sum(w.get(i, 0.0) for i in idx) * s)
+            g = (p - y[k]) * s
+            for i in idx:
+                wi = w.get(i, 0.0)
+                w[i] = wi - step * (g + l2 * wi)
+    return w
+
+
+def train(samples: Iterable[Tuple[str, int]], bits: int = DEFAULT_BITS, epochs: int = 200,
+          lr: float = 2.0, l2: float = 1e-4, bot_name: str = "", seed: int = 1) -> ReplyModel:
+    """(text, label)-Paare → ReplyModel. NumPy (Full-Batch) wenn verfügbar, sonst SGD."""
+    rows: List[List[int]] = []
+    y: List[float] = []
+    for text, label in samples:
+        idx = features(text, bits, bot_name)
+        if idx:
+            rows.append(idx)
+            y.append(1.0 if label else 0.0)
+    if not rows:
+        raise ValueError("keine Trainingsdaten")
+    try:
+        weights = _train_numpy(rows, y, bits, epochs, lr, l2)
+        backend = "numpy"
+    except ImportError:
+        weights = _train_python(rows, y, max(1, epochs // 10), lr, l2, seed)
+        backend = "python"
+    pos = int(sum(y))
+    return ReplyModel(weights, bits, meta={"samples": len(rows), "positive": pos, "backend": backend})
+
+
+# -----------------------------------------------------------------------------
+# Interaktions-Log + Labeling
+# -----------------------------------------------------------------------------
+
+_log_lock = threading.Lock()
+_log_buf: List[Tuple[str, Dict[str, Any]]] = []
+_LOG_BUF_MAX = 1000            # voller Puffer → sofort schreiben (Periodik fehlt/hängt)
+
+
+def log_event(kind: str, user: str, text: str, path: Optional[str] = None, **extra) -> None:
+    """Chatzeile ("line") oder Bot-Antwort ("reply") puffern; flush_log() schreibt."""
+    if not LOG_ENABLED:
+        return
+    rec = {"t": round(clock.time(), 3), "kind": kind, "user": (user or "").lower(), "text": text}
+    rec.update(extra)
+    with _log_lock:
+        _log_buf.append((path or LOG_FILE, rec))
+        full = len(_log_buf) >= _LOG_BUF_MAX
+    if full:
+        flush_log()
+
+
+def flush_log() -> int:
+    """Gepufferte Events anhängen (mit Rotation); best effort, Anzahl geschriebener Zeilen.
+
+    Läuft mit der periodischen Sicherung und beim Beenden – nicht im Chat-Handler.
+    """
+    with _log_lock:
+        if not _log_buf:
+            return 0
+        batch = list(_log_buf)
+        _log_buf.clear()
+    by_path: Dict[str, List[str]] = {}
+    for path, rec in batch:
+        by_path.setdefault(path, []).append(json.dumps(rec, ensure_ascii=False) + "\n")
+    n = 0
+    for path, lines in by_path.items():
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            try:
+                if os.path.getsize(path) > LOG_MAX_BYTES:
+                    os.replace(path, path + ".1")
+            except OSError:
+                pass
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            n += len(lines)
+        except Exception as e:
+            log.debug("[reply] log flush failed (%d Zeilen verworfen): %s", len(lines), e)
+    return n
+
+
+def read_events(paths: Sequence[str]) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for p in paths:
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        out.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    out.sort(key=lambda r: float(r.get("t") or 0.0))
+    return out
+
+
+def label_events(events: Sequence[Dict[str, Any]],
+                 engage_window_sec: float = ENGAGE_WINDOW_SEC) -> List[Tuple[str, int]]:
+    """Beantwortete Zeilen labeln: 1 = Nutzer schreibt danach im Fenster weiter."""
+    samples: List[Tuple[str, int]] = []
+    last_line: Dict[str, Dict[str, Any]] = {}
+    open_replies: List[Tuple[float, str, str]] = []     # (t_reply, user, text der Zeile)
+    for ev in events:
+        t = float(ev.get("t") or 0.0)
+        user = ev.get("user") or ""
+        kind = ev.get("kind")
+        # abgelaufene Antworten ohne Reaktion → negativ
+        while open_replies and t - open_replies[0][0] > engage_window_sec:
+            _, _, text = open_replies.pop(0)
+            samples.append((text, 0))
+        if kind == "line":
+            if "label" in ev:
+                samples.append((ev.get("text") or "", 1 if ev["label"] else 0))
+                continue
+            for k, (_, u, text) in enumerate(open_replies):
+                if u == user:
+                    samples.append((text, 1))
+                    del open_replies[k]
+                    break
+            last_line[user] = ev
+        elif kind == "reply":
+            src = ev.get("to")
+            if src is None and user in last_line:
+                src = last_line[user].get("text")
+            if src:
+                open_replies.append((t, user, src))
+    samples.extend((text, 0) for _, _, text in open_replies)
+    return samples
+
+
+# -----------------------------------------------------------------------------
+# Gate für zephyr_bot
+# -----------------------------------------------------------------------------
+
+_MODEL: Optional[ReplyModel] = None
+_MODEL_MTIME: Optional[float] = None
+
+
+def get_model(path: str = MODEL_FILE) -> Optional[ReplyModel]:
+    """Modell laden und bei geänderter Datei neu laden (nach erneutem Training)."""
+    global _MODEL, _MODEL_MTIME
+    try:
+        m = os.stat(path).st_mtime
+    except OSError:
+        return _MODEL
+    if m != _MODEL_MTIME:
+        _MODEL = ReplyModel.load(path)
+        _MODEL_MTIME = m
+        if _MODEL is not None:
+            log.info("[reply] model loaded: %s", _MODEL.meta)
+    return _MODEL
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="Reply-Klassifikator trainieren/testen")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    tr = sub.add_parser("train")
+    tr.add_argument("--log", action="append", default=[], help="Interaktions-Log (mehrfach)")
+    tr.add_argument("--out", default=MODEL_FILE)
+    tr.add_argument("--bits", type=int, default=DEFAULT_BITS)
+    tr.add_argument("--epochs", type=int, default=200)
+    sc = sub.add_parser("score")
+    sc.add_argument("text", nargs="+")
+    sc.add_argument("--model", default=MODEL_FILE)
+    args = ap.parse_args(argv)
+
+    bot_name = (os.getenv("TWITCH_USERNAME") or os.getenv("BOT_USERNAME") or "").lower()
+    if args.cmd == "train":
+        logs = args.log or [LOG_FILE + ".1", LOG_FILE]
+        samples = label_events(read_events(logs))
+        if not samples:
+            print("keine beantworteten Zeilen im Log", file=sys.stderr)
+            return 1
+        model = train(samples, bits=args.bits, epochs=args.epochs, bot_name=bot_name)
+        model.save(args.out)
+        print(f"model: {args.out} {model.meta}")
+        return 0
+    model = ReplyModel.load(args.model)
+    if model is None:
+        print(f"kein Modell: {args.model}", file=sys.stderr)
+        return 1
+    for t in args.text:
+        print(f"{model.score(t, bot_name):.3f}  {t}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulation des Haupt-Loops auf virtueller Zeit
+
+Treibt zephyr_bot.main() mit einer VirtualClock, gestubbtem Vision-/LLM-
+Backend, einem Twitch-Client ohne Netzwerk (echte Budget-Logik) und
+synchronen Sinks. Drei Stunden Stream laufen so in Sekunden durch.
+
+Bericht: Posts pro Bucket, Drops (AntiFlood, Cooldown, Budget) und
+verschwendete Inferenz (Ticks mit Vision+Writer, deren Ergebnis nie im Chat
+landete).
+
+Beispiel:
+  python simulate.py --hours 3 --set CHAT_GLOBAL_COOLDOWN_SEC=60 \
+      --set POST_BUDGET_VISION_MAX_MSGS=10 --vision-ms 2500 --writer-ms 1200
+"""
+
+from __future__ import annotations
+import os
+import sys
+import time
+import types
+import random
+import logging
+import argparse
+import importlib
+import functools
+from typing import Any, Callable, Dict, List, Optional
+
+import clock
+import lazy_import
+
+_STUBBED = ("orchestrator", "vision_summarizer", "llm_router")
+
+
+class _Patches:
+    """Attribute setzen und am Ende in umgekehrter Reihenfolge zurücksetzen."""
+
+    def __init__(self):
+        self._undo: List[Callable[[], None]] = []
+
+    def attr(self, obj: Any, name: str, value: Any):
+        missing = object()
+        old = getattr(obj, name, missing)
+        setattr(obj, name, value)
+        if old is missing:
+            self._undo.append(lambda: delattr(obj, name))
+        else:
+            self._undo.append(lambda: setattr(obj, name, old))
+
+    def env(self, key: str, value: str):
+        old = os.environ.get(key)
+        os.environ[key] = value
+        self._undo.append(lambda: os.environ.pop(key, None) if old is None else os.environ.__setitem__(key, old))
+
+    def module(self, name: str, mod: types.ModuleType):
+        old = sys.modules.get(name)
+        sys.modules[name] = mod
+        lazy_import.forget(name)
+
+        def _restore():
+            if old is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = old
+            lazy_import.forget(name)
+        self._undo.append(_restore)
+
+    def undo(self):
+        while self._undo:
+            try:
+                self._undo.pop()()
+            except Exception:
+                pass
+
+
+class _Backend:
+    """Gestubbte Vision/Writer/LLM-Aufrufe mit virtueller Latenz."""
+
+    def __init__(self, vision_ms: float, writer_ms: float, change_rate: float, seed: int):
+        self.vision_sec = vision_ms / 1000.0
+        self.writer_sec = writer_ms / 1000.0
+        self.change_rate = change_rate
+        self.rng = random.Random(seed)
+        self.scene = 0
+        self.counts = {"ticks": 0, "vision": 0, "writer": 0, "llm": 0}
+
+    def _next_scene(self) -> int:
+        if self.counts["ticks"] == 0 or self.rng.random() < self.change_rate:
+            self.scene += 1
+        return self.scene
+
+    def run_tick(self, timestamp, screenshot_path, optional_ocr_text=None, trace=None):
+        scene = self._next_scene()
+        self.counts["ticks"] += 1
+        self.counts["vision"] += 1
+        clock.sleep(self.vision_sec)
+        self.counts["writer"] += 1
+        clock.sleep(self.writer_sec)
+        sentence = f"Szene {scene}: jemand arbeitet konzentriert im Terminal."
+        if trace is not None:
+            trace.update({"image_md5": f"scene-{scene}", "vision": {"scene_summary": f"scene {scene}"},
+                          "writer": {"short_sentence": sentence},
+                          "timings": {"vision_ms": int(self.vision_sec * 1000), "writer_ms": int(self.writer_sec * 1000)}})
+        return {"twitch_sentence": sentence, "youtube_sentence": sentence, "keywords": ["terminal"]}
+
+    def summarize_image(self, path):
+        self.counts["vision"] += 1
+        clock.sleep(self.vision_sec)
+        return {"details": f"scene {self.scene}", "objects": [], "hp": None}
+
+    def ask_image_question(self, path, question):
+        self.counts["vision"] += 1
+        clock.sleep(self.vision_sec)
+        return "Sieht nach Code aus."
+
+    def run_llm_chain(self, prompt, *a, **kw):
+        self.counts["llm"] += 1
+        clock.sleep(self.writer_sec)
+        return "Gerade wird konzentriert am Code gearbeitet."
+
+    def modules(self) -> Dict[str, types.ModuleType]:
+        orch = types.ModuleType("orchestrator")
+        orch.run_tick = self.run_tick
+        vs = types.ModuleType("vision_summarizer")
+        vs.summarize_image = self.summarize_image
+        vs.ask_image_question = self.ask_image_question
+        llm = types.ModuleType("llm_router")
+        llm.run_llm_chain = self.run_llm_chain
+        llm.is_idle = lambda quiet_sec=0.0: True
+        return {"orchestrator": orch, "vision_summarizer": vs, "llm_router": llm}
+
+
+def _sim_twitch_class(base):
+    class SimTwitch(base):
+        """TwitchClient ohne Socket: echte Budget-/Bucket-Logik, Sends nur gezählt."""
+
+        def connect(self):
+            self._connected = True
+            self.lines: List[str] = []
+            if callable(getattr(self, "on_ready", None)):
+                clock.call_later(0.5, self.on_ready)
+
+        def _raw_send(self, data: str):
+            self.lines.append(data)
+
+        def ping(self, timeout_ms: int = 800):
+            return 1
+    return SimTwitch
+
+
+def run_simulation(hours: float = 3.0, env: Optional[Dict[str, str]] = None,
+                   vision_ms: float = 2500.0, writer_ms: float = 1200.0,
+                   change_rate: float = 0.3, seed: int = 1) -> Dict[str, Any]:
+    """main() auf virtueller Zeit laufen lassen und Kennzahlen zurückgeben."""
+    p = _Patches()
+    backend = _Backend(vision_ms, writer_ms, change_rate, seed)
+    vclock = clock.VirtualClock(until=hours * 3600.0)
+    decisions: Dict[str, int] = {}
+    t_wall = time.perf_counter()
+    import bot_config
+    import zephyr_bot as zb
+    # main() lädt die Konfiguration mit Sim-Env – danach die des Aufrufers zurück
+    p.attr(bot_config, "_CFG", bot_config._CFG)
+    try:
+        for k, v in (env or {}).items():
+            p.env(k, str(v))
+        for name, mod in backend.modules().items():
+            p.module(name, mod)
+        zb = importlib.reload(zb)   # frische Modul-Globals (ENABLE_*, Zähler) mit Sim-Env
+        clock.set_clock(vclock)
+
+        import output_sinks
+        import joke_pool
+        import health_monitor
+        import tick_journal
+        import state_snapshot
+        p.attr(zb, "TwitchClient", _sim_twitch_class(zb.TwitchClient))
+        p.attr(zb, "ENABLE_TWITCH", True)
+        p.attr(zb, "ENABLE_YOUTUBE", False)
+        p.attr(zb, "MULTIPROC_ENABLED", False)
+        p.attr(zb, "ORCHESTRATOR_ENABLED", True)
+        p.attr(output_sinks, "build_default_hub", functools.partial(output_sinks.build_default_hub, inline=True))
+        p.attr(joke_pool, "start_background", lambda: None)
+        p.attr(health_monitor, "start_default", lambda *a, **kw: None)
+        p.attr(tick_journal, "start_default", lambda: None)
+        p.attr(state_snapshot, "SNAPSHOT_ENABLED", False)
+        p.attr(bot_config, "start_watch", lambda *a, **kw: None)
+        p.attr(bot_config, "install_sighup_handler", lambda: None)
+
+        publish = zb._publish_vision
+
+        def _counting_publish(*a, **kw):
+            trace = kw.get("trace")
+            if trace is None:
+                trace = kw["trace"] = {}
+            ok = publish(*a, **kw)
+            d = trace.get("decision") or "?"
+            decisions[d] = decisions.get(d, 0) + 1
+            return ok
+        p.attr(zb, "_publish_vision", _counting_publish)
+
+        try:
+            zb.main([])
+        except clock.SimulationDone:
+            pass
+        tw = zb.twitch
+        sent = dict(getattr(tw, "sent_counts", {}) or {})
+        budget_drops = dict(getattr(tw, "drop_counts", {}) or {})
+        loop_stats = dict(zb.STATS)
+    finally:
+        clock.set_clock(None)
+        p.undo()
+        importlib.reload(zb)        # Modul-Globals wieder aus der Umgebung des Aufrufers
+
+    ticks = backend.counts["ticks"]
+    vision_posts = sent.get("vision", 0)
+    wasted = max(0, ticks - vision_posts)
+    return {
+        "virtual_hours": hours,
+        "wall_sec": round(time.perf_counter() - t_wall, 3),
+        "ticks": ticks,
+        "inference": dict(backend.counts),
+        "posts": sent,
+        "decisions": decisions,
+        "budget_drops": budget_drops,
+        "wasted_inference": wasted,
+        "wasted_ratio": round(wasted / ticks, 3) if ticks else 0.0,
+        "inference_saved": loop_stats.get("inference_saved", 0),
+        "skips": loop_stats.get("skips", 0),
+    }
+
+
+def format_report(r: Dict[str, Any]) -> str:
+    def _kv(d: Dict[str, Any]) -> str:
+        return ", ".join(f"{k} {v}" for k, v in sorted(d.items())) or "–"
+    lines = [
+        f"sim: {r['virtual_hours']:.2f}h virtuell in {r['wall_sec']:.2f}s",
+        f"ticks: {r['ticks']}  inference: {_kv(r['inference'])}",
+        f"posts: {_kv(r['posts'])}",
+        f"decisions: {_kv(r['decisions'])}",
+        f"budget drops: {_kv(r['budget_drops'])}",
+        f"wasted inference: {r['wasted_inference']} Ticks ({r['wasted_ratio'] * 100:.0f}%)",
+        f"inference saved: ~{r['inference_saved']} Ticks ({r['skips']} Skips vor Cooldown/Budget)",
+    ]
+    return "\n".join(lines)
+
+
+def _parse_set(items: List[str]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for it in items or []:
+        if "=" not in it:
+            raise SystemExit(f"--set erwartet KEY=VALUE, nicht {it!r}")
+        k, v = it.split("=", 1)
+        out[k.strip()] = v
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Zephyr-Haupt-Loop auf virtueller Zeit simulieren")
+    ap.add_argument("--hours", type=float, default=3.0)
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Env-Override (mehrfach)")
+    ap.add_argument("--vision-ms", type=float, default=2500.0)
+    ap.add_argument("--writer-ms", type=float, default=1200.0)
+    ap.add_argument("--change-rate", type=float, default=0.3, help="Anteil Ticks mit neuer Szene")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format="%(levelname)s %(name)s: %(message)s")
+    r = run_simulation(args.hours, _parse_set(args.set), args.vision_ms, args.writer_ms,
+                       args.change_rate, args.seed)
+    print(format_report(r))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Startup-Profiler für zephyr_bot (--profile-startup)
+
+Zeichnet verschachtelte Import-/Init-Phasen mit perf_counter auf und gibt sie
+als Baum aus. Die Aufzeichnung läuft immer mit (zwei perf_counter()-Aufrufe
+pro Phase, nur im Main-Thread); ausgegeben wird nur auf Anfrage.
+"""
+
+from __future__ import annotations
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+_T0 = time.perf_counter()
+
+# [depth, name, start, duration|None]
+_records: List[list] = []
+_depth = 0
+# (name, offset_s) – Meilensteine, dürfen aus beliebigen Threads kommen
+_marks: List[tuple] = []
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Misst einen (verschachtelbaren) Startabschnitt."""
+    global _depth
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    rec = [_depth, name, time.perf_counter(), None]
+    _records.append(rec)
+    _depth += 1
+    try:
+        yield
+    finally:
+        _depth -= 1
+        rec[3] = time.perf_counter() - rec[2]
+
+
+def mark(name: str) -> None:
+    """Meilenstein (z. B. 'irc ready') relativ zum Profil-Start festhalten."""
+    _marks.append((name, time.perf_counter() - _T0))
+
+
+def elapsed_ms() -> float:
+    return (time.perf_counter() - _T0) * 1000.0
+
+
+def report(title: Optional[str] = None) -> str:
+    """Zeitbaum als Text (ms, eingerückt nach Verschachtelung)."""
+    lines = [title or "startup profile (ms)"]
+    for depth, name, _start, dur in _records:
+        ms = "   open" if dur is None else f"{dur * 1000.0:7.1f}"
+        lines.append(f"{ms}  {'  ' * depth}{name}")
+    for name, off in _marks:
+        lines.append(f"@{off * 1000.0:6.1f}  {name}")
+    lines.append(f"total {elapsed_ms():.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Warm-Restart: kompakter Laufzeit-Snapshot
+
+Module registrieren (export, restore)-Paare; save() schreibt alle Teile
+atomar als eine kleine JSON-Datei, restore_all() spielt sie beim Start
+zurück. Gespeichert wird periodisch und beim SIGTERM (systemd-Stop,
+restart-zephyr.sh, entr-Reload), damit Budgets, Dedupe-Fenster und
+"Startup-Vision schon gepostet" einen Neustart überleben.
+
+Alle Zeitstempel im Snapshot sind Wall-Clock (time.time()); Module mit
+monotonic()-Werten rechnen beim Export/Import selbst um.
+"""
+
+from __future__ import annotations
+import os
+import json
+import time
+import signal
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+log = logging.getLogger("state_snapshot")
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ENABLED = os.getenv("STATE_SNAPSHOT_ENABLED", "true").lower() != "false"
+SNAPSHOT_FILE = os.getenv(
+    "STATE_SNAPSHOT_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "zephyr_state.json"),
+)
+try:
+    SNAPSHOT_INTERVAL_SEC = max(1.0, float(os.getenv("STATE_SNAPSHOT_INTERVAL_SEC", "30")))
+except Exception:
+    SNAPSHOT_INTERVAL_SEC = 30.0
+try:
+    # ältere Snapshots verwerfen (Budgets/Fenster wären ohnehin abgelaufen)
+    SNAPSHOT_MAX_AGE_SEC = float(os.getenv("STATE_SNAPSHOT_MAX_AGE_SEC", "3600"))
+except Exception:
+    SNAPSHOT_MAX_AGE_SEC = 3600.0
+
+_providers: Dict[str, Tuple[Callable[[], Any], Callable[[Any], None]]] = {}
+_save_hooks: Dict[str, Callable[[], Any]] = {}
+_lock = threading.Lock()
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def mono_to_wall(t: float) -> float:
+    return time.time() - (time.monotonic() - t)
+
+
+def wall_to_mono(t: float) -> float:
+    return time.monotonic() - (time.time() - t)
+
+
+def register(name: str, export: Callable[[], Any], restore: Callable[[Any], None]):
+    _providers[name] = (export, restore)
+
+
+def unregister(name: Optional[str] = None):
+    if name is None:
+        _providers.clear()
+    else:
+        _providers.pop(name, None)
+
+
+def add_save_hook(name: str, fn: Callable[[], Any]):
+    """fn läuft bei jedem save() mit (periodisch, SIGTERM) – für Puffer, die eigene Dateien schreiben."""
+    _save_hooks[name] = fn
+
+
+def remove_save_hook(name: Optional[str] = None):
+    if name is None:
+        _save_hooks.clear()
+    else:
+        _save_hooks.pop(name, None)
+
+
+def run_save_hooks():
+    for name, fn in list(_save_hooks.items()):
+        try:
+            fn()
+        except Exception as e:
+            log.debug("[state] save hook %s failed: %s", name, e)
+
+
+def collect() -> Dict[str, Any]:
+    parts: Dict[str, Any] = {}
+    for name, (export, _) in list(_providers.items()):
+        try:
+            parts[name] = export()
+        except Exception as e:
+            log.debug("[state] export %s failed: %s", name, e)
+    return {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "parts": parts}
+
+
+def save(path: Optional[str] = None) -> bool:
+    """Alle registrierten Teile atomar schreiben (tmp + replace)."""
+    path = path or SNAPSHOT_FILE
+    run_save_hooks()
+    data = collect()
+    tmp = f"{path}.tmp"
+    with _lock:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, path)
+            return True
+        except Exception as e:
+            log.warning("[state] save failed: %s", e)
+            return False
+
+
+def load(path: Optional[str] = None, max_age_sec: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    path = path or SNAPSHOT_FILE
+    max_age = SNAPSHOT_MAX_AGE_SEC if max_age_sec is None else max_age_sec
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warning("[state] snapshot unreadable (%s) – cold start", e)
+        return None
+    if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+        return None
+    age = time.time() - float(data.get("saved_at") or 0)
+    if max_age and age > max_age:
+        log.info("[state] snapshot %.0fs alt – cold start", age)
+        return None
+    return data
+
+
+def restore_all(path: Optional[str] = None, max_age_sec: Optional[float] = None) -> int:
+    """Registrierte Teile aus dem Snapshot zurückspielen; Anzahl wiederhergestellter Teile."""
+    t0 = time.perf_counter()
+    data = load(path, max_age_sec)
+    if not data:
+        return 0
+    n = 0
+    parts = data.get("parts") or {}
+    for name, (_, restore) in list(_providers.items()):
+        if name not in parts:
+            continue
+        try:
+            restore(parts[name])
+            n += 1
+        except Exception as e:
+            log.warning("[state] restore %s failed: %s", name, e)
+    log.info("[state] warm restart: %d Teile in %.1f ms (Snapshot %.0fs alt)",
+             n, (time.perf_counter() - t0) * 1000, time.time() - float(data.get("saved_at") or 0))
+    return n
+
+
+def _run(interval: float):
+    while not _stop.wait(interval):
+        save()
+
+
+def start_periodic(interval_sec: float = SNAPSHOT_INTERVAL_SEC):
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, args=(interval_sec,), name="state-snapshot", daemon=True)
+    _thread.start()
+
+
+def stop():
+    _stop.set()
+
+
+def install_sigterm_handler():
+    """SIGTERM → Snapshot schreiben, dann regulär beenden (nur im Main-Thread möglich)."""
+    prev = signal.getsignal(signal.SIGTERM)
+
+    def _on_term(signum, frame):
+        log.info("[state] SIGTERM – snapshot speichern")
+        save()
+        if callable(prev):
+            prev(signum, frame)
+        raise SystemExit(0)
+
+    try:
+        signal.signal(signal.SIGTERM, _on_term)
+    except ValueError:
+        log.debug("[state] SIGTERM handler nur im Main-Thread möglich")
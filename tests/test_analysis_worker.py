@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import time
+
+import analysis_worker as aw
+
+
+def _start(tmp_path, handler, **kw):
+    path = str(tmp_path / "w.sock")
+    srv = aw.WorkerServer(handler, path, **kw)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    cl = aw.WorkerClient(path=path, timeout_sec=5)
+    for _ in range(100):
+        if cl.ping():
+            break
+        time.sleep(0.02)
+    return srv, t, cl
+
+
+def test_ping_analyze_and_shutdown(tmp_path):
+    def handler(req):
+        if req["image"] == "boom":
+            raise ValueError("kaputt")
+        return {"text": f"{req['image']}|{req['salt']}"}
+    srv, t, cl = _start(tmp_path, handler)
+    st = cl.ping()
+    assert st["ok"] and st["pid"] == os.getpid() and st["served"] == 0
+    assert cl.analyze("a.png", "x")["text"] == "a.png|x"
+    err = cl.analyze("boom")
+    assert err["ok"] is False and "kaputt" in err["error"]
+    assert cl.ping()["served"] == 2
+    cl.request({"op": "shutdown"})
+    t.join(5)
+    assert not t.is_alive()
+    assert not os.path.exists(srv.path)
+
+
+def test_ping_answers_while_busy_and_max_requests_recycles(tmp_path):
+    gate = threading.Event()
+
+    def handler(req):
+        gate.wait(5)
+        return {"text": "ok"}
+    srv, t, cl = _start(tmp_path, handler, max_requests=1)
+    res = {}
+    th = threading.Thread(target=lambda: res.update(cl.request({"op": "analyze", "image": "i"})))
+    th.start()
+    time.sleep(0.2)
+    assert cl.ping()["busy_sec"] > 0
+    gate.set()
+    th.join(5)
+    assert res["text"] == "ok"
+    t.join(5)
+    assert not t.is_alive(), "nach max_requests beendet sich der Worker geordnet"
+
+
+def test_client_spawns_worker_process(tmp_path, monkeypatch):
+    path = str(tmp_path / "spawn.sock")
+    monkeypatch.setenv("ANALYSIS_WORKER_SOCKET", path)
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cl = aw.WorkerClient([sys.executable, os.path.join(here, "analyze_and_comment.py"), "--serve"], path=path)
+    try:
+        st = cl.ensure()
+        assert st["pid"] != os.getpid()
+        assert cl.ensure()["pid"] == st["pid"], "läuft schon → kein zweiter Start"
+    finally:
+        cl.stop(grace_sec=5)
+    assert cl.ping() is None
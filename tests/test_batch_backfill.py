@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+
+import batch_backfill as bb
+
+
+def _images(tmp_path, n):
+    d = tmp_path / "shots"
+    d.mkdir()
+    for i in range(n):
+        (d / f"shot_{i:02}.png").write_bytes(b"img-%d" % i)
+    (d / "notes.txt").write_text("kein Bild")
+    return d
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_resumes_from_checkpoint_and_skips_cached(tmp_path):
+    d = _images(tmp_path, 6)
+    (d / "dup.png").write_bytes(b"img-0")                 # gleiche Bytes wie shot_00
+    calls = []
+    lock = threading.Lock()
+
+    def analyzer(frame):
+        with lock:
+            calls.append(frame.path)
+        return None if frame.path.endswith("shot_03.png") else {"details": frame.path}
+
+    cache = {}
+    out, ck = str(tmp_path / "out.jsonl"), str(tmp_path / "out.ckpt")
+    paths = bb.list_sources(str(d))
+    assert len(paths) == 7
+    s1 = bb.run_batch(paths, out, ck, concurrency=2, analyzer=analyzer,
+                      cached=cache.get, progress=lambda s: None, vlm_wait=lambda: 0.0)
+    assert s1["analyzed"] == 5 and s1["failed"] == 1 and s1["skipped"] == 1
+    assert len(_read(out)) == 5
+
+    # zweiter Lauf: nur der fehlgeschlagene Frame wird erneut angefragt; einer kommt aus dem Cache
+    calls.clear()
+    (d / "shot_06.png").write_bytes(b"img-6")
+    import hashlib
+    cache[hashlib.md5(b"img-6").hexdigest()] = {"details": "cached"}
+    s2 = bb.run_batch(bb.list_sources(str(d)), out, ck, analyzer=analyzer,
+                      cached=cache.get, progress=lambda s: None, vlm_wait=lambda: 0.0)
+    assert [c.rsplit("/", 1)[1] for c in calls] == ["shot_03.png"]
+    assert s2["cached"] == 1 and s2["skipped"] == 6
+    recs = _read(out)
+    assert recs[-1]["cached"] is True and recs[-1]["vision"] == {"details": "cached"}
+
+
+def test_adaptive_limit_backs_off_on_queueing_latency():
+    lim = bb.AdaptiveLimit(start=2, lo=1, hi=4, factor=1.8)
+    for _ in range(20):
+        lim.on_result(1000.0, True)
+    assert lim.limit == 4
+    lim.on_result(2500.0, True)            # Bridge staut: Latenz > 1.8 × Bestwert
+    assert lim.limit == 2
+    lim.on_result(1000.0, False)
+    assert lim.limit == 1
+
+
+def test_concurrency_is_bounded(tmp_path):
+    d = _images(tmp_path, 12)
+    active = [0, 0]
+    lock = threading.Lock()
+
+    def analyzer(frame):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return {"ok": True}
+
+    s = bb.run_batch(bb.list_sources(str(d)), str(tmp_path / "o.jsonl"), None, concurrency=3,
+                     max_concurrency=3, analyzer=analyzer, cached=lambda m: None,
+                     progress=lambda s: None, vlm_wait=lambda: 0.0)
+    assert s["analyzed"] == 12 and 1 <= active[1] <= 3
@@ -0,0 +1,60 @@
+import os
+
+import bot_config
+
+
+def test_from_env_parses_and_validates():
+    cfg, errors = bot_config.from_env({
+        "SCREENSHOT_ANALYSIS_INTERVAL": "15",
+        "VISION_COMMENT_USE_LLM": "false",
+        "TWITCH_RANDOM_REPLY_RATE": "2.5",          # außerhalb [0, 1]
+        "CHAT_GLOBAL_COOLDOWN_SEC": "abc",          # kein int
+        "TWITCH_RANDOM_REPLY_IGNORE_USERS": "Nightbot, foo",
+    })
+    assert cfg.interval_sec == 15
+    assert cfg.vision_comment_use_llm is False
+    assert cfg.rand_reply_rate == 0.10
+    assert cfg.chat_global_cooldown_sec == 120
+    assert cfg.rand_reply_ignore == ("nightbot", "foo")
+    assert len(errors) == 2
+
+
+def test_invalid_value_keeps_previous_on_reload():
+    base, _ = bot_config.from_env({"SCREENSHOT_ANALYSIS_INTERVAL": "20"})
+    cfg, errors = bot_config.from_env({"SCREENSHOT_ANALYSIS_INTERVAL": "0"}, base=base)
+    assert cfg.interval_sec == 20 and errors
+    assert base.diff(cfg) == {}
+
+
+def test_reload_from_env_file_respects_process_env(tmp_path, monkeypatch):
+    env_file = tmp_path / ".env"
+    env_file.write_text("SCREENSHOT_ANALYSIS_INTERVAL=10\nLINKS_URL=https://a\n", encoding="utf-8")
+    monkeypatch.setattr(bot_config, "ENV_FILE", str(env_file))
+    monkeypatch.setenv("SCREENSHOT_ANALYSIS_INTERVAL", "10")
+    monkeypatch.setenv("LINKS_URL", "https://from-systemd")
+    bot_config.load()
+    seen = []
+    monkeypatch.setattr(bot_config, "_listeners", [lambda old, new: seen.append((old, new))])
+
+    env_file.write_text("SCREENSHOT_ANALYSIS_INTERVAL=30\nLINKS_URL=https://b\n", encoding="utf-8")
+    cfg = bot_config.reload("test")
+    assert cfg.interval_sec == 30
+    assert cfg.links_url == "https://from-systemd"
+    assert bot_config.get() is cfg
+    assert seen and seen[0][0].interval_sec == 10
+
+
+def test_reload_drops_keys_removed_from_env_file(tmp_path, monkeypatch):
+    env_file = tmp_path / ".env"
+    env_file.write_text("SCREENSHOT_ANALYSIS_INTERVAL=30\nLINKS_URL=https://a\n", encoding="utf-8")
+    monkeypatch.setattr(bot_config, "ENV_FILE", str(env_file))
+    monkeypatch.delenv("SCREENSHOT_ANALYSIS_INTERVAL", raising=False)
+    monkeypatch.setenv("LINKS_URL", "https://from-systemd")
+    bot_config.load()
+    assert bot_config.reload("test").interval_sec == 30
+
+    env_file.write_text("LINKS_URL=https://b\n", encoding="utf-8")
+    cfg = bot_config.reload("test")
+    assert "SCREENSHOT_ANALYSIS_INTERVAL" not in os.environ
+    assert cfg.interval_sec == bot_config.BotConfig().interval_sec
+    assert cfg.links_url == "https://from-systemd"
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+import bot_config
+from cadence import CadenceController
+
+
+@pytest.fixture(autouse=True)
+def _reload_config():
+    yield
+    bot_config.load()
+
+
+def _cfg(monkeypatch, **env):
+    base = {"SCREENSHOT_ANALYSIS_INTERVAL": "10", "TICK_JITTER_SEC": "0", "CADENCE_MIN_SEC": "3",
+            "CADENCE_MAX_SEC": "60", "CADENCE_HEADROOM": "1.2", "CADENCE_IDLE_STRETCH": "3",
+            "CADENCE_EWMA_ALPHA": "1"}
+    base.update(env)
+    for k, v in base.items():
+        monkeypatch.setenv(k, v)
+    bot_config.load()
+
+
+def _tick(c, md5, vision_ms=1000, writer_ms=500):
+    c.observe({"image_md5": md5, "timings": {"vision_ms": vision_ms, "writer_ms": writer_ms}})
+
+
+def test_slow_pipeline_stretches_period(monkeypatch):
+    _cfg(monkeypatch)
+    c = CadenceController(rng=random.Random(0))
+    _tick(c, "a", vision_ms=20000, writer_ms=5000)    # 25s Latenz > 10s Intervall
+    d = c.next_delay(tick_sec=25.0)
+    assert c.decisions()["reason"] == "latency"
+    assert abs(d - (25 * 1.2 - 25)) < 0.01
+
+
+def test_idle_screen_and_bounds(monkeypatch):
+    _cfg(monkeypatch)
+    c = CadenceController(rng=random.Random(0))
+    _tick(c, "a")
+    _tick(c, "a")                                      # kein Bildwechsel → change_rate 0
+    d = c.next_delay(tick_sec=1.5)
+    assert c.decisions()["reason"] == "idle"
+    assert abs(d - (10 * 3 - 1.5)) < 0.01
+    # volles Budget verdoppelt zusätzlich, Obergrenze greift
+    assert c.next_delay(tick_sec=0.0, budget=(4, 4, 300)) == 60.0
+
+
+def test_disabled_falls_back_to_static_interval(monkeypatch):
+    _cfg(monkeypatch, CADENCE_ENABLED="false")
+    c = CadenceController(rng=random.Random(0))
+    _tick(c, "a", vision_ms=60000)
+    assert c.next_delay(tick_sec=60.0) == 10.0
+    assert c.decisions()["reason"] == "static"
@@ -17,6 +17,7 @@ def setup_module(module):
 def test_links_command(monkeypatch):
     import zephyr_bot as zb
     importlib.reload(zb)
+    zb.bot_config.load()
 
     mt = MockTwitch()
     zb.twitch = mt
@@ -32,6 +33,7 @@ def test_links_command(monkeypatch):
 def test_info_command(monkeypatch):
     import zephyr_bot as zb
     importlib.reload(zb)
+    zb.bot_config.load()
 
     mt = MockTwitch()
     zb.twitch = mt
@@ -47,6 +49,7 @@ def test_info_command(monkeypatch):
 def test_bild_command(monkeypatch):
     import zephyr_bot as zb
     importlib.reload(zb)
+    zb.bot_config.load()
 
     mt = MockTwitch()
     zb.twitch = mt
@@ -68,6 +71,7 @@ def test_bild_command(monkeypatch):
 def test_witz_command(monkeypatch):
     import zephyr_bot as zb
     importlib.reload(zb)
+    zb.bot_config.load()
 
     mt = MockTwitch()
     zb.twitch = mt
@@ -84,3 +88,49 @@ def test_witz_command(monkeypatch):
     assert len(msg) > 0
     assert bucket == "command"
 
+
+
+def test_random_reply_gated_by_classifier_and_budget(monkeypatch, tmp_path):
+    import zephyr_bot as zb
+    import bot_config
+    import reply_classifier
+    monkeypatch.setenv("TWITCH_RANDOM_REPLY", "true")
+    monkeypatch.setenv("TWITCH_RANDOM_REPLY_MIN_GAP_SEC", "0")
+    monkeypatch.setenv("TWITCH_RANDOM_REPLY_LLM_BUDGET", "1")
+    monkeypatch.setattr(reply_classifier, "LOG_FILE", str(tmp_path / "chat.jsonl"))
+    importlib.reload(zb)
+    zb.bot_config.load()
+
+    class _Model:
+        def score(self, text, bot_name=""):
+            return 0.9 if text.endswith("?") else 0.1
+    monkeypatch.setattr(reply_classifier, "get_model", lambda *a: _Model())
+    calls = []
+    monkeypatch.setattr(zb, "_llm_chain", lambda: (lambda p: calls.append(p) or "Gute Frage."))
+    mt = MockTwitch()
+    zb.twitch = mt
+    zb.TWITCH_CLIENT = mt
+    try:
+        zb.handle_chat_message("anna", False, "lol")
+        assert not calls and not mt.sent
+        zb.handle_chat_message("anna", False, "welche IDE ist das?")
+        assert len(calls) == 1 and mt.sent[-1][0].startswith("@anna")
+        zb.handle_chat_message("bob", False, "und welches Theme?")
+        assert len(calls) == 1, "Budget erschöpft → kein weiterer LLM-Aufruf"
+    finally:
+        bot_config.load()
+
+
+def test_journal_tick_keeps_optional_trace_fields(monkeypatch):
+    import zephyr_bot as zb
+    recs = []
+    monkeypatch.setattr(zb.tick_journal, "record", recs.append)
+    trace = {"image_md5": "abc", "vision": {"scene_summary": "Editor"}, "region": {"full": "no_reference"},
+             "ladder": [{"tokens": 256, "ms": 40, "conf": 0.8, "next": None}], "payload": {"sent_kb": 88.0},
+             "state_delta": {"new_entities": ["Terminal"]}, "writer_prompt_chars": 812}
+    zb._journal_tick("2024-01-01T00:00:00", trace, None, "none")
+    rec = recs[-1]
+    assert rec["ladder"][0]["tokens"] == 256 and rec["payload"] == {"sent_kb": 88.0}
+    assert rec["region"] == {"full": "no_reference"} and rec["vision"] == {"scene_summary": "Editor"}
+    assert rec["state_delta"] == {"new_entities": ["Terminal"]} and rec["writer_prompt_chars"] == 812
+    assert "ocr" not in rec and rec["decision"] == "none"
@@ -0,0 +1,74 @@
+import pytest
+
+import clock
+from frame_gate import FrameGate, Signature, hamming, tile_diff
+
+
+def _sig(dhash, tiles):
+    return Signature(dhash, tiles)
+
+
+def test_near_duplicate_reuses_previous_vision():
+    base = [100.0] * 144
+    cursor = list(base)
+    cursor[40] += 2.0                       # blinkender Cursor: winzige Kachel-Änderung
+    chat = list(base)
+    chat[130] += 25.0                       # neue Chatzeile in einer Kachel
+    sigs = {"a": _sig(0b1011, base), "b": _sig(0b1011, cursor), "c": _sig(0b1011, chat),
+            "d": _sig(0b1011 ^ 0xFF, base)}
+    g = FrameGate(max_hamming=4, max_tile_diff=6, max_reuse_sec=0, signer=sigs.__getitem__)
+
+    first = g.check("a")
+    assert not first.reuse
+    g.remember({"scene_summary": "Editor"})
+    d = g.check("b")
+    assert d.reuse and d.vision == {"scene_summary": "Editor"} and d.hamming == 0
+    c = g.check("c")
+    assert not c.reuse and not c.forced     # lokale Änderung → neu analysieren
+    assert not g.check("d").reuse           # Struktur geändert (8 Bit)
+    s = g.stats()
+    assert s["frames"] == 4 and s["skips"] == 1 and s["hash_ms_avg"] is not None
+
+
+def test_reuse_expires_and_missing_libs_disable_gate():
+    vc = clock.VirtualClock()
+    clock.set_clock(vc)
+    try:
+        g = FrameGate(max_reuse_sec=60, signer=lambda p: _sig(1, [0.0]))
+        g.check("x")
+        g.remember({"v": 1})
+        assert g.check("x").reuse
+        vc.advance(61)
+        d = g.check("x")
+        assert not d.reuse and d.forced         # nur das Fenster ist abgelaufen
+    finally:
+        clock.set_clock(None)
+
+    def _no_libs(path):
+        raise ImportError("No module named 'numpy'")
+    off = FrameGate(signer=_no_libs)
+    assert off.check("x") is None and off.stats_compact() == "off"
+
+
+def test_distance_helpers():
+    assert hamming(0b1010, 0b0101) == 4
+    assert tile_diff([1.0, 5.0], [1.5, 1.0]) == 4.0
+    assert tile_diff([1.0], [1.0, 2.0]) == float("inf")
+
+
+def test_real_signature_tiles_and_dhash(tmp_path):
+    pytest.importorskip("numpy")
+    Image = pytest.importorskip("PIL.Image")
+    from frame_gate import signature
+    im = Image.new("RGB", (1920, 1080), (30, 30, 30))
+    im.paste((200, 200, 200), (0, 0, 960, 1080))           # linke Hälfte hell
+    p = tmp_path / "f.jpg"
+    im.save(p, quality=85)
+    sig = signature(str(p))
+    assert len(sig.tiles) == 144 and 0 <= sig.dhash < 2 ** 64
+    assert sig.tiles[0] > 150 and sig.tiles[-1] < 60        # Kachel = Flächenmittel
+    assert signature(p.read_bytes()) == sig                 # Pfad und Puffer gleich
+    im.paste((200, 200, 200), (1800, 1000, 1920, 1080))     # Änderung unten rechts
+    im.save(p, quality=85)
+    changed = signature(str(p))
+    assert hamming(changed.dhash, sig.dhash) <= 4 and tile_diff(changed.tiles, sig.tiles) > 6
@@ -0,0 +1,63 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import frame_index
+
+
+def _vec(seed, dim=8):
+    v = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_search_ring_and_reload(tmp_path):
+    idx = frame_index.FrameIndex(str(tmp_path), capacity=16, dim=8)
+    for i in range(20):                                   # 4 Zeilen werden überschrieben
+        idx.add(_vec(i), sid=i, path=f"/s/{i}.png")
+    assert len(idx) == 16 and idx.row_for_sid(2) is None
+    hits = idx.similar_to_sid(10, 3)
+    assert len(hits) == 3 and all(m["sid"] != 10 for m, _ in hits)
+    q = _vec(7)
+    assert idx.search(q, 1)[0][0] == idx.row_for_sid(7)
+
+    idx.flush()
+    again = frame_index.FrameIndex(str(tmp_path), capacity=16, dim=8)
+    assert len(again) == 16 and again.row_for_sid(19) == idx.row_for_sid(19)
+    assert again.search(q, 1)[0][0] == again.row_for_sid(7)
+
+
+def test_ingest_adds_vector_and_prunes_dups(tmp_path, monkeypatch):
+    idx = frame_index.FrameIndex(str(tmp_path), capacity=16, dim=8,
+                                 extractor=lambda src: _vec(len(src)))
+    monkeypatch.setattr(frame_index, "_INDEX", idx)
+    monkeypatch.setattr(frame_index, "PRUNE_DUPS", True)
+
+    class FakeManager:
+        def __init__(self):
+            self.recs = []
+
+        def ingest(self, path):
+            rec = {"sid": len(self.recs) + 1, "path": path, "ts": 1.0}
+            self.recs.append(rec)
+            return rec
+
+    sm = FakeManager()
+    assert frame_index.ingest(sm, "/s/a.png", b"xx")["sid"] == 1
+    assert frame_index.ingest(sm, "/s/b.png", b"yy") is None      # gleicher Vektor → verworfen
+    assert frame_index.ingest(sm, "/s/c.png", b"zzz")["sid"] == 2
+    assert len(idx) == 2 and idx.stats["pruned"] == 1
+
+
+def test_reader_follows_writer(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        frame_index.FrameIndex(str(tmp_path), capacity=16, dim=8, writer=False)
+    w = frame_index.FrameIndex(str(tmp_path), capacity=16, dim=8)
+    w.add(_vec(0), sid=0)
+    r = frame_index.FrameIndex(str(tmp_path), capacity=16, dim=8, writer=False)
+    assert len(r) == 1
+    with pytest.raises(OSError):
+        r.add(_vec(1), sid=1)
+    for i in range(1, 5):
+        w.add(_vec(i), sid=i)
+    assert r.search(_vec(3), 1)[0][0] == r.row_for_sid(3) == w.row_for_sid(3)
+    assert len(r) == 5
@@ -0,0 +1,49 @@
+import base64
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import frame_loader
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def test_load_hash_and_data_uri_share_one_read(tmp_path, monkeypatch):
+    data = os.urandom(4096)
+    p = _write(tmp_path / "shot.jpg", data)
+    opened = []
+    real_open = open
+
+    def counting_open(file, *a, **kw):
+        opened.append(file)
+        return real_open(file, *a, **kw)
+
+    monkeypatch.setattr("builtins.open", counting_open)
+    frame = frame_loader.load(p)
+    assert frame.md5 == hashlib.md5(data).hexdigest()
+    assert frame.data_uri() == "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")
+    assert [f for f in opened if str(f).startswith(str(tmp_path))] == [p]
+
+
+def test_too_small_falls_back_to_sibling(tmp_path):
+    _write(tmp_path / "shot.jpg", b"x" * 10)
+    png = _write(tmp_path / "shot.png", b"y" * 2048)
+    frame = frame_loader.load(str(tmp_path / "shot.jpg"), min_bytes=1024)
+    assert frame.path == png
+    assert frame.mime == "image/png"
+
+
+def test_missing_raises_frame_error(tmp_path):
+    with pytest.raises(frame_loader.FrameError):
+        frame_loader.load(str(tmp_path / "nope.jpg"))
+    assert frame_loader.try_load(str(tmp_path / "nope.jpg")) is None
+    _write(tmp_path / "nope.png", b"z" * 100)
+    assert frame_loader.try_load(str(tmp_path / "nope.jpg"), siblings=False) is None
@@ -0,0 +1,84 @@
+import json
+
+from game_state_tracker import GameStateTracker
+
+
+def _vis(scene, ents, text=()):
+    return {"scene_summary": scene, "entities": list(ents), "notable_text": list(text), "confidence": 0.8}
+
+
+def _tracker(tmp_path, **kw):
+    seed = tmp_path / "seed.json"
+    seed.write_text(json.dumps({"game": "WoW Classic", "mood": "Questing", "player_status": ""}))
+    return GameStateTracker(str(tmp_path / "state.json"), str(seed), entity_ttl=2, save_sec=0, **kw)
+
+
+def test_delta_since_last_post_and_persistence(tmp_path):
+    t = _tracker(tmp_path)
+    d = t.fold(_vis("Der Spieler kämpft gegen Wölfe im Wald von Elwynn", ["Wolf", "Paladin"], ["Quest: Wolfsjagd"]))
+    assert d["new_entities"] == ["Wolf", "Paladin"] and "scene_summary" in d
+    assert d["context_changed"] == {"game": "WoW Classic", "mood": "Questing"}
+    t.mark_posted()
+
+    # gleiche Szene anders formuliert, Entities gleich → nichts Neues
+    assert t.fold(_vis("Im Wald von Elwynn kämpft der Spieler gegen Wölfe", ["wolf", "Paladin"])) == {}
+    # ein Tick ohne Wolf lässt ihn nicht verschwinden (TTL 2), der zweite schon
+    assert t.fold(_vis("Im Wald von Elwynn kämpft der Spieler", ["Paladin"])) == {}
+    d = t.fold(_vis("Der Paladin betritt Goldhain und spricht mit dem Händler", ["Paladin", "Händler"]))
+    assert d["gone_entities"] == ["Wolf"] and d["new_entities"] == ["Händler"] and "scene_summary" in d
+
+    again = GameStateTracker(str(tmp_path / "state.json"), None, entity_ttl=2)
+    assert again.tick == 4 and again.static["game"] == "WoW Classic"
+    assert again.delta() == d
+
+
+def test_writer_prompt_stays_flat(tmp_path, monkeypatch):
+    import orchestrator
+    t = _tracker(tmp_path)
+    prompts = []
+
+    def fake_llm(prompt):
+        prompts.append(prompt)
+        return json.dumps({"long_sentence": "Ein langer Satz.", "short_sentence": "Kurz."})
+    monkeypatch.setattr(orchestrator.lazy_import, "optional", lambda *a: fake_llm)
+
+    for i in range(40):
+        vis = _vis(f"Terminal mit Build-Log, Schritt {i // 10}", ["Terminal", f"Datei{i // 10}.py"], ["make: ok"])
+        t.fold(vis)
+        assert orchestrator._call_writer(vis, "2024-01-01T00:00:00", tracker=t)
+        t.mark_posted()
+    assert max(len(p) for p in prompts[5:]) < 1.2 * len(prompts[1])
+    assert '"unchanged": true' in prompts[12]
+
+
+def test_failed_save_keeps_state_dirty(tmp_path):
+    t = _tracker(tmp_path)
+    t.path = str(tmp_path / "seed.json" / "state.json")     # Elternpfad ist eine Datei
+    t.fold(_vis("Menü", ["Button"]))
+    assert not t.save(force=True)
+    t.path = str(tmp_path / "state.json")
+    assert t.save(force=True)
+    assert not t.save(force=True)
+
+
+def test_gate_reuse_does_not_age_entities(tmp_path, monkeypatch):
+    import orchestrator
+    from frame_gate import GateDecision
+    t = _tracker(tmp_path)
+    vis = _vis("Editor mit Build-Log", ["Terminal"])
+    t.fold(vis)
+
+    class _Gate:
+        def check(self, data):
+            return GateDecision(True, vis, 0, 0.0, 0.1, ())
+
+    class _Frame:
+        md5, data = "abc", b"x"
+    monkeypatch.setattr(orchestrator.frame_loader, "try_load", lambda p: _Frame())
+    monkeypatch.setattr(orchestrator.frame_gate, "get_gate", lambda: _Gate())
+    monkeypatch.setattr(orchestrator.game_state_tracker, "get_tracker", lambda: t)
+    monkeypatch.setattr(orchestrator, "_call_writer",
+                        lambda *a, **kw: {"long_sentence": "Ein Satz.", "short_sentence": "Kurz."})
+    for _ in range(5):
+        assert orchestrator.run_tick("2024-01-01T00:00:00", "/s/a.png")
+    assert t.tick == 1 and t.present() == ["Terminal"]
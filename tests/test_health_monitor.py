@@ -0,0 +1,28 @@
+import time
+
+from health_monitor import HealthMonitor, fmt_entry
+
+
+def test_snapshot_collects_concurrently_with_deadline():
+    mon = HealthMonitor(max_workers=4)
+    mon.add("fast", lambda: (True, 12, None), interval_sec=60, timeout_sec=1.0)
+    mon.add("broken", lambda: (False, None, "connectionerror"), interval_sec=60, timeout_sec=1.0)
+    mon.add("hung", lambda: (time.sleep(0.5), (True, 1, None))[1], interval_sec=60, timeout_sec=0.1)
+
+    t0 = time.monotonic()
+    mon.run_once(wait_sec=2.0)
+    assert time.monotonic() - t0 < 0.45, "deadline must not wait for the hung probe"
+
+    snap = mon.snapshot()
+    assert snap["fast"]["ok"] is True and snap["fast"]["p50"] == 12
+    assert snap["broken"]["ok"] is False
+    assert snap["hung"]["err"] == "deadline"
+    mon.stop()
+
+
+def test_fmt_entry_plain_and_verbose():
+    entry = {"ok": False, "ms": None, "err": "timeout", "age": 3, "p50": 40, "p95": 90,
+             "runs": 4, "failures": 1}
+    assert fmt_entry("qwen", entry) == "qwen: ERR"
+    assert fmt_entry("qwen", entry, verbose=True) == "qwen: ERR(timeout) (p50 40/p95 90, fail 1/4, 3s)"
+    assert fmt_entry("auth", None) == "auth: n/a"
@@ -0,0 +1,31 @@
+from joke_pool import TextPool
+
+
+def test_pool_dedupes_and_serves_from_memory():
+    outputs = iter([
+        "Warum tragen Bugs Brillen? Weil sie Features sehen wollen.",
+        "warum tragen bugs brillen – weil sie features sehen wollen!",  # near-identical
+        "Mein Server ist wie ich: läuft nur mit Kaffee.",
+    ])
+    pool = TextPool(generate=lambda prompt: next(outputs), idle_check=lambda q: True, size=5)
+
+    assert pool.refill_once() is True
+    assert pool.refill_once() is False  # duplicate rejected
+    assert pool.refill_once() is True
+    assert pool.stats["duplicates"] == 1
+
+    # refill alternates kinds by fill level: witz first, then filler
+    assert "Bugs" in pool.take("witz")
+    assert "Server" in pool.take("filler")
+    assert pool.take("witz") is None
+    assert pool.stats["served"] == 2
+
+
+def test_pool_rejects_echoed_prompt_and_waits_for_idle():
+    pool = TextPool(generate=lambda prompt: prompt, idle_check=lambda q: True, size=2)
+    assert pool.refill_once() is False
+    assert pool.stats["rejected"] == 1
+
+    busy = TextPool(generate=lambda prompt: "Witz", idle_check=lambda q: False, size=2)
+    assert busy.refill_once() is False
+    assert busy.take("witz") is None
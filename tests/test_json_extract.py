@@ -0,0 +1,51 @@
+import json
+import os
+import random
+import time
+
+import pytest
+
+from json_extract import extract_object
+
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), "data", "json_corpus.jsonl")
+with open(CORPUS_FILE, encoding="utf-8") as _f:
+    CORPUS = [json.loads(line) for line in _f if line.strip()]
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[c["note"] for c in CORPUS])
+def test_corpus(case):
+    assert extract_object(case["raw"]) == case["expect"]
+
+
+def test_fuzz_truncation_and_noise_never_raise():
+    rng = random.Random(1234)
+    noise = "abc xyz {}[]:,.\n\\"
+    for case in CORPUS:
+        raw = case["raw"]
+        for _ in range(40):
+            cut = raw[:rng.randint(0, len(raw))]
+            out = extract_object(cut)
+            assert out is None or isinstance(out, dict)
+            if out and isinstance(case["expect"], dict) and cut.lstrip().startswith("{"):
+                # abgeschnitten: nur Schlüssel, die es im Original gibt
+                assert all(f'"{k}"' in raw for k in out)
+        if isinstance(case["expect"], dict) and not case["raw"].lstrip().startswith("["):
+            for _ in range(10):
+                junk = "".join(rng.choice(noise) for _ in range(rng.randint(0, 60)))
+                junk = junk.replace("{", "{ ").rstrip("\\")
+                assert extract_object(junk + " " + raw) == case["expect"], junk
+
+
+def test_many_braces_stays_linear():
+    obj = {"scene_summary": "Code", "entities": [], "notable_text": [], "confidence": 0.5}
+    tail = " " + json.dumps(obj)
+
+    def run(n):
+        s = "{x} [y] " * n + tail
+        t0 = time.perf_counter()
+        assert extract_object(s) == obj
+        return time.perf_counter() - t0
+
+    run(1000)
+    small, big = run(5000), run(40000)
+    assert big < max(small, 1e-3) * 40
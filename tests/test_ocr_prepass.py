@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+import frame_loader
+import ocr_prepass as op
+
+
+def _res(changed, text_regions, mostly=True, regions=("",) * 6):
+    return op.OcrResult("", tuple(regions), ("h",) * 6, tuple(changed), tuple(text_regions), mostly, 0, 0.0)
+
+
+def test_text_only_change():
+    prev = _res((), (0, 1, 2, 3))
+    assert op.text_only_change(prev, _res((1, 3), (0, 1, 2, 3)))
+    assert not op.text_only_change(prev, _res((1, 5), (0, 1, 2, 3)))      # Bildregion geändert
+    assert not op.text_only_change(prev, _res((1,), (1,), mostly=False))
+    assert not op.text_only_change(None, _res((1,), (0, 1, 2, 3)))
+    assert not op.text_only_change(prev, _res((), (0, 1, 2, 3)))          # nichts geändert
+
+
+def test_changed_lines_only_new():
+    prev = _res((), (), regions=("a\n$ make\nok",) + ("",) * 5)
+    cur = _res((0,), (), regions=("a\n$ make\nok\n$ pytest -q\n12 passed",) + ("",) * 5)
+    assert op.changed_lines(prev, cur) == ["$ pytest -q", "12 passed"]
+
+
+def test_regions_are_cached_by_pixel_hash(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    calls = []
+
+    def runner(png):
+        calls.append(png)
+        return "Traceback (most recent call last): File main.py line 3"
+
+    def frame(color):
+        im = Image.new("L", (120, 90), 255)
+        im.paste(color, (0, 0, 60, 30))                 # nur Region 0 ändert sich
+        buf = io.BytesIO()
+        im.save(buf, format="PNG")
+        p = tmp_path / f"f{color}.png"
+        p.write_bytes(buf.getvalue())
+        return frame_loader.load(str(p), siblings=False)
+
+    ocr = op.OcrPrepass(grid=(2, 3), workers=2, runner=runner)
+    a = ocr.run(frame(0))
+    assert len(calls) == 6 and a.mostly_text and a.changed == ()
+    b = ocr.run(frame(128))
+    assert len(calls) == 7 and b.changed == (0,) and b.cached == 5
+    assert ocr.fast_path(b)
+    ocr.run(frame(0))
+    assert len(calls) == 7                              # alte Region wieder im Cache
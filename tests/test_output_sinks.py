@@ -0,0 +1,62 @@
+import threading
+import time
+
+from output_sinks import Sink, SinkHub
+
+
+class SlowSink(Sink):
+    name = "slow"
+    field = "twitch"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.got = []
+
+    def deliver(self, payload):
+        self.release.wait(2.0)
+        self.got.append(payload)
+
+
+class FailingSink(Sink):
+    name = "broken"
+    field = "youtube"
+
+    def deliver(self, payload):
+        raise ConnectionError("down")
+
+
+class ListSink(Sink):
+    name = "list"
+    field = "twitch"
+
+    def __init__(self):
+        self.got = []
+
+    def deliver(self, payload):
+        self.got.append(payload)
+
+
+def test_slow_and_failing_sinks_do_not_block_publish_or_each_other():
+    hub = SinkHub()
+    slow, fast = SlowSink(), ListSink()
+    hub.add(slow)
+    hub.add(FailingSink(), max_retries=0)
+    hub.add(fast)
+
+    t0 = time.monotonic()
+    for i in range(5):
+        hub.publish({"twitch": f"msg {i}", "youtube": f"yt {i}"})
+    assert time.monotonic() - t0 < 0.05, "publish must not wait for delivery"
+
+    deadline = time.monotonic() + 2.0
+    while len(fast.got) < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert fast.got == [f"msg {i}" for i in range(5)]
+    assert slow.got == []  # still stuck, nobody else cares
+
+    st = hub.stats()
+    assert st["broken"]["breaker"] == "open"
+    assert st["broken"]["dropped_open"] >= 1
+    assert st["list"]["delivered"] == 5 and st["list"]["p50_ms"] is not None
+    slow.release.set()
+    hub.stop()
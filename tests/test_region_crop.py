@@ -0,0 +1,61 @@
+import pytest
+
+import region_crop
+from region_crop import RegionCropper, plan
+from vision_preprocess import Encoded
+
+
+def _idx(c, r, cols=16):
+    return r * cols + c
+
+
+def test_plan_single_window_and_mosaic():
+    # ein Fenster unten rechts (2×2 Kacheln) → eine Box, um 1 Kachel gepolstert
+    win = [_idx(12, 6), _idx(13, 6), _idx(12, 7), _idx(13, 7)]
+    assert plan(win, pad=1) == [(11, 5, 14, 8)]
+    # Uhr oben links + Chatzeile unten rechts → zwei getrennte Boxen (Mosaik)
+    boxes = plan([_idx(0, 0), _idx(15, 8)], pad=1)
+    assert boxes == [(0, 0, 1, 1), (14, 7, 15, 8)]
+    # benachbarte Inseln verschmelzen nach dem Polstern
+    assert plan([_idx(4, 4), _idx(6, 4)], pad=1) == [(3, 3, 7, 5)]
+
+
+def test_plan_falls_back_to_full_frame():
+    assert plan([]) is None
+    assert plan(None) is None
+    half = [_idx(c, r) for r in range(9) for c in range(9)]
+    assert plan(half, max_area=0.45, pad=0) is None
+    # zu viele Inseln → eine umschließende Box, die dann zu groß ist
+    scattered = [_idx(0, 0), _idx(15, 0), _idx(0, 8), _idx(15, 8)]
+    assert plan(scattered, max_regions=3, pad=0) is None
+
+
+def test_cropper_refreshes_full_frame_every_n_ticks(monkeypatch):
+    fake = region_crop.Crop(((0, 0, 10, 10),), 0.05, Encoded("data:,", 28, 28, 1, 1, 1, 0.0, True), False)
+    monkeypatch.setattr(region_crop, "render", lambda frame, boxes: fake)
+    c = RegionCropper(refresh_ticks=2)
+    changed = [_idx(3, 3)]
+
+    crop, why = c.crop(None, changed, has_context=False)
+    assert crop is None and why == "no_context"
+    c.committed(crop)
+    seq = []
+    for _ in range(6):
+        crop, why = c.crop(None, changed, has_context=True)
+        c.committed(crop)
+        seq.append(why or "crop")
+    assert seq == ["crop", "crop", "refresh", "crop", "crop", "refresh"]
+    assert c.stats["crops"] == 4 and c.stats["full"] == 3
+
+
+def test_render_crop_scales_budget_with_area(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    import frame_loader
+    p = tmp_path / "shot.png"
+    Image.new("RGB", (2560, 1440), (20, 20, 20)).save(p)
+    frame = frame_loader.load(str(p))
+    crop = region_crop.render(frame, [(0, 0, 3, 2)], max_pixels=1024 * 28 * 28)
+    assert crop.boxes == ((0, 0, 640, 480),)
+    assert crop.encoded.tokens <= 1024 * 640 * 480 // (2560 * 1440) + 4
+    mosaic = region_crop.render(frame, [(0, 0, 1, 1), (14, 7, 15, 8)])
+    assert mosaic.mosaic and len(mosaic.boxes) == 2
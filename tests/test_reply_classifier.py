@@ -0,0 +1,55 @@
+import random
+import time
+
+import reply_classifier as rc
+
+
+def test_features_are_stable_and_bounded():
+    a = rc.features("Welche IDE nutzt du?", bits=10)
+    assert a == rc.features("welche ide nutzt du?", bits=10)
+    assert all(0 <= i < 1024 for i in a)
+
+
+def test_label_events_uses_follow_up_engagement():
+    ev = [
+        {"t": 0, "kind": "line", "user": "anna", "text": "welche sprache ist das?"},
+        {"t": 5, "kind": "reply", "user": "anna", "text": "@anna Python", "to": "welche sprache ist das?"},
+        {"t": 30, "kind": "line", "user": "anna", "text": "danke!"},
+        {"t": 40, "kind": "line", "user": "bob", "text": "lol"},
+        {"t": 41, "kind": "reply", "user": "bob", "text": "@bob :)", "to": "lol"},
+        {"t": 500, "kind": "line", "user": "carl", "text": "gg", "label": 0},
+    ]
+    samples = rc.label_events(ev, engage_window_sec=120)
+    assert ("welche sprache ist das?", 1) in samples
+    assert ("lol", 0) in samples
+    assert ("gg", 0) in samples
+
+
+def test_trained_model_separates_questions_from_noise(tmp_path):
+    rng = random.Random(0)
+    topics = ["python", "rust", "linux", "vim", "docker", "git", "setup", "stream", "monitor"]
+    pos = [f"{q} {t}?" for q in ("wie funktioniert", "welches", "warum nutzt du", "was ist") for t in topics]
+    neg = ["lol", "xD", "gg", "kekw", "hahaha", "lul", "pog", "omg", ":D", "ok"] * 4
+    samples = [(t, 1) for t in pos] + [(t, 0) for t in neg]
+    rng.shuffle(samples)
+    model = rc.train(samples, bits=12, epochs=300)
+    path = str(tmp_path / "m.json")
+    model.save(path)
+    m = rc.ReplyModel.load(path)
+    assert m.score("wie funktioniert git?") > 0.6 > m.score("lol")
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        m.score("warum nutzt du eigentlich vim statt emacs?")
+    assert (time.perf_counter() - t0) / 1000 < 0.001
+
+
+def test_log_event_buffers_until_flush(tmp_path, monkeypatch):
+    path = str(tmp_path / "chat.jsonl")
+    monkeypatch.setattr(rc, "LOG_FILE", path)
+    rc.flush_log()
+    rc.log_event("line", "Anna", "hallo?")
+    rc.log_event("reply", "anna", "@anna hi", to="hallo?")
+    assert not (tmp_path / "chat.jsonl").exists()
+    assert rc.flush_log() == 2
+    assert [e["kind"] for e in rc.read_events([path])] == ["line", "reply"]
+    assert rc.flush_log() == 0
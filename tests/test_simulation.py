@@ -0,0 +1,42 @@
+from simulate import run_simulation
+
+
+def test_one_virtual_hour_runs_fast_and_respects_cooldown():
+    r = run_simulation(hours=1.0, env={"CHAT_GLOBAL_COOLDOWN_SEC": "120", "TWITCH_HELP_ENABLED": "false",
+                                       "VISION_SKIP_BLOCKED_TICKS": "false"},
+                       vision_ms=2000, writer_ms=1000, seed=3)
+    assert r["wall_sec"] < 10
+    assert r["ticks"] > 50
+    # globaler Cooldown 120s → höchstens 30 Vision-Posts pro Stunde
+    assert 0 < r["posts"].get("vision", 0) <= 31
+    assert r["posts"].get("startup_vision") == 1
+    assert r["decisions"].get("drop:cooldown", 0) > 0
+    assert r["wasted_inference"] == r["ticks"] - r["posts"]["vision"]
+
+
+def test_vision_budget_drops_are_counted():
+    r = run_simulation(hours=0.5, env={"CHAT_GLOBAL_COOLDOWN_SEC": "0", "SHORT_CHAT_MIN_INTERVAL": "0",
+                                       "POST_BUDGET_VISION_MAX_MSGS": "3", "POST_BUDGET_VISION_WINDOW_SEC": "600",
+                                       "POST_BUDGET_MAX_MSGS": "1000", "VISION_SKIP_BLOCKED_TICKS": "false"},
+                       change_rate=1.0)
+    assert r["posts"]["vision"] <= 3 * 3 + 3
+    assert r["budget_drops"].get("vision", 0) > 0
+
+
+def test_blocked_ticks_are_skipped_instead_of_wasted():
+    env = {"CHAT_GLOBAL_COOLDOWN_SEC": "120", "TWITCH_HELP_ENABLED": "false",
+           "POST_BUDGET_VISION_MAX_MSGS": "10", "POST_BUDGET_VISION_WINDOW_SEC": "600"}
+    r = run_simulation(hours=1.0, env=env, vision_ms=2000, writer_ms=1000, seed=3)
+    assert 0 < r["posts"].get("vision", 0) <= 10 * 6
+    assert r["decisions"].get("drop:cooldown", 0) == 0
+    assert r["budget_drops"].get("vision", 0) == 0
+    assert r["wasted_inference"] <= 1
+    assert r["inference_saved"] > 0
+
+
+def test_simulation_restores_caller_config(monkeypatch):
+    import bot_config
+    monkeypatch.delenv("SCREENSHOT_ANALYSIS_INTERVAL", raising=False)
+    before = bot_config.load().interval_sec
+    run_simulation(hours=0.05, env={"SCREENSHOT_ANALYSIS_INTERVAL": "77"})
+    assert bot_config.get().interval_sec == before != 77
@@ -0,0 +1,45 @@
+import time
+
+import state_snapshot
+from anti_flood import AntiFlood
+
+
+def test_roundtrip_restores_registered_parts(tmp_path):
+    path = str(tmp_path / "state.json")
+    af = AntiFlood()
+    assert af.allow("hallo", min_interval=30)
+    state = {"done": True}
+    state_snapshot.unregister()
+    state_snapshot.register("anti_flood", af.export_state, af.restore_state)
+    state_snapshot.register("bot", lambda: dict(state), state.update)
+    try:
+        assert state_snapshot.save(path)
+
+        af2 = AntiFlood()
+        state.clear()
+        state_snapshot.register("anti_flood", af2.export_state, af2.restore_state)
+        assert state_snapshot.restore_all(path) == 2
+        assert state == {"done": True}
+        # gleicher Text innerhalb des Fensters bleibt nach dem Neustart blockiert
+        assert not af2.allow("hallo", min_interval=30)
+    finally:
+        state_snapshot.unregister()
+
+
+def test_stale_or_missing_snapshot_is_cold_start(tmp_path):
+    path = str(tmp_path / "state.json")
+    assert state_snapshot.restore_all(path) == 0
+    state_snapshot.unregister()
+    state_snapshot.register("bot", lambda: {"x": 1}, lambda d: None)
+    try:
+        state_snapshot.save(path)
+        assert state_snapshot.load(path, max_age_sec=3600) is not None
+        time.sleep(0.01)
+        assert state_snapshot.load(path, max_age_sec=0.001) is None
+    finally:
+        state_snapshot.unregister()
+
+
+def test_mono_wall_conversion_roundtrip():
+    t = time.monotonic() - 42.0
+    assert abs(state_snapshot.wall_to_mono(state_snapshot.mono_to_wall(t)) - t) < 0.01
@@ -0,0 +1,30 @@
+from tick_journal import TickJournal
+
+
+def test_batched_write_index_and_lookup(tmp_path):
+    j = TickJournal(str(tmp_path), fsync=False)
+    for i in range(5):
+        j.append({"t": 1000.0 + i, "image_md5": f"h{i}", "decision": "posted" if i % 2 else "drop:cooldown"})
+    j.flush()
+    assert j.stats["written"] == 5 and j.stats["batches"] == 1
+    assert j.lookup_hash("h3")["t"] == 1003.0
+    assert [r["t"] for r in j.iter_range(1001.0, 1004.0)] == [1001.0, 1002.0, 1003.0]
+    j.stop()
+
+    # Index wird beim erneuten Öffnen aus den .idx-Dateien geladen
+    j2 = TickJournal(str(tmp_path), fsync=False)
+    assert j2.lookup_hash("h0")["decision"] == "drop:cooldown"
+    assert len(list(j2.iter_range())) == 5
+
+
+def test_size_rotation_prunes_old_files(tmp_path):
+    j = TickJournal(str(tmp_path), max_bytes=1024, max_files=2, fsync=False)
+    for i in range(6):
+        j.append({"t": float(i), "image_md5": f"h{i}", "pad": "x" * 900})
+        j.flush()
+    files = [p for p in tmp_path.iterdir() if p.suffix == ".jsonl"]
+    assert len(files) == 2
+    assert j.stats["rotations"] == 2
+    assert j.lookup_hash("h0") is None
+    assert j.lookup_hash("h5")["t"] == 5.0
+    j.stop()
@@ -0,0 +1,82 @@
+import time
+import urllib.error
+
+import pytest
+
+import clock
+import qwen_client
+import vision_cache
+import vision_summarizer as vs
+from circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def vclock(monkeypatch):
+    vc = clock.VirtualClock()
+    clock.set_clock(vc)
+    monkeypatch.setattr(qwen_client, "BREAKER", CircuitBreaker("vlm", 2, 20, clock=clock.monotonic))
+    monkeypatch.setattr(vs, "SHOT_BREAKER", CircuitBreaker("screenshot", 2, 5, clock=clock.monotonic))
+    monkeypatch.setattr(vision_cache, "CACHE_ENABLED", False)
+    yield vc
+    clock.set_clock(None)
+
+
+def test_missing_screenshot_opens_breaker_without_sleeping(tmp_path, vclock):
+    missing = str(tmp_path / "none.jpg")
+    t0 = time.perf_counter()
+    assert vs.get_vision_comment(missing) is None
+    assert vs.get_vision_comment(missing) is None
+    assert vs.get_vision_comment(missing) is None       # offen: sofort abgelehnt
+    assert time.perf_counter() - t0 < 0.5
+    r = vs.vision_ready()
+    assert not r["ready"] and r["reason"] == "screenshot" and 0 < r["retry_in"] <= 5
+    vclock.advance(5)
+    assert vs.vision_ready()["ready"]
+
+
+def test_vlm_failures_short_circuit_calls(tmp_path, vclock, monkeypatch):
+    img = tmp_path / "shot.jpg"
+    img.write_bytes(b"\xff\xd8" + b"x" * (vs.MIN_BYTES + 10))
+    calls = []
+
+    def down(req, timeout=None):
+        calls.append(req)
+        raise urllib.error.URLError("connection refused")
+    monkeypatch.setattr("urllib.request.urlopen", down)
+
+    assert vs.get_vision_comment(str(img)) is None
+    assert vs.ask_image_question(str(img), "Was läuft?") is None
+    assert len(calls) == 2
+    assert vs.get_vision_comment(str(img)) is None
+    assert vs.ask_image_question(str(img), "Was läuft?") is None
+    assert len(calls) == 2, "Breaker offen → kein weiterer Aufruf"
+    r = vs.vision_ready()
+    assert r["reason"] == "vlm" and r["error"] == "URLError"
+    assert vs.breaker_info()["screenshot"]["state"] == "closed"
+
+
+def test_unexpected_error_in_half_open_probe_reopens_breaker(tmp_path, vclock, monkeypatch):
+    import io
+    import json
+    img = tmp_path / "shot.jpg"
+    img.write_bytes(b"\xff\xd8" + b"x" * (vs.MIN_BYTES + 10))
+    monkeypatch.setattr("urllib.request.urlopen",
+                        lambda req, timeout=None: io.BytesIO(json.dumps({"choices": []}).encode()))
+    br = qwen_client.BREAKER
+    br.record_failure("x")
+    br.record_failure("x")
+    vclock.advance(20)
+    assert br.state == "half_open"
+    assert qwen_client.analyze_image(str(img)) is None      # IndexError im Probeaufruf
+    assert br.state == "open" and br.last_error == "IndexError"
+
+
+def test_half_open_trial_that_never_reports_times_out():
+    t = [0.0]
+    br = CircuitBreaker("x", 1, 10, clock=lambda: t[0], trial_timeout_sec=30)
+    br.record_failure("boom")
+    t[0] = 10.0
+    assert br.allow()                   # Probeaufruf, meldet sich nie zurück
+    assert not br.allow()
+    t[0] = 41.0
+    assert br.allow()
@@ -0,0 +1,66 @@
+import io
+import json
+import time
+
+import clock
+import vision_cache
+from vision_cache import VisionCache
+
+
+def test_lru_ttl_and_disk_warm_load(tmp_path):
+    vc = clock.VirtualClock()
+    clock.set_clock(vc)
+    try:
+        c = VisionCache(str(tmp_path), max_entries=2, ttl_sec=100, disk_max_entries=10)
+        c.put("a" * 32, "scene", {"scene_summary": "A"}, "de")
+        c.put("b" * 32, "scene", {"scene_summary": "B"}, "de")
+        c.put("c" * 32, "scene", {"scene_summary": "C"}, "de")
+        assert c.stats["evictions"] == 1
+        assert c.get("a" * 32, "scene", "de") == {"scene_summary": "A"}      # von Platte
+        assert c.stats["disk_hits"] == 1
+        assert c.get("a" * 32, "scene", "en") is None                        # andere Sprache
+        assert c.get("c" * 32, "question", "de", "was?") is None
+
+        fresh = VisionCache(str(tmp_path), max_entries=10, ttl_sec=100, disk_max_entries=10)
+        assert fresh.warm_load() == 3
+        assert fresh.get("b" * 32, "scene", "de")["scene_summary"] == "B"
+        assert fresh.stats["hits"] == 1
+
+        vc.advance(101)
+        assert fresh.get("b" * 32, "scene", "de") is None
+        assert fresh.stats["expired"] == 1
+    finally:
+        clock.set_clock(None)
+
+
+def test_hit_returns_copy_and_is_fast(tmp_path):
+    c = VisionCache(None)
+    c.put("d" * 32, "summary", {"objects": [1]})
+    v = c.get("d" * 32, "summary")
+    v["objects"].append(2)
+    assert c.get("d" * 32, "summary") == {"objects": [1]}
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        c.get("d" * 32, "summary")
+    assert (time.perf_counter() - t0) / 1000 < 0.0005
+
+
+def test_orchestrator_vision_call_is_cached(tmp_path, monkeypatch):
+    import orchestrator
+    monkeypatch.setattr(vision_cache, "_CACHE", VisionCache(str(tmp_path / "vc")))
+    img = tmp_path / "shot.jpg"
+    img.write_bytes(b"\xff\xd8" + b"x" * 2048)
+    calls = []
+
+    def fake_urlopen(req, timeout=None):
+        calls.append(req)
+        content = json.dumps({"scene_summary": "Terminal", "entities": ["vim"], "notable_text": [], "confidence": 0.8})
+        return io.BytesIO(json.dumps({"choices": [{"message": {"content": content}}]}).encode())
+    monkeypatch.setattr("urllib.request.urlopen", fake_urlopen)
+
+    a = orchestrator._call_vision(str(img), None)
+    b = orchestrator._call_vision(str(img), None)
+    assert a == b and a["scene_summary"] == "Terminal"
+    assert len(calls) == 1
+    orchestrator._call_vision(str(img), "OCR-Hinweis")
+    assert len(calls) == 2
@@ -0,0 +1,40 @@
+import vision_ladder as vl
+
+
+def _ladder():
+    return vl.Ladder(step_tokens=(256, 1024), min_conf=0.6, log_every=0)
+
+
+def test_stops_at_first_confident_step():
+    lad = _ladder()
+    seen = []
+
+    def analyze(px):
+        seen.append(px)
+        return {"scene_summary": "Editor", "entities": ["VS Code"], "confidence": 0.8}
+
+    vis, trail = lad.run(analyze)
+    assert vis["confidence"] == 0.8 and len(seen) == 1 and trail[0]["next"] is None
+    assert lad.stats["hits"] == [1, 0] and lad.stats["tried"] == [1, 0]
+
+
+def test_escalates_on_low_conf_or_empty_objects_and_keeps_best():
+    lad = _ladder()
+    answers = {256 * 784: {"hp": None, "objects": [], "details": "unklar"},
+               1024 * 784: {"hp": None, "objects": [{"label": "Boss", "confidence": 0.9}], "details": "Bosskampf"}}
+    vis, trail = lad.run(lambda px: answers[px])
+    assert vis["details"] == "Bosskampf" and [t["next"] for t in trail] == ["empty", None]
+
+    # höhere Stufe scheitert → Ergebnis der niedrigen Stufe bleibt
+    low = {"scene_summary": "Menü", "entities": ["Menü"], "confidence": 0.3}
+    vis, trail = lad.run(lambda px: low if px == 256 * 784 else None)
+    assert vis is low and trail[-1]["next"] == "error"
+    assert lad.stats["tried"] == [2, 2] and lad.stats["hits"] == [0, 1]
+    assert lad.stats_compact().startswith("0%/50% ok")
+
+
+def test_needs_more():
+    assert vl.needs_more({"objects": [{"label": "x", "confidence": None}]}) == ""
+    assert vl.needs_more({"objects": [{"label": "x", "confidence": 0.2}]}) == "low_conf"
+    assert vl.needs_more({"scene_summary": "", "entities": [], "confidence": 0.9}) == "empty"
+    assert vl.needs_more({}) == "empty"
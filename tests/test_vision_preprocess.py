@@ -0,0 +1,48 @@
+import pytest
+
+import frame_loader
+from vision_preprocess import Preprocessor, fit_to_grid
+
+
+def test_fit_to_grid_respects_budget_and_patch_grid():
+    for w, h in ((3840, 2160), (2560, 1440), (1920, 1080), (1366, 768), (800, 600)):
+        tw, th = fit_to_grid(w, h, max_pixels=1024 * 28 * 28, min_pixels=4 * 28 * 28, grid=28)
+        assert tw % 28 == 0 and th % 28 == 0
+        assert tw * th <= 1024 * 28 * 28
+        assert abs(tw / th - w / h) < 0.08
+    assert fit_to_grid(1120, 616, max_pixels=1024 * 28 * 28) == (1120, 616)
+    assert fit_to_grid(20, 20, max_pixels=10**6, min_pixels=4 * 28 * 28) == (56, 56)
+
+
+def test_falls_back_to_original_without_pillow(tmp_path, monkeypatch):
+    import builtins
+    real_import = builtins.__import__
+
+    def no_pil(name, *a, **kw):
+        if name == "PIL" or name.startswith("PIL."):
+            raise ImportError("no PIL")
+        return real_import(name, *a, **kw)
+
+    monkeypatch.setattr(builtins, "__import__", no_pil)
+    p = tmp_path / "shot.png"
+    p.write_bytes(b"\x89PNG" + b"0" * 100)
+    frame = frame_loader.load(str(p))
+    prep = Preprocessor()
+    enc = prep.encode(frame)
+    assert enc.data_uri == frame.data_uri() and not enc.resized
+    assert prep.stats_compact() == "off"
+
+
+def test_downscales_to_grid_and_caches_per_hash(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    p = tmp_path / "shot.png"
+    Image.new("RGB", (2560, 1440), (40, 90, 160)).save(p)
+    frame = frame_loader.load(str(p))
+    prep = Preprocessor(max_pixels=256 * 28 * 28, quality=80)
+    enc = prep.encode(frame)
+    assert enc.resized and enc.data_uri.startswith("data:image/jpeg;base64,")
+    assert enc.width % 28 == 0 and enc.height % 28 == 0
+    assert enc.width * enc.height <= 256 * 28 * 28
+    assert enc.tokens == (enc.width // 28) * (enc.height // 28)
+    assert prep.encode(frame) is enc
+    assert prep.stats["hits"] == 1 and prep.stats["encodes"] == 1
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Append-only Tick-Journal (JSONL)
+
+Pro Orchestrator-Tick eine Zeile: Zeitstempel, Screenshot-Hash, Vision-JSON,
+Writer-Ausgabe, Keywords, Post/Drop-Entscheidung und Timings, dazu – wenn
+der Tick sie hatte – Frame-Gate, OCR-Vorlauf, Ausschnitt-Entscheidung
+(region: Boxen/Fläche oder Grund fürs Vollbild), Auflösungsleiter (ladder),
+Payload und das Writer-Delta (state_delta, writer_prompt_chars). append() legt
+den Datensatz nur in eine Queue; ein Hintergrund-Thread schreibt gesammelt
+(ein write + ein fsync pro Batch) und rotiert nach Größe.
+
+Neben jeder Journal-Datei liegt ein kompakter Index (<datei>.idx, eine Zeile
+"ts<TAB>md5<TAB>offset" pro Datensatz). Beim Öffnen werden nur die Indizes
+geladen; Lookups nach Hash oder Zeitraum lesen gezielt per Offset.
+Gedacht für Latenzanalysen, Cache-Warm-up nach Neustart und Replay.
+"""
+
+from __future__ import annotations
+import os
+import json
+import atexit
+import time
+import queue
+import bisect
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+log = logging.getLogger("tick_journal")
+
+JOURNAL_ENABLED = os.getenv("TICK_JOURNAL_ENABLED", "true").lower() != "false"
+JOURNAL_DIR = os.getenv(
+    "TICK_JOURNAL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "journal"),
+)
+try:
+    MAX_BYTES = int(float(os.getenv("TICK_JOURNAL_MAX_MB", "20")) * 1024 * 1024)
+except Exception:
+    MAX_BYTES = 20 * 1024 * 1024
+try:
+    MAX_FILES = max(1, int(os.getenv("TICK_JOURNAL_MAX_FILES", "10")))
+except Exception:
+    MAX_FILES = 10
+try:
+    FLUSH_SEC = max(0.05, float(os.getenv("TICK_JOURNAL_FLUSH_SEC", "2")))
+except Exception:
+    FLUSH_SEC = 2.0
+FSYNC = os.getenv("TICK_JOURNAL_FSYNC", "true").lower() != "false"
+
+_PREFIX = "ticks-"
+_SUFFIX = ".jsonl"
+
+# Index-Eintrag: (ts, datei, offset)
+_Entry = Tuple[float, str, int]
+
+
+class TickJournal:
+    def __init__(self, directory: str = JOURNAL_DIR, max_bytes: int = MAX_BYTES,
+                 max_files: int = MAX_FILES, flush_sec: float = FLUSH_SEC,
+                 fsync: bool = FSYNC, queue_max: int = 1000):
+        self.dir = directory
+        self.max_bytes = max(1024, int(max_bytes))
+        self.max_files = max(1, int(max_files))
+        self.flush_sec = flush_sec
+        self.fsync = fsync
+        self._q: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max(1, queue_max))
+        self._lock = threading.Lock()            # Index + Dateiwechsel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._by_ts: List[_Entry] = []
+        self._by_hash: Dict[str, _Entry] = {}
+        self._fh = None
+        self._idx_fh = None
+        self._path: Optional[str] = None
+        self._size = 0
+        self.stats = {"appended": 0, "written": 0, "dropped": 0, "batches": 0, "rotations": 0}
+        os.makedirs(self.dir, exist_ok=True)
+        self._load_index()
+
+    # --- Dateien/Index ---
+    def _files(self) -> List[str]:
+        names = sorted(n for n in os.listdir(self.dir) if n.startswith(_PREFIX) and n.endswith(_SUFFIX))
+        return [os.path.join(self.dir, n) for n in names]
+
+    def _load_index(self):
+        for path in self._files():
+            try:
+                with open(path + ".idx", "r", encoding="utf-8") as f:
+                    for line in f:
+                        parts = line.rstrip("\n").split("\t")
+                        if len(parts) != 3:
+                            continue
+                        self._index_add(float(parts[0]), parts[1], path, int(parts[2]))
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                log.debug("[journal] index %s unreadable: %s", path, e)
+        self._by_ts.sort()
+
+    def _index_add(self, ts: float, md5: str, path: str, off: int):
+        e = (ts, path, off)
+        if self._by_ts and ts < self._by_ts[-1][0]:
+            bisect.insort(self._by_ts, e)
+        else:
+            self._by_ts.append(e)
+        if md5:
+            self._by_hash[md5] = e
+
+    def _open_new(self):
+        self._close()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        # feste Laufnummer, damit die lexikalische Sortierung der Zeitfolge entspricht
+        n = 0
+        path = os.path.join(self.dir, f"{_PREFIX}{stamp}-{n:03d}{_SUFFIX}")
+        while os.path.exists(path):
+            n += 1
+            path = os.path.join(self.dir, f"{_PREFIX}{stamp}-{n:03d}{_SUFFIX}")
+        self._fh = open(path, "ab")
+        self._idx_fh = open(path + ".idx", "a", encoding="utf-8")
+        self._path = path
+        self._size = 0
+        self._prune_files()
+
+    def _prune_files(self):
+        files = self._files()
+        for old in files[: max(0, len(files) - self.max_files)]:
+            for p in (old, old + ".idx"):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            self._by_ts = [e for e in self._by_ts if e[1] != old]
+            self._by_hash = {k: e for k, e in self._by_hash.items() if e[1] != old}
+
+    def _close(self):
+        for fh in (self._fh, self._idx_fh):
+            if fh is not None:
+                try:
+                    fh.close()
+                except Exception:
+                    pass
+        self._fh = self._idx_fh = None
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        with self._lock:
+            if self._fh is None or self._size >= self.max_bytes:
+                if self._fh is not None:
+                    self.stats["rotations"] += 1
+                self._open_new()
+            buf = bytearray()
+            idx_lines = []
+            added = []
+            for rec in batch:
+                line = (json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+                off = self._size + len(buf)
+                buf += line
+                ts = float(rec.get("t") or 0.0)
+                md5 = str(rec.get("image_md5") or "")
+                idx_lines.append(f"{ts}\t{md5}\t{off}\n")
+                added.append((ts, md5, off))
+            self._fh.write(buf)
+            self._fh.flush()
+            self._idx_fh.write("".join(idx_lines))
+            self._idx_fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+                os.fsync(self._idx_fh.fileno())
+            self._size += len(buf)
+            for ts, md5, off in added:
+                self._index_add(ts, md5, self._path, off)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+
+    # --- Schreiben ---
+    def append(self, record: Dict[str, Any]) -> bool:
+        """Nicht blockierend; volle Queue → Datensatz verwerfen (Tick geht vor)."""
+        rec = dict(record)
+        rec.setdefault("t", time.time())
+        try:
+            self._q.put_nowait(rec)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["appended"] += 1
+        return True
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        while True:
+            try:
+                batch.append(self._q.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def flush(self):
+        batch = self._drain()
+        if batch:
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                log.warning("[journal] write failed (%d records lost): %s", len(batch), e)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_sec):
+            self.flush()
+        self.flush()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tick-journal", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        with self._lock:
+            self._close()
+
+    # --- Lesen ---
+    def _read_at(self, path: str, off: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "rb") as f:
+                f.seek(off)
+                return json.loads(f.readline().decode("utf-8"))
+        except Exception:
+            return None
+
+    def lookup_hash(self, md5: str) -> Optional[Dict[str, Any]]:
+        """Jüngster Datensatz zu einem Screenshot-Hash (z. B. Vision-Cache-Warm-up)."""
+        with self._lock:
+            e = self._by_hash.get(md5)
+        return self._read_at(e[1], e[2]) if e else None
+
+    def iter_range(self, t0: float = 0.0, t1: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Datensätze mit t0 <= t < t1 in Zeitreihenfolge (Replay/Analyse)."""
+        with self._lock:
+            lo = bisect.bisect_left(self._by_ts, (t0, "", -1))
+            hi = len(self._by_ts) if t1 is None else bisect.bisect_left(self._by_ts, (t1, "", -1))
+            entries = self._by_ts[lo:hi]
+        for _, path, off in entries:
+            rec = self._read_at(path, off)
+            if rec is not None:
+                yield rec
+
+    def hashes(self) -> List[str]:
+        with self._lock:
+            return list(self._by_hash)
+
+
+_JOURNAL: Optional[TickJournal] = None
+
+
+def get_journal() -> Optional[TickJournal]:
+    return _JOURNAL
+
+
+def start_default() -> Optional[TickJournal]:
+    global _JOURNAL
+    if not JOURNAL_ENABLED:
+        return None
+    if _JOURNAL is None:
+        try:
+            _JOURNAL = TickJournal()
+        except Exception as e:
+            log.warning("[journal] disabled: %s", e)
+            return None
+        _JOURNAL.start()
+        # Rest der Queue bei regulärem Ende/SIGTERM (SystemExit) noch schreiben
+        atexit.register(_JOURNAL.stop)
+    return _JOURNAL
+
+
+def record(rec: Dict[str, Any]) -> bool:
+    """Bequemer Einstieg: no-op ohne gestartetes Journal."""
+    return _JOURNAL.append(rec) if _JOURNAL is not None else False
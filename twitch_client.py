@@ -10,11 +10,8 @@ from collections import deque
 import logging
 import re
 
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format="%(asctime)s [%(name)-12s] [%(levelname)-5s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+import clock
+
 log = logging.getLogger("TwitchClient")
 
 
@@ -93,6 +90,17 @@ class TwitchClient:
         self._ping_event = threading.Event()
         self._last_rtt_ms: int | None = None
         # --- Budget ---
+        self._budget_times = deque()   # monotonic() timestamps erfolgreicher Sends
+        self._budget_last_notice_ts: float | None = None
+        self._bucket_times_map: dict[str, deque] = {}
+        self._bucket_last_notice_ts: dict[str, float | None] = {}
+        # Zähler pro Bucket (Simulation/!health): gesendet bzw. vom Budget verworfen
+        self.sent_counts: dict[str, int] = {}
+        self.drop_counts: dict[str, int] = {}
+        self.reload_budget_config()
+
+    def reload_budget_config(self):
+        """POST_BUDGET_* (neu) aus der Umgebung übernehmen; bisherige Sendezeiten bleiben erhalten."""
         self._budget_enabled = (os.getenv("POST_BUDGET_ENABLED","true").lower() != "false")
         try:
             self._budget_window = int(os.getenv("POST_BUDGET_WINDOW_SEC","600"))
@@ -102,25 +110,25 @@ class TwitchClient:
         except Exception:
             self._budget_window, self._budget_limit = 600, 6
             self._budget_silent, self._budget_notice_cd = True, 60
-        self._budget_times = deque()   # monotonic() timestamps erfolgreicher Sends
-        self._budget_last_notice_ts: float | None = None
         # --- Bucket Budgets ---
         self._allow_priority = (os.getenv("POST_BUDGET_ALLOW_PRIORITY","true").lower() == "true")
         buckets = [b.strip() for b in os.getenv("POST_BUDGET_BUCKETS","vision,command,system,startup_vision,default").split(",") if b.strip()]
-        self._bucket_cfg = {}
+        bucket_cfg = {}
         for b in buckets:
             key = b.upper()
             win = int(os.getenv(f"POST_BUDGET_{key}_WINDOW_SEC", os.getenv("POST_BUDGET_DEFAULT_WINDOW_SEC","600")))
             lim = int(os.getenv(f"POST_BUDGET_{key}_MAX_MSGS",   os.getenv("POST_BUDGET_DEFAULT_MAX_MSGS","6")))
-            self._bucket_cfg[b] = (win, lim)
-        self._bucket_cfg.setdefault("default", (int(os.getenv("POST_BUDGET_DEFAULT_WINDOW_SEC","600")),
-                                                int(os.getenv("POST_BUDGET_DEFAULT_MAX_MSGS","6"))))
+            bucket_cfg[b] = (win, lim)
+        bucket_cfg.setdefault("default", (int(os.getenv("POST_BUDGET_DEFAULT_WINDOW_SEC","600")),
+                                          int(os.getenv("POST_BUDGET_DEFAULT_MAX_MSGS","6"))))
         # Sensible defaults for startup_vision if not configured
-        if "startup_vision" in buckets and "startup_vision" not in self._bucket_cfg:
-            self._bucket_cfg["startup_vision"] = (30, 2)
-        self._bucket_times_map: dict[str, deque] = {b: deque() for b in self._bucket_cfg}
+        if "startup_vision" in buckets and "startup_vision" not in bucket_cfg:
+            bucket_cfg["startup_vision"] = (30, 2)
+        for b in bucket_cfg:
+            self._bucket_times_map.setdefault(b, deque())
+            self._bucket_last_notice_ts.setdefault(b, None)
+        self._bucket_cfg = bucket_cfg
         self._bucket_notice_cd = max(10, self._budget_notice_cd)
-        self._bucket_last_notice_ts: dict[str, float | None] = {b: None for b in self._bucket_cfg}
 
     @staticmethod
     def _normalize_channel(ch: str) -> str:
@@ -324,11 +332,12 @@ class TwitchClient:
                     "[twitch] DROP global-budget: used=%s/%s, window_left=%ss (Text verworfen)",
                     used, limit, left,
                 )
+                self.drop_counts[bucket] = self.drop_counts.get(bucket, 0) + 1
                 if not self._budget_silent and self._budget_notice_ok():
                     notice = "⏳ budget: limit erreicht – einige Nachrichten werden gedrosselt"
                     self._raw_send(f"PRIVMSG {self.channel} :{self._clamp(notice)}")
                     try:
-                        self._budget_last_notice_ts = time.monotonic()
+                        self._budget_last_notice_ts = clock.monotonic()
                     except Exception:
                         pass
                 return
@@ -336,12 +345,13 @@ class TwitchClient:
             if not self._bucket_allow(bucket):
                 # kompakten Bucketzustand loggen und optional Hinweis senden
                 bs = self.bucket_states_compact()
+                self.drop_counts[bucket] = self.drop_counts.get(bucket, 0) + 1
                 if self._bucket_notice_ok(bucket):
                     if not self._budget_silent:
                         notice = f"⏳ budget[{bucket}]: limit erreicht – gedrosselt"
                         self._raw_send(f"PRIVMSG {self.channel} :{self._clamp(notice)}")
                     try:
-                        self._bucket_last_notice_ts[bucket] = time.monotonic()
+                        self._bucket_last_notice_ts[bucket] = clock.monotonic()
                     except Exception:
                         pass
                     log.info("[twitch] DROP bucket '%s': %s (Text verworfen)", bucket, bs or "?")
@@ -349,8 +359,9 @@ class TwitchClient:
 
         # Send and account against budget
         self._send_now(text, bucket=bucket)
+        self.sent_counts[bucket] = self.sent_counts.get(bucket, 0) + 1
         try:
-            nowm = time.monotonic()
+            nowm = clock.monotonic()
             self._budget_times.append(nowm)
             self._budget_prune()
             bt = self._bucket_times_map.get(bucket) if hasattr(self, "_bucket_times_map") else None
@@ -367,7 +378,7 @@ class TwitchClient:
         msg = self._clamp(text)
         self._raw_send(f"PRIVMSG {self.channel} :{msg}")
         try:
-            self._last_sent_ts = time.monotonic()
+            self._last_sent_ts = clock.monotonic()
         except Exception:
             pass
         if bucket == "startup_vision":
@@ -437,7 +448,7 @@ class TwitchClient:
         try:
             if self._last_sent_ts is None:
                 return None
-            return int(time.monotonic() - self._last_sent_ts)
+            return int(clock.monotonic() - self._last_sent_ts)
         except Exception:
             return None
 
@@ -453,7 +464,7 @@ class TwitchClient:
     def _budget_prune(self):
         """Alte Timestamps ausserhalb des Fensters entfernen."""
         try:
-            now = time.monotonic()
+            now = clock.monotonic()
             win = self._budget_window
             while self._budget_times and (now - self._budget_times[0]) > win:
                 self._budget_times.popleft()
@@ -470,7 +481,7 @@ class TwitchClient:
     def _budget_notice_ok(self) -> bool:
         """Begrenzt Hinweis-Spam, wenn SILENT=false."""
         try:
-            now = time.monotonic()
+            now = clock.monotonic()
             if self._budget_last_notice_ts is None:
                 return True
             return (now - self._budget_last_notice_ts) >= self._budget_notice_cd
@@ -485,11 +496,36 @@ class TwitchClient:
             if not self._budget_times:
                 return used, self._budget_limit, self._budget_window
             oldest = self._budget_times[0]
-            left = max(0, int(self._budget_window - (time.monotonic() - oldest)))
+            left = max(0, int(self._budget_window - (clock.monotonic() - oldest)))
             return used, self._budget_limit, left
         except Exception:
             return None, None, None
 
+    # --- Warm-Restart (state_snapshot) ---
+    def export_state(self) -> dict:
+        """Budget-/Bucket-Fenster als Wall-Clock-Zeitstempel (monotonic überlebt keinen Neustart)."""
+        off = clock.time() - clock.monotonic()
+        return {
+            "budget": [t + off for t in list(self._budget_times)],
+            "buckets": {b: [t + off for t in list(dq)] for b, dq in self._bucket_times_map.items() if dq},
+            "last_sent": (self._last_sent_ts + off) if self._last_sent_ts is not None else None,
+        }
+
+    def restore_state(self, data: dict):
+        off = clock.time() - clock.monotonic()
+        now = clock.monotonic()
+        def _conv(vals):
+            return [float(t) - off for t in (vals or []) if float(t) - off <= now]
+        self._budget_times.extend(sorted(_conv(data.get("budget"))))
+        self._budget_prune()
+        for b, vals in (data.get("buckets") or {}).items():
+            if b not in self._bucket_times_map:
+                continue
+            self._bucket_times_map[b].extend(sorted(_conv(vals)))
+            self._bucket_prune(b)
+        if data.get("last_sent") is not None:
+            self._last_sent_ts = float(data["last_sent"]) - off
+
     # --- Bucket helpers ---
     def _classify_bucket(self, text: str) -> str:
         try:
@@ -507,7 +543,7 @@ class TwitchClient:
     def _bucket_prune(self, bucket: str):
         try:
             win, _ = self._bucket_cfg.get(bucket, self._bucket_cfg.get("default", (600, 6)))
-            now = time.monotonic()
+            now = clock.monotonic()
             dq = self._bucket_times_map.setdefault(bucket, deque())
             while dq and (now - dq[0]) > win:
                 dq.popleft()
@@ -525,7 +561,7 @@ class TwitchClient:
 
     def _bucket_notice_ok(self, bucket: str) -> bool:
         try:
-            now = time.monotonic()
+            now = clock.monotonic()
             last = self._bucket_last_notice_ts.get(bucket)
             if last is None:
                 return True
@@ -533,6 +569,46 @@ class TwitchClient:
         except Exception:
             return False
 
+    @staticmethod
+    def _wait_for_slot(times, window: int, limit: int, now: float) -> float:
+        """Sekunden, bis in einem Fenster (times, window, limit) wieder ein Send frei ist."""
+        if limit <= 0:
+            return float(window)
+        n = len(times)
+        if n < limit:
+            return 0.0
+        # die (n - limit + 1) ältesten Einträge müssen aus dem Fenster fallen
+        return max(0.0, times[n - limit] + window - now)
+
+    def next_slot_in(self, bucket: str = "vision") -> float:
+        """Sekunden bis ein nicht-priorisierter Send in `bucket` Global- und Bucket-Budget passiert."""
+        try:
+            now = clock.monotonic()
+            self._budget_prune()
+            wait = 0.0
+            if self._budget_enabled:
+                wait = self._wait_for_slot(self._budget_times, self._budget_window, self._budget_limit, now)
+            if bucket not in self._bucket_cfg:
+                bucket = "default"
+            self._bucket_prune(bucket)
+            win, lim = self._bucket_cfg[bucket]
+            dq = self._bucket_times_map.get(bucket) or deque()
+            return max(wait, self._wait_for_slot(dq, win, lim, now))
+        except Exception:
+            return 0.0
+
+    def bucket_state(self, bucket: str):
+        """(used, limit, seconds_left_in_window) eines Buckets – wie budget_state()."""
+        try:
+            self._bucket_prune(bucket)
+            win, lim = self._bucket_cfg.get(bucket, self._bucket_cfg.get("default", (600, 6)))
+            dq = self._bucket_times_map.get(bucket) or deque()
+            if not dq:
+                return 0, lim, win
+            return len(dq), lim, max(0, int(win - (clock.monotonic() - dq[0])))
+        except Exception:
+            return None, None, None
+
     def bucket_states_compact(self) -> str | None:
         """Kurzform: v 1/4, c 0/6, s 0/3"""
         try:
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Inhaltsadressierter Cache für Vision-Ergebnisse
+
+Schlüssel: (Bild-MD5, Art, Sprache, Frage/Zusatz). Gleiche Bytes mit gleicher
+Anfrage → gleiches Ergebnis, ohne das VLM erneut zu fragen (!bild direkt nach
+einem Tick, wiederholtes !shot <sid>, Startup-Vision, Fragen zum selben Bild).
+
+- LRU im Speicher (VISION_CACHE_MAX_ENTRIES), Treffer in Mikrosekunden
+- pro Eintrag eine JSON-Datei auf Platte (atomar geschrieben), begrenzt auf
+  VISION_CACHE_DISK_MAX_ENTRIES; älteste Dateien fliegen zuerst
+- TTL (VISION_CACHE_TTL_SEC) für Speicher und Platte
+- Warm-Load beim Start: jüngste gültige Platteneinträge direkt ins LRU
+- Kennzahlen hits/misses/disk_hits/evictions für !health verbose
+
+Gespeichert werden nur normalisierte Ergebnisse (dict/str), nie None.
+"""
+
+from __future__ import annotations
+import os
+import json
+import copy
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import clock
+
+log = logging.getLogger("vision_cache")
+
+CACHE_ENABLED = os.getenv("VISION_CACHE_ENABLED", "true").lower() != "false"
+CACHE_DIR = os.getenv(
+    "VISION_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "vision"),
+)
+try:
+    MAX_ENTRIES = max(1, int(os.getenv("VISION_CACHE_MAX_ENTRIES", "512")))
+except Exception:
+    MAX_ENTRIES = 512
+try:
+    DISK_MAX_ENTRIES = max(0, int(os.getenv("VISION_CACHE_DISK_MAX_ENTRIES", "5000")))
+except Exception:
+    DISK_MAX_ENTRIES = 5000
+try:
+    TTL_SEC = float(os.getenv("VISION_CACHE_TTL_SEC", "21600"))
+except Exception:
+    TTL_SEC = 21600.0
+WARM_LOAD = os.getenv("VISION_CACHE_WARM", "true").lower() != "false"
+
+
+def make_key(md5: str, kind: str, lang: str = "", question: str = "") -> str:
+    raw = "\x1f".join((md5 or "", kind or "", (lang or "").lower(), " ".join((question or "").split())))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class VisionCache:
+    def __init__(self, directory: Optional[str] = CACHE_DIR, max_entries: int = MAX_ENTRIES,
+                 ttl_sec: float = TTL_SEC, disk_max_entries: int = DISK_MAX_ENTRIES):
+        self.dir = directory
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_sec = float(ttl_sec)
+        self.disk_max_entries = max(0, int(disk_max_entries))
+        self._lru: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_count = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "puts": 0, "evictions": 0, "expired": 0}
+        if self.dir and self.disk_max_entries:
+            try:
+                os.makedirs(self.dir, exist_ok=True)
+            except OSError as e:
+                log.warning("[vcache] disk cache disabled: %s", e)
+                self.dir = None
+        else:
+            self.dir = None
+
+    # --- Platte ---
+    def _path(self, key: str) -> str:
+        return os.path.join(self.dir, key[:2], key + ".json")
+
+    def _disk_read(self, key: str) -> Optional[Tuple[float, Any]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                d = json.load(f)
+            return float(d["t"]), d["v"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _disk_write(self, key: str, t: float, value: Any, meta: Dict[str, Any]):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"t": t, "v": value, "meta": meta}, f, ensure_ascii=False, separators=(",", ":"))
+            new = not os.path.exists(path)
+            os.replace(tmp, path)
+            if new:
+                self._disk_count += 1
+            if self._disk_count > self.disk_max_entries * 1.1:
+                self._disk_prune()
+        except (OSError, TypeError, ValueError) as e:
+            log.debug("[vcache] disk write failed: %s", e)
+
+    def _disk_files(self) -> List[Tuple[float, str]]:
+        out: List[Tuple[float, str]] = []
+        if not self.dir:
+            return out
+        for sub in os.listdir(self.dir):
+            d = os.path.join(self.dir, sub)
+            if not os.path.isdir(d):
+                continue
+            for n in os.listdir(d):
+                if n.endswith(".json"):
+                    p = os.path.join(d, n)
+                    try:
+                        out.append((os.stat(p).st_mtime, p))
+                    except OSError:
+                        pass
+        return out
+
+    def _disk_prune(self):
+        files = sorted(self._disk_files())
+        excess = len(files) - self.disk_max_entries
+        for _, p in files[:max(0, excess)]:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        self._disk_count = min(len(files), self.disk_max_entries)
+
+    # --- API ---
+    def _fresh(self, t: float, now: float) -> bool:
+        return self.ttl_sec <= 0 or (now - t) < self.ttl_sec
+
+    def _remember(self, key: str, t: float, value: Any):
+        self._lru[key] = (t, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, md5: Optional[str], kind: str, lang: str = "", question: str = "") -> Optional[Any]:
+        """Kopie des gecachten Ergebnisses oder None."""
+        if not md5:
+            return None
+        key = make_key(md5, kind, lang, question)
+        now = clock.time()
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                if self._fresh(hit[0], now):
+                    self._lru.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return copy.deepcopy(hit[1])
+                del self._lru[key]
+                self.stats["expired"] += 1
+            if self.dir:
+                rec = self._disk_read(key)
+                if rec is not None and self._fresh(rec[0], now):
+                    self._remember(key, rec[0], rec[1])
+                    self.stats["disk_hits"] += 1
+                    return copy.deepcopy(rec[1])
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, md5: Optional[str], kind: str, value: Any, lang: str = "", question: str = ""):
+        if not md5 or value is None:
+            return
+        key = make_key(md5, kind, lang, question)
+        t = clock.time()
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, t, value)
+            self.stats["puts"] += 1
+            if self.dir:
+                self._disk_write(key, t, value, {"md5": md5, "kind": kind, "lang": lang, "q": question[:200]})
+
+    def get_or_compute(self, md5: Optional[str], kind: str, compute: Callable[[], Any],
+                       lang: str = "", question: str = "") -> Any:
+        v = self.get(md5, kind, lang, question)
+        if v is not None:
+            return v
+        v = compute()
+        self.put(md5, kind, v, lang, question)
+        return v
+
+    def warm_load(self, limit: Optional[int] = None) -> int:
+        """Jüngste gültige Platteneinträge ins LRU laden; Abgelaufenes löschen."""
+        if not self.dir:
+            return 0
+        files = sorted(self._disk_files(), reverse=True)
+        self._disk_count = len(files)
+        now = clock.time()
+        limit = self.max_entries if limit is None else limit
+        loaded = []
+        for _, p in files:
+            if len(loaded) >= limit:
+                break
+            key = os.path.basename(p)[:-5]
+            rec = self._disk_read(key)
+            if rec is None:
+                continue
+            if not self._fresh(rec[0], now):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+                continue
+            loaded.append((key, rec))
+        with self._lock:
+            for key, (t, v) in reversed(loaded):    # älteste zuerst → jüngste am LRU-Ende
+                self._remember(key, t, v)
+        return len(loaded)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def stats_compact(self) -> str:
+        s = self.stats
+        total = s["hits"] + s["disk_hits"] + s["misses"]
+        rate = (s["hits"] + s["disk_hits"]) / total * 100.0 if total else 0.0
+        return f"{s['hits']}+{s['disk_hits']}d/{total} ({rate:.0f}%), {len(self._lru)} mem"
+
+
+_CACHE: Optional[VisionCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> Optional[VisionCache]:
+    """Globale Instanz (lazy, beim ersten Zugriff ggf. Warm-Load); None wenn deaktiviert."""
+    global _CACHE
+    if not CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                c = VisionCache()
+                if WARM_LOAD:
+                    try:
+                        n = c.warm_load()
+                        if n:
+                            log.info("[vcache] warm-load: %d Einträge", n)
+                    except Exception as e:
+                        log.debug("[vcache] warm-load failed: %s", e)
+                _CACHE = c
+    return _CACHE
+
+
+def get(md5: Optional[str], kind: str, lang: str = "", question: str = "") -> Optional[Any]:
+    c = get_cache()
+    return c.get(md5, kind, lang, question) if c is not None else None
+
+
+def put(md5: Optional[str], kind: str, value: Any, lang: str = "", question: str = ""):
+    c = get_cache()
+    if c is not None:
+        c.put(md5, kind, value, lang, question)
+
+
+def stats_compact() -> str:
+    c = _CACHE
+    return c.stats_compact() if c is not None else "n/a"
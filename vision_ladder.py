@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Auflösungsleiter fürs VLM: erst billig, nur bei Bedarf genauer
+
+Die meisten Frames (Editor, Menü, Desktop) sind auch mit einem kleinen
+Pixelbudget eindeutig. Statt jeden Frame mit VISION_MAX_PIXELS zu
+analysieren, läuft die Analyse die Stufen aus VISION_LADDER_TOKENS
+(Vision-Tokens à VISION_PATCH_GRID², Standard 256 → VISION_MAX_PIXELS)
+hinauf und hört bei der ersten Stufe auf, deren Ergebnis sicher genug ist:
+
+- confidence (Orchestrator-Schema) bzw. Mittel der Objekt-Konfidenzen
+  (Summarizer-Schema {hp, objects, details}) ≥ VISION_LADDER_MIN_CONF
+- und es wurde überhaupt etwas erkannt (entities/objects nicht leer)
+
+Sonst nächste Stufe. Ausschnitte (region_crop) laufen dieselbe Leiter
+hinauf – ihr Budget ist der Stufenwert × Flächenanteil. Liefert eine höhere
+Stufe nichts (Fehler, Breaker), bleibt das beste bisherige Ergebnis.
+
+Trefferquote und mittlere Dauer pro Stufe stehen in stats_compact()
+(!health verbose) und alle VISION_LADDER_LOG_EVERY Frames im Log.
+VISION_LADDER_ENABLED=false → eine Stufe mit VISION_MAX_PIXELS wie bisher.
+"""
+
+from __future__ import annotations
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import vision_preprocess
+
+log = logging.getLogger("vision_ladder")
+
+LADDER_ENABLED = os.getenv("VISION_LADDER_ENABLED", "true").lower() != "false"
+_TOKEN_PX = vision_preprocess.PATCH_GRID * vision_preprocess.PATCH_GRID
+_MAX_TOKENS = vision_preprocess.MAX_PIXELS // _TOKEN_PX
+try:
+    STEP_TOKENS = sorted({min(_MAX_TOKENS, max(4, int(x)))
+                          for x in os.getenv("VISION_LADDER_TOKENS", f"256,{_MAX_TOKENS}").split(",")
+                          if x.strip()})
+except Exception:
+    STEP_TOKENS = sorted({min(256, _MAX_TOKENS), _MAX_TOKENS})
+try:
+    MIN_CONF = min(1.0, max(0.0, float(os.getenv("VISION_LADDER_MIN_CONF", "0.55"))))
+except Exception:
+    MIN_CONF = 0.55
+try:
+    LOG_EVERY = max(0, int(os.getenv("VISION_LADDER_LOG_EVERY", "50")))
+except Exception:
+    LOG_EVERY = 50
+
+Analyze = Callable[[int], Optional[Dict[str, Any]]]
+
+
+def confidence(vis: Dict[str, Any]) -> Optional[float]:
+    """Konfidenz eines Ergebnisses in beiden Schemata (None = unbekannt)."""
+    c = vis.get("confidence")
+    if isinstance(c, (int, float)):
+        return float(c)
+    confs = [float(o["confidence"]) for o in (vis.get("objects") or [])
+             if isinstance(o, dict) and isinstance(o.get("confidence"), (int, float))]
+    return sum(confs) / len(confs) if confs else None
+
+
+def needs_more(vis: Optional[Dict[str, Any]], min_conf: float = MIN_CONF) -> str:
+    """Grund für die nächste Stufe ("" = Ergebnis reicht)."""
+    if not vis:
+        return "empty"
+    if "entities" in vis or "objects" in vis:
+        if not (vis.get("entities") or vis.get("objects")):
+            return "empty"
+    c = confidence(vis)
+    if c is not None and c < min_conf:
+        return "low_conf"
+    return ""
+
+
+def _score(vis: Dict[str, Any]) -> Tuple[bool, float]:
+    return needs_more(vis, 0.0) == "", confidence(vis) or 0.0
+
+
+class Ladder:
+    def __init__(self, step_tokens: Sequence[int] = STEP_TOKENS, min_conf: float = MIN_CONF,
+                 log_every: int = LOG_EVERY):
+        self.steps = [int(t) * _TOKEN_PX for t in step_tokens] or [vision_preprocess.MAX_PIXELS]
+        self.min_conf = min_conf
+        self.log_every = log_every
+        self._lock = threading.Lock()
+        n = len(self.steps)
+        self.stats: Dict[str, Any] = {"frames": 0, "tried": [0] * n, "hits": [0] * n,
+                                      "ms": [0.0] * n, "ms_total": 0.0}
+
+    def run(self, analyze: Analyze) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Stufen hinauf analysieren: (bestes Ergebnis, Verlauf je Stufe fürs Journal)."""
+        best: Optional[Dict[str, Any]] = None
+        trail: List[Dict[str, Any]] = []
+        t_all = time.perf_counter()
+        for i, px in enumerate(self.steps):
+            t0 = time.perf_counter()
+            vis = analyze(px)
+            ms = (time.perf_counter() - t0) * 1000.0
+            why = needs_more(vis, self.min_conf) if vis is not None else "error"
+            with self._lock:
+                self.stats["tried"][i] += 1
+                self.stats["ms"][i] += ms
+                if not why:
+                    self.stats["hits"][i] += 1
+            trail.append({"tokens": px // _TOKEN_PX, "ms": int(ms), "conf": confidence(vis) if vis else None,
+                          "next": why or None})
+            if vis is None:
+                break
+            if best is None or _score(vis) >= _score(best):
+                best = vis
+            if not why:
+                break
+        with self._lock:
+            self.stats["frames"] += 1
+            self.stats["ms_total"] += (time.perf_counter() - t_all) * 1000.0
+            frames = self.stats["frames"]
+        if self.log_every and frames % self.log_every == 0:
+            log.info("[ladder] %s", self.summary())
+        return best, trail
+
+    def summary(self) -> str:
+        s = self.stats
+        parts = []
+        for i, px in enumerate(self.steps):
+            n = s["tried"][i]
+            if n:
+                parts.append(f"{px // _TOKEN_PX}tok {s['hits'][i]}/{n} ok ({s['hits'][i] / n * 100:.0f}%), "
+                             f"{s['ms'][i] / n:.0f}ms")
+        avg = s["ms_total"] / s["frames"] if s["frames"] else 0.0
+        return " · ".join(parts + [f"{avg:.0f}ms/frame über {s['frames']}"])
+
+    def stats_compact(self) -> str:
+        s = self.stats
+        if not s["frames"]:
+            return "n/a"
+        hit = "/".join(f"{s['hits'][i] / s['tried'][i] * 100:.0f}%" if s["tried"][i] else "-"
+                       for i in range(len(self.steps)))
+        return f"{hit} ok, {s['ms_total'] / s['frames']:.0f}ms/f"
+
+
+_LADDER: Optional[Ladder] = None
+
+
+def get_ladder() -> Optional[Ladder]:
+    """Globale Leiter oder None (aus bzw. nur eine Stufe)."""
+    global _LADDER
+    if not LADDER_ENABLED or len(STEP_TOKENS) < 2:
+        return None
+    if _LADDER is None:
+        _LADDER = Ladder()
+    return _LADDER
+
+
+def run(analyze: Analyze) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Mit Leiter analysieren – oder einmal mit VISION_MAX_PIXELS, wenn sie aus ist."""
+    ladder = get_ladder()
+    if ladder is None:
+        return analyze(vision_preprocess.MAX_PIXELS), []
+    return ladder.run(analyze)
+
+
+def stats_compact() -> str:
+    return _LADDER.stats_compact() if _LADDER is not None else "n/a"
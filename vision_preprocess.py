@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Bild-Vorverarbeitung vor dem VLM: Pixelbudget + JPEG-Rekodierung
+
+Screenshots gingen bisher in voller Auflösung als base64 an die Bridge
+(1440p/4K → mehrere MB Payload), und Qwen2.5-VL zahlt im Prefill pro
+28×28-Pixelblock ein Vision-Token. encode() skaliert deshalb vorher auf ein
+Pixelbudget (VISION_MAX_PIXELS) und richtet Breite/Höhe am Patch-Raster des
+Modells aus (VISION_PATCH_GRID, Qwen2.5-VL: 14 px Patch × 2er-Merge = 28),
+damit der Server nicht noch einmal selbst skaliert. Danach JPEG mit
+VISION_JPEG_QUALITY.
+
+- Ergebnisse werden pro Bild-MD5 + Parametern im LRU gehalten
+  (VISION_PREPROCESS_CACHE Einträge): !bild nach einem Tick, der Fallback-
+  Summarizer und Fragen zum selben Bild kodieren nicht erneut
+- Passt ein JPEG schon ins Budget und aufs Raster, bleibt es unverändert
+- Ohne Pillow (oder VISION_PREPROCESS_ENABLED=false) wird das Original
+  gesendet – wie bisher
+"""
+
+from __future__ import annotations
+import io
+import os
+import math
+import time
+import base64
+import logging
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+import frame_loader
+
+log = logging.getLogger("vision_preprocess")
+
+PREPROCESS_ENABLED = os.getenv("VISION_PREPROCESS_ENABLED", "true").lower() != "false"
+try:
+    PATCH_GRID = max(1, int(os.getenv("VISION_PATCH_GRID", "28")))
+except Exception:
+    PATCH_GRID = 28
+try:
+    # 1024 Vision-Tokens à 28×28 ≈ 1190×672 px bei 16:9
+    MAX_PIXELS = max(PATCH_GRID * PATCH_GRID, int(os.getenv("VISION_MAX_PIXELS", str(1024 * 28 * 28))))
+except Exception:
+    MAX_PIXELS = 1024 * 28 * 28
+try:
+    MIN_PIXELS = max(PATCH_GRID * PATCH_GRID, int(os.getenv("VISION_MIN_PIXELS", str(4 * 28 * 28))))
+except Exception:
+    MIN_PIXELS = 4 * 28 * 28
+try:
+    JPEG_QUALITY = min(95, max(30, int(os.getenv("VISION_JPEG_QUALITY", "82"))))
+except Exception:
+    JPEG_QUALITY = 82
+try:
+    CACHE_ENTRIES = max(0, int(os.getenv("VISION_PREPROCESS_CACHE", "16")))
+except Exception:
+    CACHE_ENTRIES = 16
+
+
+class Encoded(NamedTuple):
+    data_uri: str
+    width: int
+    height: int
+    src_bytes: int
+    out_bytes: int
+    tokens: int                     # Vision-Tokens nach Raster (w/grid * h/grid)
+    ms: float
+    resized: bool
+
+
+def fit_to_grid(width: int, height: int, max_pixels: int = MAX_PIXELS,
+                min_pixels: int = MIN_PIXELS, grid: int = PATCH_GRID) -> Tuple[int, int]:
+    """Zielgröße: Seitenverhältnis ≈ erhalten, Vielfache von `grid`, Fläche im Budget.
+
+    Entspricht smart_resize() aus dem Qwen2.5-VL-Preprocessor.
+    """
+    h = max(grid, round(height / grid) * grid)
+    w = max(grid, round(width / grid) * grid)
+    if h * w > max_pixels:
+        beta = math.sqrt((height * width) / max_pixels)
+        h = max(grid, math.floor(height / beta / grid) * grid)
+        w = max(grid, math.floor(width / beta / grid) * grid)
+    elif h * w < min_pixels:
+        beta = math.sqrt(min_pixels / (height * width))
+        h = math.ceil(height * beta / grid) * grid
+        w = math.ceil(width * beta / grid) * grid
+    return w, h
+
+
+def _encode_pil(frame: frame_loader.Frame, max_pixels: int, quality: int) -> Encoded:
+    from PIL import Image
+    t0 = time.perf_counter()
+    with Image.open(io.BytesIO(frame.data)) as im:
+        src_w, src_h = im.size
+        w, h = fit_to_grid(src_w, src_h, max_pixels)
+        if (w, h) == (src_w, src_h) and im.format == "JPEG":
+            # schon passend: Original senden, keine Generationsverluste
+            return Encoded(frame.data_uri(), w, h, frame.size, frame.size,
+                           (w // PATCH_GRID) * (h // PATCH_GRID), (time.perf_counter() - t0) * 1000.0, False)
+        if im.format == "JPEG":
+            im.draft("RGB", (w, h))                 # DCT-Skalierung beim Dekodieren
+        return _encode_rgb(im.convert("RGB"), w, h, quality, frame.size, t0)
+
+
+def _encode_rgb(img, w: int, h: int, quality: int, src_bytes: int, t0: float) -> Encoded:
+    from PIL import Image
+    if img.size != (w, h):
+        img = img.resize((w, h), Image.BICUBIC)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=False, progressive=False)
+    out = buf.getvalue()
+    uri = "data:image/jpeg;base64," + base64.b64encode(out).decode("ascii")
+    return Encoded(uri, w, h, src_bytes, len(out), (w // PATCH_GRID) * (h // PATCH_GRID),
+                   (time.perf_counter() - t0) * 1000.0, True)
+
+
+def encode_image(img, max_pixels: int = MAX_PIXELS, quality: int = JPEG_QUALITY,
+                 src_bytes: int = 0) -> Encoded:
+    """Bereits dekodiertes PIL-Bild (z. B. Ausschnitt/Mosaik) ins Raster skalieren und kodieren."""
+    t0 = time.perf_counter()
+    w, h = fit_to_grid(img.width, img.height, max_pixels)
+    return _encode_rgb(img.convert("RGB"), w, h, quality, src_bytes, t0)
+
+
+class Preprocessor:
+    def __init__(self, max_pixels: int = MAX_PIXELS, quality: int = JPEG_QUALITY,
+                 cache_entries: int = CACHE_ENTRIES):
+        self.max_pixels = max_pixels
+        self.quality = quality
+        self.cache_entries = cache_entries
+        self._lru: "OrderedDict[Tuple[str, int, int], Encoded]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disabled_reason: Optional[str] = None
+        self.stats = {"encodes": 0, "hits": 0, "passthrough": 0, "errors": 0,
+                      "src_bytes": 0, "out_bytes": 0, "ms_total": 0.0}
+
+    def _raw(self, frame: frame_loader.Frame) -> Encoded:
+        return Encoded(frame.data_uri(), 0, 0, frame.size, frame.size, 0, 0.0, False)
+
+    def encode(self, frame: frame_loader.Frame, max_pixels: Optional[int] = None) -> Encoded:
+        """Frame fürs VLM kodieren; bei fehlendem Pillow/Fehler das Original."""
+        max_pixels = int(max_pixels or self.max_pixels)
+        if self._disabled_reason:
+            return self._raw(frame)
+        key = (frame.md5, max_pixels, self.quality)
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                self._lru.move_to_end(key)
+                self.stats["hits"] += 1
+                return hit
+        try:
+            enc = _encode_pil(frame, max_pixels, self.quality)
+        except ImportError as e:
+            self._disabled_reason = str(e)
+            log.info("[prep] deaktiviert (%s) – sende Originalbilder", e)
+            return self._raw(frame)
+        except Exception as e:
+            self.stats["errors"] += 1
+            log.debug("[prep] encode failed: %s", e)
+            return self._raw(frame)
+        with self._lock:
+            self.stats["encodes"] += 1
+            if not enc.resized:
+                self.stats["passthrough"] += 1
+            self.stats["src_bytes"] += enc.src_bytes
+            self.stats["out_bytes"] += enc.out_bytes
+            self.stats["ms_total"] += enc.ms
+            if self.cache_entries:
+                self._lru[key] = enc
+                while len(self._lru) > self.cache_entries:
+                    self._lru.popitem(last=False)
+        return enc
+
+    def stats_compact(self) -> str:
+        s = self.stats
+        if self._disabled_reason:
+            return "off"
+        if not s["encodes"]:
+            return "n/a"
+        ratio = s["out_bytes"] / s["src_bytes"] * 100.0 if s["src_bytes"] else 100.0
+        return (f"{ratio:.0f}% size, {s['ms_total'] / s['encodes']:.0f}ms/enc, "
+                f"{s['hits']} hits")
+
+
+_PREP: Optional[Preprocessor] = None
+
+
+def get_preprocessor() -> Optional[Preprocessor]:
+    global _PREP
+    if not PREPROCESS_ENABLED:
+        return None
+    if _PREP is None:
+        _PREP = Preprocessor()
+    return _PREP
+
+
+def encode(frame: frame_loader.Frame, max_pixels: Optional[int] = None) -> Encoded:
+    p = get_preprocessor()
+    if p is None:
+        return Encoded(frame.data_uri(), 0, 0, frame.size, frame.size, 0, 0.0, False)
+    return p.encode(frame, max_pixels)
+
+
+def stats_compact() -> str:
+    return _PREP.stats_compact() if _PREP is not None else "n/a"
@@ -2,10 +2,13 @@
 """
 Vision Summarizer for Zephyrbot
 
-- Robust JSON extraction from model output (balanced braces, codefence tolerant)
+- Robust JSON extraction from model output (json_extract: single pass, fences,
+  trailing commas, truncated output)
 - Schema normalization to {hp, objects, details}
-- Atomic-friendly screenshot reading with size guard
-- Backoff with jitter to avoid collisions with writer cadence
+- Single-read screenshot loading (frame_loader): one open/fstat/read per call,
+  hash + size guard + base64 from the same buffer, no subprocesses
+- Non-blocking readiness: circuit breakers for screenshot + VLM (qwen_client.BREAKER)
+  instead of in-thread backoff sleeps; vision_ready() tells callers whether to wait
 - Detailed debug logging (file size, mtime, md5)
 
 This module depends on qwen_client.analyze_image(image_path) returning either:
@@ -16,23 +19,25 @@ This module depends on qwen_client.analyze_image(image_path) returning either:
 
 from __future__ import annotations
 import os
-import subprocess
-import time
 import json
-import random
-import hashlib
 import logging
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 # Local client
+import clock
+import frame_loader
+import vision_preprocess
+import vision_ladder
 import qwen_client
+import vision_cache
+import json_extract
+from circuit_breaker import CircuitBreaker
 
 # -----------------------------------------------------------------------------
 # Configuration
 # -----------------------------------------------------------------------------
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO))
 logger = logging.getLogger("vision_summarizer")
 
 # Screenshot path; allow override via systemd Environment or .env
@@ -43,9 +48,16 @@ SCREENSHOT_FILE = os.getenv("SCREENSHOT_FILE", DEFAULT_SCREENSHOT)
 # Minimal bytes required to consider the screenshot valid (avoid 0B / tiny tmp)
 MIN_BYTES = int(os.getenv("ZEPHYR_VISION_MIN_BYTES", "10240"))  # 10 KB default
 
-# Backoff between vision attempts when upstream not ready
-BACKOFF_SEC = float(os.getenv("ZEPHYR_VISION_BACKOFF_SEC", "20"))
-JITTER_SEC = float(os.getenv("ZEPHYR_VISION_JITTER_SEC", "5"))
+# Screenshot not ready N times in a row → skip reads for RESET seconds (no sleeping)
+try:
+    SHOT_BREAKER_FAILS = int(os.getenv("SCREENSHOT_BREAKER_FAILS", "3"))
+except Exception:
+    SHOT_BREAKER_FAILS = 3
+try:
+    SHOT_BREAKER_RESET_SEC = float(os.getenv("SCREENSHOT_BREAKER_RESET_SEC", "5"))
+except Exception:
+    SHOT_BREAKER_RESET_SEC = 5.0
+SHOT_BREAKER = CircuitBreaker("screenshot", SHOT_BREAKER_FAILS, SHOT_BREAKER_RESET_SEC, clock=clock.monotonic)
 
 # Max length for raw log preview
 RAW_PREVIEW = 400
@@ -55,72 +67,6 @@ RAW_PREVIEW = 400
 # Helpers
 # -----------------------------------------------------------------------------
 
-def _md5sum(path: str) -> str:
-    h = hashlib.md5()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(1 << 20), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
-def _extract_first_json_object(s: str) -> Optional[Dict[str, Any]]:
-    """
-    Extract the first valid JSON object from a possibly chatty string.
-
-    Strategy:
-      1) Try direct json.loads
-      2) Strip codefences ```(json)? ... ```
-      3) Balanced-brace scan with string/escape awareness
-    """
-    if not s:
-        return None
-
-    # 1) direct
-    try:
-        return json.loads(s)
-    except Exception:
-        pass
-
-    # 2) remove codefences gently
-    s2 = s.replace("```json", "```").replace("```", "")
-
-    # 3) balanced-brace scan
-    depth = 0
-    start = -1
-    in_str = False
-    esc = False
-
-    for i, ch in enumerate(s2):
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == '\\':
-                esc = True
-            elif ch == '"':
-                in_str = False
-            continue
-
-        if ch == '"':
-            in_str = True
-            continue
-
-        if ch == '{':
-            if depth == 0:
-                start = i
-            depth += 1
-        elif ch == '}':
-            if depth > 0:
-                depth -= 1
-                if depth == 0 and start != -1:
-                    cand = s2[start:i + 1]
-                    try:
-                        return json.loads(cand)
-                    except Exception:
-                        start = -1  # continue scanning
-
-    return None
-
-
 def _normalize_hp_schema(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Normalize to {hp, objects, details}
@@ -181,33 +127,17 @@ def _normalize_hp_schema(data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def _valid_screenshot(path: str) -> Tuple[bool, Optional[str]]:
-    # Kurzfristige Race-Condition abfedern (Writer ersetzt Datei atomar)
-    for attempt in range(5):
-        if not os.path.exists(path):
-            time.sleep(0.15)
-            continue
-        try:
-            st = os.stat(path)
-        except Exception as e:
-            if attempt < 4:
-                time.sleep(0.15)
-                continue
-            return False, f"stat() fehlgeschlagen: {e}"
-
-        if st.st_size < MIN_BYTES:
-            if attempt < 4:
-                time.sleep(0.20)
-                continue
-            return False, f"Screenshot zu klein ({st.st_size} Bytes < {MIN_BYTES})."
-
-        return True, None
-    return False, f"Bild nicht gefunden: {path}"
+def vision_ready() -> Dict[str, Any]:
+    """Sofortige Auskunft ohne Aufruf: bereit, sonst Grund + Sekunden bis zum nächsten Versuch."""
+    for name, br in (("vlm", qwen_client.BREAKER), ("screenshot", SHOT_BREAKER)):
+        wait = br.retry_in()
+        if wait > 0:
+            return {"ready": False, "reason": name, "retry_in": round(wait, 1), "error": br.last_error}
+    return {"ready": True, "reason": None, "retry_in": 0.0, "error": None}
 
 
-def _sleep_backoff():
-    dt = BACKOFF_SEC + random.uniform(0.0, max(0.0, JITTER_SEC))
-    time.sleep(dt)
+def breaker_info() -> Dict[str, Dict[str, Any]]:
+    return {"vlm": qwen_client.BREAKER.info(), "screenshot": SHOT_BREAKER.info()}
 
 
 # -----------------------------------------------------------------------------
@@ -222,108 +152,98 @@ def get_vision_comment(image_path: Optional[str] = None) -> Optional[Dict[str, A
         dict with keys {hp, objects, details} or None on failure.
     """
     path = image_path or SCREENSHOT_FILE
-    # Try sibling extensions before validation (handles .jpg/.jpeg/.png swaps)
+    if not SHOT_BREAKER.allow():
+        logger.debug("[VISION] screenshot not ready – retry in %.0fs", SHOT_BREAKER.retry_in())
+        return None
+    # Einmal lesen (fstat + Puffer); Hash, Größenprüfung und base64 nutzen denselben Puffer.
+    # Fehlt die Datei/ist sie zu klein, probiert frame_loader die Geschwister-Endungen.
+    frame = None
+    err: Optional[str] = None
     try:
-        def _pick_sibling(pth: str) -> Optional[str]:
-            base, ext = os.path.splitext(pth)
-            # prefer jpg -> jpeg -> png (or reverse when given png)
-            ext_order = [".jpg", ".jpeg", ".png"]
-            # rotate so the current ext is first, then try others
-            ext_l = ext.lower()
-            if ext_l in ext_order:
-                order = [ext_l] + [e for e in ext_order if e != ext_l]
-            else:
-                order = ext_order
-            for e in order:
-                cand = base + e
-                if os.path.exists(cand):
-                    ok, _ = _valid_screenshot(cand)
-                    if ok:
-                        return cand
-            return None
-
-        sib = _pick_sibling(path) if not os.path.exists(path) else None
-        if sib and sib != path:
-            logger.debug("[VISION] primärer Pfad fehlt, weiche auf Sibling aus: %s", sib)
-            path = sib
-    except Exception:
-        pass
-
-    logger.debug("[VISION] pre-check exists=%s path=%s ENV SCREENSHOT_FILE=%r",
-                 os.path.exists(path), path, os.getenv("SCREENSHOT_FILE"))
-    ok, err = _valid_screenshot(path)
-    if not ok:
-        # Sibling retry also when file exists but is invalid (e.g., 0B tmp)
-        try:
-            sib2 = _pick_sibling(path)  # type: ignore[name-defined]
-            if sib2 and sib2 != path:
-                logger.debug("[VISION] Datei ungültig, Sibling-Retry: %s", sib2)
-                path = sib2
-                ok, err = _valid_screenshot(path)
-        except Exception:
-            pass
-
-    if not ok:
+        frame = frame_loader.load(path, min_bytes=MIN_BYTES)
+    except frame_loader.FrameError as e:
+        err = str(e)
+    if frame is None:
         # Fallback: try most recent screenshot from ring buffer if available
         try:
             from screenshots.screenshot_manager import latest as _latest
             rec = _latest()
-            if rec and isinstance(rec, dict):
-                alt_path = rec.get("path")
-                if alt_path and alt_path != path and os.path.exists(alt_path):
-                    alt_ok, _ = _valid_screenshot(alt_path)
-                    if alt_ok:
-                        logger.debug("[VISION] Fallback auf Ringpuffer: %s", alt_path)
-                        path = alt_path
-                        ok = True
+            alt_path = rec.get("path") if isinstance(rec, dict) else None
+            if alt_path and alt_path != path:
+                frame = frame_loader.try_load(alt_path, min_bytes=MIN_BYTES, siblings=False)
+                if frame is not None:
+                    logger.debug("[VISION] Fallback auf Ringpuffer: %s", alt_path)
         except Exception:
             pass
 
-    if not ok:
+    if frame is None:
         logger.error("[vision_summarizer] %s", err)
-        _sleep_backoff()
+        SHOT_BREAKER.record_failure(err)
         return None
+    SHOT_BREAKER.record_success()
+    if frame.path != path:
+        logger.debug("[VISION] Sibling statt primärem Pfad: %s", frame.path)
+    return summarize_frame(frame)
 
-    # Log file meta for clear diagnosis
-    try:
-        st = os.stat(path)
-        md5 = _md5sum(path)
-        logger.debug("[VISION] read file size=%dB mtime=%.0f md5=%s path=%s",
-                     st.st_size, st.st_mtime, md5, path)
-    except Exception as e:
-        logger.error("[vision_summarizer] Konnte Datei-Metadaten nicht lesen: %s", e)
-        _sleep_backoff()
-        return None
 
-    # Extra diag: stat via system tool to capture ownership/size in journal
-    try:
-        st_line = subprocess.check_output([
-            "/usr/bin/stat", "-c", "%n %sB %U:%G", path
-        ], timeout=2).decode().strip()
-        logger.debug("[VISION] stat: %s | ENV SCREENSHOT_FILE=%r", st_line, os.getenv("SCREENSHOT_FILE"))
-    except Exception as e:
-        logger.debug("[VISION] stat failed for %r: %r | ENV=%r", path, e, os.getenv("SCREENSHOT_FILE"))
+def cached_summary(md5: str) -> Optional[Dict[str, Any]]:
+    """Gecachtes {hp, objects, details} für diese Bild-MD5 (aktuelle VISION_LANG) oder None."""
+    lang = (os.getenv("VISION_LANG") or "de").strip().lower()
+    return vision_cache.get(md5, "summary", lang)
 
-    # Call model
-    try:
-        raw = qwen_client.analyze_image(image_path=path)
-    except Exception as e:
-        logger.exception("[vision_summarizer] analyze_image() Exception: %s", e)
-        _sleep_backoff()
-        return None
 
-    if raw is None:
-        logger.debug("Vision-Ergebnis leer/None (Upstream nicht bereit oder Fehler).")
-        _sleep_backoff()
-        return None
+def summarize_frame(frame: "frame_loader.Frame") -> Optional[Dict[str, Any]]:
+    """
+    Bereits geladenen Frame analysieren (Cache → VLM → Parse → Normalize).
 
-    # Parse
-    if isinstance(raw, dict):
-        data = _normalize_hp_schema(raw)
+    Ohne Screenshot-Breaker und Ringpuffer-Fallback – für Aufrufer, die ihre
+    Bilder selbst auswählen (Batch-Backfill).
+    """
+    md5 = frame.md5
+    logger.debug("[VISION] read file size=%dB mtime=%.0f md5=%s path=%s",
+                 frame.size, frame.mtime, md5, frame.path)
+
+    # Gleiche Bytes, gleiche Sprache → Ergebnis aus dem Cache statt erneuter Inferenz
+    lang = (os.getenv("VISION_LANG") or "de").strip().lower()
+    cached = vision_cache.get(md5, "summary", lang)
+    if cached is not None:
+        logger.debug("[VISION] cache hit md5=%s", md5)
+        return cached
+
+    # Call model – Auflösungsleiter: kleines Pixelbudget zuerst, höher nur bei
+    # niedriger Objekt-Konfidenz oder leerer Objektliste
+    parsed: List[int] = []
+
+    def _step(max_pixels: int) -> Optional[Dict[str, Any]]:
+        try:
+            raw = qwen_client.analyze_image(image_path=frame.path, frame=frame, max_pixels=max_pixels)
+        except Exception as e:
+            logger.exception("[vision_summarizer] analyze_image() Exception: %s", e)
+            return None
+        if raw is None:
+            logger.debug("Vision-Ergebnis leer/None (Upstream nicht bereit oder Fehler, vlm %s).",
+                         qwen_client.BREAKER.state)
+            return None
+        data, ok = _parse_raw(raw)
+        if ok:
+            parsed.append(id(data))
         return data
 
+    data, trail = vision_ladder.run(_step)
+    if trail:
+        logger.debug("[VISION] ladder md5=%s %s", md5, trail)
+    if data is not None and id(data) in parsed:
+        vision_cache.put(md5, "summary", data, lang)
+    return data
+
+
+def _parse_raw(raw: Any) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Modellausgabe → ({hp, objects, details}, aus JSON?). Nicht-JSON liefert Fallback-Details."""
+    if isinstance(raw, dict):
+        return _normalize_hp_schema(raw), True
+
     if isinstance(raw, str):
-        parsed = _extract_first_json_object(raw)
+        parsed = json_extract.extract_object(raw)
         if not parsed:
             # Fallback: liefere minimalen Inhalt als details, damit der Bot posten kann
             try:
@@ -336,18 +256,15 @@ def get_vision_comment(image_path: Optional[str] = None) -> Optional[Dict[str, A
                 fallback = {"hp": None, "objects": [], "details": s}
                 logger.warning("[vision_summarizer] Keine gültige JSON-Antwort. Fallback-Details verwendet. Raw (gekürzt): %s",
                                raw[:RAW_PREVIEW])
-                return fallback
+                return fallback, False
             except Exception:
                 logger.warning("[vision_summarizer] Keine gültige JSON-Antwort. Raw (gekürzt): %s",
                                raw[:RAW_PREVIEW])
-                _sleep_backoff()
-                return None
-        data = _normalize_hp_schema(parsed)
-        return data
+                return None, False
+        return _normalize_hp_schema(parsed), True
 
     logger.warning("[vision_summarizer] Unerwarteter Modell-Output-Typ: %r", type(raw))
-    _sleep_backoff()
-    return None
+    return None, False
 
 
 def summarize_image(image_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -364,28 +281,23 @@ def ask_image_question(image_path: str, question: str) -> Optional[str]:
     Returns the assistant content as a string, or None on error.
     """
     try:
-        if not os.path.exists(image_path):
-            logger.error("[vision_summarizer] Bild nicht gefunden: %s", image_path)
+        import json as _json, urllib.request as _ur
+        try:
+            frame = frame_loader.load(image_path, siblings=False)
+        except frame_loader.FrameError as e:
+            logger.error("[vision_summarizer] %s", e)
             return None
 
-        # Build data URI using same mimetype logic as qwen_client
-        import base64, mimetypes, json as _json, urllib.request as _ur
-
-        mime, _ = mimetypes.guess_type(image_path)
-        if not mime:
-            ext = os.path.splitext(image_path)[1].lower()
-            if ext == ".png":
-                mime = "image/png"
-            else:
-                mime = "image/jpeg"
-        with open(image_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode("ascii")
-        data_uri = f"data:{mime};base64,{b64}"
-
         # Language toggle via VISION_LANG (default: German)
         _lang = (os.getenv("VISION_LANG") or "de").strip().lower()
         _is_en = _lang.startswith("en")
 
+        md5 = frame.md5
+        cached = vision_cache.get(md5, "question", _lang, question or "")
+        if cached is not None:
+            return cached
+        data_uri = vision_preprocess.encode(frame).data_uri
+
         messages = [
             {
                 "role": "user",
@@ -408,10 +320,21 @@ def ask_image_question(image_path: str, question: str) -> Optional[str]:
             data=_json.dumps(payload).encode("utf-8"),
             headers={"Content-Type": "application/json"},
         )
-        with _ur.urlopen(req, timeout=getattr(qwen_client, "QWEN_TIMEOUT", 30.0)) as r:
-            body = r.read().decode("utf-8")
-            data = _json.loads(body)
-            return data["choices"][0]["message"]["content"]
+        if not qwen_client.BREAKER.allow():
+            logger.debug("[vision_summarizer] VLM nicht bereit – retry in %.0fs", qwen_client.BREAKER.retry_in())
+            return None
+        try:
+            with _ur.urlopen(req, timeout=getattr(qwen_client, "QWEN_TIMEOUT", 30.0)) as r:
+                body = r.read().decode("utf-8")
+                data = _json.loads(body)
+                answer = data["choices"][0]["message"]["content"]
+        except Exception as e:
+            qwen_client.BREAKER.record_failure(type(e).__name__)
+            raise
+        qwen_client.BREAKER.record_success()
+        if answer:
+            vision_cache.put(md5, "question", answer, _lang, question or "")
+        return answer
     except Exception as e:
         logger.exception("[vision_summarizer] ask_image_question() Exception: %s", e)
         return None
@@ -422,5 +345,6 @@ def ask_image_question(image_path: str, question: str) -> Optional[str]:
 # -----------------------------------------------------------------------------
 
 if __name__ == "__main__":
+    logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO))
     res = get_vision_comment()
     print(json.dumps(res, ensure_ascii=False, indent=2))
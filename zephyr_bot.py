@@ -10,38 +10,80 @@ import os
 import sys
 import time
 import logging
-from typing import Optional
-
-try:
-    # .env automatisch laden, wenn vorhanden
-    from dotenv import load_dotenv
-    from pathlib import Path
-    _root = Path(__file__).resolve().parent
-    _env_path = _root / ".env"
-    if _env_path.exists():
-        load_dotenv(_env_path)
-except Exception:
-    pass
-
-from vision_summarizer import summarize_image, ask_image_question
-import orchestrator
-from commentary_engine import make_comment, should_post_now, prepare_for_twitch, generate_one_sentence
-from anti_flood import AntiFlood
-from twitch_client import TwitchClient
-from youtube_client import YouTubeClient
-from screenshots.screenshot_manager import ingest, list_recent, get_by_sid, latest, count as shots_count
-import bot_health
-import os
 import re
+from typing import Any, Dict, Optional
+
+import startup_profile
+from startup_profile import phase
+
+with phase("load .env"):
+    try:
+        # .env automatisch laden, wenn vorhanden
+        from dotenv import load_dotenv
+        from pathlib import Path
+        _root = Path(__file__).resolve().parent
+        _env_path = _root / ".env"
+        if _env_path.exists():
+            load_dotenv(_env_path)
+    except Exception:
+        pass
+
+# Nur was für "IRC verbunden + Befehle annehmen" nötig ist, wird sofort geladen.
+# Vision, Orchestrator, Kommentar-Engine, LLM-Router, Screenshot-Archiv und
+# Health-Checks (requests) kommen verzögert über lazy_import beim ersten Gebrauch.
+with phase("import lazy_import"):
+    import clock
+    import lazy_import
+with phase("import anti_flood"):
+    from anti_flood import AntiFlood
+with phase("import twitch_client"):
+    from twitch_client import TwitchClient
+with phase("import youtube_client"):
+    from youtube_client import YouTubeClient
+with phase("import joke_pool"):
+    import joke_pool
+with phase("import health_monitor"):
+    import health_monitor
+with phase("import output_sinks"):
+    import output_sinks
+with phase("import bot_config"):
+    import bot_config
+with phase("import cadence"):
+    import cadence
+with phase("import tick_journal"):
+    import tick_journal
+with phase("import state_snapshot"):
+    import state_snapshot
+with phase("import reply_classifier"):
+    import reply_classifier
+with phase("import vision_cache"):
+    import vision_cache
+with phase("import frame_gate"):
+    import frame_gate
+with phase("import vision_preprocess"):
+    import vision_preprocess
+with phase("import region_crop"):
+    import region_crop
+with phase("import frame_index"):
+    import frame_index
+with phase("import vision_ladder"):
+    import vision_ladder
+with phase("import game_state_tracker"):
+    import game_state_tracker
+with phase("import ocr_prepass"):
+    import ocr_prepass
 
 # -----------------------------------------
-# Setup Logging
+# Setup Logging (erst in main(), nicht beim Import)
 # -----------------------------------------
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format="%(asctime)s [%(name)-12s] [%(levelname)-5s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+def _setup_logging():
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s [%(name)-12s] [%(levelname)-5s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+
 logger = logging.getLogger("MAIN_BOT")
 
 # -----------------------------------------
@@ -50,33 +92,15 @@ logger = logging.getLogger("MAIN_BOT")
 SCREENSHOT_FILE = os.getenv(
     "SCREENSHOT_FILE", "/root/zephyr/screenshots/current_screenshot.jpg"
 )
-POST_SALT = os.getenv("POST_SALT", ".")
-INTERVAL = int(os.getenv("SCREENSHOT_ANALYSIS_INTERVAL", "10"))
-INTERVAL_JITTER = float(os.getenv("TICK_JITTER_SEC", "1.0"))
-# Für 10s-Posting-Ziel sinnvoll senken (per .env überschreibbar)
-SHORT_CHAT_MIN_INTERVAL = int(os.getenv("SHORT_CHAT_MIN_INTERVAL", "8"))
-CHAT_GLOBAL_COOLDOWN_SEC = int(os.getenv("CHAT_GLOBAL_COOLDOWN_SEC", "120"))
+# Takt, Cooldowns, Chat-Befehle usw. stehen in bot_config (typisiert, live
+# per SIGHUP/.env-Änderung neu ladbar); hier nur Werte, die einen Neustart brauchen.
 
 ENABLE_TWITCH = os.getenv("ENABLE_TWITCH", "true").lower() == "true"
 ENABLE_YOUTUBE = os.getenv("ENABLE_YOUTUBE", "true").lower() == "true"
 # Suppress automatic Twitch output (vision posts) but still connect for commands
 TWITCH_SILENT_AUTO = os.getenv("TWITCH_SILENT_AUTO", "false").lower() == "true"
 ORCHESTRATOR_ENABLED = os.getenv("ORCHESTRATOR_ENABLED", "true").lower() == "true"
-
-# Random reply settings (disabled by default)
-RAND_REPLY_ENABLED = os.getenv("TWITCH_RANDOM_REPLY", "false").lower() == "true"
-try:
-    RAND_REPLY_RATE = float(os.getenv("TWITCH_RANDOM_REPLY_RATE", "0.10"))  # 10% chance
-except Exception:
-    RAND_REPLY_RATE = 0.10
-try:
-    RAND_REPLY_MIN_GAP = int(os.getenv("TWITCH_RANDOM_REPLY_MIN_GAP_SEC", "90"))
-except Exception:
-    RAND_REPLY_MIN_GAP = 90
-RAND_REPLY_IGNORE = [s.strip().lower() for s in os.getenv(
-    "TWITCH_RANDOM_REPLY_IGNORE_USERS",
-    "nightbot,streamelements,moobot,anotherttvviewer"
-).split(",") if s.strip()]
+MULTIPROC_ENABLED = os.getenv("ZEPHYR_MULTIPROC", "false").lower() == "true"
 
 # -----------------------------------------
 # AntiFlood
@@ -87,7 +111,18 @@ ANTI_FLOOD = AntiFlood()
 TWITCH_CLIENT: Optional[TwitchClient] = None
 # Alias-Name, damit Handler auch 'twitch' nutzen kann
 twitch: Optional[TwitchClient] = None
+# Ausgabe-Sinks für Vision-Posts (in main() aus den aktiven Clients gebaut)
+SINKS = None
+# Zähler des Vision-Loops (Simulation, !health verbose)
+STATS: Dict[str, int] = {"ticks": 0, "skips": 0, "inference_saved": 0}
+# Adaptive Tick-Kadenz des Vision-Loops
+CADENCE = cadence.CadenceController()
+# Stufen-Prozesse (nur mit ZEPHYR_MULTIPROC=true / --multiproc)
+PIPELINE = None
 _last_rand_reply_ts: float = 0.0
+_rand_reply_llm_calls: int = 0      # LLM-Aufrufe für Zufallsantworten in diesem Stream
+_last_sent_ts: float = 0.0  # letzter Vision-Post (globaler Cooldown)
+_last_vision_post: Optional[Dict[str, Any]] = None
 _startup_vision_done: bool = False
 
 # Startup vision env flags
@@ -103,9 +138,65 @@ except Exception:
     STARTUP_VISION_MAX_WAIT_SEC = 25
 
 
+# -----------------------------------------
+# Verzögerte Modul-Zugriffe
+# -----------------------------------------
+# Dünne Wrapper statt Top-Level-Imports: Namen bleiben Modul-Attribute
+# (monkeypatch-bar in Tests), der eigentliche Import passiert beim ersten Aufruf.
+def summarize_image(image_path: Optional[str] = None):
+    return lazy_import.module("vision_summarizer").summarize_image(image_path)
+
+
+def ask_image_question(image_path: str, question: str):
+    return lazy_import.module("vision_summarizer").ask_image_question(image_path, question)
+
+
+def vision_ready() -> Dict[str, Any]:
+    """Breaker-Zustand von Screenshot/VLM, ohne zu warten (siehe vision_summarizer)."""
+    try:
+        return lazy_import.module("vision_summarizer").vision_ready()
+    except Exception:
+        return {"ready": True, "reason": None, "retry_in": 0.0}
+
+
+def _not_ready_msg(default: str) -> str:
+    """Antwort für Chat-Befehle, wenn die Vision gerade nichts liefert."""
+    r = vision_ready()
+    if r.get("ready"):
+        return default
+    what = "Vision-Modell" if r.get("reason") == "vlm" else "Screenshot"
+    return f"⏳ {what} gerade nicht bereit – nochmal in ~{max(1, int(r.get('retry_in') or 0))}s."
+
+
+def make_comment(vision: Dict[str, Any], *, salt: str = "") -> Optional[str]:
+    return lazy_import.module("commentary_engine").make_comment(vision, salt=salt)
+
+
+def prepare_for_twitch(text: str, *, salt: str = "") -> str:
+    return lazy_import.module("commentary_engine").prepare_for_twitch(text, salt=salt)
+
+
+def generate_one_sentence(vision: Dict[str, Any]) -> str:
+    return lazy_import.module("commentary_engine").generate_one_sentence(vision)
+
+
+def should_post_now() -> bool:
+    return lazy_import.module("commentary_engine").should_post_now()
+
+
+def _shots():
+    """screenshots.screenshot_manager oder None, wenn das Archiv fehlt."""
+    return lazy_import.optional("screenshots.screenshot_manager")
+
+
+def _llm_chain():
+    """llm_router.run_llm_chain oder None (Import einmalig, auch bei Fehlschlag)."""
+    return lazy_import.optional("llm_router", "run_llm_chain")
+
+
 def get_help_message() -> str:
     return (
-        "Befehle: !links, !shots [n], !shot <latest|sid>, !askshot <latest|sid> <frage>, "
+        "Befehle: !links, !shots [n], !shot <latest|sid>, !askshot <latest|sid> <frage>, !similar <latest|sid> [n], "
         "!bild (Analyse), !witz (kurzer Witz), !health, !budget"
     )
 
@@ -136,14 +227,14 @@ def get_vision_comment(image_path: str) -> Optional[str]:
         return None
 
     # Erzeuge Short-Chat Kommentar
-    comment = make_comment(vision, salt=POST_SALT)
+    comment = make_comment(vision, salt=bot_config.get().post_salt)
 
     # Debug-Zusammenfassung fürs Log
     full_text = (
         f"🎯 Vision-Analyse "
         f"HP: {vision.get('hp')} "
         f"Objekte: {_labels_for_log(vision)} "
-        f"Details: {str(vision.get('details') or '(keine)').replace('\n', ' ')}"
+        f"Details: {' '.join(str(vision.get('details') or '(keine)').splitlines())}"
     )
     safe = full_text
     if len(safe) > 240:
@@ -160,7 +251,6 @@ def get_vision_comment(image_path: str) -> Optional[str]:
 
 
 def schedule_startup_vision():
-    global _startup_vision_done
     if _startup_vision_done:
         return
     if not AUTO_VISION_ON_START:
@@ -170,16 +260,13 @@ def schedule_startup_vision():
         logger.info("[startup_vision] SKIP: TWITCH_SILENT_AUTO=true")
         return
     try:
-        import threading
         logger.info("[startup_vision] scheduling in %ss", STARTUP_VISION_DELAY_SEC)
         def _runner():
             try:
                 safe_post_startup_vision()
             except Exception as e:
                 logger.warning("[startup_vision] error: %s", e)
-        t = threading.Timer(STARTUP_VISION_DELAY_SEC, _runner)
-        t.daemon = True
-        t.start()
+        clock.call_later(STARTUP_VISION_DELAY_SEC, _runner)
     except Exception as e:
         logger.warning("[startup_vision] schedule failed: %s", e)
 
@@ -188,9 +275,9 @@ def safe_post_startup_vision():
     global _startup_vision_done
     if _startup_vision_done:
         return
-    deadline = time.time() + max(3, STARTUP_VISION_MAX_WAIT_SEC)
+    deadline = clock.time() + max(3, STARTUP_VISION_MAX_WAIT_SEC)
     attempt = 0
-    while time.time() < deadline:
+    while clock.time() < deadline:
         attempt += 1
         vis = None
         try:
@@ -211,7 +298,7 @@ def safe_post_startup_vision():
                 _startup_vision_done = True
             return
         # Not yet available – small wait and retry
-        time.sleep(2.0)
+        clock.sleep(2.0)
     logger.warning("[startup_vision] no vision available within %ss – skip", STARTUP_VISION_MAX_WAIT_SEC)
     _startup_vision_done = True
 
@@ -229,7 +316,7 @@ def handle_chat_message(user, is_mod, text):
 
     # quick links
     if re.match(r"^!links\b", t, re.I):
-        url = os.getenv("LINKS_URL", "https://linktr.ee/derleiti")
+        url = bot_config.get().links_url
         if twitch:
             # explizit als Command-Bucket senden (bypass falscher Heuristik bei 'Links ·')
             twitch.say(prepare_for_twitch(f"Links · {url}"), bucket="command")
@@ -242,7 +329,7 @@ def handle_chat_message(user, is_mod, text):
             if vis:
                 msg = make_comment(vis) or "🎯 Analyse erstellt"
             else:
-                msg = "⚠️ Keine Analyse verfügbar"
+                msg = _not_ready_msg("⚠️ Keine Analyse verfügbar")
             if TWITCH_CLIENT:
                 TWITCH_CLIENT.say(prepare_for_twitch(msg), bucket="command")
         except Exception:
@@ -250,23 +337,9 @@ def handle_chat_message(user, is_mod, text):
                 TWITCH_CLIENT.say("⚠️ Vision fehlgeschlagen.", bucket="system")
         return
 
-    # kleiner witz
+    # kleiner witz – aus dem vorproduzierten Pool, statische Liste nur wenn leer
     if re.match(r"^!witz\b", t, re.I):
-        reply = None
-        # Optional via LLM
-        try:
-            from llm_router import run_llm_chain as _llm
-        except Exception:
-            _llm = None
-        if _llm:
-            try:
-                prompt = (
-                    "Erzähle einen sehr kurzen, harmlosen Witz auf Deutsch. "
-                    "Eine Zeile, max. 120 Zeichen, ohne Markdown."
-                )
-                reply = _llm(prompt)
-            except Exception:
-                reply = None
+        reply = joke_pool.take("witz")
         if not reply:
             jokes = [
                 "Warum hat die KI eine Brille? Damit sie besser lernt!",
@@ -284,8 +357,8 @@ def handle_chat_message(user, is_mod, text):
 
     # mod-only: budget status
     m = re.match(r"^!(\w+)\b", t, re.I)
-    if m and m.group(1).lower() == os.getenv("BUDGET_CMD","budget").lower():
-        require_mod = (os.getenv("BUDGET_REQUIRE_MOD","true").lower() != "false")
+    if m and m.group(1).lower() == bot_config.get().budget_cmd.lower():
+        require_mod = bot_config.get().budget_require_mod
         if require_mod and not is_mod:
             return  # still & silent
         try:
@@ -309,7 +382,8 @@ def handle_chat_message(user, is_mod, text):
     if m:
         n = int(m.group(1) or 5)
         n = max(1, min(n, 10))
-        recs = list_recent(n)
+        sm = _shots()
+        recs = sm.list_recent(n) if sm else []
         if not recs:
             if TWITCH_CLIENT:
                 TWITCH_CLIENT.say("📁 Keine gespeicherten Screenshots.", bucket="command")
@@ -325,14 +399,17 @@ def handle_chat_message(user, is_mod, text):
     m = re.match(r"^!shot\s+(latest|\d+)$", t, re.I)
     if m:
         sel = m.group(1).lower()
-        rec = latest() if sel == "latest" else get_by_sid(int(sel))
+        sm = _shots()
+        rec = None
+        if sm:
+            rec = sm.latest() if sel == "latest" else sm.get_by_sid(int(sel))
         if not rec:
             if TWITCH_CLIENT:
                 TWITCH_CLIENT.say("❓ Screenshot nicht gefunden.", bucket="command")
             return
         try:
             vis = summarize_image(rec["path"])
-            msg = make_comment(vis) if vis else f"🎯 {rec['name']}"
+            msg = make_comment(vis) if vis else _not_ready_msg(f"🎯 {rec['name']}")
             if TWITCH_CLIENT:
                 TWITCH_CLIENT.say(prepare_for_twitch(msg), bucket="command")
         except Exception:
@@ -340,19 +417,44 @@ def handle_chat_message(user, is_mod, text):
                 TWITCH_CLIENT.say("⚠️ Vision fehlgeschlagen.", bucket="system")
         return
 
+    # Ähnliche Shots (frame_index)
+    m = re.match(r"^!similar\s+(latest|\d+)(?:\s+(\d+))?$", t, re.I)
+    if m:
+        sel, n = m.group(1).lower(), max(1, min(int(m.group(2) or 3), 5))
+        sm = _shots()
+        rec = (sm.latest() if sel == "latest" else sm.get_by_sid(int(sel))) if sm else None
+        idx = frame_index.get_index()
+        hits = idx.similar_to_sid(int(rec["sid"]), n) if rec and idx is not None else []
+        if not TWITCH_CLIENT:
+            return
+        if not rec:
+            TWITCH_CLIENT.say("❓ Screenshot nicht gefunden.", bucket="command")
+        elif not hits:
+            TWITCH_CLIENT.say("🔍 Keine ähnlichen Shots im Index.", bucket="command")
+        else:
+            parts = [f"sid:{h.get('sid')} ({sim:.2f}) · {time.strftime('%H:%M:%S', time.localtime(h.get('ts') or 0))}"
+                     for h, sim in hits]
+            TWITCH_CLIENT.say(prepare_for_twitch(f"🔍 ähnlich zu sid:{rec['sid']}: " + " | ".join(parts)),
+                              bucket="command")
+        return
+
     # Gezielt fragen
     m = re.match(r"^!askshot\s+(latest|\d+)\s+(.+)$", t, re.I)
     if m:
         sel, q = m.group(1).lower(), m.group(2).strip()
-        rec = latest() if sel == "latest" else get_by_sid(int(sel))
+        sm = _shots()
+        rec = None
+        if sm:
+            rec = sm.latest() if sel == "latest" else sm.get_by_sid(int(sel))
         if not rec:
             if TWITCH_CLIENT:
                 TWITCH_CLIENT.say("❓ Screenshot nicht gefunden.", bucket="command")
             return
         try:
             ans = ask_image_question(rec["path"], q)
+            msg = f"🔎 {ans}" if ans else _not_ready_msg("⚠️ Keine Antwort verfügbar")
             if TWITCH_CLIENT:
-                TWITCH_CLIENT.say(prepare_for_twitch(f"🔎 {ans}"), bucket="command")
+                TWITCH_CLIENT.say(prepare_for_twitch(msg), bucket="command")
         except Exception:
             if TWITCH_CLIENT:
                 TWITCH_CLIENT.say("⚠️ Analyse fehlgeschlagen.", bucket="system")
@@ -360,8 +462,9 @@ def handle_chat_message(user, is_mod, text):
 
     # Health summary
     if re.match(r"^!health\b", t, re.I):
-        host = os.getenv("VISION_HOST_LABEL") or os.uname().nodename
-        source = os.getenv("VISION_SOURCE_LABEL", "screen@unknown")
+        cfg = bot_config.get()
+        host = cfg.vision_host_label or os.uname().nodename
+        source = cfg.vision_source_label
         parts = [f"♥ health [{host}|{source}]"]
         verbose = ("verbose" in t.lower())
 
@@ -372,39 +475,24 @@ def handle_chat_message(user, is_mod, text):
             status = "ERR"
         parts.append(f"twitch: {status}")
 
-        # irc rtt (optional)
-        if os.getenv("HEALTH_INCLUDE_IRC","true").lower() != "false":
-            try:
-                rtt = twitch.ping(int(os.getenv("HEALTH_IRC_TIMEOUT_MS","800"))) if twitch else None
-                if rtt is not None:
-                    parts.append(f"irc: {rtt}ms")
-                else:
-                    parts.append("irc: n/a")
-            except Exception:
+        # Probes (irc/qwen/auth/shots) laufen im Hintergrund – hier nur Snapshot rendern
+        mon = health_monitor.get_monitor()
+        snap = mon.snapshot() if mon else {}
+        if cfg.health_include_irc:
+            irc = snap.get("irc")
+            if irc and irc.get("ok"):
+                parts.append(health_monitor.fmt_entry("irc", irc, verbose=True) if verbose else f"irc: {irc['ms']}ms")
+            else:
                 parts.append("irc: n/a")
-
-        # qwen (optional)
-        if bot_health.INC_QWEN:
-            qok, qms, qerr = bot_health.check_qwen(
-                os.getenv("QWEN_BASE","http://127.0.0.1:8010"),
-                os.getenv("QWEN_MODEL","qwen-vl"),
-                int(os.getenv("HEALTH_TIMEOUT_MS","1500"))
-            )
-            parts.append(bot_health.fmt_check("qwen", qok, qms, qerr, show_err=verbose))
-
-        # auth (optional)
-        if bot_health.INC_AUTH:
-            aok, ams, aerr = bot_health.check_auth(
-                os.getenv("AUTH_BASE_URL","http://127.0.0.1:8088"),
-                int(os.getenv("HEALTH_TIMEOUT_MS","1500"))
-            )
-            parts.append(bot_health.fmt_check("auth", aok, ams, aerr, show_err=verbose))
-
-        # screenshots count + last post age
-        try:
-            parts.append(f"shots: {shots_count()}")
-        except Exception:
-            parts.append("shots: n/a")
+        for name in ("qwen", "auth"):
+            if name in snap:
+                parts.append(health_monitor.fmt_entry(name, snap[name], verbose=verbose))
+        shots = snap.get("shots")
+        parts.append(f"shots: {shots['info']}" if shots and shots.get("ok") else "shots: n/a")
+        if "vision_summarizer" in sys.modules:
+            vr = vision_ready()
+            if not vr.get("ready"):
+                parts.append(f"vision: {vr['reason']} OPEN ({vr['retry_in']:.0f}s)")
         try:
             age = twitch.last_post_age_seconds() if twitch else None
             if age is not None:
@@ -423,6 +511,17 @@ def handle_chat_message(user, is_mod, text):
                 parts.append(f"budget: {used}/{limit} ({left}s)")
         except Exception:
             pass
+        if verbose and SINKS is not None and SINKS.workers:
+            parts.append(f"sinks: {SINKS.stats_compact()}")
+        if verbose and ORCHESTRATOR_ENABLED:
+            parts.append(f"cadence: {CADENCE.compact()}, saved {STATS['inference_saved']}")
+        if verbose:
+            parts.append(f"vcache: {vision_cache.stats_compact()}, fgate: {frame_gate.stats_compact()}, "
+                         f"prep: {vision_preprocess.stats_compact()}, crop: {region_crop.stats_compact()}, "
+                         f"ladder: {vision_ladder.stats_compact()}, findex: {frame_index.stats_compact()}, "
+                         f"gstate: {game_state_tracker.stats_compact()}, ocr: {ocr_prepass.stats_compact()}")
+        if verbose and PIPELINE is not None:
+            parts.append(f"procs: {PIPELINE.stats_compact()}")
 
         if TWITCH_CLIENT:
             TWITCH_CLIENT.say(prepare_for_twitch(" · ".join(parts)), bucket="command")
@@ -430,31 +529,38 @@ def handle_chat_message(user, is_mod, text):
 
     # --- Random lightweight replies to regular chat lines ---
     try:
-        if not RAND_REPLY_ENABLED:
+        cfg = bot_config.get()
+        if not cfg.rand_reply_enabled:
             return
         if not t or t.startswith("!"):
             return  # ignore commands/empties
         sender = (user or "").strip().lower()
-        if not sender or sender in RAND_REPLY_IGNORE:
+        if not sender or sender in cfg.rand_reply_ignore:
             return
         # avoid self-replies
-        self_name = (os.getenv("TWITCH_USERNAME", "") or os.getenv("BOT_USERNAME", "")).strip().lower()
+        self_name = cfg.bot_username.strip().lower()
         if self_name and sender == self_name:
             return
-        # probability gate
-        import random as _random
-        if _random.random() > max(0.0, min(1.0, RAND_REPLY_RATE)):
-            return
+        reply_classifier.log_event("line", sender, t)
+        # relevance gate: trainiertes Modell, sonst Würfel
+        model = reply_classifier.get_model() if cfg.rand_reply_classifier else None
+        if model is not None:
+            if model.score(t, self_name) < cfg.rand_reply_threshold:
+                return
+        else:
+            import random as _random
+            if _random.random() > cfg.rand_reply_rate:
+                return
         # cooldown gate
-        global _last_rand_reply_ts
-        now = time.time()
-        if (now - _last_rand_reply_ts) < RAND_REPLY_MIN_GAP:
+        global _last_rand_reply_ts, _rand_reply_llm_calls
+        now = clock.time()
+        if (now - _last_rand_reply_ts) < cfg.rand_reply_min_gap_sec:
+            return
+        # LLM-Budget pro Stream
+        if cfg.rand_reply_llm_budget and _rand_reply_llm_calls >= cfg.rand_reply_llm_budget:
             return
         # generate concise reply using LLM router (fallback-safe)
-        try:
-            from llm_router import run_llm_chain as _llm
-        except Exception:
-            _llm = None
+        _llm = _llm_chain()
         prompt = (
             "Antworte im Twitch-Chat kurz, freundlich und themenbezogen in DE. "
             "Maximal 1 Satz, höchstens 120 Zeichen, kein Markdown. "
@@ -462,165 +568,333 @@ def handle_chat_message(user, is_mod, text):
         )
         reply = None
         if _llm:
+            _rand_reply_llm_calls += 1
             try:
                 reply = _llm(prompt)
             except Exception:
                 reply = None
         if not reply:
-            # simple echo fallback
-            reply = f"@{user} verstanden! 😊"
+            # Füllzeile aus dem Pool, sonst simple echo fallback
+            reply = joke_pool.take("filler") or f"@{user} verstanden! 😊"
         msg = f"@{user} {reply}" if not reply.startswith(f"@{user}") else reply
         if twitch:
             twitch.say(prepare_for_twitch(msg), bucket="command")
             _last_rand_reply_ts = now
+            reply_classifier.log_event("reply", sender, msg, to=t)
     except Exception:
         # never break the chat loop due to rand-replies
         pass
 
 
+def _publish_vision(tw_msg: str, yt_msg: str, extra: Optional[Dict[str, Any]] = None,
+                    trace: Optional[Dict[str, Any]] = None) -> bool:
+    """AntiFlood + globaler Cooldown, dann an alle Sinks. True = veröffentlicht.
+    `trace` erhält die Entscheidung ("posted" / "drop:…") fürs Tick-Journal."""
+    if trace is None:
+        trace = {}
+    global _last_sent_ts, _last_vision_post
+    cfg = bot_config.get()
+    if not ANTI_FLOOD.allow(tw_msg, min_interval=cfg.short_chat_min_interval, salt=cfg.post_salt):
+        logger.info(
+            "[vision→twitch] DROP durch AntiFlood: min_interval=%ss (Text gehasht mit salt)",
+            cfg.short_chat_min_interval,
+        )
+        trace["decision"] = "drop:antiflood"
+        return False
+    now = clock.time()
+    if (now - _last_sent_ts) < cfg.chat_global_cooldown_sec:
+        logger.debug("Global Cooldown: noch %.1fs – übersprungen", cfg.chat_global_cooldown_sec - (now - _last_sent_ts))
+        trace["decision"] = "drop:cooldown"
+        return False
+    if twitch and TWITCH_SILENT_AUTO:
+        logger.info("[vision] SKIP: TWITCH_SILENT_AUTO=true")
+    # Zustellung asynchron pro Sink (eigene Queue/Retry/Breaker) – blockiert den Tick nicht
+    msg = {"twitch": tw_msg, "youtube": yt_msg}
+    msg.update(extra or {})
+    SINKS.publish(msg)
+    _last_sent_ts = clock.time()
+    _last_vision_post = msg
+    trace["decision"] = "posted"
+    return True
+
+
 # -----------------------------------------
 # Haupt-Loop
 # -----------------------------------------
-def main():
+def _on_irc_ready():
+    startup_profile.mark("irc ready (366/376)")
+    schedule_startup_vision()
+
+
+def _print_startup_profile():
+    """--profile-startup: verzögerte Importe einmal messen und Zeitbaum ausgeben."""
+    with phase("deferred imports (first use, nach Ready)"):
+        for name in ("commentary_engine", "vision_summarizer", "orchestrator",
+                     "llm_router", "bot_health", "screenshots.screenshot_manager"):
+            lazy_import.optional(name)
+    print(startup_profile.report("zephyr startup profile (ms)"), file=sys.stderr, flush=True)
+
+
+def _next_post_in() -> float:
+    """Sekunden, bis ein Vision-Post frühestens rausgehen kann (globaler Cooldown + Twitch-Budget)."""
+    cfg = bot_config.get()
+    wait = max(0.0, cfg.chat_global_cooldown_sec - (clock.time() - _last_sent_ts))
+    if twitch and not TWITCH_SILENT_AUTO:
+        wait = max(wait, twitch.next_slot_in("vision"))
+    return wait
+
+
+# optionale Trace-Felder aus orchestrator.run_tick: nur ins Journal, wenn gesetzt
+_JOURNAL_TRACE_KEYS = ("frame_changed", "frame_gate", "ocr", "region", "ladder", "payload",
+                       "state_delta", "writer_prompt_chars")
+
+
+def _blocked_skip_sec(cfg) -> float:
+    """Sekunden ohne Inferenz, weil jeder Post bis dahin verworfen würde (0 = jetzt analysieren).
+
+    Wartet bis kurz vor den nächsten freien Slot, sodass der Tick genau dann fertig wird.
+    """
+    wait = _next_post_in() if cfg.skip_blocked_ticks else 0.0
+    expected = CADENCE.expected_latency()
+    if wait <= expected:
+        return 0.0
+    # kleiner Aufschlag: Budget-Fenster geben den Slot erst nach Ablauf frei
+    skip = wait - expected + 0.5
+    STATS["skips"] += 1
+    STATS["inference_saved"] += int(skip // max(float(cfg.interval_sec), expected))
+    logger.debug("[vision] skip inference: nächster Slot in %.0fs (Tick ~%.1fs)", wait, expected)
+    return skip
+
+
+def _journal_tick(ts: str, trace: Dict[str, Any], out: Optional[Dict[str, Any]], decision: Optional[str] = None):
+    """Ein Tick ins Journal (Hintergrund-Thread schreibt gebündelt)."""
+    rec = {
+        "ts": ts,
+        "image_md5": trace.get("image_md5"),
+        "vision": trace.get("vision"),
+        "writer": trace.get("writer"),
+        "out": out,
+        "decision": decision or trace.get("decision"),
+        "timings": trace.get("timings"),
+    }
+    rec.update((k, trace[k]) for k in _JOURNAL_TRACE_KEYS if k in trace)
+    tick_journal.record(rec)
+
+
+def _export_bot_state() -> Dict[str, Any]:
+    return {
+        "startup_vision_done": _startup_vision_done,
+        "last_sent": _last_sent_ts,
+        "last_rand_reply": _last_rand_reply_ts,
+        "rand_reply_llm_calls": _rand_reply_llm_calls,
+        "last_post": _last_vision_post,
+    }
+
+
+def _restore_bot_state(data: Dict[str, Any]):
+    global _startup_vision_done, _last_sent_ts, _last_rand_reply_ts, _last_vision_post, _rand_reply_llm_calls
+    _startup_vision_done = bool(data.get("startup_vision_done"))
+    _last_sent_ts = float(data.get("last_sent") or 0.0)
+    _last_rand_reply_ts = float(data.get("last_rand_reply") or 0.0)
+    _rand_reply_llm_calls = int(data.get("rand_reply_llm_calls") or 0)
+    _last_vision_post = data.get("last_post")
+
+
+def _setup_state_snapshot(twitch_client, youtube_client=None):
+    """Warm-Restart: Provider registrieren, Snapshot zurückspielen, Sicherung starten."""
+    if not state_snapshot.SNAPSHOT_ENABLED:
+        return
+    state_snapshot.register("bot", _export_bot_state, _restore_bot_state)
+    state_snapshot.register("anti_flood", ANTI_FLOOD.export_state, ANTI_FLOOD.restore_state)
+    if twitch_client is not None:
+        state_snapshot.register("twitch", twitch_client.export_state, twitch_client.restore_state)
+    pool = joke_pool.get_pool()
+    state_snapshot.register("joke_pool", pool.export_state, pool.restore_state)
+
+    # commentary_engine wird verzögert geladen: Zustand bis zum ersten Import parken
+    pending: Dict[str, Any] = {}
+
+    def _export_ce():
+        ce = sys.modules.get("commentary_engine")
+        return ce.export_state() if ce is not None else pending.get("data")
+
+    def _restore_ce(data):
+        pending["data"] = data
+        lazy_import.on_load("commentary_engine", lambda ce: ce.restore_state(pending.get("data") or {}))
+    state_snapshot.register("commentary", _export_ce, _restore_ce)
+    # Chat-Interaktionslog wird gepuffert und mit jeder Sicherung angehängt
+    state_snapshot.add_save_hook("reply_log", reply_classifier.flush_log)
+    state_snapshot.add_save_hook("game_state", game_state_tracker.save)
+
+    with phase("main: state restore"):
+        state_snapshot.restore_all()
+    state_snapshot.start_periodic()
+    state_snapshot.install_sigterm_handler()
+
+
+def _run_multiproc(tick_hook):
+    """Vision-Pfad in Stufen-Prozessen; dieser Prozess macht nur Chat-I/O + Veröffentlichung."""
+    global PIPELINE
+    frame_index.set_writer(False)           # die Ingest-Stufe schreibt den Index, hier nur !similar
+    mp_pipe = lazy_import.module("multiproc_pipeline")
+    PIPELINE = mp_pipe.StagePipeline(SCREENSHOT_FILE, bot_config.get().interval_sec)
+    PIPELINE.start()
+    logger.info("[pipeline] multi-process: %s", PIPELINE.stats_compact())
+    hold_until = 0.0
+    try:
+        while True:
+            tick_hook()
+            # wie im Single-Process-Loop: keine Frames in die Stufen, deren Post verworfen würde
+            if time.time() >= hold_until:
+                skip = _blocked_skip_sec(bot_config.get())
+                hold_until = time.time() + skip if skip else 0.0
+                PIPELINE.hold_until(hold_until)
+            out = PIPELINE.results(timeout=1.0)
+            if not out:
+                continue
+            tw_msg = out.get("twitch_sentence") or ""
+            yt_msg = out.get("youtube_sentence") or tw_msg[:200]
+            trace: Dict[str, Any] = {"image_md5": out.get("md5"), "timings": out.get("timings")}
+            CADENCE.observe(trace)
+            _publish_vision(tw_msg, yt_msg, {"keywords": out.get("keywords") or [], "ts": out.get("ts")}, trace=trace)
+            _journal_tick(out.get("ts") or "", trace, out)
+    except KeyboardInterrupt:
+        logger.info("Beende Zephyr Bot (KeyboardInterrupt)…")
+        if state_snapshot.SNAPSHOT_ENABLED:
+            state_snapshot.save()
+        reply_classifier.flush_log()
+        PIPELINE.stop()
+        sys.exit(0)
+
+
+def main(argv: Optional[list] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    profile_startup = "--profile-startup" in argv
+    _setup_logging()
+    # Konfiguration erst beim Start laden – ein Import (Tools, Tests, simulate)
+    # friert sonst die Umgebung des Aufrufers ein
+    bot_config.load()
     logger.info("========================================")
     logger.info("🤖 Zephyr Bot - Final Edition")
     logger.info("▶  PID: %s", os.getpid())
 
-    global TWITCH_CLIENT, twitch
-    twitch = TwitchClient() if ENABLE_TWITCH else None
-    youtube = YouTubeClient() if ENABLE_YOUTUBE else None
+    global TWITCH_CLIENT, twitch, SINKS
+    with phase("main: clients init"):
+        twitch = TwitchClient() if ENABLE_TWITCH else None
+        youtube = YouTubeClient() if ENABLE_YOUTUBE else None
     TWITCH_CLIENT = twitch
+    # vor connect(): Budgets/Dedupe/Startup-Vision-Status aus dem letzten Lauf
+    _setup_state_snapshot(twitch, youtube)
+    # Live-Reload per SIGHUP oder .env-Änderung; Budgets ohne IRC-Reconnect neu setzen
+    if twitch:
+        bot_config.on_change(lambda old, new: twitch.reload_budget_config())
+    bot_config.install_sighup_handler()
+    bot_config.start_watch()
 
     if twitch:
         # Chat-Befehle auswerten
         twitch.on_message = handle_chat_message
         # Schedule auto-vision when IRC ready (USERSTATE/ROOMSTATE or end of MOTD)
         try:
-            twitch.on_ready = schedule_startup_vision
+            twitch.on_ready = _on_irc_ready
         except Exception:
             pass
-        twitch.connect()
+        with phase("main: twitch.connect"):
+            twitch.connect()
 
     # Periodic help/commands announcement
-    help_enabled = os.getenv("TWITCH_HELP_ENABLED", "true").lower() == "true"
-    try:
-        help_interval = int(os.getenv("TWITCH_HELP_INTERVAL_SEC", "300"))
-    except Exception:
-        help_interval = 300
-    help_msg = os.getenv("TWITCH_HELP_MESSAGE") or get_help_message()
     last_help_ts: float = 0.0
     if youtube:
         youtube.connect()
+    SINKS = output_sinks.build_default_hub(twitch if not TWITCH_SILENT_AUTO else None, youtube)
+    # Tick-Journal (JSONL, gebündelt geschrieben)
+    tick_journal.start_default()
+    # Witz-/Füllzeilen im Leerlauf der LLM-Kette vorproduzieren
+    joke_pool.start_background()
+    # Health-Probes im Hintergrund; !health liest nur den Snapshot
+    health_monitor.start_default(twitch)
+
+    startup_profile.mark("main: betriebsbereit")
+    logger.info("Bot gestartet und betriebsbereit (%.0f ms).", startup_profile.elapsed_ms())
+    if profile_startup:
+        _print_startup_profile()
+
+    def _maybe_help():
+        # Periodic commands/help line every N seconds
+        nonlocal last_help_ts
+        cfg = bot_config.get()
+        if cfg.help_enabled and twitch:
+            now_ts = clock.time()
+            if (now_ts - last_help_ts) >= cfg.help_interval_sec:
+                try:
+                    twitch.say(prepare_for_twitch(cfg.help_message or get_help_message()), bucket="command")
+                    last_help_ts = now_ts
+                except Exception:
+                    pass
 
-    logger.info("Bot gestartet und betriebsbereit.")
+    if ORCHESTRATOR_ENABLED and (MULTIPROC_ENABLED or "--multiproc" in argv):
+        _run_multiproc(_maybe_help)
+        return
 
     try:
-        last_sent_ts: float = 0.0
         while True:
-            # Periodic commands/help line every N seconds
-            if help_enabled and twitch:
-                now_ts = time.time()
-                if (now_ts - last_help_ts) >= max(60, help_interval):
-                    try:
-                        twitch.say(prepare_for_twitch(help_msg), bucket="command")
-                        last_help_ts = now_ts
-                    except Exception:
-                        pass
+            _maybe_help()
+            cfg = bot_config.get()
             if not should_post_now():
-                time.sleep(INTERVAL)
+                clock.sleep(cfg.interval_sec)
                 continue
 
             # Screenshot in den Ringpuffer aufnehmen (optional best effort)
             try:
-                from screenshots.screenshot_manager import ingest as _ingest
-                _ingest(SCREENSHOT_FILE)
+                sm = _shots()
+                if sm:
+                    frame_index.ingest(sm, SCREENSHOT_FILE)
             except Exception:
                 pass
 
             if ORCHESTRATOR_ENABLED:
-                ts = time.strftime("%Y-%m-%dT%H:%M:%S%z")
-                out = orchestrator.run_tick(ts, SCREENSHOT_FILE, optional_ocr_text=None)
+                # keine Inferenz, deren Ergebnis ohnehin verworfen würde
+                skip = _blocked_skip_sec(cfg)
+                if skip:
+                    clock.sleep(skip)
+                    continue
+                STATS["ticks"] += 1
+                ts = time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(clock.time()))
+                trace: Dict[str, Any] = {}
+                t_tick = clock.monotonic()
+                out = lazy_import.module("orchestrator").run_tick(ts, SCREENSHOT_FILE, optional_ocr_text=None, trace=trace)
+                CADENCE.observe(trace)
                 if not out:
                     # no output this tick
-                    time.sleep(INTERVAL)
-                    continue
-                tw_msg = out.get("twitch_sentence") or ""
-                yt_msg = out.get("youtube_sentence") or tw_msg[:200]
-                # AntiFlood (use twitch sentence)
-                if not ANTI_FLOOD.allow(tw_msg, min_interval=SHORT_CHAT_MIN_INTERVAL, salt=POST_SALT):
-                    logger.info(
-                        "[vision→twitch] DROP durch AntiFlood: min_interval=%ss (Text gehasht mit salt)",
-                        SHORT_CHAT_MIN_INTERVAL,
-                    )
-                    time.sleep(INTERVAL)
-                    continue
-                now = time.time()
-                if (now - last_sent_ts) < CHAT_GLOBAL_COOLDOWN_SEC:
-                    logger.debug("Global Cooldown: noch %.1fs – übersprungen", CHAT_GLOBAL_COOLDOWN_SEC - (now - last_sent_ts))
-                    time.sleep(INTERVAL)
-                    continue
-                if twitch and not TWITCH_SILENT_AUTO:
-                    try:
-                        twitch.enqueue(tw_msg, bucket="vision")
-                    except Exception as e:
-                        logger.warning("[vision→twitch] SEND-Error: %s", e)
-                        # retry once after backoff 1.5x
-                        time.sleep(max(1.0, INTERVAL * 1.5))
-                        try:
-                            twitch.enqueue(tw_msg, bucket="vision")
-                        except Exception:
-                            pass
-                elif twitch and TWITCH_SILENT_AUTO:
-                    logger.info("[vision] SKIP: TWITCH_SILENT_AUTO=true")
-                if youtube:
-                    try:
-                        youtube.post(yt_msg)
-                    except Exception:
-                        time.sleep(max(1.0, INTERVAL * 1.5))
-                        try:
-                            youtube.post(yt_msg)
-                        except Exception:
-                            pass
-                last_sent_ts = time.time()
-                # jittered sleep
-                try:
-                    import random as _r
-                    dt = INTERVAL + _r.uniform(-INTERVAL_JITTER, INTERVAL_JITTER)
-                    time.sleep(max(1.0, dt))
-                except Exception:
-                    time.sleep(INTERVAL)
+                    _journal_tick(ts, trace, None, "none")
+                else:
+                    tw_msg = out.get("twitch_sentence") or ""
+                    yt_msg = out.get("youtube_sentence") or tw_msg[:200]
+                    if _publish_vision(tw_msg, yt_msg, {"keywords": out.get("keywords") or [], "ts": ts}, trace=trace):
+                        # nächster Writer-Prompt: nur was sich seit diesem Post ändert
+                        game_state_tracker.mark_posted()
+                    _journal_tick(ts, trace, out)
+                # nächste Pause aus Latenz, Bildwechselrate und Budget-Druck
+                budget = twitch.bucket_state("vision") if twitch else None
+                clock.sleep(CADENCE.next_delay(clock.monotonic() - t_tick, budget))
                 continue
 
             # Legacy path
             comment = get_vision_comment(SCREENSHOT_FILE)
             if not comment:
-                time.sleep(INTERVAL)
-                continue
-            if not ANTI_FLOOD.allow(comment, min_interval=SHORT_CHAT_MIN_INTERVAL, salt=POST_SALT):
-                logger.info(
-                    "[vision→twitch] DROP durch AntiFlood: min_interval=%ss (Text gehasht mit salt)",
-                    SHORT_CHAT_MIN_INTERVAL,
-                )
-                time.sleep(INTERVAL)
+                clock.sleep(cfg.interval_sec)
                 continue
-            short_msg = prepare_for_twitch(comment, salt=POST_SALT)
-            now = time.time()
-            if (now - last_sent_ts) < CHAT_GLOBAL_COOLDOWN_SEC:
-                logger.debug("Global Cooldown: noch %.1fs – übersprungen", CHAT_GLOBAL_COOLDOWN_SEC - (now - last_sent_ts))
-                time.sleep(INTERVAL)
+            if not _publish_vision(prepare_for_twitch(comment, salt=cfg.post_salt), prepare_for_twitch(comment, salt=cfg.post_salt)):
+                clock.sleep(cfg.interval_sec)
                 continue
-            if twitch and not TWITCH_SILENT_AUTO:
-                twitch.enqueue(short_msg, bucket="vision")
-            else:
-                if TWITCH_SILENT_AUTO:
-                    logger.info("[vision] SKIP: TWITCH_SILENT_AUTO=true")
-            if youtube:
-                youtube.post(short_msg)
-            last_sent_ts = time.time()
-            time.sleep(INTERVAL)
+            clock.sleep(cfg.interval_sec)
 
     except KeyboardInterrupt:
         logger.info("Beende Zephyr Bot (KeyboardInterrupt)…")
+        if state_snapshot.SNAPSHOT_ENABLED:
+            state_snapshot.save()
+        reply_classifier.flush_log()
+        game_state_tracker.save()
         sys.exit(0)
 
 